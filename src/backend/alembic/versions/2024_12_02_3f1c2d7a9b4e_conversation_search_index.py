@@ -0,0 +1,68 @@
+"""Add full-text search index to conversations
+
+Revision ID: 3f1c2d7a9b4e
+Revises: cc8ba02f10ee
+Create Date: 2024-12-02 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2d7a9b4e'
+down_revision: Union[str, None] = 'cc8ba02f10ee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'conversations',
+        sa.Column('message_search_vector', postgresql.TSVECTOR(), nullable=True),
+    )
+    # Index the messages of existing conversations
+    op.execute(
+        """
+        UPDATE conversations
+        SET message_search_vector = (
+            SELECT to_tsvector('english', coalesce(string_agg(messages.text, ' ' ORDER BY messages.position), ''))
+            FROM messages
+            WHERE messages.conversation_id = conversations.id
+                AND messages.user_id = conversations.user_id
+                AND messages.is_active
+        )
+        """
+    )
+    op.add_column(
+        'conversations',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A')"
+                " || setweight(coalesce(message_search_vector, ''::tsvector), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'conversation_search_vector_index',
+        'conversations',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'conversation_search_vector_index',
+        table_name='conversations',
+        postgresql_using='gin',
+    )
+    op.drop_column('conversations', 'search_vector')
+    op.drop_column('conversations', 'message_search_vector')
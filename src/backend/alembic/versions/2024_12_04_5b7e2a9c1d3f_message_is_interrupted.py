@@ -0,0 +1,33 @@
+"""Mark messages interrupted by a client disconnect
+
+Revision ID: 5b7e2a9c1d3f
+Revises: 3f1c2d7a9b4e
+Create Date: 2024-12-04 10:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2a9c1d3f'
+down_revision: Union[str, None] = '3f1c2d7a9b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'messages',
+        sa.Column(
+            'is_interrupted',
+            sa.Boolean(),
+            server_default=sa.false(),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'is_interrupted')
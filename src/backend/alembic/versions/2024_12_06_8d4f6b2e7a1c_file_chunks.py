@@ -0,0 +1,41 @@
+"""Add file chunks for file search
+
+Revision ID: 8d4f6b2e7a1c
+Revises: 5b7e2a9c1d3f
+Create Date: 2024-12-06 09:31:12.204117
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f6b2e7a1c'
+down_revision: Union[str, None] = '5b7e2a9c1d3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'file_chunks',
+        sa.Column('file_id', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('start_offset', sa.Integer(), nullable=False),
+        sa.Column('end_offset', sa.Integer(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('embedding', sa.LargeBinary(), nullable=False),
+        sa.Column('embedder', sa.String(), nullable=False),
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('file_chunk_file_id', 'file_chunks', ['file_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('file_chunk_file_id', table_name='file_chunks')
+    op.drop_table('file_chunks')
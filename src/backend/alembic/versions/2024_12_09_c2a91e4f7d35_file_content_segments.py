@@ -0,0 +1,122 @@
+"""Move file content to compressed segments and add word counts
+
+Revision ID: c2a91e4f7d35
+Revises: 8d4f6b2e7a1c
+Create Date: 2024-12-09 14:12:47.530961
+
+"""
+import zlib
+from typing import Sequence, Union
+from uuid import uuid4
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a91e4f7d35'
+down_revision: Union[str, None] = '8d4f6b2e7a1c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match backend.database_models.file_content
+SEGMENT_SIZE = 64 * 1024
+COMPRESSION_LEVEL = 6
+
+files = sa.table(
+    'files',
+    sa.column('id', sa.String()),
+    sa.column('file_content', sa.String()),
+    sa.column('word_count', sa.Integer()),
+)
+segments = sa.table(
+    'file_content_segments',
+    sa.column('id', sa.String()),
+    sa.column('file_id', sa.String()),
+    sa.column('position', sa.Integer()),
+    sa.column('start_offset', sa.Integer()),
+    sa.column('length', sa.Integer()),
+    sa.column('data', sa.LargeBinary()),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'file_content_segments',
+        sa.Column('file_id', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('start_offset', sa.Integer(), nullable=False),
+        sa.Column('length', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'file_content_segment_file_id_position',
+        'file_content_segments',
+        ['file_id', 'position'],
+        unique=False,
+    )
+
+    op.add_column(
+        'files',
+        sa.Column('word_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    conn = op.get_bind()
+    # One file at a time, so large contents aren't all held in memory
+    file_ids = conn.execute(sa.select(files.c.id)).scalars().all()
+    for file_id in file_ids:
+        content = conn.execute(
+            sa.select(files.c.file_content).where(files.c.id == file_id)
+        ).scalar() or ''
+        rows = [
+            {
+                'id': str(uuid4()),
+                'file_id': file_id,
+                'position': position,
+                'start_offset': start,
+                'length': len(text),
+                'data': zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL),
+            }
+            for position, start in enumerate(range(0, len(content), SEGMENT_SIZE))
+            for text in [content[start : start + SEGMENT_SIZE]]
+        ]
+        if rows:
+            conn.execute(segments.insert(), rows)
+        conn.execute(
+            files.update()
+            .where(files.c.id == file_id)
+            .values(word_count=len(content.split()))
+        )
+
+    op.drop_column('files', 'file_content')
+
+
+def downgrade() -> None:
+    op.add_column(
+        'files',
+        sa.Column('file_content', sa.String(), nullable=False, server_default=''),
+    )
+
+    conn = op.get_bind()
+    file_ids = conn.execute(sa.select(segments.c.file_id).distinct()).scalars().all()
+    for file_id in file_ids:
+        data = conn.execute(
+            sa.select(segments.c.data)
+            .where(segments.c.file_id == file_id)
+            .order_by(segments.c.position)
+        ).scalars()
+        content = ''.join(zlib.decompress(chunk).decode('utf-8') for chunk in data)
+        conn.execute(
+            files.update().where(files.c.id == file_id).values(file_content=content)
+        )
+
+    op.alter_column('files', 'file_content', server_default=None)
+    op.drop_column('files', 'word_count')
+    op.drop_index(
+        'file_content_segment_file_id_position', table_name='file_content_segments'
+    )
+    op.drop_table('file_content_segments')
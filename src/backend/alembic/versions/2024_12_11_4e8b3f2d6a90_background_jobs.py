@@ -0,0 +1,61 @@
+"""Add background jobs
+
+Revision ID: 4e8b3f2d6a90
+Revises: c2a91e4f7d35
+Create Date: 2024-12-11 10:04:55.318274
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8b3f2d6a90'
+down_revision: Union[str, None] = 'c2a91e4f7d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'background_jobs',
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('context', sa.JSON(), nullable=False),
+        sa.Column('deployment_name', sa.String(), nullable=True),
+        sa.Column(
+            'status',
+            sa.Enum(
+                'PENDING',
+                'RUNNING',
+                'SUCCEEDED',
+                'FAILED',
+                name='backgroundjobstatus',
+                native_enum=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'background_job_status_run_after',
+        'background_jobs',
+        ['status', 'run_after'],
+        unique=False,
+    )
+    op.create_index('background_job_key', 'background_jobs', ['key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('background_job_key', table_name='background_jobs')
+    op.drop_index('background_job_status_run_after', table_name='background_jobs')
+    op.drop_table('background_jobs')
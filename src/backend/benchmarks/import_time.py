@@ -0,0 +1,116 @@
+"""
+Measures how long importing a module takes in a fresh interpreter, and whether it
+attempts any network I/O while doing so.
+
+Usage:
+    python -m backend.benchmarks.import_time [--module backend.main] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in the child interpreter: records connection and DNS attempts instead of making them
+IMPORT_PROBE = """
+import json, socket, sys, time
+
+attempts = []
+
+def guard(name):
+    def blocked(*args, **kwargs):
+        attempts.append(f"{name}{args[1:] if name == 'connect' else args[:2]}")
+        raise OSError("Network I/O is disabled while importing")
+    return blocked
+
+socket.socket.connect = guard("connect")
+socket.socket.connect_ex = guard("connect")
+socket.getaddrinfo = guard("getaddrinfo")
+
+error = None
+start = time.perf_counter()
+try:
+    __import__(sys.argv[1])
+except Exception as e:
+    error = repr(e)
+seconds = time.perf_counter() - start
+
+print(json.dumps({"seconds": seconds, "network_attempts": attempts, "error": error}))
+"""
+
+
+def measure_import(module: str = "backend.main", env: dict | None = None) -> dict:
+    """
+    Imports a module once in a fresh interpreter with networking disabled.
+
+    Args:
+        module (str): Module to import.
+        env (dict): Optional environment of the child interpreter.
+
+    Returns:
+        dict: The import duration in seconds, the network calls attempted and the
+            import error, if any.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE, module],
+        capture_output=True,
+        text=True,
+        env=env if env is not None else os.environ.copy(),
+        check=True,
+    )
+
+    # Modules may print while importing, the probe result is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(module: str = "backend.main", runs: int = 5) -> dict:
+    """
+    Imports a module runs times, each in a fresh interpreter.
+
+    Args:
+        module (str): Module to import.
+        runs (int): Number of imports.
+
+    Returns:
+        dict: Import time statistics in seconds, import errors and all network calls
+            attempted.
+    """
+    measurements = [measure_import(module) for _ in range(runs)]
+    seconds = [measurement["seconds"] for measurement in measurements]
+
+    return {
+        "module": module,
+        "runs": runs,
+        "mean_seconds": statistics.mean(seconds),
+        "median_seconds": statistics.median(seconds),
+        "max_seconds": max(seconds),
+        "errors": [
+            measurement["error"] for measurement in measurements if measurement["error"]
+        ],
+        "network_attempts": sorted(
+            {
+                attempt
+                for measurement in measurements
+                for attempt in measurement["network_attempts"]
+            }
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    report = run_benchmark(args.module, args.runs)
+    print(json.dumps(report, indent=2))
+
+    if report["errors"] or report["network_attempts"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""
+End-to-end load and latency benchmark of the backend against a local mock OpenAI server.
+
+The backend and the mock server run in this process, so database queries and memory
+can be measured. Results are written as JSON, to track regressions across commits.
+The database must be migrated, or pass --migrate.
+
+Usage:
+    python -m backend.benchmarks.load --requests 50 --concurrency 8 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable
+
+import httpx
+import uvicorn
+from sqlalchemy import event
+
+from backend.benchmarks.mock_openai import (
+    MOCK_MODEL,
+    MockOpenAIConfig,
+    create_mock_openai_app,
+)
+
+SCENARIOS = [
+    "chat_stream",
+    "chat",
+    "list_conversations",
+    "batch_upload_file",
+    "upload_folder",
+]
+UPLOAD_CONTENT = b"The Mariana Trench is the deepest oceanic trench on Earth.\n" * 20
+SERVER_START_TIMEOUT_SECONDS = 30
+
+
+@dataclass
+class Sample:
+    seconds: float
+    error: str | None = None
+    time_to_first_token: float | None = None
+    inter_token_latencies: list[float] = field(default_factory=list)
+    events: int = 0
+
+
+class QueryCounter:
+    """Counts the SQL statements executed on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args: Any) -> None:
+        with self._lock:
+            self.count += 1
+
+
+class BackgroundServer:
+    """Runs a uvicorn server in a daemon thread"""
+
+    def __init__(self, app, port: int):
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Benchmark server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    if not values:
+        return None
+
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def get_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return get_peak_rss_bytes()
+
+
+def get_peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def chat_stream(client: httpx.AsyncClient, headers: dict) -> Sample:
+    start = time.perf_counter()
+    first_token_at = None
+    last_token_at = None
+    inter_token_latencies = []
+    events = 0
+
+    async with client.stream(
+        "POST",
+        "/v1/chat-stream",
+        headers=headers,
+        json={"message": "Tell me about the Mariana Trench"},
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+
+            events += 1
+            chat_event = json.loads(line[len("data:") :])
+            if chat_event.get("event") != "text-generation":
+                continue
+
+            now = time.perf_counter()
+            if first_token_at is None:
+                first_token_at = now
+            else:
+                inter_token_latencies.append(now - last_token_at)
+            last_token_at = now
+
+    return Sample(
+        seconds=time.perf_counter() - start,
+        time_to_first_token=first_token_at - start if first_token_at else None,
+        inter_token_latencies=inter_token_latencies,
+        events=events,
+    )
+
+
+async def chat(client: httpx.AsyncClient, headers: dict) -> Sample:
+    start = time.perf_counter()
+    response = await client.post(
+        "/v1/chat",
+        headers=headers,
+        json={"message": "Tell me about the Mariana Trench"},
+    )
+    response.raise_for_status()
+
+    return Sample(seconds=time.perf_counter() - start, events=1)
+
+
+async def list_conversations(client: httpx.AsyncClient, headers: dict) -> Sample:
+    start = time.perf_counter()
+    response = await client.get("/v1/conversations", headers=headers)
+    response.raise_for_status()
+
+    return Sample(seconds=time.perf_counter() - start, events=1)
+
+
+async def batch_upload_file(client: httpx.AsyncClient, headers: dict) -> Sample:
+    start = time.perf_counter()
+    response = await client.post(
+        "/v1/conversations/batch_upload_file",
+        headers=headers,
+        files=[("files", ("benchmark.txt", UPLOAD_CONTENT, "text/plain"))],
+    )
+    response.raise_for_status()
+
+    return Sample(seconds=time.perf_counter() - start, events=1)
+
+
+async def upload_folder(client: httpx.AsyncClient, headers: dict) -> Sample:
+    start = time.perf_counter()
+    response = await client.post(
+        "/v1/conversations/upload_folder",
+        headers=headers,
+        data={
+            "folder_name": "benchmark",
+            "paths": ["benchmark/a.txt", "benchmark/b.txt"],
+            "names": ["a.txt", "b.txt"],
+        },
+        files=[
+            ("files", ("a.txt", UPLOAD_CONTENT, "text/plain")),
+            ("files", ("b.txt", UPLOAD_CONTENT, "text/plain")),
+        ],
+    )
+    response.raise_for_status()
+
+    return Sample(seconds=time.perf_counter() - start, events=1)
+
+
+SCENARIO_RUNNERS: dict[str, Callable[..., Awaitable[Sample]]] = {
+    "chat_stream": chat_stream,
+    "chat": chat,
+    "list_conversations": list_conversations,
+    "batch_upload_file": batch_upload_file,
+    "upload_folder": upload_folder,
+}
+
+
+async def run_scenario(
+    name: str,
+    client: httpx.AsyncClient,
+    headers: dict,
+    requests: int,
+    concurrency: int,
+    query_counter: QueryCounter,
+) -> dict:
+    """
+    Sends requests for a scenario, at most concurrency at a time.
+
+    Args:
+        name (str): Scenario name, see SCENARIOS.
+        client (httpx.AsyncClient): Client for the backend.
+        headers (dict): Request headers.
+        requests (int): Number of requests.
+        concurrency (int): Maximum number of concurrent requests.
+        query_counter (QueryCounter): Counter of the backend's database queries.
+
+    Returns:
+        dict: Scenario results.
+    """
+    runner = SCENARIO_RUNNERS[name]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_once() -> Sample:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                return await runner(client, headers)
+            except Exception as e:
+                return Sample(seconds=time.perf_counter() - start, error=repr(e))
+
+    queries_before = query_counter.count
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(run_once() for _ in range(requests)))
+    wall_seconds = time.perf_counter() - start
+    queries = query_counter.count - queries_before
+
+    succeeded = [sample for sample in samples if sample.error is None]
+    latencies = [sample.seconds for sample in succeeded]
+    ttfts = [
+        sample.time_to_first_token
+        for sample in succeeded
+        if sample.time_to_first_token is not None
+    ]
+    inter_token_latencies = [
+        latency for sample in succeeded for latency in sample.inter_token_latencies
+    ]
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(samples) - len(succeeded),
+        "error_samples": sorted({sample.error for sample in samples if sample.error})[
+            :5
+        ],
+        "wall_seconds": wall_seconds,
+        "requests_per_second": len(succeeded) / wall_seconds if wall_seconds else None,
+        "events_per_second": (
+            sum(sample.events for sample in succeeded) / wall_seconds
+            if wall_seconds
+            else None
+        ),
+        "latency_seconds": {
+            "mean": statistics.mean(latencies) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+        },
+        "time_to_first_token_seconds": {
+            "p50": percentile(ttfts, 50),
+            "p99": percentile(ttfts, 99),
+        },
+        "inter_token_latency_seconds": {
+            "p50": percentile(inter_token_latencies, 50),
+            "p99": percentile(inter_token_latencies, 99),
+        },
+        "db_queries_per_request": queries / requests if requests else None,
+        "rss_bytes": get_rss_bytes(),
+    }
+
+
+async def run_scenarios(args: argparse.Namespace, query_counter: QueryCounter) -> dict:
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout
+    ) as client:
+        response = await client.post(
+            "/v1/users", json={"fullname": "Benchmark User"}
+        )
+        response.raise_for_status()
+        headers = {
+            "User-Id": response.json()["id"],
+            "Deployment-Name": args.deployment,
+        }
+
+        # Warm up connections, caches and lazily loaded modules
+        for name in args.scenarios:
+            await run_scenario(name, client, headers, 1, 1, query_counter)
+
+        return {
+            name: await run_scenario(
+                name, client, headers, args.requests, args.concurrency, query_counter
+            )
+            for name in args.scenarios
+        }
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    """
+    Starts the mock OpenAI server and the backend, then runs the benchmark scenarios.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        dict: Benchmark configuration and results per scenario.
+    """
+    mock_config = MockOpenAIConfig(
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        jitter_seconds=args.jitter_seconds,
+        tool_call_rate=args.tool_call_rate,
+        seed=args.seed,
+    )
+
+    with BackgroundServer(create_mock_openai_app(mock_config), args.mock_port):
+        # Deployments read their configuration on import, so point them at the mock first
+        os.environ["OPENAI_API_KEY"] = "benchmark"
+        os.environ["OPENAI_ENDPOINT_URL"] = f"http://127.0.0.1:{args.mock_port}/v1"
+        os.environ["OPENAI_DEFAULT_MODEL"] = MOCK_MODEL
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+
+        if args.migrate:
+            from alembic.command import upgrade
+            from alembic.config import Config
+
+            upgrade(Config("src/backend/alembic.ini"), "head")
+
+        from backend.database_models.database import engine
+        from backend.main import app
+
+        query_counter = QueryCounter(engine)
+        with BackgroundServer(app, args.port):
+            results = asyncio.run(run_scenarios(args, query_counter))
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "deployment": args.deployment,
+            "database": engine.url.render_as_string(hide_password=True),
+            "mock_openai": asdict(mock_config),
+            "python": platform.python_version(),
+        },
+        "peak_rss_bytes": get_peak_rss_bytes(),
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS
+    )
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deployment", default="OpenAI")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--migrate", action="store_true")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--mock-port", type=int, default=8089)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=50)
+    parser.add_argument("--jitter-seconds", type=float, default=0.0)
+    parser.add_argument("--tool-call-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(run_benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
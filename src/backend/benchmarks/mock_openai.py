@@ -0,0 +1,185 @@
+"""
+Local OpenAI-compatible stub server for benchmarks.
+
+It streams generated tokens at a configurable rate with jitter, and can answer with
+a tool call in the JSON format the OpenAI deployment parses out of the message text.
+
+Usage:
+    python -m backend.benchmarks.mock_openai --port 8089 --tokens-per-second 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator
+from uuid import uuid4
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MOCK_MODEL = "mock-gpt"
+TOKEN = "lorem "
+# CohereToOpenAI sends tool results back as text containing this marker
+TOOL_RESPONSE_MARKER = "tool response"
+
+
+@dataclass
+class MockOpenAIConfig:
+    tokens_per_second: float = 50.0
+    response_tokens: int = 50
+    # Maximum random delay added to each token
+    jitter_seconds: float = 0.0
+    # Share of first turn requests answered with a tool call
+    tool_call_rate: float = 0.0
+    tool_name: str = "toolkit_calculator"
+    tool_parameters: str = '{"code": "6 * 7"}'
+    seed: int | None = None
+
+
+def create_mock_openai_app(config: MockOpenAIConfig) -> FastAPI:
+    """
+    Creates the stub server app.
+
+    Args:
+        config (MockOpenAIConfig): Token rate, jitter and tool call emission.
+
+    Returns:
+        FastAPI: The app, serving /v1/models, /v1/chat/completions and /v1/completions.
+    """
+    app = FastAPI()
+    rng = random.Random(config.seed)
+
+    def get_response_text(messages: list[dict[str, Any]]) -> str:
+        has_tool_results = any(
+            message.get("role") == "tool"
+            or TOOL_RESPONSE_MARKER in str(message.get("content", "")).lower()
+            for message in messages
+        )
+        if not has_tool_results and rng.random() < config.tool_call_rate:
+            return (
+                f'```json\n{{"name": "{config.tool_name}", '
+                f'"parameters": {config.tool_parameters}}}\n```'
+            )
+
+        return TOKEN * config.response_tokens
+
+    async def stream_tokens(text: str) -> AsyncGenerator[str, None]:
+        # Tool calls are sent in tokens like any other text
+        tokens = [text[i : i + len(TOKEN)] for i in range(0, len(text), len(TOKEN))]
+        start = time.perf_counter()
+        for index, token in enumerate(tokens):
+            send_at = start + index / config.tokens_per_second
+            delay = send_at - time.perf_counter()
+            if config.jitter_seconds:
+                delay += rng.uniform(0, config.jitter_seconds)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield token
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": MOCK_MODEL, "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        completion_id = f"chatcmpl-{uuid4().hex}"
+        text = get_response_text(body.get("messages", []))
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.response_tokens / config.tokens_per_second)
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", MOCK_MODEL),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+            )
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            return "data: " + json.dumps(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", MOCK_MODEL),
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+            ) + "\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            async for token in stream_tokens(text):
+                yield chunk({"content": token})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        completion_id = f"cmpl-{uuid4().hex}"
+        text = get_response_text([{"content": body.get("prompt", "")}])
+
+        def chunk(token: str, finish_reason: str | None = None) -> str:
+            return "data: " + json.dumps(
+                {
+                    "id": completion_id,
+                    "object": "text_completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", MOCK_MODEL),
+                    "choices": [
+                        {"index": 0, "text": token, "finish_reason": finish_reason}
+                    ],
+                }
+            ) + "\n\n"
+
+        async def events():
+            async for token in stream_tokens(text):
+                yield chunk(token)
+            yield chunk("", "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=50)
+    parser.add_argument("--jitter-seconds", type=float, default=0.0)
+    parser.add_argument("--tool-call-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockOpenAIConfig(
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        jitter_seconds=args.jitter_seconds,
+        tool_call_rate=args.tool_call_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_mock_openai_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
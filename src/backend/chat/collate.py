@@ -1,15 +1,29 @@
+import asyncio
+import hashlib
 import json
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List
 
-from backend.model_deployments.base import BaseDeployment
 from backend.schemas.context import Context
+from backend.services.cache import TTLCache
+from backend.services.tracing import span
+
+if TYPE_CHECKING:
+    # The model deployments import to_dict from here
+    from backend.model_deployments.base import BaseDeployment
 
 RELEVANCE_THRESHOLD = 0.1
+CHUNK_CACHE_SIZE = 1024
+RERANK_SCORE_CACHE_SIZE = 10_000
+RERANK_SCORE_TTL_SECONDS = 60 * 60
+
+chunk_cache = TTLCache(RERANK_SCORE_TTL_SECONDS, max_size=CHUNK_CACHE_SIZE)
+# Rerank scores are per (query, document) pair, so they can be reused across calls
+rerank_score_cache = TTLCache(RERANK_SCORE_TTL_SECONDS, max_size=RERANK_SCORE_CACHE_SIZE)
 
 
 async def rerank_and_chunk(
     tool_results: List[Dict[str, Any]],
-    model: BaseDeployment,
+    model: "BaseDeployment",
     ctx: Context,
     **kwargs: Any,
 ) -> List[Dict[str, Any]]:
@@ -47,95 +61,163 @@ async def rerank_and_chunk(
             tool_result["outputs"]
         )
 
-    # Rerank the documents for each query
-    reranked_results = {}
-    for tool_call_hashable, tool_result in unified_tool_results.items():
-        tool_call = tool_result["call"]
-        query = tool_call.get("parameters").get("query") or tool_call.get(
-            "parameters"
-        ).get("search_query")
+    # Rerank the documents of all queries concurrently
+    with span("chat.rerank_and_chunk", queries=len(unified_tool_results)):
+        reranked_results = await asyncio.gather(
+            *(
+                rerank_tool_result(tool_result, model, ctx)
+                for tool_result in unified_tool_results.values()
+            )
+        )
+
+    return [result for result in reranked_results if result is not None]
+
+
+async def rerank_tool_result(
+    tool_result: Dict[str, Any], model: "BaseDeployment", ctx: Context
+) -> Dict[str, Any] | None:
+    """
+    Chunks and reranks the outputs of a single tool call against its query.
+
+    Only chunks without a cached score for the query are sent to the reranker.
+
+    Args:
+        tool_result (Dict[str, Any]): Tool call and its outputs.
+        model (BaseDeployment): Model deployment.
+        ctx (Context): Context object.
+
+    Returns:
+        Dict[str, Any] | None: Tool result with reranked outputs, None if it has no outputs.
+    """
+    tool_call = tool_result["call"]
+    query = tool_call.get("parameters").get("query") or tool_call.get(
+        "parameters"
+    ).get("search_query")
+
+    # Only rerank if there is a query
+    if not query:
+        return tool_result
 
-        # Only rerank if there is a query
-        if not query:
-            reranked_results[tool_call_hashable] = tool_result
-            continue
+    chunked_outputs = []
+    for output in tool_result["outputs"]:
+        text = output.get("text")
 
-        chunked_outputs = []
-        for output in tool_result["outputs"]:
-            text = output.get("text")
+        # If one doesn't have text, don't rerank
+        if not text:
+            return tool_result
 
-            if not text:
-                # If one doesn't have text, skip it
-                chunked_outputs = None
-                reranked_results[tool_call_hashable] = tool_result
-                continue
+        chunked_outputs.extend([dict(output, text=chunk) for chunk in chunk(text)])
 
-            chunks = chunk(text)
-            chunked_outputs.extend([dict(output, text=chunk) for chunk in chunks])
+    # If no documents to rerank, drop the tool result
+    if not chunked_outputs:
+        return None
 
-        # If no documents to rerank, continue to the next query
-        if not chunked_outputs:
-            continue
+    model_key = get_rerank_model_key(model)
+    score_keys = [
+        (model_key, query, get_document_hash(output)) for output in chunked_outputs
+    ]
+    scores = [rerank_score_cache.get(key) for key in score_keys]
+    uncached_indices = [i for i, score in enumerate(scores) if score is None]
 
+    if uncached_indices:
         res = await model.invoke_rerank(
             query=query,
-            documents=chunked_outputs,
+            documents=[chunked_outputs[i] for i in uncached_indices],
             ctx=ctx,
         )
 
         if not res:
-            reranked_results[tool_call_hashable] = tool_result
-            continue
+            return tool_result
+
+        # Documents left out of the results are not relevant
+        for i in uncached_indices:
+            scores[i] = 0.0
+        for r in res["results"]:
+            scores[uncached_indices[r["index"]]] = r["relevance_score"]
+        for i in uncached_indices:
+            rerank_score_cache.put(score_keys[i], scores[i])
+
+    # Sort the documents by relevance score
+    ranked_indices = sorted(
+        range(len(chunked_outputs)), key=lambda i: scores[i], reverse=True
+    )
+
+    return {
+        "call": tool_call,
+        "outputs": [
+            chunked_outputs[i]
+            for i in ranked_indices
+            if scores[i] > RELEVANCE_THRESHOLD
+        ],
+    }
+
 
-        # Sort the results by relevance score
-        res["results"].sort(key=lambda x: x["relevance_score"], reverse=True)
+def get_rerank_model_key(model: "BaseDeployment") -> str:
+    return f"{type(model).__name__}:{getattr(model, 'rerank_model', None)}"
 
-        # Map the results back to the original documents
-        reranked_results[tool_call_hashable] = {
-            "call": tool_call,
-            "outputs": [
-                chunked_outputs[r["index"]]
-                for r in res["results"]
-                if r["relevance_score"] > RELEVANCE_THRESHOLD
-            ],
-        }
 
-    return list(reranked_results.values())
+def get_document_hash(document: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(document, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
 
 
 def chunk(content, compact_mode=False, soft_word_cut_off=100, hard_word_cut_off=300):
+    """
+    Splits content into chunks of at most hard_word_cut_off words, ending a chunk early at
+    the first sentence end past soft_word_cut_off words.
+
+    Chunks are memoized by content hash, since the same documents are often retrieved
+    again in later turns.
+
+    Args:
+        content (str): Content to chunk.
+        compact_mode (bool): Whether to replace newlines with spaces first.
+        soft_word_cut_off (int): Word count after which a chunk ends at a sentence end.
+        hard_word_cut_off (int): Maximum word count of a chunk.
+
+    Returns:
+        List[str]: Chunks.
+    """
+    cache_key = (
+        hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        compact_mode,
+        soft_word_cut_off,
+        hard_word_cut_off,
+    )
+    chunks = chunk_cache.get(cache_key)
+    if chunks is None:
+        chunks = tuple(
+            _chunk_words(content, compact_mode, soft_word_cut_off, hard_word_cut_off)
+        )
+        chunk_cache.put(cache_key, chunks)
+
+    return list(chunks)
+
+
+def _chunk_words(content, compact_mode, soft_word_cut_off, hard_word_cut_off):
     if compact_mode:
         content = content.replace("\n", " ")
 
     chunks = []
-    current_chunk = ""
-    words = content.split()
-    word_count = 0
+    current_chunk = []
 
-    for word in words:
-        if word_count + len(word.split()) > hard_word_cut_off:
+    for word in content.split():
+        if len(current_chunk) + 1 > hard_word_cut_off:
             # If adding the next word exceeds the hard limit, finalize the current chunk
-            chunks.append(current_chunk)
-            current_chunk = ""
-            word_count = 0
-
-        if word_count + len(word.split()) > soft_word_cut_off and word.endswith("."):
-            # If adding the next word exceeds the soft limit and the word ends with a period, finalize the current chunk
-            current_chunk += " " + word
-            chunks.append(current_chunk.strip())
-            current_chunk = ""
-            word_count = 0
-        else:
-            # Add the word to the current chunk
-            if current_chunk == "":
-                current_chunk = word
-            else:
-                current_chunk += " " + word
-            word_count += len(word.split())
+            chunks.append(" ".join(current_chunk))
+            current_chunk = []
+
+        current_chunk.append(word)
+
+        if len(current_chunk) > soft_word_cut_off and word.endswith("."):
+            # If the chunk exceeds the soft limit and the word ends with a period, finalize the current chunk
+            chunks.append(" ".join(current_chunk))
+            current_chunk = []
 
     # Add any remaining content as the last chunk
-    if current_chunk != "":
-        chunks.append(current_chunk.strip())
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
 
     return chunks
 
@@ -1,11 +1,13 @@
+from contextlib import aclosing
 from typing import Any, AsyncGenerator, Dict, List
 
 from fastapi import HTTPException
 
 from backend.chat.base import BaseChat
-from backend.chat.custom.tool_calls import async_call_tools
+from backend.chat.custom.tool_calls import StreamedToolCalls, async_call_tools
 from backend.chat.custom.utils import get_deployment
 from backend.chat.enums import StreamEvent
+from backend.config.settings import Settings
 from backend.config.tools import AVAILABLE_TOOLS
 from backend.database_models.file import File
 from backend.model_deployments.base import BaseDeployment
@@ -13,14 +15,17 @@ from backend.schemas.chat import ChatMessage, ChatRole, EventState
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
 from backend.schemas.tool import Category, Tool
+from backend.services.catalog import get_catalog
 from backend.services.chat import check_death_loop
 from backend.services.file import get_file_service
 from backend.services.folder import get_folder_service
+from backend.services.metrics import CHAT_TOOL_LOOP_STEPS
+from backend.services.tracing import span
+from backend.tools.files import FilePrefetch, ReadFileTool
 from backend.tools.utils.tools_checkers import tool_has_category
 from backend.crud import model as model_crud
 from backend.database_models import Model
 
-from backend.crud import deployment as deployment_crud
 from backend.database_models import Deployment
 # from backend.database_models.deployment import 
 from backend.database_models.database import DBSessionDep
@@ -69,7 +74,7 @@ class CustomChat(BaseChat):
             try:
                 if (kwargs.get('session')):
                     session: Any = kwargs.get('session')
-                    deployment = deployment_crud.get_deployments_by_agent_id(db=session, agent_id=agent_id or '')
+                    deployment = get_catalog().get_agent_deployments(session, agent_id)
             except Exception as e:
                 raise HTTPException(status_code=400, detail="Agent Get Deployments Error: " + str(e))
         
@@ -124,6 +129,9 @@ class CustomChat(BaseChat):
                 "error": str(e),
                 "status_code": 500,
             }
+        finally:
+            # Stops the tool loop on a client disconnect or after the final event
+            await stream.aclose()
 
     def is_final_event(
         self, event: Dict[str, Any], chat_request: CohereChatRequest
@@ -187,7 +195,6 @@ class CustomChat(BaseChat):
         ctx: Context,
         **kwargs: Any,
     ):
-        logger = ctx.get_logger()
         managed_tools = self.get_managed_tools(chat_request)
         managed_tools_full_schema = self.get_managed_tools(chat_request, full_schema=True)
         session = kwargs.get("session")
@@ -199,90 +206,137 @@ class CustomChat(BaseChat):
             chat_request.tools = managed_tools
             file_reader_tools_names = [tool.name for tool in managed_tools_full_schema if tool_has_category(tool, Category.FileLoader)]
 
-        # Get files if available
-        all_files = []
-        if chat_request.file_ids or chat_request.agent_id:
-            if file_reader_tools_names:
-                files = get_file_service().get_files_by_conversation_id(
-                    session, user_id, ctx.get_conversation_id(), ctx
-                )
-                
-                folders = get_folder_service().get_folders_by_conversation_id(
-                    session, user_id, ctx.get_conversation_id(), ctx)
-                folders_files = sorted([file for folder in folders for file in folder.files], key=lambda x: x.path or '')
-
-                agent_files = []
-                if agent_id:
-                    agent_files = get_file_service().get_files_by_agent_id(
-                        session, user_id, agent_id, ctx
+        with span("chat.build_file_manifest") as manifest_span:
+            # Get files if available
+            all_files = []
+            if chat_request.file_ids or chat_request.agent_id:
+                if file_reader_tools_names:
+                    files = get_file_service().get_files_by_conversation_id(
+                        session, user_id, ctx.get_conversation_id(), ctx
                     )
+                
+                    folders = get_folder_service().get_folders_by_conversation_id(
+                        session, user_id, ctx.get_conversation_id(), ctx)
+                    folders_files = sorted([file for folder in folders for file in folder.files], key=lambda x: x.path or '')
+
+                    agent_files = []
+                    if agent_id:
+                        agent_files = get_file_service().get_files_by_agent_id(
+                            session, user_id, agent_id, ctx
+                        )
+
+                    all_files = files + agent_files + folders_files
+            print("all_files: ", all_files)
+            # Add files to chat history if there are any
+            # Otherwise, remove the Read_File and Search_File tools and all other FileReader tools
+            if all_files:
+                chat_request.chat_history = self.add_files_to_chat_history(
+                    chat_request.chat_history,
+                    session,
+                    files + agent_files + folders_files,
+                )
+            else:
+                chat_request.tools = [
+                    tool
+                    for tool in chat_request.tools
+                    if tool.name not in file_reader_tools_names
+                ]
+            manifest_span.set_attribute("files", len(all_files))
+
+        # The model is told to read the files first, so have them ready for the call
+        file_prefetch = None
+        if (
+            all_files
+            and Settings().tools.prefetch_files
+            and any(tool.name == ReadFileTool.NAME for tool in chat_request.tools)
+        ):
+            file_prefetch = FilePrefetch(all_files, user_id)
+            file_prefetch.start()
 
-                all_files = files + agent_files + folders_files
-        print("all_files: ", all_files)
-        # Add files to chat history if there are any
-        # Otherwise, remove the Read_File and Search_File tools and all other FileReader tools
-        if all_files:
-            chat_request.chat_history = self.add_files_to_chat_history(
-                chat_request.chat_history,
-                session,
-                files + agent_files + folders_files,
-            )
-        else:
-            chat_request.tools = [
-                tool
-                for tool in chat_request.tools
-                if tool.name not in file_reader_tools_names
-            ]
-
-        # Loop until there are no new tool calls
-        for step in range(MAX_STEPS):
-            logger.debug(
-                event=f"[Custom Chat] Chat request: {chat_request.model_dump()}",
-                step=step + 1,
-            )
-
-            # Invoke chat stream
-            has_tool_calls = False
-            async for event in deployment_model.invoke_chat_stream(
-                chat_request,
-                ctx,
-            ):
-                if event["event_type"] == StreamEvent.STREAM_END:
-                    print("HistoryUpdated", event)
-                    chat_request.chat_history = event["response"].get(
-                        "chat_history", []
-                    )
-                elif event["event_type"] == StreamEvent.TOOL_CALLS_GENERATION:
-                    has_tool_calls = True
+        try:
+            async with aclosing(
+                self.call_tool_loop(
+                    chat_request, deployment_model, ctx, file_prefetch=file_prefetch, **kwargs
+                )
+            ) as events:
+                async for event in events:
+                    yield event
+        finally:
+            if file_prefetch:
+                file_prefetch.cancel()
 
-                yield event
+        # Restore the original chat request message if needed
+        self.chat_request = chat_request
 
-            logger.info(
-                event=f"[Custom Chat] Chat stream completed: Has tool calls {has_tool_calls}",
-            )
+    async def call_tool_loop(
+        self,
+        chat_request: CohereChatRequest,
+        deployment_model: BaseDeployment,
+        ctx: Context,
+        **kwargs: Any,
+    ):
+        logger = ctx.get_logger()
 
-            # Check for new tool calls in the chat history
-            if has_tool_calls:
-                # Handle tool calls
-                tool_results = await async_call_tools(
-                    chat_request.chat_history, deployment_model, ctx, **kwargs
+        # Loop until there are no new tool calls
+        steps = 0
+        tool_calls = StreamedToolCalls(deployment_model, ctx, **kwargs)
+        try:
+            for step in range(MAX_STEPS):
+                steps = step + 1
+                logger.debug(
+                    event=f"[Custom Chat] Chat request: {chat_request.model_dump()}",
+                    step=step + 1,
                 )
 
-                # Remove the message if tool results are present
-                if tool_results:
-                    chat_request.tool_results = list(tool_results)
-                    # toolMessage =  ChatMessage(role=ChatRole.SYSTEM, message="", tool_results=tool_results)
-                    # searchResultChunk = StreamSearchResults(search_results=tool_results, documents=[])
-                    
-                    if chat_request.chat_history and len(chat_request.chat_history) > 0:
-                        # chat_request.chat_history.append(toolMessage)
-                        chat_request.message = ""
-                    
-            else:
-                break  # Exit loop if there are no new tool calls
+                # Invoke chat stream
+                has_tool_calls = False
+                async with aclosing(
+                    deployment_model.invoke_chat_stream(chat_request, ctx)
+                ) as model_stream:
+                    async for event in model_stream:
+                        if event["event_type"] == StreamEvent.STREAM_END:
+                            print("HistoryUpdated", event)
+                            chat_request.chat_history = event["response"].get(
+                                "chat_history", []
+                            )
+                        elif event["event_type"] == StreamEvent.TOOL_CALLS_GENERATION:
+                            has_tool_calls = True
+                            # Run the tools while the rest of the stream is read
+                            tool_calls.start(event.get("tool_calls") or [])
+
+                        yield event
+
+                logger.info(
+                    event=f"[Custom Chat] Chat stream completed: Has tool calls {has_tool_calls}",
+                )
 
-        # Restore the original chat request message if needed
-        self.chat_request = chat_request
+                # Check for new tool calls in the chat history
+                if has_tool_calls:
+                    # Handle tool calls
+                    if tool_calls.tasks:
+                        tool_results = await tool_calls.results()
+                    else:
+                        tool_results = await async_call_tools(
+                            chat_request.chat_history, deployment_model, ctx, **kwargs
+                        )
+
+                    # Remove the message if tool results are present
+                    if tool_results:
+                        chat_request.tool_results = list(tool_results)
+                        # toolMessage =  ChatMessage(role=ChatRole.SYSTEM, message="", tool_results=tool_results)
+                        # searchResultChunk = StreamSearchResults(search_results=tool_results, documents=[])
+                        
+                        if chat_request.chat_history and len(chat_request.chat_history) > 0:
+                            # chat_request.chat_history.append(toolMessage)
+                            chat_request.message = ""
+                        
+                else:
+                    break  # Exit loop if there are no new tool calls
+        finally:
+            # Stops tools still running when the turn ends early
+            tool_calls.cancel()
+
+        CHAT_TOOL_LOOP_STEPS.observe(steps)
 
     def update_chat_history_with_tool_results(
         self, chat_request: Any, tool_results: List[Dict[str, Any]]
@@ -318,11 +372,9 @@ class CustomChat(BaseChat):
         files_message = "The user uploaded the following files:\n"
 
         for file in files:
-            word_count = len(file.file_content.split())
+            # Stored with the file, so the manifest doesn't load file contents
+            word_count = file.word_count
 
-            # Use the first 25 words as the document preview in the preamble
-            num_words = min(25, word_count)
-            preview = " ".join(file.file_content.split()[:num_words])
             file_smmary = ""
             folder_info = ""
             if file.folder and file.folder.name and file.path:
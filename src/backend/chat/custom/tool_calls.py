@@ -1,4 +1,5 @@
 import asyncio
+import time
 from typing import Any, Dict, List
 
 from fastapi import HTTPException
@@ -9,6 +10,9 @@ from backend.config.tools import AVAILABLE_TOOLS
 from backend.model_deployments.base import BaseDeployment
 from backend.schemas.context import Context
 from backend.services.logger.utils import LoggerFactory
+from backend.services.metrics import TOOL_CALL_DURATION, TOOL_CALL_TIMEOUTS, TOOL_CALLS
+from backend.services.tracing import span
+from backend.tools.files import FilePrefetch
 
 TIMEOUT_SECONDS = 60
 
@@ -38,7 +42,11 @@ async def async_call_tools(
     )
 
     tool_results = await _call_all_tools_async(
-        kwargs.get("session"), tool_calls, deployment_model, ctx
+        kwargs.get("session"),
+        tool_calls,
+        deployment_model,
+        ctx,
+        file_prefetch=kwargs.get("file_prefetch"),
     )
 
     tool_results = await rerank_and_chunk(tool_results, deployment_model, ctx, **kwargs)
@@ -50,15 +58,87 @@ async def async_call_tools(
     return tool_results
 
 
+class StreamedToolCalls:
+    """
+    Runs tool calls as soon as the model stream generates them, while the rest of the
+    stream is still read, and reranks the results of each call as soon as it returns.
+    """
+
+    def __init__(
+        self, deployment_model: BaseDeployment, ctx: Context, **kwargs: Any
+    ) -> None:
+        self.deployment_model = deployment_model
+        self.ctx = ctx
+        self.kwargs = kwargs
+        self.tasks: list[asyncio.Task] = []
+
+    def start(self, tool_calls: list[dict]) -> None:
+        """
+        Starts calling the tools.
+
+        Args:
+            tool_calls (list[dict]): Tool calls of a tool calls generation event.
+        """
+        self.ctx.get_logger().info(
+            event="[Custom Chat] Using tools",
+            tool_calls=to_dict(tool_calls),
+        )
+        for tool_call in tool_calls:
+            self.tasks.append(asyncio.create_task(self._call_tool(tool_call)))
+
+    async def results(self) -> list[dict[str, Any]]:
+        """
+        Waits for the started tool calls.
+
+        Returns:
+            list[dict[str, Any]]: Reranked tool results, in the order the calls were started.
+        """
+        combined = asyncio.gather(*self.tasks)
+        self.tasks = []
+        try:
+            tool_results = await asyncio.wait_for(combined, timeout=TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            TOOL_CALL_TIMEOUTS.inc()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Timeout while calling tools with timeout: {TIMEOUT_SECONDS}",
+            )
+
+        tool_results = [n for m in tool_results for n in m]
+        self.ctx.get_logger().info(
+            event="[Custom Chat] Tool results",
+            tool_results=to_dict(tool_results),
+        )
+        return tool_results
+
+    def cancel(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+
+    async def _call_tool(self, tool_call: dict) -> list[dict[str, Any]]:
+        tool_results = await _call_tool_async(
+            self.ctx,
+            self.kwargs.get("session"),
+            tool_call,
+            self.deployment_model,
+            self.kwargs.get("file_prefetch"),
+        )
+        return await rerank_and_chunk(
+            tool_results, self.deployment_model, self.ctx, **self.kwargs
+        )
+
+
 async def _call_all_tools_async(
     db: Session,
     tool_calls: list[dict],
     deployment_model: BaseDeployment,
     ctx: Context,
+    file_prefetch: FilePrefetch | None = None,
 ) -> dict[str, str]:
     print("tool_calls: ", tool_calls)
     tasks = [
-        _call_tool_async(ctx, db, tool_call, deployment_model)
+        _call_tool_async(ctx, db, tool_call, deployment_model, file_prefetch)
         for tool_call in tool_calls
     ]
     
@@ -69,6 +149,7 @@ async def _call_all_tools_async(
         # Flatten a list of list of tool results
         return [n for m in tool_results for n in m]
     except asyncio.TimeoutError:
+        TOOL_CALL_TIMEOUTS.inc()
         raise HTTPException(
             status_code=500,
             detail=f"Timeout while calling tools with timeout: {TIMEOUT_SECONDS}",
@@ -80,6 +161,7 @@ async def _call_tool_async(
     db: Session,
     tool_call: dict,
     deployment_model: BaseDeployment,
+    file_prefetch: FilePrefetch | None = None,
 ) -> List[Dict[str, Any]]:
     tool_name = tool_call["name"] or tool_call["tool_name"] or tool_call["tool"] or ""
     tool = AVAILABLE_TOOLS.get(tool_name)
@@ -89,6 +171,8 @@ async def _call_tool_async(
         logger.info(
             event=f"[Custom Chat] Tool not included in tools parameter: {tool_call['name']}",
         )
+        # Not labelled with the requested name, which comes from the model
+        TOOL_CALLS.inc(tool="unknown", status="not_found")
         outputs = [
             {
                 "call": tool_call,
@@ -102,19 +186,23 @@ async def _call_tool_async(
             parameters = eval(parameters)
         except Exception:
             pass
+    start = time.perf_counter()
     try:
-        outputs = await tool.implementation().call(
-            parameters=parameters,
-            ctx=ctx,
-            session=db,
-            model_deployment=deployment_model,
-            user_id=ctx.get_user_id(),
-            trace_id=ctx.get_trace_id(),
-            agent_id=ctx.get_agent_id(),
-            conversation_id=ctx.get_conversation_id(),
-            agent_tool_metadata=ctx.get_agent_tool_metadata(),
-        )
+        with span("chat.call_tool", tool=tool_name):
+            outputs = await tool.implementation().call(
+                parameters=parameters,
+                ctx=ctx,
+                session=db,
+                model_deployment=deployment_model,
+                user_id=ctx.get_user_id(),
+                trace_id=ctx.get_trace_id(),
+                agent_id=ctx.get_agent_id(),
+                conversation_id=ctx.get_conversation_id(),
+                agent_tool_metadata=ctx.get_agent_tool_metadata(),
+                file_prefetch=file_prefetch,
+            )
     except Exception as e:
+        TOOL_CALLS.inc(tool=tool_name, status="error")
         logger.exception(
             event=f"[Custom Chat] Error while calling tool {tool_call['name']}: {str(e)}",
             error=str(e),
@@ -126,6 +214,10 @@ async def _call_tool_async(
             }
         ]
         return outputs
+    finally:
+        TOOL_CALL_DURATION.observe(time.perf_counter() - start, tool=tool_name)
+
+    TOOL_CALLS.inc(tool=tool_name, status="success")
 
     # If the tool returns a list of outputs, append each output to the tool_results list
     # Otherwise, append the single output to the tool_results list
@@ -17,6 +17,7 @@ from backend.model_deployments.single_container import SC_ENV_VARS
 from backend.model_deployments.open_ai import OpenAIDeployment, OPENAI_ENV_VARS
 from backend.schemas.deployment import Deployment
 from backend.services.logger.utils import LoggerFactory
+from backend.services.model_discovery import get_initial_models
 
 logger = LoggerFactory().get_logger()
 
@@ -32,13 +33,15 @@ class ModelDeploymentName(StrEnum):
 
 use_community_features = Settings().feature_flags.use_community_features
 
+# Models start from the last discovered ones, never from the providers, so importing this
+# module does no network I/O. They are refreshed by backend.services.model_discovery.
 # TODO names in the map below should not be the display names but ids
 ALL_MODEL_DEPLOYMENTS = {
     ModelDeploymentName.OpenAI: Deployment(
         id="openai",
         name=ModelDeploymentName.OpenAI,
         deployment_class=OpenAIDeployment,
-        models=OpenAIDeployment.list_models(),
+        models=get_initial_models("openai", OpenAIDeployment),
         is_available=OpenAIDeployment.is_available(),
         env_vars=OPENAI_ENV_VARS,
     ),
@@ -46,7 +49,7 @@ ALL_MODEL_DEPLOYMENTS = {
         id="cohere_platform",
         name=ModelDeploymentName.CoherePlatform,
         deployment_class=CohereDeployment,
-        models=CohereDeployment.list_models(),
+        models=get_initial_models("cohere_platform", CohereDeployment),
         is_available=CohereDeployment.is_available(),
         env_vars=COHERE_ENV_VARS,
     ),
@@ -54,7 +57,7 @@ ALL_MODEL_DEPLOYMENTS = {
         id="single_container",
         name=ModelDeploymentName.SingleContainer,
         deployment_class=SingleContainerDeployment,
-        models=SingleContainerDeployment.list_models(),
+        models=get_initial_models("single_container", SingleContainerDeployment),
         is_available=SingleContainerDeployment.is_available(),
         env_vars=SC_ENV_VARS,
     ),
@@ -62,7 +65,7 @@ ALL_MODEL_DEPLOYMENTS = {
         id="sagemaker",
         name=ModelDeploymentName.SageMaker,
         deployment_class=SageMakerDeployment,
-        models=SageMakerDeployment.list_models(),
+        models=get_initial_models("sagemaker", SageMakerDeployment),
         is_available=SageMakerDeployment.is_available(),
         env_vars=SAGE_MAKER_ENV_VARS,
     ),
@@ -70,7 +73,7 @@ ALL_MODEL_DEPLOYMENTS = {
         id="azure",
         name=ModelDeploymentName.Azure,
         deployment_class=AzureDeployment,
-        models=AzureDeployment.list_models(),
+        models=get_initial_models("azure", AzureDeployment),
         is_available=AzureDeployment.is_available(),
         env_vars=AZURE_ENV_VARS,
     ),
@@ -78,7 +81,7 @@ ALL_MODEL_DEPLOYMENTS = {
         id="bedrock",
         name=ModelDeploymentName.Bedrock,
         deployment_class=BedrockDeployment,
-        models=BedrockDeployment.list_models(),
+        models=get_initial_models("bedrock", BedrockDeployment),
         is_available=BedrockDeployment.is_available(),
         env_vars=BEDROCK_ENV_VARS,
     ),
@@ -178,6 +178,10 @@ class HybridWebSearchSettings(BaseSettings, BaseModel):
 class ToolSettings(BaseSettings, BaseModel):
     model_config = SETTINGS_CONFIG
     enabled_tools: Optional[List[str]] = None
+    prefetch_files: Optional[bool] = Field(
+        default=False,
+        validation_alias=AliasChoices("TOOLS_PREFETCH_FILES", "prefetch_files"),
+    )
 
     python_interpreter: Optional[PythonToolSettings] = Field(
         default=PythonToolSettings()
@@ -218,6 +222,11 @@ class RedisSettings(BaseSettings, BaseModel):
     )
 
 
+class OpenAIEndpointSettings(BaseModel):
+    url: str
+    weight: float = 1.0
+
+
 class OpenAISettings(BaseSettings, BaseModel):
     model_config = SETTINGS_CONFIG
     api_key: Optional[str] = Field(
@@ -232,6 +241,50 @@ class OpenAISettings(BaseSettings, BaseModel):
     default_use_legacy_api: Optional[bool] = Field(
         default=False, validation_alias=AliasChoices("OPENAI_DEFAULT_USE_LEGACY_API_ENV_VAR", "default_use_legacy_api")
     )
+    # Several endpoints serving the same models, e.g. vLLM replicas, used instead of endpoint_url
+    endpoints: Optional[List[OpenAIEndpointSettings]] = Field(
+        default=None, validation_alias=AliasChoices("OPENAI_ENDPOINTS", "endpoints")
+    )
+    # least_outstanding or ewma_latency
+    load_balancing: Optional[str] = Field(
+        default="least_outstanding",
+        validation_alias=AliasChoices("OPENAI_LOAD_BALANCING", "load_balancing"),
+    )
+    health_check_seconds: Optional[float] = Field(
+        default=10,
+        validation_alias=AliasChoices("OPENAI_HEALTH_CHECK_SECONDS", "health_check_seconds"),
+    )
+    failure_threshold: Optional[int] = Field(
+        default=3,
+        validation_alias=AliasChoices("OPENAI_FAILURE_THRESHOLD", "failure_threshold"),
+    )
+    ejection_seconds: Optional[float] = Field(
+        default=30,
+        validation_alias=AliasChoices("OPENAI_EJECTION_SECONDS", "ejection_seconds"),
+    )
+    first_event_timeout_seconds: Optional[float] = Field(
+        default=60,
+        validation_alias=AliasChoices(
+            "OPENAI_FIRST_EVENT_TIMEOUT_SECONDS", "first_event_timeout_seconds"
+        ),
+    )
+    hedging: Optional[bool] = Field(
+        default=False, validation_alias=AliasChoices("OPENAI_HEDGING", "hedging")
+    )
+    hedge_percentile: Optional[float] = Field(
+        default=95,
+        validation_alias=AliasChoices("OPENAI_HEDGE_PERCENTILE", "hedge_percentile"),
+    )
+    hedge_initial_delay_seconds: Optional[float] = Field(
+        default=2,
+        validation_alias=AliasChoices(
+            "OPENAI_HEDGE_INITIAL_DELAY_SECONDS", "hedge_initial_delay_seconds"
+        ),
+    )
+    hedge_budget_ratio: Optional[float] = Field(
+        default=0.1,
+        validation_alias=AliasChoices("OPENAI_HEDGE_BUDGET_RATIO", "hedge_budget_ratio"),
+    )
 
 
 class GoogleCloudSettings(BaseSettings, BaseModel):
@@ -239,6 +292,10 @@ class GoogleCloudSettings(BaseSettings, BaseModel):
     api_key: Optional[str] = Field(
         default=None, validation_alias=AliasChoices("GOOGLE_CLOUD_API_KEY", "api_key")
     )
+    synthesis_cache_dir: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("SYNTHESIS_CACHE_DIR", "synthesis_cache_dir"),
+    )
 
 
 class SageMakerSettings(BaseSettings, BaseModel):
@@ -315,6 +372,24 @@ class DeploymentSettings(BaseSettings, BaseModel):
     model_config = SETTINGS_CONFIG
     default_deployment: Optional[str] = None
     enabled_deployments: Optional[List[str]] = None
+    model_discovery_ttl_seconds: Optional[int] = Field(
+        default=300,
+        validation_alias=AliasChoices(
+            "MODEL_DISCOVERY_TTL_SECONDS", "model_discovery_ttl_seconds"
+        ),
+    )
+    model_discovery_timeout_seconds: Optional[float] = Field(
+        default=5,
+        validation_alias=AliasChoices(
+            "MODEL_DISCOVERY_TIMEOUT_SECONDS", "model_discovery_timeout_seconds"
+        ),
+    )
+    model_discovery_cache_path: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "MODEL_DISCOVERY_CACHE_PATH", "model_discovery_cache_path"
+        ),
+    )
 
     openai: Optional[OpenAISettings] = Field(default=OpenAISettings())
     sagemaker: Optional[SageMakerSettings] = Field(default=SageMakerSettings())
@@ -341,6 +416,223 @@ class LoggerSettings(BaseSettings, BaseModel):
     )
 
 
+class ChatStreamSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Where the events of chat turns are kept for Last-Event-ID reconnects:
+    # "memory", "redis" to resume on any worker, or "none" to disable resuming
+    event_log: Optional[str] = Field(
+        default="memory",
+        validation_alias=AliasChoices("CHAT_STREAM_EVENT_LOG", "event_log"),
+    )
+    max_events: Optional[int] = Field(
+        default=10_000,
+        validation_alias=AliasChoices("CHAT_STREAM_MAX_EVENTS", "max_events"),
+    )
+    retention_seconds: Optional[int] = Field(
+        default=300,
+        validation_alias=AliasChoices(
+            "CHAT_STREAM_RETENTION_SECONDS", "retention_seconds"
+        ),
+    )
+    # How long a turn keeps generating without any connected client
+    resume_grace_seconds: Optional[int] = Field(
+        default=15,
+        validation_alias=AliasChoices(
+            "CHAT_STREAM_RESUME_GRACE_SECONDS", "resume_grace_seconds"
+        ),
+    )
+    # Where turns are generated: "inline" in the web worker that accepts the request,
+    # "local" in a pool of local processes, or "redis" in generation workers consuming
+    # a Redis queue, which needs the redis event log
+    generation_workers: Optional[str] = Field(
+        default="inline",
+        validation_alias=AliasChoices(
+            "CHAT_STREAM_GENERATION_WORKERS", "generation_workers"
+        ),
+    )
+    worker_processes: Optional[int] = Field(
+        default=2,
+        validation_alias=AliasChoices(
+            "CHAT_STREAM_WORKER_PROCESSES", "worker_processes"
+        ),
+    )
+    # Turns a generation worker process runs concurrently
+    worker_max_turns: Optional[int] = Field(
+        default=32,
+        validation_alias=AliasChoices(
+            "CHAT_STREAM_WORKER_MAX_TURNS", "worker_max_turns"
+        ),
+    )
+
+
+class AdmissionSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Where limits are tracked: "memory" per worker, or "redis" across workers and nodes
+    backend: Optional[str] = Field(
+        default="memory",
+        validation_alias=AliasChoices("ADMISSION_BACKEND", "backend"),
+    )
+    # How long a turn can wait for a slot or a rate limit token before it's rejected
+    max_wait_seconds: Optional[float] = Field(
+        default=10.0,
+        validation_alias=AliasChoices("ADMISSION_MAX_WAIT_SECONDS", "max_wait_seconds"),
+    )
+    # Turns waiting per user, organization or deployment, more are rejected right away
+    max_queued: Optional[int] = Field(
+        default=100,
+        validation_alias=AliasChoices("ADMISSION_MAX_QUEUED", "max_queued"),
+    )
+    # In-flight slots are leased for this long, so a crashed worker can't leak them
+    max_turn_seconds: Optional[int] = Field(
+        default=1800,
+        validation_alias=AliasChoices("ADMISSION_MAX_TURN_SECONDS", "max_turn_seconds"),
+    )
+    # Token buckets hold this many seconds' worth of requests, the burst allowed at once
+    burst_seconds: Optional[int] = Field(
+        default=10,
+        validation_alias=AliasChoices("ADMISSION_BURST_SECONDS", "burst_seconds"),
+    )
+    # Limits are disabled when not set
+    user_max_in_flight: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "ADMISSION_USER_MAX_IN_FLIGHT", "user_max_in_flight"
+        ),
+    )
+    user_requests_per_minute: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "ADMISSION_USER_REQUESTS_PER_MINUTE", "user_requests_per_minute"
+        ),
+    )
+    organization_max_in_flight: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "ADMISSION_ORGANIZATION_MAX_IN_FLIGHT", "organization_max_in_flight"
+        ),
+    )
+    organization_requests_per_minute: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "ADMISSION_ORGANIZATION_REQUESTS_PER_MINUTE",
+            "organization_requests_per_minute",
+        ),
+    )
+    deployment_max_in_flight: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "ADMISSION_DEPLOYMENT_MAX_IN_FLIGHT", "deployment_max_in_flight"
+        ),
+    )
+    deployment_requests_per_minute: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "ADMISSION_DEPLOYMENT_REQUESTS_PER_MINUTE", "deployment_requests_per_minute"
+        ),
+    )
+
+
+class FileSearchSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Embeds file chunks for search_file: "hashing" runs locally, "openai" calls the embeddings API
+    embedder: Optional[str] = Field(
+        default="hashing",
+        validation_alias=AliasChoices("FILE_SEARCH_EMBEDDER", "embedder"),
+    )
+    embedding_model: Optional[str] = Field(
+        default="text-embedding-3-small",
+        validation_alias=AliasChoices("FILE_SEARCH_EMBEDDING_MODEL", "embedding_model"),
+    )
+    hashing_dimensions: Optional[int] = Field(
+        default=512,
+        validation_alias=AliasChoices(
+            "FILE_SEARCH_HASHING_DIMENSIONS", "hashing_dimensions"
+        ),
+    )
+
+
+class BackgroundJobSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Concurrent jobs per web worker, 0 runs jobs inline in the request that submits them
+    workers: Optional[int] = Field(
+        default=2,
+        validation_alias=AliasChoices("BACKGROUND_JOBS_WORKERS", "workers"),
+    )
+    max_attempts: Optional[int] = Field(
+        default=3,
+        validation_alias=AliasChoices("BACKGROUND_JOBS_MAX_ATTEMPTS", "max_attempts"),
+    )
+    # Delay before the first retry, doubled for each one after it
+    retry_seconds: Optional[float] = Field(
+        default=10.0,
+        validation_alias=AliasChoices("BACKGROUND_JOBS_RETRY_SECONDS", "retry_seconds"),
+    )
+    # A job running for longer is assumed lost with its worker and run again
+    lease_seconds: Optional[int] = Field(
+        default=300,
+        validation_alias=AliasChoices("BACKGROUND_JOBS_LEASE_SECONDS", "lease_seconds"),
+    )
+    # How often idle workers check for jobs submitted by other web workers
+    poll_seconds: Optional[float] = Field(
+        default=5.0,
+        validation_alias=AliasChoices("BACKGROUND_JOBS_POLL_SECONDS", "poll_seconds"),
+    )
+    # Tracked like the admission rate limits, not limited when not set
+    deployment_requests_per_minute: Optional[int] = Field(
+        default=30,
+        validation_alias=AliasChoices(
+            "BACKGROUND_JOBS_DEPLOYMENT_REQUESTS_PER_MINUTE",
+            "deployment_requests_per_minute",
+        ),
+    )
+
+
+class ResponseCacheSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Replays the responses of repeated chat requests to the OpenAI deployment
+    enabled: Optional[bool] = Field(
+        default=False,
+        validation_alias=AliasChoices("RESPONSE_CACHE_ENABLED", "enabled"),
+    )
+    ttl_seconds: Optional[int] = Field(
+        default=3600,
+        validation_alias=AliasChoices("RESPONSE_CACHE_TTL_SECONDS", "ttl_seconds"),
+    )
+    max_entries: Optional[int] = Field(
+        default=1024,
+        validation_alias=AliasChoices("RESPONSE_CACHE_MAX_ENTRIES", "max_entries"),
+    )
+    # Requests without a temperature, or with a higher one, aren't cached
+    max_temperature: Optional[float] = Field(
+        default=0.0,
+        validation_alias=AliasChoices(
+            "RESPONSE_CACHE_MAX_TEMPERATURE", "max_temperature"
+        ),
+    )
+    # Also replays a response to a similar last user message, with the file search embedder
+    semantic: Optional[bool] = Field(
+        default=False,
+        validation_alias=AliasChoices("RESPONSE_CACHE_SEMANTIC", "semantic"),
+    )
+    similarity_threshold: Optional[float] = Field(
+        default=0.95,
+        validation_alias=AliasChoices(
+            "RESPONSE_CACHE_SIMILARITY_THRESHOLD", "similarity_threshold"
+        ),
+    )
+
+
+class TracingSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # One of "json" or "opentelemetry", tracing is disabled if not set
+    exporter: Optional[str] = Field(
+        default=None, validation_alias=AliasChoices("TRACING_EXPORTER", "exporter")
+    )
+    json_path: Optional[str] = Field(
+        default=None, validation_alias=AliasChoices("TRACING_JSON_PATH", "json_path")
+    )
+
+
 class Settings(BaseSettings):
     """
     Settings class used to grab environment variables from configuration.yaml
@@ -358,6 +650,16 @@ class Settings(BaseSettings):
     google_cloud: Optional[GoogleCloudSettings] = Field(default=GoogleCloudSettings())
     deployments: Optional[DeploymentSettings] = Field(default=DeploymentSettings())
     logger: Optional[LoggerSettings] = Field(default=LoggerSettings())
+    chat_stream: Optional[ChatStreamSettings] = Field(default=ChatStreamSettings())
+    admission: Optional[AdmissionSettings] = Field(default=AdmissionSettings())
+    file_search: Optional[FileSearchSettings] = Field(default=FileSearchSettings())
+    background_jobs: Optional[BackgroundJobSettings] = Field(
+        default=BackgroundJobSettings()
+    )
+    response_cache: Optional[ResponseCacheSettings] = Field(
+        default=ResponseCacheSettings()
+    )
+    tracing: Optional[TracingSettings] = Field(default=TracingSettings())
 
     @classmethod
     def settings_customise_sources(
@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from backend.database_models.background_job import BackgroundJob, BackgroundJobStatus
+from backend.services.transaction import validate_transaction
+
+
+@validate_transaction
+def create_background_job(db: Session, job: BackgroundJob) -> BackgroundJob:
+    """
+    Create a background job.
+
+    Args:
+        db (Session): Database session.
+        job (BackgroundJob): Job to be created.
+
+    Returns:
+        BackgroundJob: Created job.
+    """
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_background_job(db: Session, job_id: str) -> BackgroundJob | None:
+    """
+    Get a background job by ID.
+
+    Args:
+        db (Session): Database session.
+        job_id (str): Job ID.
+
+    Returns:
+        BackgroundJob | None: Job with the given ID.
+    """
+    return db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+
+
+def get_unfinished_background_job(db: Session, key: str) -> BackgroundJob | None:
+    """
+    Get the pending or running background job with a key.
+
+    Args:
+        db (Session): Database session.
+        key (str): Job key.
+
+    Returns:
+        BackgroundJob | None: Unfinished job with the key.
+    """
+    return (
+        db.query(BackgroundJob)
+        .filter(
+            BackgroundJob.key == key,
+            BackgroundJob.status.in_(
+                [BackgroundJobStatus.PENDING, BackgroundJobStatus.RUNNING]
+            ),
+        )
+        .first()
+    )
+
+
+@validate_transaction
+def claim_background_job(db: Session, lease_seconds: int) -> BackgroundJob | None:
+    """
+    Claim the next due background job, or a running one whose lease expired.
+
+    Rows locked by other workers claiming jobs are skipped.
+
+    Args:
+        db (Session): Database session.
+        lease_seconds (int): How long the job is leased to the caller.
+
+    Returns:
+        BackgroundJob | None: Claimed job, now running, None if no job is due.
+    """
+    job = (
+        db.query(BackgroundJob)
+        .filter(
+            or_(
+                and_(
+                    BackgroundJob.status == BackgroundJobStatus.PENDING,
+                    BackgroundJob.run_after <= func.now(),
+                ),
+                and_(
+                    BackgroundJob.status == BackgroundJobStatus.RUNNING,
+                    BackgroundJob.locked_until < func.now(),
+                ),
+            )
+        )
+        .order_by(BackgroundJob.run_after)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.commit()
+        return None
+
+    job.status = BackgroundJobStatus.RUNNING
+    job.attempts += 1
+    job.locked_until = func.now() + timedelta(seconds=lease_seconds)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@validate_transaction
+def finish_background_job(
+    db: Session, job: BackgroundJob, status: BackgroundJobStatus, error: str = None
+) -> BackgroundJob:
+    """
+    Mark a background job as succeeded or failed.
+
+    Args:
+        db (Session): Database session.
+        job (BackgroundJob): Job.
+        status (BackgroundJobStatus): Final status.
+        error (str): Error of a failed job.
+
+    Returns:
+        BackgroundJob: Updated job.
+    """
+    job.status = status
+    job.locked_until = None
+    job.error = error
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@validate_transaction
+def reschedule_background_job(
+    db: Session,
+    job: BackgroundJob,
+    delay_seconds: float,
+    error: str = None,
+    count_attempt: bool = True,
+) -> BackgroundJob:
+    """
+    Put a claimed background job back in the queue, to run after a delay.
+
+    Args:
+        db (Session): Database session.
+        job (BackgroundJob): Job.
+        delay_seconds (float): Delay before the job is due again.
+        error (str): Error of the attempt.
+        count_attempt (bool): Whether the claim counts as an attempt.
+
+    Returns:
+        BackgroundJob: Updated job.
+    """
+    job.status = BackgroundJobStatus.PENDING
+    job.run_after = func.now() + timedelta(seconds=delay_seconds)
+    job.locked_until = None
+    job.error = error
+    if not count_attempt:
+        job.attempts -= 1
+    db.commit()
+    db.refresh(job)
+    return job
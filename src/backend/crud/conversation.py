@@ -1,10 +1,13 @@
-from sqlalchemy import desc
+from sqlalchemy import cast, desc, func, select, update
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
 from sqlalchemy.orm import Session
 
 from backend.database_models.conversation import (
+    SEARCH_CONFIG,
     Conversation,
     ConversationFileAssociation,
 )
+from backend.database_models.message import Message
 from backend.schemas.conversation import (
     ToggleConversationPinRequest,
     UpdateConversationRequest,
@@ -90,6 +93,88 @@ def get_conversations(
     return query.all()
 
 
+@validate_transaction
+def search_conversations(
+    db: Session,
+    user_id: str,
+    query: str,
+    offset: int = 0,
+    limit: int = 100,
+    agent_id: str | None = None,
+) -> list[Conversation]:
+    """
+    Full-text search over the titles and messages of all of a user's conversations.
+
+    Args:
+        db (Session): Database session.
+        user_id (str): User ID.
+        query (str): Search query, in web search syntax.
+        offset (int): Offset to start the list.
+        limit (int): Limit of conversations to be listed.
+        agent_id (str): Agent ID.
+
+    Returns:
+        list[Conversation]: Matching conversations, most relevant first.
+    """
+    ts_query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), query)
+
+    conversations = db.query(Conversation).filter(
+        Conversation.user_id == user_id,
+        Conversation.search_vector.op("@@")(ts_query),
+    )
+    if agent_id is not None:
+        conversations = conversations.filter(Conversation.agent_id == agent_id)
+
+    return (
+        conversations.order_by(
+            func.ts_rank_cd(Conversation.search_vector, ts_query).desc(),
+            Conversation.updated_at.desc(),
+        )
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+
+@validate_transaction
+def index_conversation_messages(
+    db: Session, conversation_id: str, user_id: str, position: int | None = None
+) -> None:
+    """
+    Adds the text of a conversation's active messages to its search index.
+
+    Args:
+        db (Session): Database session.
+        conversation_id (str): Conversation ID.
+        user_id (str): User ID.
+        position (int): Only index the messages at this position, i.e. a single turn.
+            If not given, the index is rebuilt from all messages.
+    """
+    messages_text = select(func.coalesce(func.string_agg(Message.text, " "), "")).where(
+        Message.conversation_id == conversation_id,
+        Message.user_id == user_id,
+        Message.is_active,
+    )
+    if position is not None:
+        messages_text = messages_text.where(Message.position == position)
+
+    messages_vector = func.to_tsvector(
+        cast(SEARCH_CONFIG, REGCONFIG), messages_text.scalar_subquery()
+    )
+    if position is not None:
+        messages_vector = func.coalesce(
+            Conversation.message_search_vector, cast("", TSVECTOR)
+        ).op("||", return_type=TSVECTOR)(messages_vector)
+
+    db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+        .values(message_search_vector=messages_vector)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
 @validate_transaction
 def update_conversation(
     db: Session, conversation: Conversation, new_conversation: UpdateConversationRequest
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 
 from backend.database_models.file import File
+from backend.database_models.file_content import FileContentSegment
+from backend.schemas.file import UpdateFileRequest
 from backend.services.transaction import validate_transaction
 
 
@@ -171,6 +173,26 @@ def get_files_by_user_id(db: Session, user_id: str) -> list[File]:
     return db.query(File).filter(File.user_id == user_id).all()
 
 
+@validate_transaction
+def update_file(db: Session, file: File, new_file: UpdateFileRequest) -> File:
+    """
+    Update a file.
+
+    Args:
+        db (Session): Database session.
+        file (File): File to be updated.
+        new_file (UpdateFileRequest): New file data.
+
+    Returns:
+        File: Updated file.
+    """
+    for attr, value in new_file.model_dump(exclude_none=True).items():
+        setattr(file, attr, value)
+    db.commit()
+    db.refresh(file)
+    return file
+
+
 @validate_transaction
 def delete_file(db: Session, file_id: str, user_id: str) -> None:
     """
@@ -220,3 +242,35 @@ def get_files_by_identifiers(db: Session, identifiers: list[str], user_id: str)
         )
         .all()
     )
+
+
+def get_file_content_range(db: Session, file_id: str, start: int, end: int) -> str:
+    """
+    Get part of a file's content, only loading the segments it overlaps.
+
+    Args:
+        db (Session): Database session.
+        file_id (str): File ID.
+        start (int): Character offset where the range starts.
+        end (int): Character offset where the range ends, exclusive.
+
+    Returns:
+        str: Content in the range, shorter if the content ends before it.
+    """
+    segments = (
+        db.query(FileContentSegment)
+        .filter(
+            FileContentSegment.file_id == file_id,
+            FileContentSegment.start_offset < end,
+            FileContentSegment.start_offset + FileContentSegment.length > start,
+        )
+        .order_by(FileContentSegment.position)
+        .all()
+    )
+    if not segments:
+        return ""
+
+    offset = segments[0].start_offset
+    content = "".join(segment.text for segment in segments)
+    return content[max(start - offset, 0) : end - offset]
+
@@ -0,0 +1,76 @@
+from sqlalchemy.orm import Session
+
+from backend.database_models.file_chunk import FileChunk
+from backend.services.transaction import validate_transaction
+
+
+@validate_transaction
+def replace_file_chunks(
+    db: Session, file_ids: list[str], file_chunks: list[FileChunk]
+) -> None:
+    """
+    Replace the chunks of files.
+
+    Args:
+        db (Session): Database session.
+        file_ids (list[str]): IDs of the files whose chunks are replaced.
+        file_chunks (list[FileChunk]): New chunks of the files.
+    """
+    db.query(FileChunk).filter(FileChunk.file_id.in_(file_ids)).delete()
+    db.add_all(file_chunks)
+    db.commit()
+
+
+def get_file_chunk_embeddings(
+    db: Session, file_ids: list[str]
+) -> list[tuple[str, bytes]]:
+    """
+    Get the embeddings of the chunks of files, without loading their text.
+
+    Args:
+        db (Session): Database session.
+        file_ids (list[str]): File IDs.
+
+    Returns:
+        list[tuple[str, bytes]]: Chunk IDs and embeddings.
+    """
+    return [
+        (chunk_id, embedding)
+        for chunk_id, embedding in db.query(FileChunk.id, FileChunk.embedding).filter(
+            FileChunk.file_id.in_(file_ids)
+        )
+    ]
+
+
+def get_file_chunks_by_ids(db: Session, chunk_ids: list[str]) -> list[FileChunk]:
+    """
+    Get file chunks by IDs.
+
+    Args:
+        db (Session): Database session.
+        chunk_ids (list[str]): Chunk IDs.
+
+    Returns:
+        list[FileChunk]: Chunks, in no particular order.
+    """
+    return db.query(FileChunk).filter(FileChunk.id.in_(chunk_ids)).all()
+
+
+def get_indexed_file_ids(db: Session, file_ids: list[str], embedder: str) -> set[str]:
+    """
+    Get which files have chunks embedded by an embedder.
+
+    Args:
+        db (Session): Database session.
+        file_ids (list[str]): File IDs.
+        embedder (str): Embedder name.
+
+    Returns:
+        set[str]: IDs of the files indexed with the embedder.
+    """
+    return {
+        file_id
+        for (file_id,) in db.query(FileChunk.file_id)
+        .filter(FileChunk.file_id.in_(file_ids), FileChunk.embedder == embedder)
+        .distinct()
+    }
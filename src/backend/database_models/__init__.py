@@ -1,6 +1,7 @@
 # ruff: noqa
 from backend.database_models.agent import *
 from backend.database_models.agent_tool_metadata import *
+from backend.database_models.background_job import *
 from backend.database_models.base import *
 from backend.database_models.blacklist import *
 from backend.database_models.citation import *
@@ -9,6 +10,8 @@ from backend.database_models.database import *
 from backend.database_models.deployment import *
 from backend.database_models.document import *
 from backend.database_models.file import *
+from backend.database_models.file_chunk import *
+from backend.database_models.file_content import *
 from backend.database_models.folder import *
 from backend.database_models.group import *
 from backend.database_models.message import *
@@ -0,0 +1,45 @@
+from datetime import datetime
+from enum import StrEnum
+from typing import Any, Optional
+
+from sqlalchemy import JSON, DateTime, Enum, Index, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.database_models.base import Base
+
+
+class BackgroundJobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    # Jobs with the same key aren't queued twice while one is unfinished
+    key: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    # Context of the request that submitted the job
+    context: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    # Jobs are rate limited per deployment
+    deployment_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    status: Mapped[BackgroundJobStatus] = mapped_column(
+        Enum(BackgroundJobStatus, native_enum=False),
+        default=BackgroundJobStatus.PENDING,
+        nullable=False,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False
+    )
+    # Running jobs past their lease are claimed again
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("background_job_status_run_after", status, run_after),
+        Index("background_job_key", key),
+    )
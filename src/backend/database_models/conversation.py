@@ -3,17 +3,22 @@ from uuid import uuid4
 
 from sqlalchemy import (
     Boolean,
+    Computed,
     ForeignKey,
     Index,
     PrimaryKeyConstraint,
     String,
     UniqueConstraint,
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.database_models.base import Base
 from backend.database_models.message import Message
 
+# Text search configuration used to index and query conversations
+SEARCH_CONFIG = "english"
+
 
 class ConversationFolderAssociation(Base):
     __tablename__ = "conversation_folders"
@@ -79,6 +84,20 @@ class Conversation(Base):
     )
     is_pinned: Mapped[bool] = mapped_column(Boolean, default=False)
 
+    # Message text is appended turn by turn, see crud.conversation.index_conversation_messages
+    message_search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, nullable=True, deferred=True
+    )
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A')"
+            " || setweight(coalesce(message_search_vector, ''::tsvector), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
     @property
     def messages(self):
         return sorted(self.text_messages, key=lambda x: x.created_at)
@@ -102,4 +121,9 @@ class Conversation(Base):
         PrimaryKeyConstraint("id", "user_id", name="conversation_pkey"),
         Index("conversation_user_agent_index", "user_id", "agent_id"),
         Index("conversation_user_id_index", "id", "user_id", unique=True),
+        Index(
+            "conversation_search_vector_index",
+            "search_vector",
+            postgresql_using="gin",
+        ),
     )
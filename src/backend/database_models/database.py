@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from backend.config.settings import Settings
 from backend.database_models.base import CustomFilterQuery
+from backend.services.metrics import instrument_engine
 
 load_dotenv()
 
@@ -14,6 +15,7 @@ SQLALCHEMY_DATABASE_URL = Settings().database.url
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, pool_size=5, max_overflow=10, pool_timeout=30
 )
+instrument_engine(engine)
 
 
 def get_session() -> Generator[Session, Any, None]:
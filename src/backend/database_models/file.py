@@ -1,6 +1,10 @@
 from sqlalchemy import String, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from backend.database_models.base import Base
+from backend.database_models.file_content import (
+    FileContentSegment,
+    build_file_content_segments,
+)
 
 # Import Folder model if not already imported
 from backend.database_models.folder import Folder
@@ -12,12 +16,30 @@ class File(Base):
     file_name: Mapped[str] = mapped_column(default="", nullable=True)
     file_generated_name: Mapped[str] = mapped_column(default="", nullable=True)
     file_size: Mapped[int] = mapped_column(default=0)
-    file_content: Mapped[str] = mapped_column(default="")
     file_summary: Mapped[str] = mapped_column(default="", nullable=True)
+    # Kept with the file, so listing files doesn't load their content
+    word_count: Mapped[int] = mapped_column(default=0)
     folder_id: Mapped[int] = mapped_column(ForeignKey("folders.id"), nullable=True)
     path: Mapped[str] = mapped_column(default=None, nullable=True)
 
     # Define the relationship to Folder (inverse of the above relationship)
     folder: Mapped["Folder"] = relationship("Folder", back_populates="files")
 
+    # Stored compressed in another table, only loaded when the content is read
+    file_content_segments: Mapped[list[FileContentSegment]] = relationship(
+        order_by=FileContentSegment.position,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    @property
+    def file_content(self) -> str:
+        return "".join(segment.text for segment in self.file_content_segments)
+
+    @file_content.setter
+    def file_content(self, content: str) -> None:
+        content = content or ""
+        self.file_content_segments = build_file_content_segments(content)
+        self.word_count = len(content.split())
+
     __table_args__ = ()
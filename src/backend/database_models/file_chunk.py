@@ -0,0 +1,23 @@
+from sqlalchemy import ForeignKey, Index, Integer, LargeBinary, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.database_models.base import Base
+
+
+class FileChunk(Base):
+    __tablename__ = "file_chunks"
+
+    file_id: Mapped[str] = mapped_column(
+        ForeignKey("files.id", ondelete="CASCADE"), nullable=False
+    )
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Character offsets of the chunk in the file's content
+    start_offset: Mapped[int] = mapped_column(Integer, nullable=False)
+    end_offset: Mapped[int] = mapped_column(Integer, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    # Unit vector quantized to int8
+    embedding: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # Chunks embedded by another embedder are re-indexed before they're searched
+    embedder: Mapped[str] = mapped_column(String, nullable=False)
+
+    __table_args__ = (Index("file_chunk_file_id", file_id),)
@@ -0,0 +1,56 @@
+import zlib
+
+from sqlalchemy import ForeignKey, Index, Integer, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.database_models.base import Base
+
+# Characters per segment, a range read decompresses at most the segments it overlaps
+FILE_CONTENT_SEGMENT_SIZE = 64 * 1024
+COMPRESSION_LEVEL = 6
+
+
+class FileContentSegment(Base):
+    __tablename__ = "file_content_segments"
+
+    file_id: Mapped[str] = mapped_column(
+        ForeignKey("files.id", ondelete="CASCADE"), nullable=False
+    )
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Character offset of the segment in the file's content
+    start_offset: Mapped[int] = mapped_column(Integer, nullable=False)
+    length: Mapped[int] = mapped_column(Integer, nullable=False)
+    # UTF-8 text, compressed with zlib
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("file_content_segment_file_id_position", file_id, position),
+    )
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.data).decode("utf-8")
+
+
+def build_file_content_segments(content: str) -> list[FileContentSegment]:
+    """
+    Splits a file's content into compressed segments.
+
+    Args:
+        content (str): File content.
+
+    Returns:
+        list[FileContentSegment]: Segments, none for empty content.
+    """
+    return [
+        FileContentSegment(
+            position=position,
+            start_offset=start,
+            length=len(text),
+            data=zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL),
+        )
+        for position, start in enumerate(
+            range(0, len(content), FILE_CONTENT_SEGMENT_SIZE)
+        )
+        for text in [content[start : start + FILE_CONTENT_SEGMENT_SIZE]]
+    ]
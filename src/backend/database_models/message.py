@@ -9,6 +9,7 @@ from sqlalchemy import (
     Index,
     String,
     UniqueConstraint,
+    false,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -54,6 +55,10 @@ class Message(Base):
     conversation_id: Mapped[str] = mapped_column(String, nullable=True)
     position: Mapped[int]
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # The client disconnected before the generation finished, the text is partial
+    is_interrupted: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default=false()
+    )
     generation_id: Mapped[str] = mapped_column(String, nullable=True)
     tool_plan: Mapped[str] = mapped_column(String, nullable=True)
 
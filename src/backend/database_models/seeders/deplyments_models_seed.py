@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from backend.config.deployments import ALL_MODEL_DEPLOYMENTS, ModelDeploymentName
 from backend.database_models import Deployment, Model, Organization
+from backend.services.model_discovery import refresh_deployment_models
 from community.config.deployments import (
     AVAILABLE_MODEL_DEPLOYMENTS as COMMUNITY_DEPLOYMENTS_SETUP,
 )
@@ -18,7 +19,8 @@ load_dotenv()
 model_deployments = ALL_MODEL_DEPLOYMENTS.copy()
 model_deployments.update(COMMUNITY_DEPLOYMENTS_SETUP)
 
-openAiModels = model_deployments.get(ModelDeploymentName.OpenAI).models
+# Seeding runs with migrations, not on import of the app, so the models can be listed here
+openAiModels = refresh_deployment_models(model_deployments.get(ModelDeploymentName.OpenAI))
 defaultOpenAiModel = openAiModels[0]
 
 MODELS_NAME_MAPPING = {
@@ -3,7 +3,7 @@ from alembic.config import Config
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from starlette.middleware.sessions import SessionMiddleware
 
 from backend.config.auth import (
@@ -11,8 +11,13 @@ from backend.config.auth import (
     is_authentication_enabled,
     verify_migrate_token,
 )
+from backend.config.deployments import AVAILABLE_MODEL_DEPLOYMENTS
 from backend.config.routers import ROUTER_DEPENDENCIES
 from backend.config.settings import Settings
+from backend.model_deployments.endpoint_pool import (
+    shutdown_endpoint_health_checks,
+    start_endpoint_health_checks,
+)
 from backend.routers.agent import router as agent_router
 from backend.routers.auth import router as auth_router
 from backend.routers.chat import router as chat_router
@@ -26,8 +31,22 @@ from backend.routers.scim import router as scim_router
 from backend.routers.snapshot import router as snapshot_router
 from backend.routers.tool import router as tool_router
 from backend.routers.user import router as user_router
+from backend.services.background_jobs import (
+    shutdown_background_job_workers,
+    start_background_job_workers,
+)
+from backend.services.catalog import start_catalog_listener, stop_catalog_listener
 from backend.services.context import ContextMiddleware, get_context
+from backend.services.generation_workers import (
+    shutdown_generation_workers,
+    start_generation_workers,
+)
 from backend.services.logger.middleware import LoggingMiddleware
+from backend.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from backend.services.metrics import REGISTRY as METRICS_REGISTRY
+from backend.services.model_discovery import start_model_discovery
+from backend.services.tracing import configure_tracing_from_settings, shutdown_tracing
+from backend.services.upload_limit import UploadSizeLimitMiddleware
 
 load_dotenv()
 
@@ -70,6 +89,8 @@ def create_app():
             app.include_router(router)
 
     # Add middleware
+    # Added before CORS, so rejected uploads still get CORS headers
+    app.add_middleware(UploadSizeLimitMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=ORIGINS,
@@ -114,12 +135,35 @@ async def validation_exception_handler(request: Request, exc: Exception):
 @app.on_event("startup")
 async def startup_event():
     """
-    Retrieves all the Auth provider endpoints if authentication is enabled.
+    Configures tracing, starts the background model discovery, the generation workers,
+    the background job workers, the OpenAI endpoint health checks and the deployment
+    catalog listener, and retrieves all the Auth provider endpoints if authentication is
+    enabled.
     """
+    configure_tracing_from_settings()
+    start_model_discovery(AVAILABLE_MODEL_DEPLOYMENTS.values())
+    start_generation_workers()
+    start_background_job_workers()
+    start_endpoint_health_checks()
+    start_catalog_listener()
+
     if is_authentication_enabled():
         await get_auth_strategy_endpoints()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stops the local generation workers, the background job workers, the OpenAI endpoint
+    health checks and the deployment catalog listener, and writes the buffered spans.
+    """
+    shutdown_generation_workers()
+    await shutdown_background_job_workers()
+    await shutdown_endpoint_health_checks()
+    stop_catalog_listener()
+    shutdown_tracing()
+
+
 @app.get("/health")
 async def health():
     """
@@ -128,6 +172,14 @@ async def health():
     return {"status": "OK"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Metrics of this worker process in the Prometheus text format
+    """
+    return Response(METRICS_REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.post("/migrate", dependencies=[Depends(verify_migrate_token)])
 async def apply_migrations():
     """
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any, AsyncGenerator, Dict, List
 
 import cohere
@@ -8,6 +9,7 @@ from backend.model_deployments.base import BaseDeployment
 from backend.model_deployments.utils import get_model_config_var
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
+from backend.services.sync_stream import iterate_in_thread
 
 AZURE_API_KEY_ENV_VAR = "AZURE_API_KEY"
 # Example URL: "https://<endpoint>.<region>.inference.ai.azure.com/v1"
@@ -63,7 +65,8 @@ class AzureDeployment(BaseDeployment):
         )
 
     async def invoke_chat(self, chat_request: CohereChatRequest) -> Any:
-        response = self.client.chat(
+        response = await asyncio.to_thread(
+            self.client.chat,
             **chat_request.model_dump(exclude={"stream", "file_ids", "agent_id"}),
         )
         yield to_dict(response)
@@ -71,11 +74,13 @@ class AzureDeployment(BaseDeployment):
     async def invoke_chat_stream(
         self, chat_request: CohereChatRequest, ctx: Context, **kwargs
     ) -> AsyncGenerator[Any, Any]:
-        stream = self.client.chat_stream(
-            **chat_request.model_dump(exclude={"stream", "file_ids", "agent_id"}),
+        stream = iterate_in_thread(
+            lambda: self.client.chat_stream(
+                **chat_request.model_dump(exclude={"stream", "file_ids", "agent_id"}),
+            )
         )
 
-        for event in stream:
+        async for event in stream:
             yield to_dict(event)
 
     async def invoke_rerank(
@@ -1,20 +1,49 @@
 from abc import abstractmethod
-from typing import Any, AsyncGenerator, Dict, List
+from typing import Any, AsyncGenerator, Dict, List, Optional
 
+from backend.chat.enums import StreamEvent
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
+from backend.services.metrics import instrument_deployment_method
+
+# Methods of deployments whose outcome and duration are recorded, with their operation label
+INSTRUMENTED_METHODS = {
+    "invoke_chat": "chat",
+    "invoke_chat_stream": "chat_stream",
+    "invoke_rerank": "rerank",
+    "complete": "complete",
+}
+
+# Utility completions, e.g. titles, only need a few tokens
+DEFAULT_COMPLETION_MAX_TOKENS = 256
 
 
 class BaseDeployment:
     """Base for all model deployment options.
 
     rerank_enabled: bool: Whether the deployment supports reranking.
+    rerank_model: Optional[str]: The model used for reranking, if any.
     invoke_chat_stream: Generator[StreamedChatResponse, None, None]: Invoke the chat stream.
     invoke_rerank: Any: Invoke the rerank.
+    complete: str: Complete a single prompt, for utility generations like titles.
     list_models: List[str]: List all models.
+    default_models: List[str]: Models known without network I/O, used until models are discovered.
     is_available: bool: Check if the deployment is available.
+    lists_models_remotely: bool: Whether list_models calls the provider, if so it only runs in
+        the background model discovery.
     """
 
+    lists_models_remotely: bool = False
+    rerank_model: Optional[str] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for name, operation in INSTRUMENTED_METHODS.items():
+            if name in cls.__dict__:
+                setattr(
+                    cls, name, instrument_deployment_method(cls.__dict__[name], operation)
+                )
+
     @property
     @abstractmethod
     def rerank_enabled(self) -> bool: ...
@@ -22,6 +51,12 @@ class BaseDeployment:
     @staticmethod
     def list_models() -> List[str]: ...
 
+    @classmethod
+    def default_models(cls) -> List[str]:
+        if cls.lists_models_remotely:
+            return []
+        return cls.list_models()
+
     @staticmethod
     def is_available() -> bool: ...
 
@@ -39,3 +74,34 @@ class BaseDeployment:
     async def invoke_rerank(
         self, query: str, documents: List[Dict[str, Any]], ctx: Context, **kwargs: Any
     ) -> Any: ...
+
+    async def complete(
+        self,
+        prompt: str,
+        ctx: Context,
+        model: Optional[str] = None,
+        max_tokens: int = DEFAULT_COMPLETION_MAX_TOKENS,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Completes a single prompt, without tools, chat history or a system message.
+
+        Deployments with a lighter API than their chat stream override it.
+
+        Args:
+            prompt (str): Prompt, sent as the only user message.
+            ctx (Context): Context object.
+            model (Optional[str]): Model, the deployment's default if None.
+            max_tokens (int): Maximum number of generated tokens.
+
+        Returns:
+            str: Generated text.
+        """
+        chat_request = CohereChatRequest(
+            message=prompt, model=model, max_tokens=max_tokens
+        )
+        text = []
+        async for event in self.invoke_chat_stream(chat_request, ctx, **kwargs):
+            if event.get("event_type") == StreamEvent.TEXT_GENERATION:
+                text.append(event.get("text") or "")
+        return "".join(text).strip()
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any, AsyncGenerator, Dict, List
 
 import cohere
@@ -8,6 +9,7 @@ from backend.model_deployments.base import BaseDeployment
 from backend.model_deployments.utils import get_model_config_var
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
+from backend.services.sync_stream import iterate_in_thread
 
 BEDROCK_ACCESS_KEY_ENV_VAR = "BEDROCK_ACCESS_KEY"
 BEDROCK_SECRET_KEY_ENV_VAR = "BEDROCK_SECRET_KEY"
@@ -74,7 +76,8 @@ class BedrockDeployment(BaseDeployment):
             exclude={"tools", "conversation_id", "model", "stream"}, exclude_none=True
         )
 
-        response = self.client.chat(
+        response = await asyncio.to_thread(
+            self.client.chat,
             **bedrock_chat_req,
         )
         yield to_dict(response)
@@ -87,10 +90,12 @@ class BedrockDeployment(BaseDeployment):
             exclude={"tools", "conversation_id", "model", "stream"}, exclude_none=True
         )
 
-        stream = self.client.chat_stream(
-            **bedrock_chat_req,
+        stream = iterate_in_thread(
+            lambda: self.client.chat_stream(
+                **bedrock_chat_req,
+            )
         )
-        for event in stream:
+        async for event in stream:
             yield to_dict(event)
 
     async def invoke_rerank(
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any, Dict, List
 
 import cohere
@@ -5,11 +6,12 @@ import requests
 
 from backend.chat.collate import to_dict
 from backend.config.settings import Settings
-from backend.model_deployments.base import BaseDeployment
+from backend.model_deployments.base import DEFAULT_COMPLETION_MAX_TOKENS, BaseDeployment
 from backend.model_deployments.utils import get_model_config_var
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
 from backend.services.logger.utils import LoggerFactory
+from backend.services.sync_stream import iterate_in_thread
 
 COHERE_API_KEY_ENV_VAR = "COHERE_API_KEY"
 COHERE_ENV_VARS = [COHERE_API_KEY_ENV_VAR]
@@ -21,6 +23,8 @@ class CohereDeployment(BaseDeployment):
 
     client_name = "cohere-toolkit"
     api_key = Settings().deployments.cohere_platform.api_key
+    rerank_model = DEFAULT_RERANK_MODEL
+    lists_models_remotely = True
 
     def __init__(self, **kwargs: Any):
         # Override the environment variable from the request
@@ -45,7 +49,11 @@ class CohereDeployment(BaseDeployment):
             "authorization": f"Bearer {cls.api_key}",
         }
 
-        response = requests.get(url, headers=headers)
+        response = requests.get(
+            url,
+            headers=headers,
+            timeout=Settings().deployments.model_discovery_timeout_seconds,
+        )
 
         if not response.ok:
             logger.warning(
@@ -63,22 +71,40 @@ class CohereDeployment(BaseDeployment):
     async def invoke_chat(
         self, chat_request: CohereChatRequest, ctx: Context, **kwargs: Any
     ) -> Any:
-        response = self.client.chat(
+        response = await asyncio.to_thread(
+            self.client.chat,
             **chat_request.model_dump(exclude={"stream", "file_ids", "agent_id"}),
         )
         yield to_dict(response)
 
+    async def complete(
+        self,
+        prompt: str,
+        ctx: Context,
+        model: str | None = None,
+        max_tokens: int = DEFAULT_COMPLETION_MAX_TOKENS,
+        **kwargs: Any,
+    ) -> str:
+        # The client sends null for None, instead of the default model
+        model_kwargs = {"model": model} if model else {}
+        response = await asyncio.to_thread(
+            self.client.chat, message=prompt, max_tokens=max_tokens, **model_kwargs
+        )
+        return response.text.strip()
+
     async def invoke_chat_stream(
         self, chat_request: CohereChatRequest, ctx: Context, **kwargs: Any
     ) -> Any:
         logger = ctx.get_logger()
 
         print("COHERE_PARAMS: ", chat_request.model_dump(exclude={"stream", "file_ids", "agent_id"}))
-        stream = self.client.chat_stream(
-            **chat_request.model_dump(exclude={"stream", "file_ids", "agent_id"}),
+        stream = iterate_in_thread(
+            lambda: self.client.chat_stream(
+                **chat_request.model_dump(exclude={"stream", "file_ids", "agent_id"}),
+            )
         )
 
-        for event in stream:
+        async for event in stream:
             print("CohereChunk: ",event)
             event_dict = to_dict(event)
 
@@ -95,7 +121,10 @@ class CohereDeployment(BaseDeployment):
     async def invoke_rerank(
         self, query: str, documents: List[Dict[str, Any]], ctx: Context, **kwargs: Any
     ) -> Any:
-        response = self.client.rerank(
-            query=query, documents=documents, model=DEFAULT_RERANK_MODEL
+        response = await asyncio.to_thread(
+            self.client.rerank,
+            query=query,
+            documents=documents,
+            model=self.rerank_model,
         )
         return to_dict(response)
@@ -0,0 +1,536 @@
+"""
+Spreads the requests of the OpenAI deployment over several OpenAI-compatible endpoints,
+e.g. vLLM replicas.
+
+Endpoints are picked by least outstanding requests or by EWMA latency, both relative to
+their weight. Requests fail over to another endpoint on connection errors, timeouts and
+server errors, streams only until their first event. Endpoints failing repeatedly are
+ejected by a circuit breaker, and probed by background health checks until they recover.
+
+Streams can be hedged: if their first event takes longer than a percentile of the recent
+first event latencies, a duplicate request goes to another endpoint, and the stream whose
+first event comes first is kept. A budget caps the share of hedged streams.
+"""
+
+import asyncio
+import functools
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Iterable, Optional, TypeVar
+
+import openai
+from openai import OpenAI
+
+from backend.config.settings import Settings
+from backend.services.logger.utils import LoggerFactory
+from backend.services.metrics import (
+    ENDPOINT_HEDGE_RATE,
+    ENDPOINT_HEDGES,
+    OPENAI_ENDPOINT_EJECTIONS,
+    OPENAI_ENDPOINT_FAILOVERS,
+    OPENAI_ENDPOINT_FAILURES,
+    OPENAI_ENDPOINT_OUTSTANDING,
+)
+from backend.services.sync_stream import iterate_in_thread
+
+logger = LoggerFactory().get_logger()
+
+T = TypeVar("T")
+
+LEAST_OUTSTANDING = "least_outstanding"
+EWMA_LATENCY = "ewma_latency"
+LOAD_BALANCING_STRATEGIES = (LEAST_OUTSTANDING, EWMA_LATENCY)
+# Weight of the latest latency in the moving average
+EWMA_ALPHA = 0.3
+HEALTH_CHECK_TIMEOUT_SECONDS = 5
+# First event latencies the hedge delay is computed from, until there are enough of them
+# hedge_initial_delay_seconds is used
+HEDGE_LATENCY_SAMPLES = 500
+HEDGE_MIN_SAMPLES = 20
+# Streams the hedge budget applies to
+HEDGE_BUDGET_WINDOW = 1000
+
+# Client errors, e.g. invalid requests, would fail on every endpoint alike
+RETRIABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+# Deployments are created for each request, the configured endpoints' state is kept here
+_pools: dict[tuple, "EndpointPool"] = {}
+_pools_lock = threading.Lock()
+
+
+async def _next_event(events: AsyncGenerator[T, None]) -> tuple[bool, Optional[T]]:
+    try:
+        return True, await anext(events)
+    except StopAsyncIteration:
+        return False, None
+
+
+@dataclass(eq=False)
+class _StreamAttempt:
+    endpoint: "Endpoint"
+    events: AsyncGenerator
+    # Waits for the first event
+    task: asyncio.Task
+    started_at: float
+    deadline: float
+    is_hedge: bool = False
+    has_event: bool = False
+    first_event: Any = None
+
+
+@dataclass(eq=False)
+class Endpoint:
+    url: str
+    client: Any
+    weight: float = 1.0
+    outstanding: int = 0
+    # Moving average of the time to first event and of health checks, in seconds
+    latency: Optional[float] = None
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+
+class EndpointPool:
+    """
+    Endpoints of a deployment, with their load, latency and circuit breaker state.
+
+    Only used from the event loop, the requests themselves run in threads.
+    """
+
+    def __init__(
+        self,
+        endpoints: Iterable[Endpoint],
+        strategy: str = LEAST_OUTSTANDING,
+        failure_threshold: int = 3,
+        ejection_seconds: float = 30,
+        first_event_timeout_seconds: float = 60,
+        deployment: str = "",
+        hedging: bool = False,
+        hedge_percentile: float = 95,
+        hedge_initial_delay_seconds: float = 2,
+        hedge_budget_ratio: float = 0.1,
+    ):
+        self.endpoints = list(endpoints)
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.ejection_seconds = ejection_seconds
+        self.first_event_timeout_seconds = first_event_timeout_seconds
+        self.deployment = deployment
+        self.hedging = hedging and len(self.endpoints) > 1
+        self.hedge_percentile = hedge_percentile
+        self.hedge_initial_delay_seconds = hedge_initial_delay_seconds
+        self.hedge_budget_ratio = hedge_budget_ratio
+        self._first_event_latencies: deque[float] = deque(maxlen=HEDGE_LATENCY_SAMPLES)
+        # Whether each of the recent streams was hedged, for the hedge budget
+        self._hedged: deque[bool] = deque(maxlen=HEDGE_BUDGET_WINDOW)
+        self._hedges = 0
+
+    def pick(self, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Picks the endpoint for the next request.
+
+        Args:
+            exclude (Iterable[Endpoint]): Endpoints already tried by the request.
+
+        Returns:
+            Optional[Endpoint]: The endpoint, None if all of them were excluded.
+        """
+        excluded = set(exclude)
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in excluded]
+        if not candidates:
+            return None
+
+        now = time.monotonic()
+        available = [endpoint for endpoint in candidates if not endpoint.is_ejected(now)]
+        if not available:
+            # Rather try the endpoint coming back first than fail the request
+            return min(candidates, key=lambda endpoint: endpoint.ejected_until)
+
+        # Ties are broken randomly, so idle endpoints share the requests
+        return min(available, key=lambda endpoint: (self._score(endpoint), random.random()))
+
+    def _score(self, endpoint: Endpoint) -> float:
+        load = (endpoint.outstanding + 1) / endpoint.weight
+        if self.strategy == EWMA_LATENCY:
+            # Endpoints without a latency yet are tried first, to measure it
+            return load * (endpoint.latency or 0.0)
+        return load
+
+    def record_success(self, endpoint: Endpoint, latency: Optional[float] = None) -> None:
+        endpoint.consecutive_failures = 0
+        endpoint.ejected_until = 0.0
+        if latency is not None:
+            endpoint.latency = (
+                latency
+                if endpoint.latency is None
+                else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * endpoint.latency
+            )
+
+    def record_failure(self, endpoint: Endpoint) -> None:
+        OPENAI_ENDPOINT_FAILURES.inc(endpoint=endpoint.url)
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures < self.failure_threshold:
+            return
+
+        now = time.monotonic()
+        if not endpoint.is_ejected(now):
+            OPENAI_ENDPOINT_EJECTIONS.inc(endpoint=endpoint.url)
+            logger.warning(
+                event="[OpenAI Endpoints] Ejecting endpoint",
+                endpoint=endpoint.url,
+                consecutive_failures=endpoint.consecutive_failures,
+                ejection_seconds=self.ejection_seconds,
+            )
+        # Half open once ejection_seconds passed, a single failure ejects it again
+        endpoint.ejected_until = now + self.ejection_seconds
+
+    async def request(self, send: Callable[[Any], T]) -> T:
+        """
+        Sends a request, failing over to another endpoint if it can be retried.
+
+        Args:
+            send (Callable[[Any], T]): Sends the request with an endpoint's client, called
+                in a thread.
+
+        Returns:
+            T: The response.
+        """
+        tried = []
+        while True:
+            endpoint = self.pick(exclude=tried)
+            tried.append(endpoint)
+            self._acquire(endpoint)
+            try:
+                response = await asyncio.to_thread(send, endpoint.client)
+            except RETRIABLE_ERRORS as e:
+                self.record_failure(endpoint)
+                if len(tried) == len(self.endpoints):
+                    raise
+                self._log_failover(endpoint, e)
+                continue
+            finally:
+                self._release(endpoint)
+
+            self.record_success(endpoint)
+            return response
+
+    async def stream(
+        self, send: Callable[[Any], Iterable[T]]
+    ) -> AsyncGenerator[T, None]:
+        """
+        Streams a response, failing over to another endpoint until the first event.
+
+        With hedging, a duplicate request is sent to another endpoint if the first event
+        takes longer than usual, and the stream whose first event comes first is kept.
+
+        Args:
+            send (Callable[[Any], Iterable[T]]): Opens the stream with an endpoint's client,
+                called in a thread.
+
+        Yields:
+            T: Stream events.
+        """
+        attempt = await self._open_stream(send)
+        try:
+            if not attempt.has_event:
+                return
+
+            yield attempt.first_event
+            try:
+                async for event in attempt.events:
+                    yield event
+            except RETRIABLE_ERRORS:
+                self.record_failure(attempt.endpoint)
+                raise
+        finally:
+            await self._close(attempt)
+
+    async def _open_stream(self, send: Callable[[Any], Iterable[T]]) -> "_StreamAttempt":
+        loop = asyncio.get_running_loop()
+        tried: list[Endpoint] = []
+        attempts: list[_StreamAttempt] = []
+        hedge_at = loop.time() + self.hedge_delay() if self.hedging else None
+        hedged = False
+        failed_endpoint, error = None, None
+
+        try:
+            while True:
+                if not attempts:
+                    endpoint = self.pick(exclude=tried)
+                    if endpoint is None:
+                        raise error
+                    if failed_endpoint is not None:
+                        self._log_failover(failed_endpoint, error)
+                    attempts.append(self._start(send, endpoint, tried))
+
+                wake_at = min(attempt.deadline for attempt in attempts)
+                if hedge_at is not None:
+                    wake_at = min(wake_at, hedge_at)
+                done, _ = await asyncio.wait(
+                    [attempt.task for attempt in attempts],
+                    timeout=max(wake_at - loop.time(), 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                for attempt in [attempt for attempt in attempts if attempt.task in done]:
+                    attempts.remove(attempt)
+                    try:
+                        attempt.has_event, attempt.first_event = attempt.task.result()
+                    except Exception as e:
+                        await self._close(attempt)
+                        if not isinstance(e, RETRIABLE_ERRORS):
+                            raise
+                        self.record_failure(attempt.endpoint)
+                        failed_endpoint, error = attempt.endpoint, e
+                        continue
+
+                    latency = loop.time() - attempt.started_at
+                    self.record_success(attempt.endpoint, latency)
+                    self._first_event_latencies.append(latency)
+                    if hedged:
+                        ENDPOINT_HEDGES.inc(
+                            deployment=self.deployment,
+                            outcome="won" if attempt.is_hedge else "lost",
+                        )
+                    return attempt
+
+                for attempt in [
+                    attempt for attempt in attempts if attempt.deadline <= loop.time()
+                ]:
+                    attempts.remove(attempt)
+                    await self._close(attempt)
+                    self.record_failure(attempt.endpoint)
+                    failed_endpoint, error = attempt.endpoint, asyncio.TimeoutError()
+
+                if hedge_at is not None and attempts and loop.time() >= hedge_at:
+                    hedge_at = None
+                    hedge = self._start_hedge(send, tried)
+                    if hedge is not None:
+                        attempts.append(hedge)
+                        hedged = True
+        finally:
+            for attempt in attempts:
+                await self._close(attempt)
+            if self.hedging:
+                self._record_hedge(hedged)
+
+    def _start(
+        self,
+        send: Callable[[Any], Iterable[T]],
+        endpoint: Endpoint,
+        tried: list[Endpoint],
+        is_hedge: bool = False,
+    ) -> "_StreamAttempt":
+        tried.append(endpoint)
+        self._acquire(endpoint)
+        events = iterate_in_thread(functools.partial(send, endpoint.client))
+        loop = asyncio.get_running_loop()
+        return _StreamAttempt(
+            endpoint=endpoint,
+            events=events,
+            task=asyncio.create_task(_next_event(events)),
+            started_at=loop.time(),
+            deadline=loop.time() + self.first_event_timeout_seconds,
+            is_hedge=is_hedge,
+        )
+
+    def _start_hedge(
+        self, send: Callable[[Any], Iterable[T]], tried: list[Endpoint]
+    ) -> Optional["_StreamAttempt"]:
+        endpoint = self.pick(exclude=tried)
+        if endpoint is None or endpoint.is_ejected(time.monotonic()):
+            return None
+
+        # At most hedge_budget_ratio of the recent streams, counting this one, are hedged
+        if self._hedges >= self.hedge_budget_ratio * (len(self._hedged) + 1):
+            ENDPOINT_HEDGES.inc(deployment=self.deployment, outcome="over_budget")
+            return None
+
+        ENDPOINT_HEDGES.inc(deployment=self.deployment, outcome="fired")
+        return self._start(send, endpoint, tried, is_hedge=True)
+
+    def hedge_delay(self) -> float:
+        """
+        Gets how long a stream waits for its first event before it's hedged.
+
+        Returns:
+            float: The hedge_percentile of recent first event latencies in seconds, or
+                hedge_initial_delay_seconds until there are enough of them.
+        """
+        if len(self._first_event_latencies) < HEDGE_MIN_SAMPLES:
+            return self.hedge_initial_delay_seconds
+
+        latencies = sorted(self._first_event_latencies)
+        index = int(len(latencies) * self.hedge_percentile / 100)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def hedge_rate(self) -> float:
+        """Share of the recent streams that were hedged."""
+        return self._hedges / len(self._hedged) if self._hedged else 0.0
+
+    def _record_hedge(self, hedged: bool) -> None:
+        if len(self._hedged) == self._hedged.maxlen:
+            self._hedges -= self._hedged[0]
+        self._hedged.append(hedged)
+        self._hedges += hedged
+
+    async def _close(self, attempt: "_StreamAttempt") -> None:
+        if not attempt.task.done():
+            attempt.task.cancel()
+        await asyncio.gather(attempt.task, return_exceptions=True)
+        await attempt.events.aclose()
+        self._release(attempt.endpoint)
+
+    async def check_health(self) -> None:
+        """Probes every endpoint, recording its latency or failure."""
+        await asyncio.gather(*(self._probe(endpoint) for endpoint in self.endpoints))
+
+    async def _probe(self, endpoint: Endpoint) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(
+                endpoint.client.with_options(
+                    timeout=HEALTH_CHECK_TIMEOUT_SECONDS, max_retries=0
+                ).models.list
+            )
+        except Exception as e:
+            self.record_failure(endpoint)
+            logger.warning(
+                event="[OpenAI Endpoints] Health check failed",
+                endpoint=endpoint.url,
+                error=str(e),
+            )
+            return
+
+        self.record_success(endpoint, time.perf_counter() - start)
+
+    def _acquire(self, endpoint: Endpoint) -> None:
+        endpoint.outstanding += 1
+        OPENAI_ENDPOINT_OUTSTANDING.inc(endpoint=endpoint.url)
+
+    def _release(self, endpoint: Endpoint) -> None:
+        endpoint.outstanding -= 1
+        OPENAI_ENDPOINT_OUTSTANDING.dec(endpoint=endpoint.url)
+
+    def _log_failover(self, endpoint: Endpoint, error: Exception) -> None:
+        OPENAI_ENDPOINT_FAILOVERS.inc(endpoint=endpoint.url)
+        logger.warning(
+            event="[OpenAI Endpoints] Request failed, failing over",
+            endpoint=endpoint.url,
+            error=str(error) or type(error).__name__,
+        )
+
+
+def get_endpoint_pool(
+    deployment: str, api_key: Optional[str], endpoints: tuple[tuple[str, float], ...]
+) -> EndpointPool:
+    """
+    Gets the pool of endpoints, shared by the deployments created for each request.
+
+    Only for the configured endpoints, the pool is kept for the process's lifetime. Use
+    create_endpoint_pool for the endpoints or API keys a request overrides.
+
+    Args:
+        deployment (str): Deployment class name, labelling the pool's metrics.
+        api_key (Optional[str]): API key of the endpoints.
+        endpoints (tuple[tuple[str, float], ...]): URLs and weights of the endpoints.
+
+    Returns:
+        EndpointPool: The pool.
+    """
+    key = (deployment, api_key, endpoints)
+    with _pools_lock:
+        if key not in _pools:
+            pool = create_endpoint_pool(deployment, api_key, endpoints)
+            ENDPOINT_HEDGE_RATE.set_function(pool.hedge_rate, deployment=deployment)
+            _pools[key] = pool
+        return _pools[key]
+
+
+def create_endpoint_pool(
+    deployment: str, api_key: Optional[str], endpoints: tuple[tuple[str, float], ...]
+) -> EndpointPool:
+    """
+    Creates a pool of endpoints, without health checks or hedge rate metric.
+
+    Args:
+        deployment (str): Deployment class name, labelling the pool's metrics.
+        api_key (Optional[str]): API key of the endpoints.
+        endpoints (tuple[tuple[str, float], ...]): URLs and weights of the endpoints.
+
+    Returns:
+        EndpointPool: The pool.
+    """
+    settings = Settings().deployments.openai
+    strategy = settings.load_balancing
+    if strategy not in LOAD_BALANCING_STRATEGIES:
+        logger.warning(
+            event="[OpenAI Endpoints] Unknown load balancing strategy, using least_outstanding",
+            strategy=strategy,
+        )
+        strategy = LEAST_OUTSTANDING
+
+    # The pool fails over instead of the client retrying the same endpoint
+    max_retries = 0 if len(endpoints) > 1 else openai.DEFAULT_MAX_RETRIES
+    return EndpointPool(
+        [
+            Endpoint(
+                url=url,
+                client=OpenAI(api_key=api_key, base_url=url, max_retries=max_retries),
+                weight=weight,
+            )
+            for url, weight in endpoints
+        ],
+        strategy=strategy,
+        failure_threshold=settings.failure_threshold,
+        ejection_seconds=settings.ejection_seconds,
+        first_event_timeout_seconds=settings.first_event_timeout_seconds,
+        deployment=deployment,
+        hedging=settings.hedging,
+        hedge_percentile=settings.hedge_percentile,
+        hedge_initial_delay_seconds=settings.hedge_initial_delay_seconds,
+        hedge_budget_ratio=settings.hedge_budget_ratio,
+    )
+
+
+async def run_health_checks(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        # A single endpoint is used whatever its health
+        with _pools_lock:
+            pools = [pool for pool in _pools.values() if len(pool.endpoints) > 1]
+        try:
+            await asyncio.gather(*(pool.check_health() for pool in pools))
+        except Exception as e:
+            logger.error(event="[OpenAI Endpoints] Error checking health", error=str(e))
+
+
+_health_checks: Optional[asyncio.Task] = None
+
+
+def start_endpoint_health_checks() -> None:
+    global _health_checks
+
+    interval = Settings().deployments.openai.health_check_seconds
+    if _health_checks is not None or not interval:
+        return
+    _health_checks = asyncio.create_task(run_health_checks(interval))
+
+
+async def shutdown_endpoint_health_checks() -> None:
+    global _health_checks
+
+    task, _health_checks = _health_checks, None
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
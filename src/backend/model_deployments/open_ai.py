@@ -9,18 +9,31 @@ from fastapi import Depends
 from openai import OpenAI
 
 import asyncio
+import copy
 import logging
 
-from backend.model_deployments.base import BaseDeployment
+from backend.model_deployments.base import DEFAULT_COMPLETION_MAX_TOKENS, BaseDeployment
+from backend.model_deployments.endpoint_pool import (
+    create_endpoint_pool,
+    get_endpoint_pool,
+)
+from backend.services.response_cache import (
+    NO_AGENT_SCOPE,
+    get_response_cache,
+    set_response_chat_history,
+    set_response_ids,
+)
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
 from backend.config.settings import Settings
 from backend.model_deployments.utils import get_model_config_var
 from backend.chat.collate import to_dict
 from backend.services.openai_cohere_conveter import CohereToOpenAI
+from backend.services.tracing import span, start_span
 from backend.schemas.chat import ChatRole, ChatMessage
 from backend.chat.enums import StreamEvent
 from backend.schemas.document import Document
+import backend.crud.file as file_crud
 from backend.services.file import get_file_service
 from backend.database_models.database import DBSessionDep, get_session
 from backend.services.context import Context, get_context
@@ -38,6 +51,9 @@ OPENAI_API_KEY_ENV_VAR = "OPENAI_API_KEY"
 OPENAI_DEFAULT_MODEL_ENV_VAR = "OPENAI_DEFAULT_MODEL"
 OPENAI_DEFAULT_USE_LEGACY_API_ENV_VAR = "OPENAI_DEFAULT_USE_LEGACY_API"
 
+# Search result documents carry the start of each file, not its whole content
+SEARCH_RESULT_DOCUMENT_CHARS = 64 * 1024
+
 OPENAI_ENV_VARS = [OPENAI_API_KEY_ENV_VAR, OPENAI_URL_ENV_VAR, OPENAI_DEFAULT_MODEL_ENV_VAR, OPENAI_DEFAULT_USE_LEGACY_API_ENV_VAR]
 
 class OpenAIDeployment(BaseDeployment):
@@ -53,10 +69,9 @@ class OpenAIDeployment(BaseDeployment):
     default_endpoint = openai_config.endpoint_url 
     default_model = openai_config.default_model
     default_use_legacy_api = openai_config.default_use_legacy_api
-    openai = OpenAI(
-        api_key=default_api_key,
-        base_url=default_endpoint,
-    )
+    default_endpoints = openai_config.endpoints
+    lists_models_remotely = True
+
     def __init__(self, **kwargs: Any):
         # Override environment variables or use defaults from config
         self.api_key = get_model_config_var(
@@ -66,11 +81,24 @@ class OpenAIDeployment(BaseDeployment):
             OPENAI_URL_ENV_VAR, OpenAIDeployment.default_endpoint, **kwargs 
         )
         
-        # Configure the OpenAI SDK with the API key and base URL if available
-        self.openai = OpenAI(
-            api_key=self.api_key,
-            base_url=self.endpoint_url,
-        )
+        # An endpoint URL set for the request replaces the configured endpoints
+        if OpenAIDeployment.default_endpoints and self.endpoint_url == OpenAIDeployment.default_endpoint:
+            endpoints = tuple(
+                (endpoint.url, endpoint.weight)
+                for endpoint in OpenAIDeployment.default_endpoints
+            )
+        else:
+            endpoints = ((self.endpoint_url, 1.0),)
+
+        deployment = type(self).__name__
+        if (
+            self.api_key == OpenAIDeployment.default_api_key
+            and self.endpoint_url == OpenAIDeployment.default_endpoint
+        ):
+            self.pool = get_endpoint_pool(deployment, self.api_key, endpoints)
+        else:
+            # Overrides get a pool of their own, so the shared pools don't grow per request
+            self.pool = create_endpoint_pool(deployment, self.api_key, endpoints)
 
     @property
     def rerank_enabled(self) -> bool:
@@ -83,7 +111,13 @@ class OpenAIDeployment(BaseDeployment):
         if not cls.is_available():
             return []
         try:
-            models = cls.openai.models.list().data
+            client = OpenAI(
+                api_key=cls.default_api_key,
+                base_url=cls.default_endpoint,
+                timeout=Settings().deployments.model_discovery_timeout_seconds,
+                max_retries=0,
+            )
+            models = client.models.list().data
             models_list = [model.to_dict().get("id") for model in models]
         except Exception as e:
             models_list = []
@@ -96,6 +130,13 @@ class OpenAIDeployment(BaseDeployment):
         
         return models_list
 
+    @classmethod
+    def default_models(cls) -> List[str]:
+        """The configured default model, served until the models are listed."""
+        if not cls.is_available() or not cls.default_model:
+            return []
+        return [cls.default_model]
+
     @classmethod
     def is_available(cls) -> bool: 
         """Check if the deployment is available based on the API key."""
@@ -118,10 +159,10 @@ class OpenAIDeployment(BaseDeployment):
             openAi_chat_request = CohereToOpenAI.cohere_to_openai_chat_request_body(chat_request)
 
             # Invoke OpenAI API for non-streamed response
-            response = await asyncio.to_thread(
-                self.openai.chat.completions.create,
-                **openAi_chat_request,
-                stream=False
+            response = await self.pool.request(
+                lambda client: client.chat.completions.create(
+                    **openAi_chat_request, stream=False
+                )
             )
 
             # Extract and process the response
@@ -149,6 +190,36 @@ class OpenAIDeployment(BaseDeployment):
 
     
   
+    async def complete(
+        self,
+        prompt: str,
+        ctx: Context,
+        model: str | None = None,
+        max_tokens: int = DEFAULT_COMPLETION_MAX_TOKENS,
+        **kwargs: Any,
+    ) -> str:
+        """Complete a prompt with a single request, without the chat template or tools."""
+        model = model or self.default_model
+        with span("openai.complete", legacy_api=self.default_use_legacy_api):
+            if self.default_use_legacy_api:
+                response = await self.pool.request(
+                    lambda client: client.completions.create(
+                        model=model, prompt=prompt, max_tokens=max_tokens
+                    )
+                )
+                text = response.choices[0].text if response.choices else ""
+            else:
+                response = await self.pool.request(
+                    lambda client: client.chat.completions.create(
+                        model=model,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=max_tokens,
+                    )
+                )
+                text = response.choices[0].message.content if response.choices else ""
+
+        return (text or "").strip()
+
     async def invoke_chat_stream(
         self, chat_request: CohereChatRequest, ctx: Context, **kwargs: Any
     ) -> AsyncGenerator[Any, Any]:
@@ -175,170 +246,225 @@ class OpenAIDeployment(BaseDeployment):
                 chat_request.chat_history = [user_message]
             appended_user_message = True
 
+        upstream = start_span("openai.upstream", legacy_api=build_template)
         if build_template:
-            openAi_chat_request = CohereToOpenAI.cohere_to_openai_completion_request_body(chat_request)
+            with span("openai.convert_request"):
+                openAi_chat_request = CohereToOpenAI.cohere_to_openai_completion_request_body(chat_request)
             print("==============================================")
             print(f"Cohere Original chat request: {chat_request}")
             print("==============================================")
             print(f"OpenAI chat request: {openAi_chat_request}")
             print("==============================================")
-            try:
-                stream = await asyncio.wait_for(asyncio.to_thread(
-                    self.openai.completions.create,
-                    **openAi_chat_request,
-                    stream=True
-                ), timeout=30)  # Set a timeout of 30 seconds
-                logger.info("Successfully initiated OpenAI completion stream")
-            except asyncio.TimeoutError:
-                logger.error("Timeout while waiting for OpenAI completions")
-                raise
-            except Exception as e:
-                logger.error(f"Failed to initiate OpenAI completions: {e}")
-                raise
-                
+
+            def open_stream(client: OpenAI) -> Any:
+                return client.completions.create(**openAi_chat_request, stream=True)
+
         else:
-            openAi_chat_request = CohereToOpenAI.cohere_to_openai_chat_request_body(chat_request)
-            try:
-                stream = await asyncio.wait_for(asyncio.to_thread(
-                    self.openai.chat.completions.create,
-                    **openAi_chat_request,
-                    stream=True
-                ), timeout=30)  # Set a timeout of 30 seconds
-                logger.info("Successfully initiated OpenAI chat stream")
-            except asyncio.TimeoutError:
-                logger.error("Timeout while waiting for OpenAI chat stream")
-                raise
-            except Exception as e:
-                logger.error(f"Failed to initiate OpenAI chat stream: {e}")
-                raise
-                
+            with span("openai.convert_request"):
+                openAi_chat_request = CohereToOpenAI.cohere_to_openai_chat_request_body(chat_request)
+
+            def open_stream(client: OpenAI) -> Any:
+                return client.chat.completions.create(**openAi_chat_request, stream=True)
+
         print("==============================================")
         print(f"Cohere Original chat request: {chat_request}")
         print("==============================================")
         print(f"OpenAI chat request: {openAi_chat_request}")
         print("==============================================")
 
+        cache = get_response_cache()
+        cache_key = None
+        if cache and cache.accepts(chat_request.temperature):
+            # Redis lookups and embeddings block, run them off the event loop
+            cache_key = await asyncio.to_thread(
+                cache.get_key,
+                {**openAi_chat_request, "legacy_api": build_template},
+                ctx.get_agent_id() or NO_AGENT_SCOPE,
+                # Steps answering tool results are only looked up exactly
+                message=None if chat_request.tool_results else chat_request.message,
+            )
+
+        cached = await asyncio.to_thread(cache.get, cache_key) if cache_key else None
+        if cached:
+            tier, cached_batches = cached
+            upstream.set_attribute("response_cache", tier)
+            cached_events = [event for batch in cached_batches for event in batch]
+            set_response_ids(
+                cached_events,
+                generation_id=generation_id,
+                conversation_id=chat_request.conversation_id,
+                response_id=ctx.get_trace_id(),
+            )
+            # The semantic tier replays a response recorded for another user message
+            set_response_chat_history(
+                cached_events,
+                CohereToOpenAI.convert_backend_message_to_openai_message(chat_request.chat_history),
+            )
+            try:
+                for i, batch in enumerate(cached_batches):
+                    for event in self.process_events(batch, chat_request, generation_id, ctx, with_tool_results=i == 0):
+                        yield event
+            finally:
+                upstream.end()
+            return
+
+        # Events of each upstream event replayed for the same request, only recorded if
+        # it may be cached
+        recorded_batches = [] if cache_key else None
+        received_first_token = False
+        error = None
+        # Opened and read in a thread by the endpoint pool, which fails over to another
+        # endpoint until the first event, and closes the response if the client disconnects
+        events = self.pool.stream(open_stream)
         try:
-            if stream:
-                logger.info("OpenAI chat stream started")
-                for event in stream:
-                    print(f"Received event: {event}")  # Log each event received
-
-                    # Attempt to convert event to a dictionary
-                    try:
-                        event_dict: Any = event.model_dump(serialize_as_any=False)
-                    except Exception as e:
-                        logger.error(f"Failed to convert event to dict: {e}")
-                        event_dict = {}
-
-                    print("Event Dict: ", event_dict)
-                    stream_message = ""
-                    finish_reason = None
-                    delta = None
-
-                    if build_template:
-                        choices = event_dict.get("choices", [])
-                        if choices and len(choices) > 0:
-                            print("I'm in Choices Condition")
-                            stream_message = choices[0].get("text", "")
-                            finish_reason = choices[0].get("finish_reason", "")
-                            delta = choices[0].get('delta', None)
-
-                        content = event_dict.get("content")
-                        if content is not None:
-                            print("I'm in Content Condition")
-                            stream_message = content
-                            stop_signal = event_dict.get('stop')
-                            if stop_signal:
-                                finish_reason = "stop"
-                    else:
-                        choices = getattr(event, 'choices', [])
-                        if choices and len(choices) > 0:
-                            stream_message = getattr(choices[0].delta, 'content', "")
-                            finish_reason = getattr(choices[0], 'finish_reason', "")
-                            delta = getattr(choices[0], 'delta', None)
+            logger.info("OpenAI chat stream started")
+            async for event in events:
+                print(f"Received event: {event}")  # Log each event received
+                if not received_first_token:
+                    upstream.add_event("first_token")
+                    received_first_token = True
+
+                # Attempt to convert event to a dictionary
+                try:
+                    event_dict: Any = event.model_dump(serialize_as_any=False)
+                except Exception as e:
+                    logger.error(f"Failed to convert event to dict: {e}")
+                    event_dict = {}
+
+                print("Event Dict: ", event_dict)
+                stream_message = ""
+                finish_reason = None
+                delta = None
+
+                if build_template:
+                    choices = event_dict.get("choices", [])
+                    if choices and len(choices) > 0:
+                        print("I'm in Choices Condition")
+                        stream_message = choices[0].get("text", "")
+                        finish_reason = choices[0].get("finish_reason", "")
+                        delta = choices[0].get('delta', None)
+
+                    content = event_dict.get("content")
+                    if content is not None:
+                        print("I'm in Content Condition")
+                        stream_message = content
+                        stop_signal = event_dict.get('stop')
+                        if stop_signal:
+                            finish_reason = "stop"
+                else:
+                    choices = getattr(event, 'choices', [])
+                    if choices and len(choices) > 0:
+                        stream_message = getattr(choices[0].delta, 'content', "")
+                        finish_reason = getattr(choices[0], 'finish_reason', "")
+                        delta = getattr(choices[0], 'delta', None)
 
                     
-                    if stream_message:
-                        full_previous_response += stream_message
+                if stream_message:
+                    full_previous_response += stream_message
 
-                    if function_triggered != 'calling':
-                        print("==================================")
-                        print("OpenAi_Event: ", event)
-                        cohere_events = CohereToOpenAI.openai_to_cohere_event_chunk(event=event, previous_response=full_previous_response, function_triggered=function_triggered, chat_request=chat_request, build_template=build_template, stream_message=stream_message, finish_reason=finish_reason, delta=delta, generation_id=generation_id, ctx=ctx)
+                if function_triggered != 'calling':
+                    print("==================================")
+                    print("OpenAi_Event: ", event)
+                    cohere_events = CohereToOpenAI.openai_to_cohere_event_chunk(event=event, previous_response=full_previous_response, function_triggered=function_triggered, chat_request=chat_request, build_template=build_template, stream_message=stream_message, finish_reason=finish_reason, delta=delta, generation_id=generation_id, ctx=ctx)
                         
-                        print("cohere_events: ", cohere_events)
-                        print("==================================")
-                    else:
-                        cohere_events = []
+                    print("cohere_events: ", cohere_events)
+                    print("==================================")
+                else:
+                    cohere_events = []
 
-                    if cohere_events and len(cohere_events) > 0:
+                batch = []
+                if cohere_events and len(cohere_events) > 0:
                                     
-                        for cohere_event in cohere_events:
-                            if cohere_event.event_type == StreamEvent.INLINE_FIX and cohere_event.text and "REMOVE" in cohere_event.text:
-                                to_remove = cohere_event.text.replace("REMOVE", "")  # Strip any leading/trailing spaces
-                                print("BEFORE REMOVED TOOL CALL", full_previous_response)
-                                print("REMOVING", f"""{to_remove}""")
+                    for cohere_event in cohere_events:
+                        if cohere_event.event_type == StreamEvent.INLINE_FIX and cohere_event.text and "REMOVE" in cohere_event.text:
+                            to_remove = cohere_event.text.replace("REMOVE", "")  # Strip any leading/trailing spaces
+                            print("BEFORE REMOVED TOOL CALL", full_previous_response)
+                            print("REMOVING", f"""{to_remove}""")
                                 
-                                # Check if the text to remove exists in the previous response before attempting to replace
-                                if to_remove in full_previous_response:
-                                    full_previous_response = full_previous_response.replace(f"""{to_remove}""", "")
-                                    print("REMOVED TOOL CALL", full_previous_response)
-                                else:
-                                    print(f"Text '{to_remove}' not found in the previous response.")
+                            # Check if the text to remove exists in the previous response before attempting to replace
+                            if to_remove in full_previous_response:
+                                full_previous_response = full_previous_response.replace(f"""{to_remove}""", "")
+                                print("REMOVED TOOL CALL", full_previous_response)
+                            else:
+                                print(f"Text '{to_remove}' not found in the previous response.")
 
                                 
-                            if (cohere_event.event_type == StreamEvent.TOOL_CALLS_GENERATION or cohere_event.event_type == StreamEvent.TOOL_CALLS_CHUNK):
-                                function_triggered = "calling"
-                                    
-                                    
-                                if cohere_event.event_type == StreamEvent.TOOL_CALLS_GENERATION and cohere_event.tool_calls and len(cohere_event.tool_calls) > 0:
-                                    for tool_call in cohere_event.tool_calls:
-                                        
-                                        tool_call_dict = {f"{str(tool_call.name)}": tool_call.parameters}
-                                        
-                                        
-                                        
-                                        
-                                        tool_call_message = ChatMessage(role=ChatRole.CHATBOT, message="I'm calling a system tool to retrieve information", tool_calls=[tool_call_dict])
-                                        if chat_request.chat_history and len(chat_request.chat_history) > 0:
-                                            chat_request.chat_history.append(tool_call_message)
-                                        else:
-                                            chat_request.chat_history = [tool_call_message]
-
-                            if not first_request_is_sent:
-                                stream_start = StreamStart(event_type=StreamEvent.STREAM_START, generation_id=generation_id)
-                                yield to_dict(stream_start)
-
-                            yield to_dict(cohere_event)
-
-                    if chat_request.tool_results and not result_sent:
-                        if chat_request.tool_results and len(chat_request.tool_results):
-                            print("Original tool results: ", chat_request.tool_results)
-                            
-                            for result in chat_request.tool_results:
-                                tool_call = dict(result['call'])
-                                tool_call_parameters = dict(tool_call['parameters'])
-                                file_ids = tool_call_parameters.get('file_ids')
-                                output_str = CohereToOpenAI.process_tool_result_entry_as_text(chat_request.tool_results)
-                                search_result,search_event = self.process_tool_result_event(output_str=output_str, generation_id=generation_id, file_ids=file_ids, ctx=ctx)
-                                
-                                # chat_request.search_results.append(dict(search_result))
-                                result_sent = True
-                                yield to_dict(search_event)
-                                  
-                            # output_str = CohereToOpenAI.process_tool_results_as_text(tool_results=chat_request.tool_results)
-                            # if output_str and len(output_str) > 0:
-                            #     search_event = self.process_tool_result_event(output_str=output_str, generation_id=generation_id, file_ids=chat_request.file_ids, ctx=ctx)
-                            #     result_sent = True
-                            #     yield to_dict(search_event)
-            else:
-                logger.error("Stream is undefined")
+                        if (cohere_event.event_type == StreamEvent.TOOL_CALLS_GENERATION or cohere_event.event_type == StreamEvent.TOOL_CALLS_CHUNK):
+                            function_triggered = "calling"
+
+                        if not first_request_is_sent:
+                            batch.append(to_dict(StreamStart(event_type=StreamEvent.STREAM_START, generation_id=generation_id)))
+
+                        batch.append(to_dict(cohere_event))
+
+                if recorded_batches is not None:
+                    recorded_batches.append(copy.deepcopy(batch))
+                for processed_event in self.process_events(batch, chat_request, generation_id, ctx, with_tool_results=not result_sent):
+                    yield processed_event
+                result_sent = True
+            upstream.add_event("last_token")
+
+            # Only complete responses are cached. Tool result events aren't recorded,
+            # they're made again from the request
+            if recorded_batches and any(
+                event["event_type"] == StreamEvent.STREAM_END
+                for batch in recorded_batches
+                for event in batch
+            ):
+                await asyncio.to_thread(cache.put, cache_key, recorded_batches)
         except Exception as e:
+            error = type(e)
             logger.error(f"Error invoking chat stream: {e}")
             logger.error(f"Chat request: {chat_request}")
             logger.error(f"OpenAI chat request: {openAi_chat_request}")
             raise
+        finally:
+            await events.aclose()
+            upstream.end(error)
+
+    def process_events(
+        self,
+        events: List[Dict[str, Any]],
+        chat_request: CohereChatRequest,
+        generation_id: str,
+        ctx: Context,
+        with_tool_results: bool = False,
+    ) -> Iterable[Dict[str, Any]]:
+        """
+        Events converted from an upstream event, live or replayed from the response cache.
+
+        The tool calls are added to the request's chat history as they're yielded, and
+        the search result events for the request's tool results follow if requested.
+        """
+        for event in events:
+            if event["event_type"] == StreamEvent.TOOL_CALLS_GENERATION:
+                for tool_call in event.get("tool_calls") or []:
+                    tool_call_dict = {f"{str(tool_call['name'])}": tool_call["parameters"]}
+                    tool_call_message = ChatMessage(role=ChatRole.CHATBOT, message="I'm calling a system tool to retrieve information", tool_calls=[tool_call_dict])
+                    if chat_request.chat_history and len(chat_request.chat_history) > 0:
+                        chat_request.chat_history.append(tool_call_message)
+                    else:
+                        chat_request.chat_history = [tool_call_message]
+            yield event
+
+        if with_tool_results and chat_request.tool_results:
+            yield from self.get_tool_result_events(chat_request, generation_id, ctx)
+
+    def get_tool_result_events(
+        self, chat_request: CohereChatRequest, generation_id: str, ctx: Context
+    ) -> List[Dict[str, Any]]:
+        """Search result events for the tool results of the request."""
+        print("Original tool results: ", chat_request.tool_results)
+        events = []
+        for result in chat_request.tool_results or []:
+            tool_call = dict(result['call'])
+            tool_call_parameters = dict(tool_call['parameters'])
+            file_ids = tool_call_parameters.get('file_ids')
+            output_str = CohereToOpenAI.process_tool_result_entry_as_text(chat_request.tool_results)
+            search_result,search_event = self.process_tool_result_event(output_str=output_str, generation_id=generation_id, file_ids=file_ids, ctx=ctx)
+            events.append(to_dict(search_event))
+
+        return events
 
     @staticmethod
     def process_tool_result_event(generation_id: str,file_ids=None, output_str="", tool_calls: Dict[str, Any] = None, ctx: Context = Depends(get_context)):
@@ -351,7 +477,16 @@ class OpenAIDeployment(BaseDeployment):
             file_service = get_file_service()
             files = file_service.get_files_by_ids( files_ids=file_ids or [], ctx=ctx, session=db)
             
-            documents = [Document(id=file.id, text=file.file_content, title=file.file_name) for file in files]
+            documents = [
+                Document(
+                    id=file.id,
+                    text=file_crud.get_file_content_range(
+                        db, file.id, 0, SEARCH_RESULT_DOCUMENT_CHARS
+                    ),
+                    title=file.file_name,
+                )
+                for file in files
+            ]
 
         # document: ChatDocument = {"text": output_str, "title": } 
         search_event = StreamSearchResults(event_type=StreamEvent.SEARCH_RESULTS, documents=documents, search_results=[dict(search_result)])
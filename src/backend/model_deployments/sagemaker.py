@@ -9,6 +9,7 @@ from backend.model_deployments.base import BaseDeployment
 from backend.model_deployments.utils import get_model_config_var
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
+from backend.services.sync_stream import iterate_in_thread
 
 SAGE_MAKER_ACCESS_KEY_ENV_VAR = "SAGE_MAKER_ACCESS_KEY"
 SAGE_MAKER_SECRET_KEY_ENV_VAR = "SAGE_MAKER_SECRET_KEY"
@@ -105,13 +106,21 @@ class SageMakerDeployment(BaseDeployment):
         }
         self.params["Body"] = json.dumps(json_params)
 
-        # Invoke the model and print the response
+        async for stream_event in iterate_in_thread(self._stream_events):
+            yield stream_event
+
+    def _stream_events(self):
+        # Invoke the model and parse the response stream, runs in a producer thread
         result = self.client.invoke_endpoint_with_response_stream(**self.params)
         event_stream = result["Body"]
-        for index, line in enumerate(SageMakerDeployment.LineIterator(event_stream)):
-            stream_event = json.loads(line.decode())
-            stream_event["index"] = index
-            yield stream_event
+        try:
+            for index, line in enumerate(SageMakerDeployment.LineIterator(event_stream)):
+                stream_event = json.loads(line.decode())
+                stream_event["index"] = index
+                yield stream_event
+        finally:
+            # Release the upstream connection, also when the consumer stopped early
+            event_stream.close()
 
     async def invoke_rerank(
         self, query: str, documents: List[Dict[str, Any]], ctx: Context
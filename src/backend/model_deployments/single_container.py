@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any, AsyncGenerator, Dict, List
 
 import cohere
@@ -8,6 +9,7 @@ from backend.model_deployments.base import BaseDeployment
 from backend.model_deployments.utils import get_model_config_var
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
+from backend.services.sync_stream import iterate_in_thread
 
 DEFAULT_RERANK_MODEL = "rerank-english-v2.0"
 SC_URL_ENV_VAR = "SINGLE_CONTAINER_URL"
@@ -19,6 +21,7 @@ class SingleContainerDeployment(BaseDeployment):
     """Single Container Deployment."""
 
     client_name = "cohere-toolkit"
+    rerank_model = DEFAULT_RERANK_MODEL
     config = Settings().deployments.single_container
     default_url = config.url
     default_model = config.model
@@ -53,7 +56,8 @@ class SingleContainerDeployment(BaseDeployment):
         )
 
     async def invoke_chat(self, chat_request: CohereChatRequest) -> Any:
-        response = self.client.chat(
+        response = await asyncio.to_thread(
+            self.client.chat,
             **chat_request.model_dump(
                 exclude={"stream", "file_ids", "model", "agent_id"}
             ),
@@ -63,18 +67,24 @@ class SingleContainerDeployment(BaseDeployment):
     async def invoke_chat_stream(
         self, chat_request: CohereChatRequest, ctx: Context, **kwargs: Any
     ) -> AsyncGenerator[Any, Any]:
-        stream = self.client.chat_stream(
-            **chat_request.model_dump(
-                exclude={"stream", "file_ids", "model", "agent_id"}
-            ),
+        stream = iterate_in_thread(
+            lambda: self.client.chat_stream(
+                **chat_request.model_dump(
+                    exclude={"stream", "file_ids", "model", "agent_id"}
+                ),
+            )
         )
 
-        for event in stream:
+        async for event in stream:
             yield to_dict(event)
 
     async def invoke_rerank(
         self, query: str, documents: List[Dict[str, Any]], ctx: Context
     ) -> Any:
-        return self.client.rerank(
-            query=query, documents=documents, model=DEFAULT_RERANK_MODEL
+        response = await asyncio.to_thread(
+            self.client.rerank,
+            query=query,
+            documents=documents,
+            model=self.rerank_model,
         )
+        return to_dict(response)
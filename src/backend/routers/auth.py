@@ -10,14 +10,14 @@ from backend.config.auth import ENABLED_AUTH_STRATEGY_MAPPING
 from backend.config.routers import RouterName
 from backend.config.settings import Settings
 from backend.config.tools import AVAILABLE_TOOLS, ToolName
-from backend.crud import blacklist as blacklist_crud
-from backend.database_models import Blacklist
 from backend.database_models.database import DBSessionDep
 from backend.schemas.auth import JWTResponse, ListAuthStrategy, Login, Logout
 from backend.schemas.context import Context
 from backend.schemas.tool_auth import DeleteToolAuth
 from backend.services.auth.jwt import JWTService
 from backend.services.auth.request_validators import validate_authorization
+from backend.services.auth.token_cache import blacklist_token
+from backend.services.auth.tool_auth import invalidate_tool_auth
 from backend.services.auth.utils import (
     get_or_create_user,
     is_enabled_authentication_strategy,
@@ -229,8 +229,7 @@ async def logout(
         dict: Empty on success
     """
     if token is not None:
-        db_blacklist = Blacklist(token_id=token["jti"])
-        blacklist_crud.create_blacklist(session, db_blacklist)
+        blacklist_token(session, token)
 
     return {}
 
@@ -314,6 +313,8 @@ async def tool_auth(
             err = tool_auth_service.retrieve_auth_token(request, session, user_id)
         except Exception as e:
             log_and_redirect_err(str(e))
+        finally:
+            invalidate_tool_auth(tool.name, user_id)
 
         if err:
             log_and_redirect_err(err)
@@ -376,6 +377,7 @@ async def delete_tool_auth(
     try:
         tool_auth_service = tool.auth_implementation()
         is_deleted = tool_auth_service.delete_tool_auth(session, user_id)
+        invalidate_tool_auth(tool.name, user_id)
 
         if not is_deleted:
             logger.error_and_raise_http_exception(event="Error deleting Tool Auth.")
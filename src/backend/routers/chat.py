@@ -1,6 +1,6 @@
 from typing import Any, Generator
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Header, Request
 from sse_starlette.sse import EventSourceResponse
 
 from backend.chat.custom.custom import CustomChat
@@ -11,15 +11,22 @@ from backend.schemas.agent import Agent, AgentToolMetadata
 from backend.schemas.chat import ChatResponseEvent, NonStreamedChatResponse
 from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
+from backend.services.admission import (
+    AdmissionTicket,
+    admit_chat_stream_turn,
+    admit_chat_turn,
+)
 from backend.services.agent import validate_agent_exists
 from backend.services.chat import (
     generate_chat_response,
-    generate_chat_stream,
     process_chat,
     process_message_regeneration,
 )
 from backend.services.context import get_context
+from backend.services.generation_workers import stream_chat_turn
 from backend.services.request_validators import validate_deployment_header
+from backend.services.resumable_stream import resume_chat_events
+from backend.services.sse import create_chat_event_response
 
 router = APIRouter(
     prefix="/v1",
@@ -33,19 +40,32 @@ async def chat_stream(
     chat_request: CohereChatRequest,
     request: Request,
     ctx: Context = Depends(get_context),
+    admission: AdmissionTicket | None = Depends(admit_chat_stream_turn),
+    last_event_id: str | None = Header(default=None),
 ) -> Generator[ChatResponseEvent, Any, None]:
     """
     Stream chat endpoint to handle user messages and return chatbot responses.
 
+    A client that reconnects with the Last-Event-ID header resumes the turn it was
+    receiving instead of starting a new one.
+
     Args:
         session (DBSessionDep): Database session.
         chat_request (CohereChatRequest): Chat request data.
         request (Request): Request object.
         ctx (Context): Context object.
+        admission (AdmissionTicket | None): Admission of the turn, within the rate and
+            concurrency limits, None when resuming.
+        last_event_id (str): ID of the last event received before reconnecting.
 
     Returns:
         EventSourceResponse: Server-sent event response with chatbot responses.
     """
+    if last_event_id:
+        return create_chat_event_response(
+            await resume_chat_events(last_event_id, ctx.get_user_id())
+        )
+
     ctx.with_model(chat_request.model)
     agent_id = chat_request.agent_id
     ctx.with_agent_id(agent_id)
@@ -60,25 +80,38 @@ async def chat_stream(
         ctx,
     ) = process_chat(session, chat_request, request, ctx)
 
-    return EventSourceResponse(
-        generate_chat_stream(
+    return create_chat_event_response(
+        stream_chat_turn(
             session,
-            CustomChat().chat(
-                chat_request,
-                stream=True,
-                managed_tools=managed_tools,
-                session=session,
-                ctx=ctx,
-            ),
+            chat_request,
             response_message,
+            managed_tools=managed_tools,
             should_store=should_store,
             next_message_position=next_message_position,
             ctx=ctx,
-        ),
-        media_type="text/event-stream",
-        headers={"Connection": "keep-alive"},
-        send_timeout=300,
-        ping=5,
+            admission=admission,
+        )
+    )
+
+
+@router.get("/chat-stream/resume")
+async def resume_chat_stream(
+    last_event_id: str = Header(),
+    ctx: Context = Depends(get_context),
+) -> EventSourceResponse:
+    """
+    Resume the stream of a chat turn after a dropped connection, without regenerating it.
+
+    Args:
+        last_event_id (str): ID of the last event received, from the Last-Event-ID header.
+        ctx (Context): Context object.
+
+    Returns:
+        EventSourceResponse: Server-sent event response with the events after
+            last_event_id, followed by the live events if the turn is still running.
+    """
+    return create_chat_event_response(
+        await resume_chat_events(last_event_id, ctx.get_user_id())
     )
 
 
@@ -88,6 +121,7 @@ async def regenerate_chat_stream(
     chat_request: CohereChatRequest,
     request: Request,
     ctx: Context = Depends(get_context),
+    admission: AdmissionTicket = Depends(admit_chat_turn),
 ) -> EventSourceResponse:
     """
     Endpoint to regenerate stream chat response for the last user message.
@@ -97,6 +131,7 @@ async def regenerate_chat_stream(
         chat_request (CohereChatRequest): Chat request data.
         request (Request): Request object.
         ctx (Context): Context object.
+        admission (AdmissionTicket): Admission of the turn, within the rate and concurrency limits.
 
     Returns:
         EventSourceResponse: Server-sent event response with chatbot responses.
@@ -129,29 +164,24 @@ async def regenerate_chat_stream(
         ctx,
     ) = process_message_regeneration(session, chat_request, request, ctx)
 
-    return EventSourceResponse(
-        generate_chat_stream(
+    return create_chat_event_response(
+        stream_chat_turn(
             session,
-            CustomChat().chat(
-                chat_request,
-                stream=True,
-                managed_tools=managed_tools,
-                session=session,
-                ctx=ctx,
-            ),
+            chat_request,
             new_response_message,
+            managed_tools=managed_tools,
             next_message_position=new_response_message.position,
             previous_response_message_ids=previous_response_message_ids,
             ctx=ctx,
-        ),
-        media_type="text/event-stream",
-        headers={"Connection": "keep-alive"},
-        send_timeout=300,
-        ping=5,
+            admission=admission,
+        )
     )
 
 
-@router.post("/chat", dependencies=[Depends(validate_deployment_header)])
+@router.post(
+    "/chat",
+    dependencies=[Depends(validate_deployment_header), Depends(admit_chat_turn)],
+)
 async def chat(
     session: DBSessionDep,
     chat_request: CohereChatRequest,
@@ -213,3 +243,4 @@ async def chat(
         ctx=ctx,
     )
     return response
+
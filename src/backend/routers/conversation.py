@@ -3,14 +3,14 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
 from fastapi import File as RequestFile
 from fastapi import UploadFile as FastAPIUploadFile
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
 
-from backend.chat.custom.utils import get_deployment
 from backend.config.routers import RouterName
 from backend.crud import agent as agent_crud
 from backend.crud import conversation as conversation_crud
 from backend.crud import message as message_crud
 from backend.database_models import Conversation as ConversationModel
+from backend.database_models.background_job import BackgroundJobStatus
 from backend.database_models.database import DBSessionDep, get_session
 from backend.schemas.agent import Agent
 from backend.schemas.context import Context
@@ -31,10 +31,8 @@ from backend.schemas.file import (
 from backend.services.agent import validate_agent_exists
 from backend.services.context import get_context
 from backend.services.conversation import (
-    filter_conversations,
-    generate_conversation_title,
-    get_documents_to_rerank,
     get_messages_with_files,
+    submit_conversation_title,
     validate_conversation,
 )
 from backend.services.file import (
@@ -48,7 +46,7 @@ from backend.services.folder import (
 )
 
 
-from backend.services.synthesizer import synthesize
+from backend.services.synthesizer import synthesize_message_stream
 
 router = APIRouter(
     prefix="/v1/conversations",
@@ -296,10 +294,10 @@ async def search_conversations(
     ctx: Context = Depends(get_context),
 ) -> list[ConversationWithoutMessages]:
     """
-    Search conversations by title.
+    Full-text search over the titles and messages of the user's conversations.
 
     Args:
-        query (str): Query string to search for in conversation titles.
+        query (str): Query string to search for in conversation titles and messages.
         session (DBSessionDep): Database session.
         request (Request): Request object.
         offset (int): Offset to start the list.
@@ -308,38 +306,26 @@ async def search_conversations(
         ctx (Context): Context object.
 
     Returns:
-        list[ConversationWithoutMessages]: List of conversations that match the query.
+        list[ConversationWithoutMessages]: List of conversations that match the query,
+            most relevant first.
     """
     user_id = ctx.get_user_id()
-    deployment_name = ctx.get_deployment_name()
-    model_deployment = get_deployment(deployment_name, ctx)
 
-    agent = None
     if agent_id:
         agent = validate_agent_exists(session, agent_id, user_id)
+        ctx.with_agent(Agent.model_validate(agent))
 
-    if agent_id:
-        agent_schema = Agent.model_validate(agent)
-        ctx.with_agent(agent_schema)
-
-    conversations = conversation_crud.get_conversations(
-        session, offset=offset, limit=limit, user_id=user_id, agent_id=agent_id
-    )
-
-    if not conversations:
-        return []
-
-    rerank_documents = get_documents_to_rerank(conversations)
-    filtered_documents = await filter_conversations(
-        query,
-        conversations,
-        rerank_documents,
-        model_deployment,
-        ctx,
+    conversations = conversation_crud.search_conversations(
+        session,
+        user_id=user_id,
+        query=query,
+        offset=offset,
+        limit=limit,
+        agent_id=agent_id,
     )
 
     results = []
-    for conversation in filtered_documents:
+    for conversation in conversations:
         files = get_file_service().get_files_by_conversation_id(
             session, user_id, conversation.id, ctx
         )
@@ -558,6 +544,9 @@ async def generate_title(
     """
     Generate a title for a conversation and update the conversation with the generated title.
 
+    The title is generated by a background job, unless jobs run inline. Until it's done,
+    the response has the current title and is_pending is set.
+
     Args:
         conversation_id (str): Conversation ID.
         session (DBSessionDep): Database session.
@@ -565,7 +554,7 @@ async def generate_title(
         ctx (Context): Context object.
 
     Returns:
-        str: Generated title for the conversation.
+        GenerateTitleResponse: Title of the conversation.
 
     Raises:
         HTTPException: If the conversation with the given ID is not found.
@@ -582,7 +571,7 @@ async def generate_title(
         agent_schema = Agent.model_validate(agent)
         ctx.with_agent(agent_schema)
 
-    title, error = await generate_conversation_title(
+    job = await submit_conversation_title(
         session,
         conversation,
         agent_id,
@@ -590,13 +579,10 @@ async def generate_title(
         model,
     )
 
-    conversation_crud.update_conversation(
-        session, conversation, UpdateConversationRequest(title=title)
-    )
-
     return GenerateTitleResponse(
-        title=title,
-        error=error,
+        title=conversation.title,
+        error=job.error,
+        is_pending=job.status in (BackgroundJobStatus.PENDING, BackgroundJobStatus.RUNNING),
     )
 
 
@@ -629,7 +615,7 @@ async def synthesize_message(
         ctx (Context): Context object.
 
     Returns:
-        Response: Synthesized audio file.
+        StreamingResponse: Synthesized audio file, streamed sentence chunk by sentence chunk.
 
     Raises:
         HTTPException: If the message with the given ID is not found or synthesis fails.
@@ -643,14 +629,22 @@ async def synthesize_message(
             detail=f"Message with ID: {message_id} not found.",
         )
 
+    audio_stream = synthesize_message_stream(message.id, message.text or "")
+
+    # Synthesize the first chunk before responding so that setup errors are still returned as a 500
     try:
-        synthesized_audio = synthesize(message.text)
+        first_chunk = await anext(audio_stream, b"")
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error while message synthesis: {e}"
         )
 
-    return Response(synthesized_audio, media_type="audio/mp3")
+    async def stream_audio():
+        yield first_chunk
+        async for chunk in audio_stream:
+            yield chunk
+
+    return StreamingResponse(stream_audio(), media_type="audio/mp3")
 
 
 # Folder Handling
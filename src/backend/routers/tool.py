@@ -6,6 +6,7 @@ from backend.database_models.database import DBSessionDep
 from backend.schemas.context import Context
 from backend.schemas.tool import ManagedTool
 from backend.services.agent import validate_agent_exists
+from backend.services.auth.tool_auth import get_tools_with_auth
 from backend.services.context import get_context
 
 router = APIRouter(prefix="/v1/tools")
@@ -31,7 +32,6 @@ def list_tools(
         list[ManagedTool]: List of available tools.
     """
     user_id = ctx.get_user_id()
-    logger = ctx.get_logger()
 
     all_tools = AVAILABLE_TOOLS.values()
 
@@ -43,22 +43,4 @@ def list_tools(
             agent_tools.append(AVAILABLE_TOOLS[tool])
         all_tools = agent_tools
 
-    for tool in all_tools:
-        if tool.is_available and tool.auth_implementation is not None:
-            try:
-                tool_auth_service = tool.auth_implementation()
-
-                tool.is_auth_required = tool_auth_service.is_auth_required(
-                    session, user_id
-                )
-                tool.auth_url = tool_auth_service.get_auth_url(user_id)
-                tool.token = tool_auth_service.get_token(session, user_id)
-            except Exception as e:
-                logger.error(event=f"Error while fetching Tool Auth: {str(e)}")
-
-                tool.is_available = False
-                tool.error_message = (
-                    f"Error while calling Tool Auth implementation {str(e)}"
-                )
-
-    return all_tools
+    return get_tools_with_auth(session, all_tools, user_id)
@@ -18,6 +18,7 @@ class Context(BaseModel):
     receive: Optional[dict] = {}
     trace_id: str = "default"
     user_id: str = "default"
+    token_claims: Optional[dict] = None
     user: Optional[User] = None
     agent: Optional[Agent] = None
     agent_tool_metadata: Optional[AgentToolMetadata] = None
@@ -60,6 +61,10 @@ class Context(BaseModel):
     def with_user_id(self, user_id: str):
         self.user_id = user_id
 
+    def with_token_claims(self, token_claims: dict | None) -> "Context":
+        self.token_claims = token_claims
+        return self
+
     def with_deployment_name(self, deployment_name: str):
         self.deployment_name = deployment_name
 
@@ -167,6 +172,9 @@ class Context(BaseModel):
     def get_user_id(self):
         return self.user_id
 
+    def get_token_claims(self):
+        return self.token_claims
+
     def get_event_type(self):
         return self.event_type
 
@@ -60,3 +60,5 @@ class DeleteConversationResponse(BaseModel):
 class GenerateTitleResponse(BaseModel):
     title: str
     error: Optional[str] = None
+    # The title is generated in the background, poll the conversation for it
+    is_pending: bool = False
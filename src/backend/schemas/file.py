@@ -22,6 +22,11 @@ class File(BaseModel):
         from_attributes = True
 
 
+class UpdateFileRequest(BaseModel):
+    file_generated_name: Optional[str] = None
+    file_summary: Optional[str] = None
+
+
 class ConversationFilePublic(BaseModel):
     id: str
     user_id: str = Field(default="")
@@ -23,6 +23,7 @@ class Message(MessageBase):
 
     position: int
     is_active: bool
+    is_interrupted: bool = False
 
     documents: List[Document]
     citations: List[Citation]
@@ -0,0 +1,445 @@
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Optional
+from uuid import uuid4
+
+from fastapi import Depends, Header, HTTPException
+
+from backend.config.settings import AdmissionSettings, Settings
+from backend.schemas.context import Context
+from backend.services.cache import get_client
+from backend.services.context import get_context
+from backend.services.logger.utils import LoggerFactory
+from backend.services.metrics import CHAT_ADMISSION_WAIT, CHAT_ADMISSIONS
+
+logger = LoggerFactory().get_logger()
+
+SCOPES = ("user", "organization", "deployment")
+# Full token buckets are dropped once there are more than this many
+MAX_BUCKETS = 10_000
+# How often turns waiting for a slot retry when limits are tracked in Redis
+POLL_SECONDS = 0.1
+
+
+class AdmissionTicket:
+    """In-flight slots held by an admitted chat turn"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self.controller = controller
+        self.id = str(uuid4())
+        self.slots: list[str] = []
+        self.is_held = False
+
+    async def release(self) -> None:
+        slots, self.slots = self.slots, []
+        for key in slots:
+            try:
+                await self.controller.release_slot(key, self.id)
+            except Exception as e:
+                # The slot's lease expires eventually
+                logger.warning(
+                    event="[Admission] Error releasing in-flight slot",
+                    key=key,
+                    error=str(e),
+                )
+
+    def hold(self, stream: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+        """
+        Holds the slots until a chat turn's stream ends.
+
+        Args:
+            stream (AsyncGenerator[Any, None]): The turn's stream.
+
+        Returns:
+            AsyncGenerator[Any, None]: The stream, releasing the slots when it ends.
+        """
+        self.is_held = True
+        return self._release_after(stream)
+
+    async def _release_after(
+        self, stream: AsyncGenerator[Any, None]
+    ) -> AsyncGenerator[Any, None]:
+        try:
+            async with aclosing(stream):
+                async for event in stream:
+                    yield event
+        finally:
+            await self.release()
+
+
+class AdmissionController(ABC):
+    """
+    Admits chat turns within the token bucket rate limits and max in-flight limits of
+    their user, organization and deployment.
+
+    A turn over a limit waits for up to max_wait_seconds, with at most max_queued turns
+    waiting per key, and is rejected with a 429 and Retry-After otherwise.
+    """
+
+    def __init__(self, settings: AdmissionSettings):
+        self.settings = settings
+
+    def get_limits(self, ctx: Context) -> list[tuple[str, int | None, int | None]]:
+        """
+        Returns the limits that apply to a request.
+
+        Args:
+            ctx (Context): Context of the request.
+
+        Returns:
+            list[tuple[str, int | None, int | None]]: Key, max in-flight turns and
+                requests per minute of each limited scope.
+        """
+        keys = {
+            "user": ctx.get_user_id(),
+            "organization": ctx.organization_id,
+            "deployment": ctx.get_deployment_name(),
+        }
+
+        limits = []
+        for scope in SCOPES:
+            max_in_flight = getattr(self.settings, f"{scope}_max_in_flight")
+            requests_per_minute = getattr(self.settings, f"{scope}_requests_per_minute")
+            if keys[scope] and (max_in_flight or requests_per_minute):
+                key = f"{scope}:{keys[scope]}"
+                limits.append((key, max_in_flight, requests_per_minute))
+        return limits
+
+    async def admit(self, ctx: Context) -> AdmissionTicket:
+        """
+        Admits a chat turn, waiting for rate limit tokens and in-flight slots if needed.
+
+        Args:
+            ctx (Context): Context of the request.
+
+        Returns:
+            AdmissionTicket: The in-flight slots of the turn, to release when it ends.
+
+        Raises:
+            HTTPException: 429 if the turn can't be admitted within max_wait_seconds.
+        """
+        ticket = AdmissionTicket(self)
+        limits = self.get_limits(ctx)
+        if not limits:
+            return ticket
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        deadline = started_at + self.settings.max_wait_seconds
+        try:
+            for key, max_in_flight, requests_per_minute in limits:
+                if requests_per_minute:
+                    await self._wait_for_token(key, requests_per_minute, deadline)
+                if max_in_flight:
+                    await self._wait_for_slot(key, max_in_flight, ticket, deadline)
+        except BaseException:
+            await ticket.release()
+            raise
+
+        CHAT_ADMISSIONS.inc(status="admitted")
+        CHAT_ADMISSION_WAIT.observe(loop.time() - started_at)
+        return ticket
+
+    async def _wait_for_token(
+        self, key: str, requests_per_minute: int, deadline: float
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        rate = requests_per_minute / 60
+        burst = max(1.0, rate * self.settings.burst_seconds)
+        while (wait := await self.take_token(key, rate, burst)) > 0:
+            if loop.time() + wait > deadline:
+                self._reject("rate_limited", key, wait)
+            await asyncio.sleep(wait)
+
+    async def _wait_for_slot(
+        self, key: str, max_in_flight: int, ticket: AdmissionTicket, deadline: float
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        if not await self.acquire_slot(key, max_in_flight, ticket.id):
+            if not await self.enter_queue(key):
+                self._reject("queue_full", key, self.settings.max_wait_seconds)
+
+            try:
+                while not await self.acquire_slot(key, max_in_flight, ticket.id):
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        self._reject("timed_out", key, self.settings.max_wait_seconds)
+                    await self.wait_for_release(key, remaining)
+            finally:
+                await self.leave_queue(key)
+
+        ticket.slots.append(key)
+
+    def _reject(self, status: str, key: str, retry_after: float) -> None:
+        CHAT_ADMISSIONS.inc(status=status)
+        scope = key.split(":", 1)[0]
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many chat requests for this {scope}, please retry later.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    @abstractmethod
+    async def take_token(self, key: str, rate: float, burst: float) -> float:
+        """Takes a token from the key's bucket, returns how long until one is available if it's empty"""
+
+    @abstractmethod
+    async def acquire_slot(self, key: str, max_in_flight: int, ticket_id: str) -> bool: ...
+
+    @abstractmethod
+    async def release_slot(self, key: str, ticket_id: str) -> None: ...
+
+    @abstractmethod
+    async def enter_queue(self, key: str) -> bool:
+        """Counts a turn waiting for the key's slots, returns False if the queue is full"""
+
+    @abstractmethod
+    async def leave_queue(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def wait_for_release(self, key: str, timeout: float) -> None: ...
+
+
+class InMemoryAdmissionController(AdmissionController):
+    """Limits in this process, each worker enforces them separately"""
+
+    def __init__(self, settings: AdmissionSettings):
+        super().__init__(settings)
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._slots: dict[str, dict[str, float]] = {}
+        self._queued: dict[str, int] = {}
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+
+    async def take_token(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        if key not in self._buckets and len(self._buckets) >= MAX_BUCKETS:
+            self._remove_full_buckets(now)
+        self._buckets[key] = (tokens, now)
+        return wait
+
+    async def acquire_slot(self, key: str, max_in_flight: int, ticket_id: str) -> bool:
+        now = time.monotonic()
+        slots = self._slots.setdefault(key, {})
+        for expired in [id for id, expires_at in slots.items() if expires_at <= now]:
+            del slots[expired]
+
+        if len(slots) >= max_in_flight:
+            return False
+        slots[ticket_id] = now + self.settings.max_turn_seconds
+        return True
+
+    async def release_slot(self, key: str, ticket_id: str) -> None:
+        slots = self._slots.get(key, {})
+        slots.pop(ticket_id, None)
+        if not slots:
+            self._slots.pop(key, None)
+
+        for waiter in self._waiters.get(key, []):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def enter_queue(self, key: str) -> bool:
+        queued = self._queued.get(key, 0)
+        if queued >= self.settings.max_queued:
+            return False
+        self._queued[key] = queued + 1
+        return True
+
+    async def leave_queue(self, key: str) -> None:
+        self._queued[key] -= 1
+        if not self._queued[key]:
+            del self._queued[key]
+
+    async def wait_for_release(self, key: str, timeout: float) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(key, [])
+        waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiters[key]
+
+    def _remove_full_buckets(self, now: float) -> None:
+        # Buckets refill completely in burst_seconds
+        refilled_at = now - self.settings.burst_seconds
+        for key in [
+            key
+            for key, (_, updated_at) in self._buckets.items()
+            if updated_at <= refilled_at
+        ]:
+            del self._buckets[key]
+
+
+class RedisAdmissionController(AdmissionController):
+    """Limits in Redis, enforced across workers and nodes"""
+
+    KEY_PREFIX = "admission"
+
+    # Returns the seconds until a token is available, 0 if one was taken
+    TAKE_TOKEN_SCRIPT = """
+        local rate = tonumber(ARGV[1])
+        local burst = tonumber(ARGV[2])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+        local tokens = tonumber(bucket[1]) or burst
+        local updated_at = tonumber(bucket[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            wait = (1 - tokens) / rate
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return tostring(wait)
+    """
+    # Slots are a sorted set of ticket IDs scored by lease expiry
+    ACQUIRE_SLOT_SCRIPT = """
+        local max_in_flight = tonumber(ARGV[1])
+        local lease = tonumber(ARGV[3])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+        if redis.call('ZCARD', KEYS[1]) >= max_in_flight then
+            return 0
+        end
+        redis.call('ZADD', KEYS[1], now + lease, ARGV[2])
+        redis.call('EXPIRE', KEYS[1], math.ceil(lease) + 1)
+        return 1
+    """
+    ENTER_QUEUE_SCRIPT = """
+        local queued = redis.call('INCR', KEYS[1])
+        redis.call('EXPIRE', KEYS[1], ARGV[2])
+        if queued > tonumber(ARGV[1]) then
+            redis.call('DECR', KEYS[1])
+            return 0
+        end
+        return 1
+    """
+
+    async def take_token(self, key: str, rate: float, burst: float) -> float:
+        wait = await asyncio.to_thread(
+            self._run_script,
+            self.TAKE_TOKEN_SCRIPT,
+            self._key("tokens", key),
+            rate,
+            burst,
+        )
+        return float(wait)
+
+    async def acquire_slot(self, key: str, max_in_flight: int, ticket_id: str) -> bool:
+        acquired = await asyncio.to_thread(
+            self._run_script,
+            self.ACQUIRE_SLOT_SCRIPT,
+            self._key("slots", key),
+            max_in_flight,
+            ticket_id,
+            self.settings.max_turn_seconds,
+        )
+        return bool(acquired)
+
+    async def release_slot(self, key: str, ticket_id: str) -> None:
+        await asyncio.to_thread(get_client().zrem, self._key("slots", key), ticket_id)
+
+    async def enter_queue(self, key: str) -> bool:
+        entered = await asyncio.to_thread(
+            self._run_script,
+            self.ENTER_QUEUE_SCRIPT,
+            self._key("queued", key),
+            self.settings.max_queued,
+            # Counts of crashed workers reset once nobody has waited for a while
+            math.ceil(self.settings.max_wait_seconds) * 2,
+        )
+        return bool(entered)
+
+    async def leave_queue(self, key: str) -> None:
+        await asyncio.to_thread(get_client().decr, self._key("queued", key))
+
+    async def wait_for_release(self, key: str, timeout: float) -> None:
+        await asyncio.sleep(min(POLL_SECONDS, timeout))
+
+    def _run_script(self, script: str, key: str, *args: Any) -> Any:
+        return get_client().eval(script, 1, key, *args)
+
+    def _key(self, kind: str, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{kind}:{key}"
+
+
+@lru_cache(maxsize=1)
+def get_admission_controller() -> AdmissionController:
+    """
+    Returns the configured admission controller.
+    """
+    settings = Settings().admission
+    if settings.backend == "redis":
+        return RedisAdmissionController(settings)
+    if settings.backend != "memory":
+        logger.warning(
+            event=f"[Admission] Unknown admission backend {settings.backend}, using memory"
+        )
+    return InMemoryAdmissionController(settings)
+
+
+async def admit_chat_turn(
+    ctx: Context = Depends(get_context),
+) -> AsyncGenerator[AdmissionTicket, None]:
+    """
+    Dependency admitting the request's chat turn, or rejecting it with a 429.
+
+    Streaming endpoints hand the ticket to the turn's stream, which holds the slots
+    until the turn ends. Otherwise, they're released when the endpoint returns.
+
+    Args:
+        ctx (Context): Context object.
+
+    Yields:
+        AdmissionTicket: The turn's in-flight slots.
+    """
+    ticket = await get_admission_controller().admit(ctx)
+    try:
+        yield ticket
+    finally:
+        if not ticket.is_held:
+            await ticket.release()
+
+
+async def admit_chat_stream_turn(
+    ctx: Context = Depends(get_context),
+    last_event_id: Optional[str] = Header(default=None),
+) -> AsyncGenerator[Optional[AdmissionTicket], None]:
+    """
+    Dependency admitting the chat stream's turn like admit_chat_turn, unless the request
+    resumes a running turn with the Last-Event-ID header, which doesn't start a turn.
+
+    Args:
+        ctx (Context): Context object.
+        last_event_id (Optional[str]): ID of the last event received before reconnecting.
+
+    Yields:
+        Optional[AdmissionTicket]: The turn's in-flight slots, or None when resuming.
+    """
+    if last_event_id:
+        yield None
+        return
+
+    async with aclosing(admit_chat_turn(ctx)) as admission:
+        yield await anext(admission)
@@ -8,8 +8,9 @@ from starlette import status
 
 from backend.config import Settings
 from backend.config.settings import SCIMAuth
-from backend.database_models import Blacklist, get_session
-from backend.services.auth.jwt import JWTService
+from backend.database_models import get_session
+from backend.schemas.context import Context
+from backend.services.auth.token_cache import decode_jwt_cached, is_token_blacklisted
 
 
 def validate_authorization(
@@ -50,19 +51,19 @@ def validate_authorization(
             detail="Authorization: Bearer <token> required in request headers.",
         )
 
-    decoded = JWTService().decode_jwt(token)
+    # ContextMiddleware already decoded the token onto the request's context
+    ctx = request.scope.get("context")
+    decoded = ctx.get_token_claims() if isinstance(ctx, Context) else None
+    if decoded is None:
+        decoded = decode_jwt_cached(token)
 
     if not decoded or "context" not in decoded:
         raise HTTPException(
             status_code=401, detail="Bearer token is invalid or expired."
         )
 
-    blacklist = (
-        session.query(Blacklist).filter(Blacklist.token_id == decoded["jti"]).first()
-    )
-
     # Token was blacklisted
-    if blacklist is not None:
+    if is_token_blacklisted(session, decoded["jti"]):
         raise HTTPException(status_code=401, detail="Bearer token is blacklisted.")
 
     return decoded
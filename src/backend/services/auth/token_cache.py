@@ -0,0 +1,156 @@
+import hashlib
+import time
+
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from backend.config.settings import Settings
+from backend.crud import blacklist as blacklist_crud
+from backend.database_models import Blacklist
+from backend.services.auth.jwt import JWTService
+from backend.services.cache import TTLCache, cache_get, cache_put
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+# Verified tokens are trusted for this long before their signature is checked again
+VERIFIED_TOKEN_TTL_SECONDS = 60
+# Tokens not blacklisted are cached in Redis for this long, logouts overwrite them
+BLACKLIST_STATUS_TTL_SECONDS = 30
+MAX_CACHED_TOKENS = 10_000
+BLACKLIST_CACHE_KEY_PREFIX = "auth:blacklist:"
+
+verified_tokens = TTLCache(VERIFIED_TOKEN_TTL_SECONDS, max_size=MAX_CACHED_TOKENS)
+blacklist_status = TTLCache(BLACKLIST_STATUS_TTL_SECONDS, max_size=MAX_CACHED_TOKENS)
+
+_redis_enabled = None
+
+
+def is_redis_blacklist_enabled() -> bool:
+    global _redis_enabled
+
+    if _redis_enabled is None:
+        _redis_enabled = bool(Settings().redis.url)
+
+    return _redis_enabled
+
+
+def get_token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def decode_jwt_cached(token: str) -> dict | None:
+    """
+    Decodes a JWT token, reusing the payload of a recently verified identical token.
+
+    Only valid payloads are cached, and never past the token's own expiry.
+
+    Args:
+        token (str): JWT token.
+
+    Returns:
+        dict | None: Decoded JWT token payload, None if the token is invalid or expired.
+    """
+    token_hash = get_token_hash(token)
+    decoded = verified_tokens.get(token_hash)
+    if decoded is not None:
+        return decoded
+
+    decoded = JWTService().decode_jwt(token)
+    if not decoded:
+        return decoded
+
+    ttl = VERIFIED_TOKEN_TTL_SECONDS
+    expires_at = decoded.get("exp")
+    if isinstance(expires_at, (int, float)):
+        ttl = min(ttl, expires_at - time.time())
+
+    verified_tokens.put(token_hash, decoded, ttl_seconds=ttl)
+    return decoded
+
+
+def is_token_blacklisted(session: Session, token_id: str) -> bool:
+    """
+    Checks whether a token ID was blacklisted, only querying the database on cache misses.
+
+    With Redis configured the status is shared by all workers. Otherwise only blacklisted
+    tokens are cached per process, since a logout on another worker couldn't invalidate
+    a cached "not blacklisted" status.
+
+    Args:
+        session (Session): Database session.
+        token_id (str): Token ID (the jti claim).
+
+    Returns:
+        bool: Whether the token is blacklisted.
+    """
+    if is_redis_blacklist_enabled():
+        try:
+            status = cache_get(f"{BLACKLIST_CACHE_KEY_PREFIX}{token_id}")
+            if status is not None:
+                return status == "1"
+        except RedisError as e:
+            logger.warning(
+                event="[Auth] Error reading blacklist cache, falling back to database",
+                error=str(e),
+            )
+    else:
+        if blacklist_status.get(token_id):
+            return True
+
+    blacklisted = blacklist_crud.get_blacklist(session, token_id) is not None
+    _remember_blacklist_status(token_id, blacklisted)
+
+    return blacklisted
+
+
+def blacklist_token(session: Session, token: dict) -> Blacklist:
+    """
+    Blacklists a decoded token and records it in the blacklist cache.
+
+    Cached payloads of the token don't need to be dropped, since every request
+    checks the blacklist status after decoding.
+
+    Args:
+        session (Session): Database session.
+        token (dict): Decoded JWT token payload.
+
+    Returns:
+        Blacklist: Created blacklist.
+    """
+    token_id = token["jti"]
+    blacklist = blacklist_crud.create_blacklist(session, Blacklist(token_id=token_id))
+
+    ttl = None
+    expires_at = token.get("exp")
+    if isinstance(expires_at, (int, float)):
+        ttl = max(int(expires_at - time.time()), 1)
+    _remember_blacklist_status(token_id, True, ttl)
+
+    return blacklist
+
+
+def clear_token_caches() -> None:
+    verified_tokens.clear()
+    blacklist_status.clear()
+
+
+def _remember_blacklist_status(
+    token_id: str, blacklisted: bool, ttl_seconds: int | None = None
+) -> None:
+    if not is_redis_blacklist_enabled():
+        if blacklisted:
+            blacklist_status.put(token_id, True, ttl_seconds=ttl_seconds)
+        return
+
+    try:
+        cache_put(
+            f"{BLACKLIST_CACHE_KEY_PREFIX}{token_id}",
+            "1" if blacklisted else "0",
+            ttl_seconds=ttl_seconds if blacklisted else BLACKLIST_STATUS_TTL_SECONDS,
+        )
+    except RedisError as e:
+        logger.warning(
+            event="[Auth] Error writing blacklist cache",
+            error=str(e),
+        )
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from backend.database_models.base import CustomFilterQuery
+from backend.schemas.tool import ManagedTool
+from backend.services.cache import TTLCache
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+# A tool authorized or revoked on another worker is seen after at most this delay
+TOOL_AUTH_TTL_SECONDS = 30
+MAX_CACHED_TOOL_AUTHS = 10_000
+MAX_TOOL_AUTH_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class ToolAuthStatus:
+    is_auth_required: bool
+    auth_url: str | None
+    token: str | None
+
+
+tool_auth_statuses = TTLCache(TOOL_AUTH_TTL_SECONDS, max_size=MAX_CACHED_TOOL_AUTHS)
+
+
+def get_tools_with_auth(
+    session: Session, tools: Iterable[ManagedTool], user_id: str
+) -> list[ManagedTool]:
+    """
+    Gets the tools with the user's auth status set on copies of the tools that need auth.
+
+    Statuses not cached yet are computed concurrently, as they may refresh OAuth tokens.
+
+    Args:
+        session (Session): Database session.
+        tools (Iterable[ManagedTool]): Tools.
+        user_id (str): User ID.
+
+    Returns:
+        list[ManagedTool]: Tools, in the same order.
+    """
+    tools = list(tools)
+    auth_tools = [
+        tool
+        for tool in tools
+        if tool.is_available and tool.auth_implementation is not None
+    ]
+    statuses = {
+        tool.name: tool_auth_statuses.get((tool.name, user_id)) for tool in auth_tools
+    }
+    uncached = [tool for tool in auth_tools if statuses[tool.name] is None]
+
+    if len(uncached) == 1:
+        # A single tool is checked on the request's session
+        statuses[uncached[0].name] = _get_tool_auth_status(session, uncached[0], user_id)
+    elif uncached:
+        with ThreadPoolExecutor(
+            max_workers=min(len(uncached), MAX_TOOL_AUTH_WORKERS)
+        ) as executor:
+            results = executor.map(
+                lambda tool: _get_tool_auth_status_in_session(tool, user_id), uncached
+            )
+            statuses.update(zip((tool.name for tool in uncached), results))
+
+    result = []
+    for tool in tools:
+        if tool.name not in statuses:
+            result.append(tool)
+            continue
+
+        # The tools are shared by all requests, only copies hold a user's status
+        tool = tool.model_copy()
+        status = statuses[tool.name]
+        if isinstance(status, ToolAuthStatus):
+            tool.is_auth_required = status.is_auth_required
+            tool.auth_url = status.auth_url
+            tool.token = status.token
+        else:
+            tool.is_available = False
+            tool.error_message = f"Error while calling Tool Auth implementation {status}"
+        result.append(tool)
+
+    return result
+
+
+def invalidate_tool_auth(tool_id: str, user_id: str) -> None:
+    tool_auth_statuses.delete((tool_id, user_id))
+
+
+def clear_tool_auth_statuses() -> None:
+    tool_auth_statuses.clear()
+
+
+def _get_tool_auth_status_in_session(
+    tool: ManagedTool, user_id: str
+) -> ToolAuthStatus | str:
+    # Imported here, the engine is created from the settings on import
+    from backend.database_models.database import engine
+
+    # Sessions aren't thread safe, so each tool gets its own
+    with Session(engine, query_cls=CustomFilterQuery) as session:
+        return _get_tool_auth_status(session, tool, user_id)
+
+
+def _get_tool_auth_status(
+    session: Session, tool: ManagedTool, user_id: str
+) -> ToolAuthStatus | str:
+    try:
+        tool_auth_service = tool.auth_implementation()
+        status = ToolAuthStatus(
+            is_auth_required=tool_auth_service.is_auth_required(session, user_id),
+            auth_url=tool_auth_service.get_auth_url(user_id),
+            token=tool_auth_service.get_token(session, user_id),
+        )
+    except Exception as e:
+        logger.error(event=f"Error while fetching Tool Auth: {str(e)}")
+        # Errors aren't cached, so the next request tries again
+        return str(e)
+
+    tool_auth_statuses.put((tool.name, user_id), status)
+    return status
@@ -70,15 +70,10 @@ def get_header_user_id(request: Request) -> str:
     Returns:
         str: User ID
     """
-    # Import here to avoid circular imports
-    from backend.services.auth.jwt import JWTService
-
     # Check if Auth enabled
     if is_authentication_enabled():
         # Validation already performed, so just retrieve value
-        authorization = request.headers.get("Authorization")
-        _, token = authorization.split(" ")
-        decoded = JWTService().decode_jwt(token)
+        decoded = get_header_token_claims(request)
 
         return decoded["context"]["id"]
     # Auth disabled
@@ -87,6 +82,28 @@ def get_header_user_id(request: Request) -> str:
         return user_id
 
 
+def get_header_token_claims(request: Request) -> dict | None:
+    """
+    Decodes the bearer token from the Authorization header.
+
+    Recently verified tokens are served from a short-lived cache, so decoding the same
+    token again later in the request does not verify the signature again.
+
+    Args:
+        request (Request): current Request
+
+    Returns:
+        dict | None: Decoded JWT token payload, None if the token is invalid or expired.
+    """
+    # Import here to avoid circular imports
+    from backend.services.auth.token_cache import decode_jwt_cached
+
+    authorization = request.headers.get("Authorization")
+    _, token = authorization.split(" ")
+
+    return decode_jwt_cached(token)
+
+
 def has_header_user_id(request: Request) -> bool:
     """
     Check whether we can get the user_id from the request headers.
@@ -0,0 +1,263 @@
+"""
+Runs slow follow-up work of requests, like generating titles, after they've returned.
+
+Jobs are queued in the background_jobs table, so they survive restarts and any web
+worker can run them. Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED,
+retry failed ones with exponential backoff and rate limit them per deployment.
+"""
+
+import asyncio
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.orm import Session
+
+import backend.crud.background_job as background_job_crud
+from backend.config.settings import BackgroundJobSettings, Settings
+from backend.database_models.background_job import BackgroundJob, BackgroundJobStatus
+from backend.database_models.base import CustomFilterQuery
+from backend.schemas.context import Context
+from backend.services.admission import get_admission_controller
+from backend.services.context import dump_context, load_context
+from backend.services.logger.utils import LoggerFactory
+from backend.services.metrics import BACKGROUND_JOBS
+
+logger = LoggerFactory().get_logger()
+
+BackgroundJobHandler = Callable[[Session, dict[str, Any], Context], Awaitable[None]]
+
+HANDLERS: dict[str, BackgroundJobHandler] = {}
+
+
+def background_job_handler(
+    kind: str,
+) -> Callable[[BackgroundJobHandler], BackgroundJobHandler]:
+    """
+    Registers the handler running a kind of job.
+
+    Handlers get a database session, the job's payload and the context of the request
+    that submitted it. Exceptions they raise are retried.
+
+    Args:
+        kind (str): Kind of job.
+
+    Returns:
+        Callable[[BackgroundJobHandler], BackgroundJobHandler]: Decorator registering the handler.
+    """
+
+    def register(handler: BackgroundJobHandler) -> BackgroundJobHandler:
+        HANDLERS[kind] = handler
+        return handler
+
+    return register
+
+
+async def submit_background_job(
+    session: Session, kind: str, key: str, payload: dict[str, Any], ctx: Context
+) -> BackgroundJob:
+    """
+    Queues a job for the workers, or runs it right away if jobs run inline.
+
+    Args:
+        session (Session): Database session.
+        kind (str): Kind of job.
+        key (str): Key of the job, it isn't queued again while a job with it is unfinished.
+        payload (dict[str, Any]): JSON serializable arguments of the job's handler.
+        ctx (Context): Context of the request submitting the job.
+
+    Returns:
+        BackgroundJob: The job, or the unfinished job with the same key.
+    """
+    settings = Settings().background_jobs
+    job = background_job_crud.get_unfinished_background_job(session, key)
+    if job is not None:
+        return job
+
+    is_inline = settings.workers <= 0
+    job = background_job_crud.create_background_job(
+        session,
+        BackgroundJob(
+            kind=kind,
+            key=key,
+            payload=payload,
+            context=dump_context(ctx),
+            deployment_name=ctx.get_deployment_name(),
+            # Inline jobs are claimed by the request, and get a single attempt
+            status=BackgroundJobStatus.RUNNING if is_inline else BackgroundJobStatus.PENDING,
+            attempts=1 if is_inline else 0,
+        ),
+    )
+    BACKGROUND_JOBS.inc(kind=kind, status="submitted")
+
+    if is_inline:
+        await run_background_job(session, job, max_attempts=1)
+    else:
+        get_background_job_workers().notify()
+
+    return job
+
+
+async def run_next_background_job(session: Session) -> bool:
+    """
+    Claims and runs the next due job.
+
+    Args:
+        session (Session): Database session.
+
+    Returns:
+        bool: Whether a job was claimed.
+    """
+    settings = Settings().background_jobs
+    job = background_job_crud.claim_background_job(session, settings.lease_seconds)
+    if job is None:
+        return False
+
+    wait = await take_deployment_token(job, settings)
+    if wait > 0:
+        background_job_crud.reschedule_background_job(
+            session, job, wait, count_attempt=False
+        )
+        BACKGROUND_JOBS.inc(kind=job.kind, status="deferred")
+        return True
+
+    await run_background_job(session, job, settings.max_attempts)
+    return True
+
+
+async def take_deployment_token(job: BackgroundJob, settings: BackgroundJobSettings) -> float:
+    """
+    Takes a rate limit token of the job's deployment.
+
+    Args:
+        job (BackgroundJob): Claimed job.
+        settings (BackgroundJobSettings): Background job settings.
+
+    Returns:
+        float: Seconds until a token is available if there's none, 0 if one was taken.
+    """
+    if not job.deployment_name or not settings.deployment_requests_per_minute:
+        return 0.0
+
+    rate = settings.deployment_requests_per_minute / 60
+    burst = max(1.0, rate * Settings().admission.burst_seconds)
+    return await get_admission_controller().take_token(
+        f"background_jobs:{job.deployment_name}", rate, burst
+    )
+
+
+async def run_background_job(
+    session: Session, job: BackgroundJob, max_attempts: int
+) -> None:
+    """
+    Runs a claimed job, and records whether it succeeded or when it's retried.
+
+    Args:
+        session (Session): Database session.
+        job (BackgroundJob): Claimed job.
+        max_attempts (int): Attempts after which a failing job isn't retried.
+    """
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler for background jobs of kind {job.kind}")
+        await handler(session, job.payload, load_context(job.context))
+    except Exception as e:
+        if handler is None or job.attempts >= max_attempts:
+            background_job_crud.finish_background_job(
+                session, job, BackgroundJobStatus.FAILED, str(e)
+            )
+            BACKGROUND_JOBS.inc(kind=job.kind, status="failed")
+            logger.error(
+                event="[Background Jobs] Job failed",
+                kind=job.kind,
+                key=job.key,
+                attempts=job.attempts,
+                error=str(e),
+            )
+            return
+
+        delay = Settings().background_jobs.retry_seconds * 2 ** (job.attempts - 1)
+        background_job_crud.reschedule_background_job(session, job, delay, str(e))
+        BACKGROUND_JOBS.inc(kind=job.kind, status="retried")
+        logger.warning(
+            event="[Background Jobs] Job failed, retrying",
+            kind=job.kind,
+            key=job.key,
+            attempts=job.attempts,
+            delay=delay,
+            error=str(e),
+        )
+        return
+
+    background_job_crud.finish_background_job(session, job, BackgroundJobStatus.SUCCEEDED)
+    BACKGROUND_JOBS.inc(kind=job.kind, status="succeeded")
+
+
+class BackgroundJobWorkers:
+    """
+    Tasks running queued jobs in the web worker's event loop.
+
+    Jobs submitted in this worker wake them up, jobs of other workers and retries are
+    picked up by polling.
+    """
+
+    def __init__(self, settings: BackgroundJobSettings):
+        self.settings = settings
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+
+    def start(self) -> None:
+        if self._tasks or self.settings.workers <= 0:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work()) for _ in range(self.settings.workers)
+        ]
+
+    async def shutdown(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self) -> None:
+        # Imported here, the engine is created from the settings on import
+        from backend.database_models.database import engine
+
+        while True:
+            try:
+                with Session(engine, query_cls=CustomFilterQuery) as session:
+                    claimed = await run_next_background_job(session)
+            except Exception as e:
+                logger.error(
+                    event="[Background Jobs] Error running background jobs", error=str(e)
+                )
+                claimed = False
+
+            if not claimed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), self.settings.poll_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+
+@lru_cache(maxsize=1)
+def get_background_job_workers() -> BackgroundJobWorkers:
+    return BackgroundJobWorkers(Settings().background_jobs)
+
+
+def start_background_job_workers() -> None:
+    get_background_job_workers().start()
+
+
+async def shutdown_background_job_workers() -> None:
+    await get_background_job_workers().shutdown()
+    get_background_job_workers.cache_clear()
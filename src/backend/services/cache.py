@@ -1,4 +1,8 @@
-from typing import Any
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Hashable
 
 from redis import Redis
 
@@ -8,6 +12,12 @@ from backend.services.logger.utils import LoggerFactory
 logger = LoggerFactory().get_logger()
 
 
+@lru_cache(maxsize=None)
+def _get_client_for_url(redis_url: str) -> Redis:
+    # Clients own a connection pool, so reuse one per URL instead of reconnecting on every call
+    return Redis.from_url(redis_url, decode_responses=True)
+
+
 def get_client() -> Redis:
     redis_url = Settings().redis.url
 
@@ -16,18 +26,18 @@ def get_client() -> Redis:
         logger.error(event=error)
         raise ValueError(error)
 
-    client = Redis.from_url(redis_url, decode_responses=True)
-
-    return client
+    return _get_client_for_url(redis_url)
 
 
-def cache_put(key: str, value: Any) -> None:
+def cache_put(key: str, value: Any, ttl_seconds: int | None = None) -> None:
     client = get_client()
 
     if isinstance(value, dict):
         client.hmset(key, value)
+        if ttl_seconds:
+            client.expire(key, ttl_seconds)
     else:
-        client.set(key, value)
+        client.set(key, value, ex=ttl_seconds)
 
 
 def cache_get(key: str) -> Any:
@@ -46,3 +56,71 @@ def cache_del(key: str) -> None:
     client = get_client()
 
     client.delete(key)
+
+
+class TTLCache:
+    """
+    Thread-safe, process-local cache whose entries expire after a time-to-live.
+
+    The least recently used entry is evicted once max_size is reached.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value from the cache.
+
+        Args:
+            key (Hashable): Cache key.
+            default (Any): Value returned if the key is missing or expired.
+
+        Returns:
+            Any: Cached value or default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: float | None = None) -> None:
+        """
+        Put a value in the cache.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value to cache.
+            ttl_seconds (float): Optional TTL overriding the cache default.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
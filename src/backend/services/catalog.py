@@ -0,0 +1,222 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from backend.config.settings import Settings
+from backend.database_models import Agent, AgentDeploymentModel, Deployment, Model
+from backend.services.cache import get_client
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+INVALIDATION_CHANNEL = "catalog:invalidate"
+# Bounds how stale a worker gets if it misses an invalidation, e.g. without Redis
+MAX_AGE_SECONDS = 60
+CATALOG_CHANGED = "catalog_changed"
+
+# Deleting models or agents cascades to the agents' deployments
+CATALOG_MODELS = (Deployment, Model, AgentDeploymentModel)
+
+
+@dataclass(frozen=True)
+class CatalogDeployment:
+    id: str
+    name: str
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    deployments_by_name: dict[str, CatalogDeployment]
+    agent_deployments: dict[str, list[CatalogDeployment]]
+    loaded_at: float
+
+
+class DeploymentCatalog:
+    """
+    Process-local snapshot of the deployments and the agents' deployments.
+
+    The snapshot is loaded on first use and dropped when one of them is written, so chat
+    requests look them up in memory instead of querying the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: CatalogSnapshot | None = None
+        self._version = 0
+
+    def get_deployment_by_name(
+        self, session: Session, name: str
+    ) -> CatalogDeployment | None:
+        """
+        Gets a deployment from the catalog.
+
+        Args:
+            session (Session): Database session, used if the catalog has to be loaded.
+            name (str): Deployment name.
+
+        Returns:
+            CatalogDeployment | None: Deployment, None if it isn't in the database.
+        """
+        return self.get_snapshot(session).deployments_by_name.get(name)
+
+    def get_agent_deployments(
+        self, session: Session, agent_id: str
+    ) -> list[CatalogDeployment]:
+        """
+        Gets the deployments assigned to an agent.
+
+        Args:
+            session (Session): Database session, used if the catalog has to be loaded.
+            agent_id (str): Agent ID.
+
+        Returns:
+            list[CatalogDeployment]: Deployments of the agent.
+        """
+        return self.get_snapshot(session).agent_deployments.get(agent_id, [])
+
+    def get_snapshot(self, session: Session) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot and time.monotonic() - snapshot.loaded_at < MAX_AGE_SECONDS:
+            return snapshot
+
+        version = self._version
+        snapshot = self._load(session)
+        with self._lock:
+            # Don't keep a snapshot that may predate a write committed while loading it
+            if version == self._version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def _load(self, session: Session) -> CatalogSnapshot:
+        deployments = {
+            deployment_id: CatalogDeployment(id=deployment_id, name=name)
+            for deployment_id, name in session.query(Deployment.id, Deployment.name)
+        }
+
+        agent_deployments: dict[str, list[CatalogDeployment]] = {}
+        for agent_id, deployment_id in session.query(
+            AgentDeploymentModel.agent_id, AgentDeploymentModel.deployment_id
+        ):
+            if deployment_id in deployments:
+                agent_deployments.setdefault(agent_id, []).append(
+                    deployments[deployment_id]
+                )
+
+        return CatalogSnapshot(
+            deployments_by_name={
+                deployment.name: deployment for deployment in deployments.values()
+            },
+            agent_deployments=agent_deployments,
+            loaded_at=time.monotonic(),
+        )
+
+
+_catalog = DeploymentCatalog()
+_listener: threading.Thread | None = None
+_pubsub = None
+
+
+def get_catalog() -> DeploymentCatalog:
+    return _catalog
+
+
+def invalidate_catalog() -> None:
+    """
+    Drops the catalog of this worker, and tells the other workers to do the same if
+    Redis is configured.
+    """
+    _catalog.invalidate()
+
+    if not Settings().redis.url:
+        return
+
+    try:
+        get_client().publish(INVALIDATION_CHANNEL, "1")
+    except Exception as e:
+        logger.warning(
+            event="[Catalog] Failed to publish the catalog invalidation",
+            error=str(e),
+        )
+
+
+def start_catalog_listener() -> None:
+    """
+    Drops the catalog whenever another worker invalidates it, if Redis is configured.
+    """
+    global _listener, _pubsub
+
+    if _listener or not Settings().redis.url:
+        return
+
+    try:
+        _pubsub = get_client().pubsub(ignore_subscribe_messages=True)
+        _pubsub.subscribe(INVALIDATION_CHANNEL)
+    except Exception as e:
+        logger.warning(
+            event="[Catalog] Failed to subscribe to catalog invalidations",
+            error=str(e),
+        )
+        _pubsub = None
+        return
+
+    _listener = threading.Thread(
+        target=_listen, args=(_pubsub,), name="catalog-listener", daemon=True
+    )
+    _listener.start()
+
+
+def stop_catalog_listener() -> None:
+    global _listener, _pubsub
+
+    if _pubsub:
+        _pubsub.close()
+    _listener = None
+    _pubsub = None
+
+
+def _listen(pubsub) -> None:
+    try:
+        for _ in pubsub.listen():
+            _catalog.invalidate()
+    except Exception as e:
+        # Closing the subscription on shutdown also ends up here
+        logger.debug(event="[Catalog] Stopped listening for invalidations", error=str(e))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_changes(session: Session, flush_context) -> None:
+    changed = [*session.new, *session.dirty, *session.deleted]
+    if any(isinstance(instance, CATALOG_MODELS) for instance in changed) or any(
+        isinstance(instance, Agent) for instance in session.deleted
+    ):
+        session.info[CATALOG_CHANGED] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_catalog_changes(state: ORMExecuteState) -> None:
+    if not (state.is_delete or state.is_update):
+        return
+
+    if any(
+        mapper.class_ in (*CATALOG_MODELS, Agent) for mapper in state.all_mappers
+    ):
+        state.session.info[CATALOG_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(CATALOG_CHANGED, False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_changes(session: Session) -> None:
+    session.info.pop(CATALOG_CHANGED, None)
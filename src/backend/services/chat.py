@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Any, AsyncGenerator, Dict, Generator, List, Union
 from uuid import uuid4
@@ -49,10 +50,17 @@ from backend.schemas.conversation import UpdateConversationRequest
 from backend.schemas.search_query import SearchQuery
 from backend.schemas.tool import Tool, ToolCall, ToolCallDelta
 from backend.services.agent import validate_agent_exists
+from backend.services.logger.utils import LoggerFactory
+from backend.services.metrics import track_chat_stream
+from backend.services.tracing import span, traced
 import re
+
+logger = LoggerFactory().get_logger()
+
 LOOKBACKS = [3, 5, 7]
 DEATHLOOP_SIMILARITY_THRESHOLDS = [0.5, 0.7, 0.9]
 
+@traced("chat.process_chat")
 def process_chat(
     session: DBSessionDep,
     chat_request: BaseChatRequest,
@@ -503,6 +511,7 @@ def create_chat_history(
     ]
 
 
+@traced("chat.persist_turn")
 def update_conversation_after_turn(
     session: DBSessionDep,
     response_message: Message,
@@ -527,6 +536,14 @@ def update_conversation_after_turn(
 
     message_crud.create_message(session, response_message)
 
+    # A regeneration replaces indexed messages, otherwise only the new turn is indexed
+    conversation_crud.index_conversation_messages(
+        session,
+        conversation_id,
+        user_id,
+        position=None if previous_response_message_ids else response_message.position,
+    )
+
     # Update conversation description with final message
     conversation = conversation_crud.get_conversation(session, conversation_id, user_id)
     new_conversation = UpdateConversationRequest(
@@ -536,6 +553,47 @@ def update_conversation_after_turn(
     conversation_crud.update_conversation(session, conversation, new_conversation)
 
 
+def save_interrupted_turn(
+    session: DBSessionDep,
+    response_message: Message,
+    conversation_id: str,
+    stream_end_data: dict[str, Any],
+    user_id: str,
+    previous_response_message_ids: list[str] | None = None,
+) -> None:
+    """
+    Saves the partial response of a turn the client disconnected from, marked as interrupted.
+
+    Args:
+        session (DBSessionDep): Database session.
+        response_message (Message): Response message object.
+        conversation_id (str): Conversation ID.
+        stream_end_data (dict[str, Any]): Data streamed so far.
+        user_id (str): The user ID.
+        previous_response_message_ids (list[str]): Previous response message IDs.
+    """
+    response_message.text = stream_end_data["text"]
+    response_message.citations = stream_end_data["citations"]
+    response_message.is_interrupted = True
+
+    try:
+        update_conversation_after_turn(
+            session,
+            response_message,
+            conversation_id,
+            stream_end_data["text"],
+            user_id,
+            previous_response_message_ids,
+        )
+    except Exception as e:
+        session.rollback()
+        logger.warning(
+            event="[Chat] Error saving interrupted turn",
+            conversation_id=conversation_id,
+            error=str(e),
+        )
+
+
 def save_tool_calls_message(
     session: DBSessionDep,
     tool_calls: List[ToolCall],
@@ -643,6 +701,32 @@ async def generate_chat_stream(
     should_store: bool = True,
     ctx: Context = Context(),
     **kwargs: Any,
+) -> AsyncGenerator[Any, Any]:
+    """
+    Generate chat stream from model deployment stream, timed as the chat.stream span.
+
+    See _generate_chat_stream for the arguments.
+    """
+    # The model deployment stream runs in this generator, so its spans are nested in this one
+    with track_chat_stream(), span("chat.stream", trace_id=ctx.get_trace_id()):
+        stream = _generate_chat_stream(
+            session, model_deployment_stream, response_message, should_store, ctx, **kwargs
+        )
+        try:
+            async for event in stream:
+                yield event
+        finally:
+            # Lets the stream save the partial turn if the client disconnected
+            await stream.aclose()
+
+
+async def _generate_chat_stream(
+    session: DBSessionDep,
+    model_deployment_stream: AsyncGenerator[Any, Any],
+    response_message: Message,
+    should_store: bool = True,
+    ctx: Context = Context(),
+    **kwargs: Any,
 ) -> AsyncGenerator[Any, Any]:
     """
     Generate chat stream from model deployment stream.
@@ -680,43 +764,70 @@ async def generate_chat_stream(
     document_ids_to_document = {}
 
     stream_event = None
-    async for event in model_deployment_stream:
-        (
-            stream_event,
-            stream_end_data,
-            response_message,
-            document_ids_to_document,
-        ) = handle_stream_event(
-            event,
-            conversation_id,
-            stream_end_data,
-            response_message,
-            ctx,
-            document_ids_to_document,
-            session=session,
-            should_store=should_store,
-            user_id=user_id,
-            next_message_position=kwargs.get("next_message_position", 0),
-        )
+    try:
+        async for event in model_deployment_stream:
+            (
+                stream_event,
+                stream_end_data,
+                response_message,
+                document_ids_to_document,
+            ) = handle_stream_event(
+                event,
+                conversation_id,
+                stream_end_data,
+                response_message,
+                ctx,
+                document_ids_to_document,
+                session=session,
+                should_store=should_store,
+                user_id=user_id,
+                next_message_position=kwargs.get("next_message_position", 0),
+            )
 
-        yield json.dumps(
-            jsonable_encoder(
-                ChatResponseEvent(
-                    event=stream_event.event_type.value,
-                    data=stream_event,
+            yield json.dumps(
+                jsonable_encoder(
+                    ChatResponseEvent(
+                        event=stream_event.event_type.value,
+                        data=stream_event,
+                    )
                 )
             )
-        )
 
-    if should_store:
-        update_conversation_after_turn(
-            session,
-            response_message,
-            conversation_id,
-            stream_end_data["text"],
-            user_id,
-            kwargs.get("previous_response_message_ids")
-        )
+        if should_store:
+            update_conversation_after_turn(
+                session,
+                response_message,
+                conversation_id,
+                stream_end_data["text"],
+                user_id,
+                kwargs.get("previous_response_message_ids")
+            )
+    except (GeneratorExit, asyncio.CancelledError):
+        if should_store and response_message:
+            if isinstance(stream_event, StreamEnd):
+                # The turn completed before the client disconnected, save it as usual
+                update_conversation_after_turn(
+                    session,
+                    response_message,
+                    conversation_id,
+                    stream_end_data["text"],
+                    user_id,
+                    kwargs.get("previous_response_message_ids"),
+                )
+            else:
+                # The client disconnected, keep what was generated so far
+                save_interrupted_turn(
+                    session,
+                    response_message,
+                    conversation_id,
+                    stream_end_data,
+                    user_id,
+                    kwargs.get("previous_response_message_ids"),
+                )
+        raise
+    finally:
+        # Stops the upstream generation and tool calls if the turn didn't complete
+        await model_deployment_stream.aclose()
 
 
 def handle_stream_event(
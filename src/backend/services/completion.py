@@ -0,0 +1,47 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from backend.model_deployments.base import DEFAULT_COMPLETION_MAX_TOKENS
+from backend.schemas.context import Context
+from backend.services.catalog import get_catalog
+
+
+async def complete_prompt(
+    session: Session,
+    prompt: str,
+    ctx: Context,
+    agent_id: Optional[str] = None,
+    model: Optional[str] = None,
+    max_tokens: int = DEFAULT_COMPLETION_MAX_TOKENS,
+) -> str:
+    """
+    Completes a utility prompt, e.g. for a title, with the deployment of the agent.
+
+    Unlike CustomChat, there are no tools, chat history, file manifest or system message,
+    and nothing is stored.
+
+    Args:
+        session (Session): Database session.
+        prompt (str): Prompt.
+        ctx (Context): Context object.
+        agent_id (Optional[str]): Agent whose deployment is used, the context's if None.
+        model (Optional[str]): Model, the deployment's default if None.
+        max_tokens (int): Maximum number of generated tokens.
+
+    Returns:
+        str: Generated text.
+    """
+    # Imported here, the deployments import the file service
+    from backend.chat.custom.utils import get_deployment
+
+    deployment_name = ctx.get_deployment_name() or ""
+    if agent_id:
+        agent_deployments = get_catalog().get_agent_deployments(session, agent_id)
+        if agent_deployments:
+            deployment_name = agent_deployments[0].name
+
+    deployment = get_deployment(deployment_name, ctx)
+    return await deployment.complete(
+        prompt, ctx, model=model, max_tokens=max_tokens
+    )
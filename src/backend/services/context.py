@@ -1,10 +1,14 @@
 import contextvars
 import uuid
+from typing import Any
 
 from fastapi import Request
 from starlette.types import ASGIApp, Receive, Scope, Send
 
+from backend.schemas import Organization
+from backend.schemas.agent import Agent, AgentToolMetadata
 from backend.schemas.context import Context
+from backend.schemas.user import User
 
 GLOBAL_REQUEST_CONTEXT = contextvars.ContextVar("GLOBAL_REQUEST_CONTEXT", default=None)
 
@@ -15,8 +19,13 @@ class ContextMiddleware:
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
         # Import here to avoid circular imports
+        from backend.config.auth import is_authentication_enabled
         from backend.schemas.user import DEFAULT_USER_ID
-        from backend.services.auth.utils import get_header_user_id, has_header_user_id
+        from backend.services.auth.utils import (
+            get_header_token_claims,
+            get_header_user_id,
+            has_header_user_id,
+        )
 
         trace_id = str(uuid.uuid4())
 
@@ -34,7 +43,12 @@ class ContextMiddleware:
         request = Request(scope)
         context.with_deployment_name(request.headers.get("Deployment-Name", ""))
 
-        if has_header_user_id(request):
+        if has_header_user_id(request) and is_authentication_enabled():
+            # Decoded once here, validate_authorization reads the claims from the context
+            token_claims = get_header_token_claims(request)
+            context.with_token_claims(token_claims)
+            user_id = token_claims["context"]["id"]
+        elif has_header_user_id(request):
             user_id = get_header_user_id(request)
         else:
             user_id = DEFAULT_USER_ID
@@ -71,3 +85,56 @@ def get_context_from_scope(scope: Scope) -> Context:
 
 def get_context(request: Request) -> Context:
     return get_context_from_scope(request.scope)
+
+
+def dump_context(ctx: Context) -> dict[str, Any]:
+    """
+    Serializes a context, to continue its request's work in another task or process.
+
+    Args:
+        ctx (Context): Context object.
+
+    Returns:
+        dict[str, Any]: JSON serializable context, loaded back with load_context.
+    """
+    # The request, response and logger are bound to the web worker and aren't serializable
+    return ctx.model_dump(
+        mode="json", exclude={"request", "response", "receive", "logger"}
+    )
+
+
+def load_context(data: dict[str, Any]) -> Context:
+    """
+    Loads a context serialized with dump_context.
+
+    Args:
+        data (dict[str, Any]): Serialized context.
+
+    Returns:
+        Context: Context object, with a new logger.
+    """
+    ctx = Context()
+    ctx.with_trace_id(data["trace_id"])
+    ctx.with_user_id(data["user_id"])
+    ctx.with_token_claims(data["token_claims"])
+    ctx.with_deployment_name(data["deployment_name"])
+    ctx.with_deployment_config(data["deployment_config"] or {})
+    ctx.with_model(data["model"])
+    ctx.with_conversation_id(data["conversation_id"])
+    ctx.with_agent_id(data["agent_id"])
+    ctx.with_organization_id(data["organization_id"])
+    ctx.use_global_filtering = data["use_global_filtering"]
+
+    if data["user"]:
+        ctx.with_user(user=User.model_validate(data["user"]))
+    if data["agent"]:
+        ctx.with_agent(Agent.model_validate(data["agent"]))
+    if data["agent_tool_metadata"] is not None:
+        # Stored as a list, despite the field's annotation
+        ctx.with_agent_tool_metadata(
+            [AgentToolMetadata.model_validate(x) for x in data["agent_tool_metadata"]]
+        )
+    if data["organization"]:
+        ctx.with_organization(organization=Organization.model_validate(data["organization"]))
+    ctx.with_logger()
+    return ctx
@@ -1,21 +1,28 @@
-from typing import List, Optional
+from typing import Optional
 
 from fastapi import HTTPException
 
-from backend.chat.custom.custom import CustomChat
 from backend.crud import conversation as conversation_crud
 from backend.database_models import Message as MessageModel
+from backend.database_models.background_job import BackgroundJob
 from backend.database_models.conversation import Conversation as ConversationModel
 from backend.database_models.database import DBSessionDep
 from backend.schemas.chat import ChatRole
-from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
-from backend.schemas.conversation import Conversation
+from backend.schemas.conversation import Conversation, UpdateConversationRequest
 from backend.schemas.message import Message
-from backend.services.chat import generate_chat_response
+from backend.services.background_jobs import (
+    background_job_handler,
+    submit_background_job,
+)
+from backend.services.completion import complete_prompt
 from backend.services.file import attach_conversation_id_to_files, get_file_service
 
 DEFAULT_TITLE = "New Conversation"
+CONVERSATION_TITLE_JOB = "conversation_title"
+TITLE_MAX_TOKENS = 32
+# The start of the chatlog is enough to tell its topic
+TITLE_CHATLOG_CHARS = 8_000
 GENERATE_TITLE_PROMPT = """# TASK
 Given the following conversation history, write a short title that summarizes the topic of the conversation. Be concise and respond with just the title.
 
@@ -25,7 +32,6 @@ Given the following conversation history, write a short title that summarizes th
 
 # TITLE
 """
-SEARCH_RELEVANCE_THRESHOLD = 0.3
 
 
 def validate_conversation(
@@ -139,77 +145,6 @@ def get_messages_with_files(
     return messages_with_file
 
 
-def get_documents_to_rerank(conversations: List[Conversation]) -> List[str]:
-    """Get documents (strings) to rerank from a list of conversations
-
-    Args:
-        conversations (List[Conversation]): List of conversations
-
-    Returns:
-        List[str]: List of documents to rerank
-    """
-    rerank_documents = []
-    for conversation in conversations:
-        chatlog = extract_details_from_conversation(conversation)
-
-        document = f"Title: {conversation.title}\n"
-        if len(chatlog.strip()) != 0:
-            document += "\nChatlog:\n{chatlog}"
-
-        rerank_documents.append(document)
-
-    return rerank_documents
-
-
-async def filter_conversations(
-    query: str,
-    conversations: List[Conversation],
-    rerank_documents: List[str],
-    model_deployment,
-    ctx: Context,
-) -> List[Conversation]:
-    """Filter conversations based on the rerank score
-
-    Args:
-        query (str): The query to filter conversations
-        conversations (List[Conversation]): List of conversations
-        rerank_documents (List[str]): List of documents to rerank
-        model_deployment: Model deployment object
-        ctx (Context): Context object
-
-    Returns:
-        List[Conversation]: List of filtered conversations
-    """
-    # if rerank is not enabled, filter out conversations that don't contain the query
-    if not model_deployment.rerank_enabled:
-        filtered_conversations = []
-
-        for rerank_document, conversation in zip(rerank_documents, conversations):
-            if query.lower() in rerank_document.lower():
-                filtered_conversations.append(conversation)
-
-        return filtered_conversations
-
-    # Rerank documents
-    res = await model_deployment.invoke_rerank(
-        query=query,
-        documents=rerank_documents,
-        ctx=ctx,
-    )
-
-    # Sort conversations by rerank score
-    res["results"].sort(key=lambda x: x["relevance_score"], reverse=True)
-
-    # Filter out conversations with low relevance score
-    reranked_conversations = [
-        conversations[r["index"]]
-        for r in res["results"]
-        if r["relevance_score"] > SEARCH_RELEVANCE_THRESHOLD
-    ]
-
-    return reranked_conversations
-
-
 async def generate_conversation_title(
     session: DBSessionDep,
     conversation: ConversationModel,
@@ -232,36 +167,21 @@ async def generate_conversation_title(
         str: Generated title
         str: Error message
     """
-    user_id = ctx.get_user_id()
     logger = ctx.get_logger()
     title = ""
     error = None
 
     try:
         chatlog = extract_details_from_conversation(conversation)
-        prompt = GENERATE_TITLE_PROMPT % chatlog
-        chat_request = CohereChatRequest(
-            message=prompt,
-            model=model,
-        )
-
-        response = await generate_chat_response(
+        prompt = GENERATE_TITLE_PROMPT % chatlog[:TITLE_CHATLOG_CHARS]
+        title = await complete_prompt(
             session,
-            CustomChat().chat(
-                chat_request,
-                stream=False,
-                agent_id=agent_id,
-                ctx=ctx,
-            ),
-            response_message=None,
-            conversation_id=None,
-            user_id=user_id,
-            should_store=False,
-            ctx=ctx,
+            prompt,
+            ctx,
+            agent_id=agent_id,
+            model=model,
+            max_tokens=TITLE_MAX_TOKENS,
         )
-
-        title = response.text
-        error = response.error
     except Exception as e:
         title = DEFAULT_TITLE
         error = str(e)
@@ -270,3 +190,53 @@ async def generate_conversation_title(
         )
 
     return title, error
+
+
+async def submit_conversation_title(
+    session: DBSessionDep,
+    conversation: ConversationModel,
+    agent_id: str,
+    ctx: Context,
+    model: Optional[str] = None,
+) -> BackgroundJob:
+    """Submits a background job generating a conversation's title and storing it
+
+    Args:
+        session: Database session
+        conversation: Conversation object
+        agent_id: Agent ID
+        ctx: Context object
+        model: Model name
+
+    Returns:
+        BackgroundJob: The job, already finished if jobs run inline
+    """
+    return await submit_background_job(
+        session,
+        CONVERSATION_TITLE_JOB,
+        f"{CONVERSATION_TITLE_JOB}:{conversation.id}",
+        {"conversation_id": conversation.id, "agent_id": agent_id, "model": model},
+        ctx,
+    )
+
+
+@background_job_handler(CONVERSATION_TITLE_JOB)
+async def generate_conversation_title_job(
+    session: DBSessionDep, payload: dict, ctx: Context
+) -> None:
+    conversation = conversation_crud.get_conversation(
+        session, payload["conversation_id"], ctx.get_user_id()
+    )
+    if conversation is None:
+        # Deleted since the job was submitted
+        return
+
+    title, error = await generate_conversation_title(
+        session, conversation, payload["agent_id"], ctx, payload["model"]
+    )
+    if error:
+        raise ValueError(error)
+
+    conversation_crud.update_conversation(
+        session, conversation, UpdateConversationRequest(title=title)
+    )
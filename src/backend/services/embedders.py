@@ -0,0 +1,127 @@
+import hashlib
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+from openai import OpenAI
+
+from backend.config.settings import Settings
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+TOKEN_PATTERN = re.compile(r"\w+")
+OPENAI_BATCH_SIZE = 256
+
+
+class BaseEmbedder(ABC):
+    """
+    Embeds texts into unit vectors, so their dot products are cosine similarities.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Identifies the embedder and its vector space, vectors are only compared within one."""
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embeds texts.
+
+        Args:
+            texts (list[str]): Texts.
+
+        Returns:
+            np.ndarray: float32 array with one unit vector per text, zero for empty texts.
+        """
+
+
+class HashingEmbedder(BaseEmbedder):
+    """
+    Deterministic local embedder hashing words and word pairs into a fixed number of
+    dimensions, with signs from the hash so collisions cancel out on average.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    @property
+    def name(self) -> str:
+        return f"hashing:{self.dimensions}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            words = TOKEN_PATTERN.findall(text.lower())
+            features = Counter(words)
+            features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+            for feature, count in features.items():
+                index, sign = self._hash(feature)
+                # Sublinear term frequency, so repeated words don't dominate
+                vectors[i, index] += sign * (1 + math.log(count))
+
+        return normalize(vectors)
+
+    def _hash(self, feature: str) -> tuple[int, float]:
+        digest = int.from_bytes(
+            hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        return digest % self.dimensions, 1.0 if digest >> 63 else -1.0
+
+
+class OpenAIEmbedder(BaseEmbedder):
+    """
+    Embeds texts with the embeddings API of the OpenAI deployment.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.client = OpenAI(
+            api_key=Settings().deployments.openai.api_key,
+            base_url=Settings().deployments.openai.endpoint_url,
+        )
+
+    @property
+    def name(self) -> str:
+        return f"openai:{self.model}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        embeddings = []
+        for start in range(0, len(texts), OPENAI_BATCH_SIZE):
+            # The API rejects empty inputs
+            batch = [text or " " for text in texts[start : start + OPENAI_BATCH_SIZE]]
+            response = self.client.embeddings.create(model=self.model, input=batch)
+            embeddings.extend(item.embedding for item in response.data)
+
+        return normalize(np.array(embeddings, dtype=np.float32))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+@lru_cache(maxsize=None)
+def get_embedder() -> BaseEmbedder:
+    """
+    Gets the embedder configured for file search.
+
+    Returns:
+        BaseEmbedder: The embedder, the hashing embedder if the configured one is unknown.
+    """
+    settings = Settings().file_search
+
+    if settings.embedder == "openai":
+        return OpenAIEmbedder(settings.embedding_model)
+
+    if settings.embedder != "hashing":
+        logger.warning(
+            event="[File Search] Unknown embedder, using the hashing embedder",
+            embedder=settings.embedder,
+        )
+
+    return HashingEmbedder(settings.hashing_dimensions)
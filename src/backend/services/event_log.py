@@ -0,0 +1,273 @@
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import AsyncGenerator
+
+from backend.config.settings import Settings
+from backend.services.cache import get_client
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+# How often readers waiting for events renew their lease and check for the end of the log
+POLL_SECONDS = 1.0
+# Logs whose producer never closed them are dropped after this long
+MAX_LOG_SECONDS = 24 * 60 * 60
+
+
+class EventLogNotFoundError(Exception):
+    """The log doesn't exist or has expired"""
+
+
+class EventLogExpiredError(Exception):
+    """Events after the requested offset were evicted from the bounded log"""
+
+
+class EventLog:
+    """
+    Bounded, append-only logs of SSE events, one per chat turn, with IDs increasing from 1.
+
+    One producer appends to a log and closes it when the turn ends. Readers replay it
+    from an offset, then follow it until it's closed. Reading renews the log's lease,
+    which producers check to stop turns nobody is reading anymore.
+    """
+
+    def __init__(self, max_events: int, retention_seconds: float):
+        self.max_events = max_events
+        self.retention_seconds = retention_seconds
+
+    async def create(self, stream_id: str, user_id: str) -> None: ...
+
+    async def append(self, stream_id: str, data: str) -> int: ...
+
+    async def close(self, stream_id: str) -> None: ...
+
+    async def get_owner(self, stream_id: str) -> str | None:
+        """Returns the ID of the user the log belongs to, or None if it doesn't exist"""
+
+    async def get_seconds_since_read(self, stream_id: str) -> float: ...
+
+    def read(
+        self, stream_id: str, after_id: int = 0
+    ) -> AsyncGenerator[tuple[int, str], None]:
+        """
+        Replays the events after after_id, then follows the log until it's closed.
+
+        Args:
+            stream_id (str): Log ID.
+            after_id (int): ID of the last event the reader received, 0 for all events.
+
+        Yields:
+            tuple[int, str]: Event ID and data.
+
+        Raises:
+            EventLogNotFoundError: If the log doesn't exist.
+            EventLogExpiredError: If events after after_id were evicted.
+        """
+
+
+class _Log:
+    def __init__(self, user_id: str, max_events: int):
+        self.user_id = user_id
+        self.events: deque[tuple[int, str]] = deque(maxlen=max_events)
+        self.last_id = 0
+        self.closed = False
+        self.expires_at = time.monotonic() + MAX_LOG_SECONDS
+        self.read_at = time.monotonic()
+        self.changed = asyncio.Condition()
+
+
+class InMemoryEventLog(EventLog):
+    """Event logs in this process, turns can only be resumed on the worker that runs them"""
+
+    def __init__(self, max_events: int, retention_seconds: float):
+        super().__init__(max_events, retention_seconds)
+        self._logs: dict[str, _Log] = {}
+
+    async def create(self, stream_id: str, user_id: str) -> None:
+        self._remove_expired()
+        self._logs[stream_id] = _Log(user_id, self.max_events)
+
+    async def append(self, stream_id: str, data: str) -> int:
+        log = self._get(stream_id)
+        log.last_id += 1
+        log.events.append((log.last_id, data))
+        async with log.changed:
+            log.changed.notify_all()
+        return log.last_id
+
+    async def close(self, stream_id: str) -> None:
+        log = self._get(stream_id)
+        log.closed = True
+        log.expires_at = time.monotonic() + self.retention_seconds
+        async with log.changed:
+            log.changed.notify_all()
+
+    async def get_owner(self, stream_id: str) -> str | None:
+        log = self._logs.get(stream_id)
+        if log is None or log.expires_at <= time.monotonic():
+            return None
+        return log.user_id
+
+    async def get_seconds_since_read(self, stream_id: str) -> float:
+        return time.monotonic() - self._get(stream_id).read_at
+
+    async def read(
+        self, stream_id: str, after_id: int = 0
+    ) -> AsyncGenerator[tuple[int, str], None]:
+        log = self._get(stream_id)
+
+        while True:
+            log.read_at = time.monotonic()
+            if log.events and log.events[0][0] > after_id + 1:
+                raise EventLogExpiredError(stream_id)
+
+            for event_id, data in [event for event in log.events if event[0] > after_id]:
+                yield event_id, data
+                after_id = event_id
+                log.read_at = time.monotonic()
+
+            async with log.changed:
+                if after_id < log.last_id:
+                    continue
+                if log.closed:
+                    return
+                log.read_at = time.monotonic()
+                try:
+                    await asyncio.wait_for(log.changed.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _get(self, stream_id: str) -> _Log:
+        log = self._logs.get(stream_id)
+        if log is None:
+            raise EventLogNotFoundError(stream_id)
+        return log
+
+    def _remove_expired(self) -> None:
+        now = time.monotonic()
+        for stream_id in [id for id, log in self._logs.items() if log.expires_at <= now]:
+            del self._logs[stream_id]
+
+
+class RedisEventLog(EventLog):
+    """
+    Event logs in Redis streams, so turns can be resumed on any worker.
+
+    Event IDs are stored as Redis stream IDs "0-<event ID>".
+    """
+
+    KEY_PREFIX = "chat_stream"
+
+    async def create(self, stream_id: str, user_id: str) -> None:
+        def create() -> None:
+            with get_client().pipeline() as pipeline:
+                pipeline.hset(
+                    self._meta_key(stream_id),
+                    mapping={"user_id": user_id, "last_id": 0, "read_at": time.time()},
+                )
+                pipeline.expire(self._meta_key(stream_id), MAX_LOG_SECONDS)
+                pipeline.execute()
+
+        await asyncio.to_thread(create)
+
+    async def append(self, stream_id: str, data: str) -> int:
+        def append() -> int:
+            client = get_client()
+            event_id = client.hincrby(self._meta_key(stream_id), "last_id", 1)
+            client.xadd(
+                self._key(stream_id),
+                {"data": data},
+                id=f"0-{event_id}",
+                maxlen=self.max_events,
+                approximate=False,
+            )
+            if event_id == 1:
+                client.expire(self._key(stream_id), MAX_LOG_SECONDS)
+            return event_id
+
+        return await asyncio.to_thread(append)
+
+    async def close(self, stream_id: str) -> None:
+        def close() -> None:
+            with get_client().pipeline() as pipeline:
+                pipeline.hset(self._meta_key(stream_id), "closed", 1)
+                pipeline.expire(self._meta_key(stream_id), self.retention_seconds)
+                pipeline.expire(self._key(stream_id), self.retention_seconds)
+                pipeline.execute()
+
+        await asyncio.to_thread(close)
+
+    async def get_owner(self, stream_id: str) -> str | None:
+        return await asyncio.to_thread(
+            get_client().hget, self._meta_key(stream_id), "user_id"
+        )
+
+    async def get_seconds_since_read(self, stream_id: str) -> float:
+        read_at = await asyncio.to_thread(
+            get_client().hget, self._meta_key(stream_id), "read_at"
+        )
+        if read_at is None:
+            raise EventLogNotFoundError(stream_id)
+        return time.time() - float(read_at)
+
+    async def read(
+        self, stream_id: str, after_id: int = 0
+    ) -> AsyncGenerator[tuple[int, str], None]:
+        key = self._key(stream_id)
+        meta_key = self._meta_key(stream_id)
+
+        def poll(after_id: int) -> tuple[dict, list, list]:
+            client = get_client()
+            client.hset(meta_key, "read_at", time.time())
+            meta = client.hgetall(meta_key)
+            first = client.xrange(key, count=1)
+            entries = client.xread({key: f"0-{after_id}"}, count=100, block=None)
+            if not entries and not meta.get("closed"):
+                entries = client.xread(
+                    {key: f"0-{after_id}"}, count=100, block=int(POLL_SECONDS * 1000)
+                )
+            return meta, first, entries[0][1] if entries else []
+
+        while True:
+            meta, first, entries = await asyncio.to_thread(poll, after_id)
+            if not meta:
+                raise EventLogNotFoundError(stream_id)
+            if first and _parse_redis_id(first[0][0]) > after_id + 1:
+                raise EventLogExpiredError(stream_id)
+
+            for redis_id, fields in entries:
+                after_id = _parse_redis_id(redis_id)
+                yield after_id, fields["data"]
+
+            if not entries and meta.get("closed") and after_id >= int(meta["last_id"]):
+                return
+
+    def _key(self, stream_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{stream_id}"
+
+    def _meta_key(self, stream_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{stream_id}:meta"
+
+
+def _parse_redis_id(redis_id: str) -> int:
+    return int(redis_id.split("-")[1])
+
+
+@lru_cache(maxsize=1)
+def get_event_log() -> EventLog | None:
+    """
+    Returns the configured event log, or None if resuming chat streams is disabled.
+    """
+    settings = Settings().chat_stream
+    if settings is None or settings.event_log in (None, "", "none"):
+        return None
+
+    if settings.event_log == "redis":
+        return RedisEventLog(settings.max_events, settings.retention_seconds)
+    if settings.event_log != "memory":
+        logger.warning(
+            event=f"[Event Log] Unknown event log {settings.event_log}, using memory"
+        )
+    return InMemoryEventLog(settings.max_events, settings.retention_seconds)
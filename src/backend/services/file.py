@@ -1,13 +1,14 @@
+import asyncio
+import csv
 import io
 import re
 import os
 
-from typing import Optional
-import pandas as pd
+from typing import Any, BinaryIO, Iterable, Optional
 from docx import Document
 from fastapi import Depends, HTTPException
 from fastapi import UploadFile as FastAPIUploadFile
-from python_calamine.pandas import pandas_monkeypatch
+from python_calamine import CalamineWorkbook
 
 
 
@@ -19,14 +20,18 @@ from backend.database_models.conversation import ConversationFileAssociation
 from backend.database_models.database import DBSessionDep, get_session
 from backend.database_models.file import File as FileModel
 from backend.database_models.folder import Folder
-from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
-from backend.schemas.file import ConversationFilePublic, File
+from backend.schemas.file import ConversationFilePublic, File, UpdateFileRequest
 from backend.services import utils
 from backend.services.agent import validate_agent_exists
+from backend.services.background_jobs import (
+    background_job_handler,
+    submit_background_job,
+)
+from backend.services.completion import complete_prompt
 from backend.services.context import get_context
+from backend.services.file_search import index_files_async
 from backend.services.logger.utils import LoggerFactory
-from backend.services.chat import generate_chat_response
 # from backend.services.conversation import (
 #     validate_conversation,
 # )
@@ -36,6 +41,14 @@ from backend.crud import agent as agent_crud
 
 MAX_FILE_SIZE = 20_000_000  # 20MB
 MAX_TOTAL_FILE_SIZE = 1_000_000_000  # 1GB
+PARQUET_BATCH_SIZE = 10_000  # Rows converted at a time
+
+FILE_NAME_JOB = "file_name"
+FILE_SUMMARY_JOB = "file_summary"
+FILE_NAME_MAX_TOKENS = 32
+FILE_SUMMARY_MAX_TOKENS = 256
+# Names and summaries are generated from the start of the file
+UTILITY_PROMPT_CONTENT_CHARS = 16_000
 
 PDF_EXTENSION = "pdf"
 TEXT_EXTENSION = "txt"
@@ -83,9 +96,6 @@ The File name is: {file_name}
 # SUMMARY
 """
 
-# Monkey patch Pandas to use Calamine for Excel reading because Calamine is faster than Pandas
-pandas_monkeypatch()
-
 file_service = None
 
 logger = LoggerFactory().get_logger()
@@ -560,6 +570,18 @@ async def insert_files_in_db(
     Returns:
         list[File]: The files that were created
     """
+    validate_file_sizes(files)
+
+    conversation = conversation_crud.get_conversation(session, conversation_id, user_id)
+    agent_id = conversation.agent_id if conversation and conversation.agent_id else None
+    agent = None
+    if agent_id:
+        agent = agent_crud.get_agent_by_id(session, agent_id, user_id)
+        agent_schema = Agent.model_validate(agent)
+        ctx.with_agent(agent_schema)
+        deployment = agent.deployments[0]
+        ctx.with_deployment_name(deployment.name)
+
     files_to_upload = []
     for file in files:
         content = await get_file_content(file)
@@ -570,46 +592,19 @@ async def insert_files_in_db(
             filename = file.filename
         
         filename = filename.encode("ascii", "ignore").decode("utf-8")
-        _, extension = os.path.splitext(filename)
         
         # I found that file name sometimes affect the accuracy of the model.
         
         # filename = sanitize_filename(filename)
         
-        conversation = conversation_crud.get_conversation(session, conversation_id, user_id)
-        print("Conversation O User: ", conversation)
-        try:
-            agent_id = conversation.agent_id if conversation and conversation.agent_id else None
-
-            if agent_id:
-                agent = agent_crud.get_agent_by_id(session, agent_id, user_id)
-                agent_schema = Agent.model_validate(agent)
-                ctx.with_agent(agent_schema)
-                deployment = agent.deployments[0]
-                ctx.with_deployment_name(deployment.name)
-                
-            print("Agent ID GEN FILE: ", agent_id)
-            print("Agent GEN FILE: ", agent)
-            print("MODEL GEN FILE: ", agent.model)
-        
-            generated_file_name, error = await generate_file_name(session, file_name=filename, folder_name=folder.name if folder else None, file_content=content, path=path, agent_id=agent_id, ctx=ctx, model=agent.model)
-            generated_summary, summary_error = await generate_file_summary(session, file_name=filename, folder_name=folder.name if folder else None, file_content=content, path=path, agent_id=agent_id, ctx=ctx, model=agent.model)
-        except Exception as e:
-            print("Error generating file name or summary: ", e)
-            generated_file_name = filename
-            generated_summary = ""
-            
-        file_generated_name = f"{generated_file_name}{extension}"
-        # file_generated_name = content[0:64].replace(" ", "").encode("ascii", "ignore").decode("utf-8") + f"{extension}"
-        file_generated_name = sanitize_filename(file_generated_name)
-        
         files_to_upload.append(
             FileModel(
                 file_name=filename,
-                file_generated_name=file_generated_name,
+                # Replaced by the generated name and summary once they're generated
+                file_generated_name=sanitize_filename(filename),
                 file_size=file.size,
                 file_content=cleaned_content,
-                file_summary=generated_summary,
+                file_summary="",
                 user_id=user_id,
                 folder_id=folder.id if folder else None,
                 path=path
@@ -617,9 +612,94 @@ async def insert_files_in_db(
         )
 
     uploaded_files = file_crud.batch_create_files(session, files_to_upload)
+
+    try:
+        await index_files_async(session, uploaded_files)
+    except Exception as e:
+        # Files without chunks are indexed when they're first searched
+        logger.warning(
+            event="[File Search] Failed to index uploaded files", error=str(e)
+        )
+
+    # Names and summaries are generated with the model of the conversation's agent
+    if agent is not None:
+        for uploaded_file in uploaded_files:
+            payload = {
+                "file_id": uploaded_file.id,
+                "folder_name": folder.name if folder else None,
+                "agent_id": agent_id,
+                "model": agent.model,
+            }
+            for kind in (FILE_NAME_JOB, FILE_SUMMARY_JOB):
+                await submit_background_job(
+                    session, kind, f"{kind}:{uploaded_file.id}", payload, ctx
+                )
+
     return uploaded_files
 
 
+@background_job_handler(FILE_NAME_JOB)
+async def generate_file_name_job(
+    session: DBSessionDep, payload: dict, ctx: Context
+) -> None:
+    file = file_crud.get_file(session, payload["file_id"], ctx.get_user_id())
+    if file is None:
+        # Deleted since the job was submitted
+        return
+
+    generated_file_name, error = await generate_file_name(
+        session,
+        file_name=file.file_name,
+        folder_name=payload["folder_name"],
+        file_content=file_crud.get_file_content_range(
+            session, file.id, 0, UTILITY_PROMPT_CONTENT_CHARS
+        ),
+        path=file.path,
+        agent_id=payload["agent_id"],
+        ctx=ctx,
+        model=payload["model"],
+    )
+    if error:
+        raise ValueError(error)
+
+    _, extension = os.path.splitext(file.file_name)
+    file_crud.update_file(
+        session,
+        file,
+        UpdateFileRequest(
+            file_generated_name=sanitize_filename(f"{generated_file_name}{extension}")
+        ),
+    )
+
+
+@background_job_handler(FILE_SUMMARY_JOB)
+async def generate_file_summary_job(
+    session: DBSessionDep, payload: dict, ctx: Context
+) -> None:
+    file = file_crud.get_file(session, payload["file_id"], ctx.get_user_id())
+    if file is None:
+        return
+
+    generated_summary, error = await generate_file_summary(
+        session,
+        file_name=file.file_name,
+        folder_name=payload["folder_name"],
+        file_content=file_crud.get_file_content_range(
+            session, file.id, 0, UTILITY_PROMPT_CONTENT_CHARS
+        ),
+        path=file.path,
+        agent_id=payload["agent_id"],
+        ctx=ctx,
+        model=payload["model"],
+    )
+    if error:
+        raise ValueError(error)
+
+    file_crud.update_file(
+        session, file, UpdateFileRequest(file_summary=generated_summary)
+    )
+
+
 def attach_conversation_id_to_files(
     conversation_id: str, files: list[FileModel]
 ) -> list[ConversationFilePublic]:
@@ -640,29 +720,29 @@ def attach_conversation_id_to_files(
 
 
 
-def read_excel(file_contents: bytes) -> str:
-    """Reads the text from an Excel file using Pandas
+def read_excel(file: BinaryIO) -> str:
+    """Reads the first sheet of an Excel file as CSV, row by row using Calamine
 
     Args:
-        file_contents (bytes): The file contents
+        file (BinaryIO): The file
 
     Returns:
-        str: The text extracted from the Excel
+        str: The CSV text of the sheet
     """
-    excel = pd.read_excel(io.BytesIO(file_contents), engine="calamine")
-    return excel.to_string()
+    sheet = CalamineWorkbook.from_filelike(file).get_sheet_by_index(0)
+    return rows_to_csv(sheet.iter_rows())
 
 
-def read_docx(file_contents: bytes) -> str:
+def read_docx(file: BinaryIO) -> str:
     """Reads the text from a DOCX file
 
     Args:
-        file_contents (bytes): The file contents
+        file (BinaryIO): The file
 
     Returns:
         str: The text extracted from the DOCX file, with each paragraph separated by a newline
     """
-    document = Document(io.BytesIO(file_contents))
+    document = Document(file)
     text = ""
 
     for paragraph in document.paragraphs:
@@ -671,18 +751,69 @@ def read_docx(file_contents: bytes) -> str:
     return text
 
 
-def read_parquet(file_contents: bytes) -> str:
-    """Reads the text from a Parquet file using Pandas
+def read_parquet(file: BinaryIO) -> str:
+    """Reads a Parquet file as CSV, in batches of rows using PyArrow
+
+    Args:
+        file (BinaryIO): The file
+
+    Returns:
+        str: The CSV text of the table
+    """
+    # Imported here, as PyArrow is only needed for Parquet files
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(file)
+
+    def iter_rows():
+        yield parquet.schema_arrow.names
+        for batch in parquet.iter_batches(batch_size=PARQUET_BATCH_SIZE):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    return rows_to_csv(iter_rows())
+
+
+def read_text(file: BinaryIO) -> str:
+    """Reads a UTF-8 text file
+
+    Args:
+        file (BinaryIO): The file
+
+    Returns:
+        str: The text
+    """
+    text_file = io.TextIOWrapper(file, encoding="utf-8")
+    try:
+        return text_file.read()
+    finally:
+        # Leaves the upload's file open, it's closed with the request
+        text_file.detach()
+
+
+def rows_to_csv(rows: Iterable[Iterable[Any]]) -> str:
+    """Writes table rows as compact CSV, without holding the whole table in memory
 
     Args:
-        file_contents (bytes): The file contents
+        rows (Iterable[Iterable[Any]]): The rows, starting with the header
 
     Returns:
-        str: The text extracted from the Parquet
+        str: The CSV text
     """
-    parquet = pd.read_parquet(io.BytesIO(file_contents), engine="pyarrow")
-    return parquet.to_string()
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    for row in rows:
+        writer.writerow(format_cell(value) for value in row)
 
+    return output.getvalue()
+
+
+def format_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    # Spreadsheets store all numbers as floats
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
 
 
 def get_file_extension(file_name: str) -> str:
@@ -697,9 +828,35 @@ def get_file_extension(file_name: str) -> str:
     return file_name.split(".")[-1].lower()
 
 
+def validate_file_sizes(files: list[FastAPIUploadFile]) -> None:
+    """Validates the sizes of uploaded files before they're read
+
+    Args:
+        files (list[FastAPIUploadFile]): The files
+
+    Raises:
+        HTTPException: If a file or all the files are too large
+    """
+    for file in files:
+        if file.size is not None and file.size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File {file.filename} is larger than the {MAX_FILE_SIZE // 1_000_000}MB limit.",
+            )
+
+    if sum(file.size or 0 for file in files) > MAX_TOTAL_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Files are larger than the {MAX_TOTAL_FILE_SIZE // 1_000_000}MB limit.",
+        )
+
+
 async def get_file_content(file: FastAPIUploadFile) -> str:
     """Reads the file contents based on the file extension
 
+    The upload is read from its spooled temporary file in a thread, without reading
+    it into memory first.
+
     Args:
         file (UploadFile): The file to read
 
@@ -709,15 +866,14 @@ async def get_file_content(file: FastAPIUploadFile) -> str:
     Raises:
         ValueError: If the file extension is not supported
     """
-    file_contents = await file.read()
     file_extension = get_file_extension(file.filename)
 
     if file_extension == PDF_EXTENSION:
-        return utils.read_pdf(file_contents)
+        reader = utils.read_pdf
     elif file_extension == DOCX_EXTENSION:
-        return read_docx(file_contents)
+        reader = read_docx
     elif file_extension == PARQUET_EXTENSION:
-        return read_parquet(file_contents)
+        reader = read_parquet
     elif file_extension in [
         TEXT_EXTENSION,
         MARKDOWN_EXTENSION,
@@ -725,11 +881,14 @@ async def get_file_content(file: FastAPIUploadFile) -> str:
         TSV_EXTENSION,
         JSON_EXTENSION,
     ]:
-        return file_contents.decode("utf-8")
+        reader = read_text
     elif file_extension in [EXCEL_EXTENSION, EXCEL_OLD_EXTENSION]:
-        return read_excel(file_contents)
+        reader = read_excel
+    else:
+        raise ValueError(f"File extension {file_extension} is not supported")
 
-    raise ValueError(f"File extension {file_extension} is not supported")
+    await file.seek(0)
+    return await asyncio.to_thread(reader, file.file)
 
 
 async def generate_file_name(
@@ -757,48 +916,27 @@ async def generate_file_name(
         str: Generated title
         str: Error message
     """
-    
-    from backend.chat.custom.custom import CustomChat
-    
-    user_id = ctx.get_user_id()
     logger = ctx.get_logger()
     generated_file_name = ""
     error = None
 
-    # try:
     folder_prompt_part = ""
     if path and folder_name:
         folder_prompt_part = FOLDER_INFO_PROMPT_PART.format(folder_name=folder_name, file_path=path)
     prompt = GENERATE_FILE_NAME_PROMPT.format(file_content=file_content, file_path=path, file_name=file_name, folder_prompt_part=folder_prompt_part)
     # prompt = GENERATE_FILE_NAME_PROMPT % file_content
-    chat_request = CohereChatRequest(
-        message=prompt,
-        model=model,
-    )
-
-    response = await generate_chat_response(
-        session,
-        CustomChat().chat(
-            chat_request,
-            stream=False,
+    try:
+        generated_file_name = await complete_prompt(
+            session,
+            prompt,
+            ctx,
             agent_id=agent_id,
-            ctx=ctx,
-        ),
-        response_message=None,
-        conversation_id=None,
-        user_id=user_id,
-        should_store=False,
-        ctx=ctx,
-    )
-    
-    generated_file_name = response.text
-    error = response.error
-    # except Exception as e:
-    #     generated_file_name = DEFAULT_TITLE
-    #     error = str(e)
-    #     logger.error(
-    #         event=f"[Conversation] Error generating file name: File, {e}",
-    #     )
+            model=model,
+            max_tokens=FILE_NAME_MAX_TOKENS,
+        )
+    except Exception as e:
+        error = str(e)
+        logger.error(event=f"[File] Error generating file name: {e}")
 
     return generated_file_name, error
 
@@ -828,9 +966,6 @@ async def generate_file_summary(
         str: Generated summary
         str: Error message
     """
-    from backend.chat.custom.custom import CustomChat
-    
-    user_id = ctx.get_user_id()
     logger = ctx.get_logger()
     generated_summary = ""
     error = None
@@ -846,27 +981,17 @@ async def generate_file_summary(
         folder_prompt_part=folder_prompt_part
     )
 
-    chat_request = CohereChatRequest(
-        message=prompt,
-        model=model,
-    )
-
-    response = await generate_chat_response(
-        session,
-        CustomChat().chat(
-            chat_request,
-            stream=False,
+    try:
+        generated_summary = await complete_prompt(
+            session,
+            prompt,
+            ctx,
             agent_id=agent_id,
-            ctx=ctx,
-        ),
-        response_message=None,
-        conversation_id=None,
-        user_id=user_id,
-        should_store=False,
-        ctx=ctx,
-    )
-    
-    generated_summary = response.text
-    error = response.error
+            model=model,
+            max_tokens=FILE_SUMMARY_MAX_TOKENS,
+        )
+    except Exception as e:
+        error = str(e)
+        logger.error(event=f"[File] Error generating file summary: {e}")
 
     return generated_summary, error
@@ -0,0 +1,194 @@
+import asyncio
+import re
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import backend.crud.file_chunk as file_chunk_crud
+from backend.database_models.file import File
+from backend.database_models.file_chunk import FileChunk
+from backend.services.embedders import BaseEmbedder, get_embedder
+
+WORD_PATTERN = re.compile(r"\S+")
+SOFT_WORD_CUT_OFF = 100
+HARD_WORD_CUT_OFF = 300
+# Unit vectors are stored as int8, components scaled to [-127, 127]
+QUANTIZATION_SCALE = 127
+
+
+@dataclass(frozen=True)
+class TextChunk:
+    text: str
+    start_offset: int
+    end_offset: int
+
+
+def chunk_with_offsets(content: str) -> list[TextChunk]:
+    """
+    Splits content into chunks of at most HARD_WORD_CUT_OFF words, ending a chunk early at
+    the first sentence end past SOFT_WORD_CUT_OFF words, like the reranker's chunks.
+
+    Args:
+        content (str): Content to chunk.
+
+    Returns:
+        list[TextChunk]: Chunks with their character offsets in the content.
+    """
+    chunks = []
+    words = []
+
+    def add_chunk():
+        start, end = words[0].start(), words[-1].end()
+        chunks.append(TextChunk(content[start:end], start, end))
+        words.clear()
+
+    for word in WORD_PATTERN.finditer(content):
+        if len(words) + 1 > HARD_WORD_CUT_OFF:
+            add_chunk()
+
+        words.append(word)
+
+        if len(words) > SOFT_WORD_CUT_OFF and word.group().endswith("."):
+            add_chunk()
+
+    if words:
+        add_chunk()
+
+    return chunks
+
+
+def quantize(vectors: np.ndarray) -> list[bytes]:
+    quantized = np.round(vectors * QUANTIZATION_SCALE).astype(np.int8)
+    return [row.tobytes() for row in quantized]
+
+
+def dequantize(embeddings: list[bytes]) -> np.ndarray:
+    matrix = np.frombuffer(b"".join(embeddings), dtype=np.int8)
+    return matrix.reshape(len(embeddings), -1).astype(np.float32)
+
+
+def build_file_chunks(
+    files: list[tuple[str, str]], embedder: BaseEmbedder
+) -> list[FileChunk]:
+    """
+    Chunks and embeds files, without touching the database so it can run in a thread.
+
+    Args:
+        files (list[tuple[str, str]]): IDs and contents of the files.
+        embedder (BaseEmbedder): Embedder.
+
+    Returns:
+        list[FileChunk]: Chunks of the files.
+    """
+    chunks = [
+        (file_id, position, chunk)
+        for file_id, content in files
+        for position, chunk in enumerate(chunk_with_offsets(content))
+    ]
+    if not chunks:
+        return []
+
+    embeddings = quantize(embedder.embed([chunk.text for _, _, chunk in chunks]))
+
+    return [
+        FileChunk(
+            file_id=file_id,
+            position=position,
+            start_offset=chunk.start_offset,
+            end_offset=chunk.end_offset,
+            text=chunk.text,
+            embedding=embedding,
+            embedder=embedder.name,
+        )
+        for (file_id, position, chunk), embedding in zip(chunks, embeddings)
+    ]
+
+
+def index_files(session: Session, files: list[File]) -> None:
+    """
+    Stores the chunks of files, replacing the ones they had.
+
+    Args:
+        session (Session): Database session.
+        files (list[File]): Files.
+    """
+    file_chunks = build_file_chunks(
+        [(file.id, file.file_content) for file in files], get_embedder()
+    )
+    file_chunk_crud.replace_file_chunks(
+        session, [file.id for file in files], file_chunks
+    )
+
+
+async def index_files_async(session: Session, files: list[File]) -> None:
+    """
+    Stores the chunks of files like index_files, embedding them in a thread.
+
+    Args:
+        session (Session): Database session.
+        files (list[File]): Files.
+    """
+    file_chunks = await asyncio.to_thread(
+        build_file_chunks,
+        [(file.id, file.file_content) for file in files],
+        get_embedder(),
+    )
+    file_chunk_crud.replace_file_chunks(
+        session, [file.id for file in files], file_chunks
+    )
+
+
+def search_files(
+    session: Session, files: list[File], query: str, top_k: int
+) -> list[tuple[FileChunk, float]]:
+    """
+    Finds the chunks of files most similar to a query.
+
+    Files without chunks from the current embedder, e.g. uploaded before chunks were
+    stored, are indexed first.
+
+    Args:
+        session (Session): Database session.
+        files (list[File]): Files to search.
+        query (str): Query.
+        top_k (int): Maximum number of chunks.
+
+    Returns:
+        list[tuple[FileChunk, float]]: Chunks and their cosine similarity, most similar first.
+    """
+    embedder = get_embedder()
+    file_ids = [file.id for file in files]
+
+    indexed_file_ids = file_chunk_crud.get_indexed_file_ids(
+        session, file_ids, embedder.name
+    )
+    unindexed_files = [file for file in files if file.id not in indexed_file_ids]
+    if unindexed_files:
+        index_files(session, unindexed_files)
+
+    chunk_embeddings = file_chunk_crud.get_file_chunk_embeddings(session, file_ids)
+    if not chunk_embeddings or top_k <= 0:
+        return []
+
+    chunk_ids = [chunk_id for chunk_id, _ in chunk_embeddings]
+    matrix = dequantize([embedding for _, embedding in chunk_embeddings])
+    query_vector = embedder.embed([query])[0]
+
+    # Quantized vectors aren't exactly unit length anymore
+    norms = np.linalg.norm(matrix, axis=1)
+    scores = np.divide(
+        matrix @ query_vector, norms, out=np.zeros_like(norms), where=norms > 0
+    )
+
+    k = min(top_k, len(chunk_ids))
+    top_indices = np.argpartition(-scores, k - 1)[:k]
+    top_indices = top_indices[np.argsort(-scores[top_indices])]
+
+    chunks = {
+        chunk.id: chunk
+        for chunk in file_chunk_crud.get_file_chunks_by_ids(
+            session, [chunk_ids[i] for i in top_indices]
+        )
+    }
+    return [(chunks[chunk_ids[i]], float(scores[i])) for i in top_indices]
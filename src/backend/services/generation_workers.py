@@ -0,0 +1,490 @@
+"""
+Runs streamed chat turns outside the web worker that accepted them.
+
+Turns are serialized as generation jobs and run by generation worker processes, so web
+workers only relay events and the two can be scaled independently. Run the Redis queue
+workers with `python -m backend.services.generation_workers`.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import threading
+from contextlib import aclosing
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Awaitable, Callable
+from uuid import uuid4
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from backend.chat.custom.custom import CustomChat
+from backend.config.settings import Settings
+from backend.database_models.base import CustomFilterQuery
+from backend.database_models.message import Message, MessageAgent
+from backend.schemas.cohere_chat import CohereChatRequest
+from backend.schemas.context import Context
+from backend.services.admission import AdmissionTicket
+from backend.services.cache import get_client
+from backend.services.chat import generate_chat_stream
+from backend.services.context import dump_context, load_context
+from backend.services.event_log import RedisEventLog, get_event_log
+from backend.services.logger.utils import LoggerFactory
+from backend.services.resumable_stream import (
+    follow_chat_events,
+    produce_chat_events,
+    stream_chat_events,
+)
+from backend.services.tracing import configure_tracing_from_settings
+
+logger = LoggerFactory().get_logger()
+
+# Redis list generation jobs are queued in
+JOBS_KEY = "chat_stream:jobs"
+# How long idle Redis queue workers block waiting for a job
+POLL_SECONDS = 1
+
+
+class GenerationJob(BaseModel):
+    """A streamed chat turn, processed by process_chat and serializable to run elsewhere"""
+
+    stream_id: str
+    chat_request: CohereChatRequest
+    response_message: dict[str, Any]
+    managed_tools: bool
+    should_store: bool = True
+    next_message_position: int = 0
+    previous_response_message_ids: list[str] | None = None
+    context: dict[str, Any]
+
+    @classmethod
+    def create(
+        cls,
+        chat_request: CohereChatRequest,
+        response_message: Message,
+        managed_tools: bool,
+        ctx: Context,
+        **kwargs: Any,
+    ) -> "GenerationJob":
+        return cls(
+            stream_id=str(uuid4()),
+            chat_request=chat_request,
+            response_message={
+                "id": response_message.id,
+                "user_id": response_message.user_id,
+                "conversation_id": response_message.conversation_id,
+                "text": response_message.text,
+                "position": response_message.position,
+                "agent": response_message.agent,
+                "tool_plan": response_message.tool_plan,
+            },
+            managed_tools=managed_tools,
+            context=dump_context(ctx),
+            **kwargs,
+        )
+
+    def get_user_id(self) -> str:
+        return self.context["user_id"]
+
+    def get_context(self) -> Context:
+        return load_context(self.context)
+
+    def get_response_message(self) -> Message:
+        # The response message isn't stored until the turn ends
+        return Message(
+            **{**self.response_message, "agent": MessageAgent(self.response_message["agent"])},
+            is_active=True,
+        )
+
+
+async def generate_job_chat_stream(job: GenerationJob) -> AsyncGenerator[str, None]:
+    """
+    Generates a job's chat turn, in its own database session.
+
+    Args:
+        job (GenerationJob): The job to run.
+
+    Yields:
+        str: Events of the turn, as serialized JSON.
+    """
+    # Imported here, so the engine is only created in processes that run turns
+    from backend.database_models.database import engine
+
+    ctx = job.get_context()
+    with Session(engine, query_cls=CustomFilterQuery) as session:
+        stream = generate_chat_stream(
+            session,
+            CustomChat().chat(
+                job.chat_request,
+                stream=True,
+                managed_tools=job.managed_tools,
+                session=session,
+                ctx=ctx,
+            ),
+            job.get_response_message(),
+            should_store=job.should_store,
+            next_message_position=job.next_message_position,
+            previous_response_message_ids=job.previous_response_message_ids,
+            ctx=ctx,
+        )
+        async with aclosing(stream):
+            async for data in stream:
+                yield data
+
+
+class GenerationWorkers:
+    """Runs generation jobs and streams their events to the web worker"""
+
+    def start(self) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+    def stream(
+        self, job: GenerationJob, admission: AdmissionTicket | None = None
+    ) -> AsyncGenerator[Any, None]: ...
+
+
+class LocalGenerationWorkers(GenerationWorkers):
+    """
+    A pool of local generation worker processes.
+
+    Jobs go to the pool through a shared queue, and the workers send the events back
+    through another one. The web worker appends them to its event log as if the turns
+    ran inline, so they can be resumed the same way. A closed stream cancels its turn.
+    """
+
+    def __init__(self, processes: int, max_turns: int):
+        # Forking would copy the web worker's event loop, threads and connections
+        context = multiprocessing.get_context("spawn")
+        self._jobs = context.Queue()
+        self._events = context.Queue()
+        self._controls = [context.Queue() for _ in range(processes)]
+        self._processes = [
+            context.Process(
+                target=serve_local_jobs,
+                args=(self._jobs, self._events, control, max_turns),
+                daemon=True,
+            )
+            for control in self._controls
+        ]
+        self._turns: dict[str, asyncio.Queue] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self) -> None:
+        if self._loop is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        for process in self._processes:
+            process.start()
+        threading.Thread(target=self._relay, daemon=True).start()
+
+    def shutdown(self) -> None:
+        if self._loop is None:
+            return
+
+        for _ in self._processes:
+            self._jobs.put(None)
+        for control in self._controls:
+            control.put(None)
+        self._events.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._loop = None
+
+    def stream(
+        self, job: GenerationJob, admission: AdmissionTicket | None = None
+    ) -> AsyncGenerator[Any, None]:
+        turn = self._run(job)
+        if admission is not None:
+            turn = admission.hold(turn)
+        return stream_chat_events(turn, job.get_user_id())
+
+    async def _run(self, job: GenerationJob) -> AsyncGenerator[str, None]:
+        self.start()
+        events: asyncio.Queue = asyncio.Queue()
+        self._turns[job.stream_id] = events
+        self._jobs.put(job.model_dump_json())
+
+        finished = False
+        try:
+            while (data := await events.get()) is not None:
+                yield data
+            finished = True
+        finally:
+            del self._turns[job.stream_id]
+            if not finished:
+                # Only the worker running the turn knows it, so tell all of them
+                for control in self._controls:
+                    control.put(job.stream_id)
+
+    def _relay(self) -> None:
+        while (event := self._events.get()) is not None:
+            self._loop.call_soon_threadsafe(self._deliver, *event)
+
+    def _deliver(self, stream_id: str, data: str | None) -> None:
+        events = self._turns.get(stream_id)
+        if events is not None:
+            events.put_nowait(data)
+
+
+class RedisGenerationWorkers(GenerationWorkers):
+    """
+    Generation workers on any node, consuming a Redis queue.
+
+    The workers append to the Redis event log, which any web worker can follow, and
+    stop turns nobody reads anymore through the log's lease.
+    """
+
+    def __init__(self, event_log: RedisEventLog):
+        self._event_log = event_log
+
+    def stream(
+        self, job: GenerationJob, admission: AdmissionTicket | None = None
+    ) -> AsyncGenerator[Any, None]:
+        events = self._enqueue_and_follow(job)
+        if admission is not None:
+            # The turn runs elsewhere, following it is the closest to its lifetime here
+            events = admission.hold(events)
+        return events
+
+    async def _enqueue_and_follow(self, job: GenerationJob) -> AsyncGenerator[Any, None]:
+        await self._event_log.create(job.stream_id, job.get_user_id())
+        await asyncio.to_thread(get_client().lpush, JOBS_KEY, job.model_dump_json())
+
+        async for event in follow_chat_events(self._event_log, job.stream_id):
+            yield event
+
+
+@lru_cache(maxsize=1)
+def get_generation_workers() -> GenerationWorkers | None:
+    """
+    Returns the configured generation workers, or None if turns run inline.
+    """
+    settings = Settings().chat_stream
+    if settings is None or settings.generation_workers in (None, "", "inline"):
+        return None
+
+    if settings.generation_workers == "local":
+        return LocalGenerationWorkers(
+            settings.worker_processes, settings.worker_max_turns
+        )
+    if settings.generation_workers == "redis":
+        event_log = get_event_log()
+        if isinstance(event_log, RedisEventLog):
+            return RedisGenerationWorkers(event_log)
+        logger.warning(
+            event="[Generation Workers] Redis generation workers need the redis event log, running turns inline"
+        )
+        return None
+
+    logger.warning(
+        event=f"[Generation Workers] Unknown generation workers {settings.generation_workers}, running turns inline"
+    )
+    return None
+
+
+def start_generation_workers() -> None:
+    """Starts the generation workers, so the first turns don't wait for them"""
+    workers = get_generation_workers()
+    if workers is not None:
+        workers.start()
+
+
+def shutdown_generation_workers() -> None:
+    workers = get_generation_workers()
+    if workers is not None:
+        workers.shutdown()
+    get_generation_workers.cache_clear()
+
+
+def stream_chat_turn(
+    session: Session,
+    chat_request: CohereChatRequest,
+    response_message: Message,
+    managed_tools: bool,
+    ctx: Context,
+    admission: AdmissionTicket | None = None,
+    **kwargs: Any,
+) -> AsyncGenerator[Any, None]:
+    """
+    Streams a processed chat turn, generated inline or by the generation workers.
+
+    Args:
+        session (Session): Database session, used when the turn runs inline.
+        chat_request (CohereChatRequest): Chat request, processed by process_chat.
+        response_message (Message): Response message object.
+        managed_tools (bool): Whether the request uses managed tools.
+        ctx (Context): Context object.
+        admission (AdmissionTicket): Admission of the turn, held until it ends.
+        **kwargs (Any): should_store, next_message_position and
+            previous_response_message_ids, as for generate_chat_stream.
+
+    Returns:
+        AsyncGenerator[Any, None]: The turn's SSE events.
+    """
+    workers = get_generation_workers()
+    if workers is None:
+        stream = generate_chat_stream(
+            session,
+            CustomChat().chat(
+                chat_request,
+                stream=True,
+                managed_tools=managed_tools,
+                session=session,
+                ctx=ctx,
+            ),
+            response_message,
+            ctx=ctx,
+            **kwargs,
+        )
+        if admission is not None:
+            stream = admission.hold(stream)
+        return stream_chat_events(stream, ctx.get_user_id())
+
+    return workers.stream(
+        GenerationJob.create(chat_request, response_message, managed_tools, ctx, **kwargs),
+        admission,
+    )
+
+
+def serve_local_jobs(
+    jobs: multiprocessing.Queue,
+    events: multiprocessing.Queue,
+    control: multiprocessing.Queue,
+    max_turns: int,
+) -> None:
+    """
+    Entry point of local generation worker processes.
+
+    Args:
+        jobs (multiprocessing.Queue): Serialized jobs, None to stop.
+        events (multiprocessing.Queue): (stream ID, data) events, with None data at the
+            end of each turn.
+        control (multiprocessing.Queue): IDs of turns to cancel, None to stop.
+        max_turns (int): Maximum number of turns to run concurrently.
+    """
+    asyncio.run(_serve_local_jobs(jobs, events, control, max_turns))
+
+
+async def _serve_local_jobs(
+    jobs: multiprocessing.Queue,
+    events: multiprocessing.Queue,
+    control: multiprocessing.Queue,
+    max_turns: int,
+) -> None:
+    configure_tracing_from_settings()
+    loop = asyncio.get_running_loop()
+    turns: dict[str, asyncio.Task] = {}
+
+    def cancel_turns() -> None:
+        while (stream_id := control.get()) is not None:
+            loop.call_soon_threadsafe(_cancel_turn, turns, stream_id)
+
+    threading.Thread(target=cancel_turns, daemon=True).start()
+
+    async def publish(job: GenerationJob) -> None:
+        try:
+            async with aclosing(generate_job_chat_stream(job)) as stream:
+                async for data in stream:
+                    events.put((job.stream_id, data))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(
+                event="[Generation Workers] Error generating chat turn",
+                stream_id=job.stream_id,
+                error=str(e),
+            )
+        finally:
+            events.put((job.stream_id, None))
+
+    await _serve(lambda: asyncio.to_thread(jobs.get), publish, turns, max_turns)
+
+
+def _cancel_turn(turns: dict[str, asyncio.Task], stream_id: str) -> None:
+    turn = turns.get(stream_id)
+    if turn is not None:
+        turn.cancel()
+
+
+async def _serve(
+    get_job: Callable[[], Awaitable[str | None]],
+    run_job: Callable[[GenerationJob], Awaitable[None]],
+    turns: dict[str, asyncio.Task],
+    max_turns: int,
+) -> None:
+    # Jobs are only taken when there's a free slot, so idle workers get them instead
+    slots = asyncio.Semaphore(max_turns)
+    while True:
+        await slots.acquire()
+        job_json = await get_job()
+        if job_json is None:
+            break
+
+        job = GenerationJob.model_validate_json(job_json)
+        turn = asyncio.create_task(run_job(job))
+        turns[job.stream_id] = turn
+
+        def release(_: asyncio.Task, stream_id: str = job.stream_id) -> None:
+            turns.pop(stream_id, None)
+            slots.release()
+
+        turn.add_done_callback(release)
+
+    if turns:
+        await asyncio.wait(list(turns.values()))
+
+
+async def serve_redis_jobs(max_turns: int) -> None:
+    """
+    Runs generation jobs from the Redis queue until cancelled.
+
+    Args:
+        max_turns (int): Maximum number of turns to run concurrently.
+    """
+    event_log = get_event_log()
+    if not isinstance(event_log, RedisEventLog):
+        raise ValueError(
+            "Redis generation workers need chat_stream.event_log in configuration.yaml to be redis."
+        )
+
+    def pop_job() -> str | None:
+        popped = get_client().brpop(JOBS_KEY, timeout=POLL_SECONDS)
+        return popped[1] if popped else None
+
+    async def get_job() -> str:
+        # Polls, so the worker can be stopped between jobs
+        while (job_json := await asyncio.to_thread(pop_job)) is None:
+            pass
+        return job_json
+
+    async def run_job(job: GenerationJob) -> None:
+        await produce_chat_events(
+            event_log, generate_job_chat_stream(job), job.stream_id
+        )
+
+    await _serve(get_job, run_job, {}, max_turns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Runs chat turns from the Redis queue.")
+    parser.add_argument(
+        "--max-turns",
+        type=int,
+        default=Settings().chat_stream.worker_max_turns,
+        help="Maximum number of turns to run concurrently",
+    )
+    args = parser.parse_args()
+
+    configure_tracing_from_settings()
+    try:
+        asyncio.run(serve_redis_jobs(args.max_turns))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
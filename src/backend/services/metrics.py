@@ -0,0 +1,460 @@
+"""
+In-process metrics registry, rendered in the Prometheus text format by the /metrics endpoint.
+
+Metrics are per worker process, scrape each worker or aggregate them by instance.
+"""
+
+import asyncio
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import aclosing, contextmanager
+from typing import Any, AsyncGenerator, Callable, Generator, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metric:
+    """Base for metrics, with one value per combination of label values"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        self._init_values()
+
+    def _init_values(self) -> None:
+        # Metrics without labels are exposed before their first update
+        if not self.labelnames:
+            self._values[()] = self._zero()
+
+    def _zero(self) -> Any:
+        return 0.0
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple[str, ...], **extra: str) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra.items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            return [
+                f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+                for key, value in self._values.items()
+            ]
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._init_values()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: dict[tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels: Any) -> None:
+        """Reads the value from function when the metrics are collected"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def get(self, **labels: Any) -> float:
+        key = self._key(labels)
+        with self._lock:
+            function = self._functions.get(key)
+            value = self._values.get(key, 0.0)
+        return function() if function else value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                values[key] = math.nan
+
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _zero(self) -> list:
+        # Bucket counts, the last one is +Inf, then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = self._zero()
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def get_count(self, **labels: Any) -> int:
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+        return counts[len(self.buckets)] if counts else 0
+
+    def get_sum(self, **labels: Any) -> float:
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+        return counts[-1] if counts else 0.0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+
+        lines = []
+        for key, counts in values.items():
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                le = self._format_labels(key, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{le} {count}")
+            labels = self._format_labels(key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {counts[len(self.buckets)]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def clear(self) -> None:
+        """Resets all metric values, for tests"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+CHAT_STREAMS_OPEN = REGISTRY.gauge(
+    "toolkit_chat_streams_open", "Chat streams currently open"
+)
+CHAT_STREAMS = REGISTRY.counter(
+    "toolkit_chat_streams_total",
+    "Chat streams by outcome: completed, cancelled or error",
+    ["status"],
+)
+CHAT_TOOL_LOOP_STEPS = REGISTRY.histogram(
+    "toolkit_chat_tool_loop_steps",
+    "Model calls per chat turn in the custom chat tool loop",
+    buckets=(1, 2, 3, 5, 8, 10, 15),
+)
+TOOL_CALLS = REGISTRY.counter(
+    "toolkit_tool_calls_total",
+    "Tool calls by tool and outcome: success, error or not_found",
+    ["tool", "status"],
+)
+TOOL_CALL_DURATION = REGISTRY.histogram(
+    "toolkit_tool_call_duration_seconds", "Duration of tool calls", ["tool"]
+)
+TOOL_CALL_TIMEOUTS = REGISTRY.counter(
+    "toolkit_tool_call_timeouts_total",
+    "Tool call batches that exceeded the tool call timeout",
+)
+FILE_PREFETCH_READS = REGISTRY.counter(
+    "toolkit_file_prefetch_reads_total",
+    "read_document calls in turns with prefetched files, by outcome: hit or miss",
+    ["status"],
+)
+DEPLOYMENT_REQUESTS = REGISTRY.counter(
+    "toolkit_deployment_requests_total",
+    "Model deployment requests by deployment class, operation and outcome",
+    ["deployment", "operation", "status"],
+)
+DEPLOYMENT_REQUEST_DURATION = REGISTRY.histogram(
+    "toolkit_deployment_request_duration_seconds",
+    "Duration of model deployment requests, streams until their last event",
+    ["deployment", "operation"],
+)
+DEPLOYMENT_TIME_TO_FIRST_EVENT = REGISTRY.histogram(
+    "toolkit_deployment_time_to_first_event_seconds",
+    "Time until the first event of model deployment chat streams",
+    ["deployment"],
+)
+CHAT_ADMISSIONS = REGISTRY.counter(
+    "toolkit_chat_admissions_total",
+    "Chat turns by admission outcome: admitted, rate_limited, queue_full or timed_out",
+    ["status"],
+)
+CHAT_ADMISSION_WAIT = REGISTRY.histogram(
+    "toolkit_chat_admission_wait_seconds",
+    "Time chat turns waited for rate limit tokens and in-flight slots",
+)
+DB_POOL_CHECKED_OUT = REGISTRY.gauge(
+    "toolkit_db_pool_checked_out", "Database connections checked out of the pool"
+)
+DB_POOL_SIZE = REGISTRY.gauge(
+    "toolkit_db_pool_size", "Configured size of the database connection pool"
+)
+DB_POOL_OVERFLOW = REGISTRY.gauge(
+    "toolkit_db_pool_overflow",
+    "Database connections over the pool size, negative while the pool is not full",
+)
+DB_POOL_CHECKOUTS = REGISTRY.counter(
+    "toolkit_db_pool_checkouts_total", "Database connection checkouts"
+)
+BACKGROUND_JOBS = REGISTRY.counter(
+    "toolkit_background_jobs_total",
+    "Background jobs by kind and outcome: submitted, succeeded, retried, deferred or failed",
+    ["kind", "status"],
+)
+OPENAI_ENDPOINT_OUTSTANDING = REGISTRY.gauge(
+    "toolkit_openai_endpoint_outstanding_requests",
+    "Requests in flight per OpenAI-compatible endpoint",
+    ["endpoint"],
+)
+OPENAI_ENDPOINT_FAILURES = REGISTRY.counter(
+    "toolkit_openai_endpoint_failures_total",
+    "Failed requests and health checks per OpenAI-compatible endpoint",
+    ["endpoint"],
+)
+OPENAI_ENDPOINT_FAILOVERS = REGISTRY.counter(
+    "toolkit_openai_endpoint_failovers_total",
+    "Requests retried on another endpoint, by the endpoint that failed",
+    ["endpoint"],
+)
+OPENAI_ENDPOINT_EJECTIONS = REGISTRY.counter(
+    "toolkit_openai_endpoint_ejections_total",
+    "Endpoints ejected by their circuit breaker after repeated failures",
+    ["endpoint"],
+)
+ENDPOINT_HEDGES = REGISTRY.counter(
+    "toolkit_deployment_hedged_streams_total",
+    "Hedged streams per deployment, by outcome: fired, won or lost by the hedge, or over_budget",
+    ["deployment", "outcome"],
+)
+ENDPOINT_HEDGE_RATE = REGISTRY.gauge(
+    "toolkit_deployment_hedge_rate",
+    "Share of the recent streams of a deployment that were hedged",
+    ["deployment"],
+)
+RESPONSE_CACHE_REQUESTS = REGISTRY.counter(
+    "toolkit_response_cache_requests_total",
+    "Chat requests looked up in the response cache, by outcome: exact or semantic hit, or miss",
+    ["outcome"],
+)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Exposes the connection pool saturation of an engine.
+
+    Args:
+        engine (Engine): SQLAlchemy engine, its pool must be a QueuePool.
+    """
+    pool = engine.pool
+    DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+    DB_POOL_SIZE.set_function(pool.size)
+    DB_POOL_OVERFLOW.set_function(pool.overflow)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(*args: Any) -> None:
+        DB_POOL_CHECKOUTS.inc()
+
+
+@contextmanager
+def track_chat_stream() -> Generator[None, None, None]:
+    """Counts a chat stream as open while in the block, and its outcome when it exits"""
+    CHAT_STREAMS_OPEN.inc()
+    status = "error"
+    try:
+        yield
+        status = "completed"
+    except (GeneratorExit, asyncio.CancelledError):
+        status = "cancelled"
+        raise
+    finally:
+        CHAT_STREAMS_OPEN.dec()
+        CHAT_STREAMS.inc(status=status)
+
+
+def instrument_deployment_method(method: Callable, operation: str) -> Callable:
+    """
+    Wraps a model deployment method to record its outcome and duration per deployment class.
+
+    Chat streams also record the time to their first event. Methods that are neither
+    coroutines nor async generators are returned as is.
+
+    Args:
+        method (Callable): Deployment method, e.g. invoke_chat_stream.
+        operation (str): Operation label, e.g. "chat_stream".
+
+    Returns:
+        Callable: The wrapped method.
+    """
+    if inspect.isasyncgenfunction(method):
+
+        @functools.wraps(method)
+        async def stream_wrapper(self, *args: Any, **kwargs: Any) -> AsyncGenerator:
+            deployment = type(self).__name__
+            start = time.perf_counter()
+            received_first_event = False
+            status = "error"
+            try:
+                async with aclosing(method(self, *args, **kwargs)) as stream:
+                    async for stream_event in stream:
+                        if not received_first_event:
+                            DEPLOYMENT_TIME_TO_FIRST_EVENT.observe(
+                                time.perf_counter() - start, deployment=deployment
+                            )
+                            received_first_event = True
+                        yield stream_event
+                status = "success"
+            except (GeneratorExit, asyncio.CancelledError):
+                status = "cancelled"
+                raise
+            finally:
+                _record_deployment_request(deployment, operation, status, start)
+
+        return stream_wrapper
+
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = await method(self, *args, **kwargs)
+                status = "success"
+                return result
+            except asyncio.CancelledError:
+                status = "cancelled"
+                raise
+            finally:
+                _record_deployment_request(type(self).__name__, operation, status, start)
+
+        return wrapper
+
+    return method
+
+
+def _record_deployment_request(
+    deployment: str, operation: str, status: str, start: float
+) -> None:
+    DEPLOYMENT_REQUESTS.inc(deployment=deployment, operation=operation, status=status)
+    DEPLOYMENT_REQUEST_DURATION.observe(
+        time.perf_counter() - start, deployment=deployment, operation=operation
+    )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) + ".0"
+    return str(value)
@@ -0,0 +1,236 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Iterable, Type
+
+from backend.config.settings import Settings
+from backend.schemas.deployment import Deployment
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+MODEL_DISCOVERY_CACHE_FILE_NAME = "toolkit-model-discovery.json"
+MAX_DISCOVERY_WORKERS = 4
+
+_lock = threading.Lock()
+_refreshed_at: dict[str, float] = {}
+_in_flight: dict[str, Future] = {}
+_executor: ThreadPoolExecutor | None = None
+_refresher: threading.Thread | None = None
+_stop_refresher = threading.Event()
+
+
+def get_initial_models(deployment_id: str, deployment_class: Type) -> list[str]:
+    """
+    Returns the models a deployment starts with, without any network I/O.
+
+    These are the last models discovered for the deployment, or the deployment's
+    default models if discovery never succeeded.
+
+    Args:
+        deployment_id (str): Deployment ID.
+        deployment_class (Type): Deployment class.
+
+    Returns:
+        list[str]: Model names.
+    """
+    models = load_last_known_models().get(deployment_id)
+    if models:
+        return models
+
+    return deployment_class.default_models()
+
+
+def refresh_deployment_models(
+    deployment: Deployment, timeout_seconds: float | None = None
+) -> list[str]:
+    """
+    Lists the models of a deployment, giving up after timeout_seconds.
+
+    On success the models are set on the deployment and persisted, on error or timeout
+    the deployment keeps its last known models.
+
+    Args:
+        deployment (Deployment): Deployment to refresh.
+        timeout_seconds (float): Optional timeout overriding the configured one.
+
+    Returns:
+        list[str]: The deployment's models after the refresh.
+    """
+    if timeout_seconds is None:
+        timeout_seconds = Settings().deployments.model_discovery_timeout_seconds
+
+    with _lock:
+        future = _in_flight.get(deployment.id)
+        if future is None:
+            future = _get_executor().submit(deployment.deployment_class.list_models)
+            _in_flight[deployment.id] = future
+            future.add_done_callback(lambda _: _in_flight.pop(deployment.id, None))
+
+    try:
+        models = future.result(timeout=timeout_seconds)
+    except FutureTimeoutError:
+        logger.warning(
+            event="[Model Discovery] Timed out listing models",
+            deployment=deployment.id,
+            timeout_seconds=timeout_seconds,
+        )
+        return deployment.models
+    except Exception as e:
+        logger.warning(
+            event="[Model Discovery] Error listing models",
+            deployment=deployment.id,
+            error=str(e),
+        )
+        return deployment.models
+    finally:
+        _refreshed_at[deployment.id] = time.monotonic()
+
+    if models and models != deployment.models:
+        deployment.models = models
+        _persist_models(deployment.id, models)
+
+    return deployment.models
+
+
+def refresh_stale_deployment_models(
+    deployments: Iterable[Deployment], ttl_seconds: float | None = None
+) -> None:
+    """
+    Concurrently refreshes the models of deployments that list them remotely and
+    weren't refreshed in the last ttl_seconds.
+
+    Args:
+        deployments (Iterable[Deployment]): Deployments to check.
+        ttl_seconds (float): Optional TTL overriding the configured one.
+    """
+    if ttl_seconds is None:
+        ttl_seconds = Settings().deployments.model_discovery_ttl_seconds
+
+    now = time.monotonic()
+    stale_deployments = [
+        deployment
+        for deployment in deployments
+        if deployment.deployment_class is not None
+        and deployment.deployment_class.lists_models_remotely
+        and deployment.is_available
+        and now - _refreshed_at.get(deployment.id, float("-inf")) >= ttl_seconds
+    ]
+
+    threads = [
+        threading.Thread(target=refresh_deployment_models, args=(deployment,))
+        for deployment in stale_deployments
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def start_model_discovery(deployments: Iterable[Deployment]) -> None:
+    """
+    Starts refreshing the models of the given deployments in a background thread,
+    once right away and then every model_discovery_ttl_seconds.
+
+    Calling it again while the refresher is running has no effect.
+
+    Args:
+        deployments (Iterable[Deployment]): Deployments to keep up to date.
+    """
+    global _refresher
+
+    deployments = list(deployments)
+    with _lock:
+        if _refresher is not None and _refresher.is_alive():
+            return
+
+        _stop_refresher.clear()
+        _refresher = threading.Thread(
+            target=_run_refresher,
+            args=(deployments,),
+            name="model-discovery",
+            daemon=True,
+        )
+        _refresher.start()
+
+
+def stop_model_discovery() -> None:
+    global _refresher
+
+    _stop_refresher.set()
+    with _lock:
+        _refresher = None
+
+
+def load_last_known_models() -> dict[str, list[str]]:
+    try:
+        with open(_get_cache_path()) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cached, dict):
+        return {}
+
+    return {
+        deployment_id: models
+        for deployment_id, models in cached.items()
+        if isinstance(models, list)
+    }
+
+
+def clear_model_discovery_state() -> None:
+    _refreshed_at.clear()
+
+
+def _run_refresher(deployments: list[Deployment]) -> None:
+    while not _stop_refresher.is_set():
+        try:
+            refresh_stale_deployment_models(deployments)
+        except Exception as e:
+            logger.error(event="[Model Discovery] Error refreshing models", error=str(e))
+
+        _stop_refresher.wait(Settings().deployments.model_discovery_ttl_seconds)
+
+
+def _persist_models(deployment_id: str, models: list[str]) -> None:
+    path = _get_cache_path()
+
+    with _lock:
+        cached = load_last_known_models()
+        cached[deployment_id] = models
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so a worker booting concurrently never reads a partial file
+            with tempfile.NamedTemporaryFile(
+                "w", dir=os.path.dirname(path), delete=False
+            ) as f:
+                json.dump(cached, f)
+            os.replace(f.name, path)
+        except OSError as e:
+            logger.warning(
+                event="[Model Discovery] Error persisting models", error=str(e)
+            )
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_DISCOVERY_WORKERS, thread_name_prefix="model-discovery"
+        )
+
+    return _executor
+
+
+def _get_cache_path() -> str:
+    cache_path = Settings().deployments.model_discovery_cache_path
+    if cache_path:
+        return cache_path
+
+    return os.path.join(tempfile.gettempdir(), MODEL_DISCOVERY_CACHE_FILE_NAME)
@@ -20,6 +20,7 @@ from backend.database_models.database import DBSessionDep
 from backend.model_deployments.utils import class_name_validator
 from backend.services.agent import validate_agent_exists
 from backend.services.auth.utils import get_header_user_id
+from backend.services.catalog import get_catalog
 from backend.services.logger.utils import LoggerFactory
 
 logger = LoggerFactory().get_logger()
@@ -179,10 +180,8 @@ def validate_deployment_header(request: Request, session: DBSessionDep):
     # TODO Eugene: Discuss with Scott
     deployment_name = request.headers.get("Deployment-Name")
     if deployment_name:
-        available_db_deployments = deployment_crud.get_deployments(session)
-        is_deployment_in_db = any(
-            deployment.name == deployment_name
-            for deployment in available_db_deployments
+        is_deployment_in_db = (
+            get_catalog().get_deployment_by_name(session, deployment_name) is not None
         )
         if (
             not is_deployment_in_db
@@ -0,0 +1,399 @@
+import copy
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from backend.config.settings import Settings
+from backend.database_models import (
+    Agent,
+    AgentDeploymentModel,
+    AgentToolMetadata,
+    File,
+    FileChunk,
+    FileContentSegment,
+)
+from backend.services.cache import TTLCache, get_client
+from backend.services.embedders import BaseEmbedder, get_embedder
+from backend.services.logger.utils import LoggerFactory
+from backend.services.metrics import RESPONSE_CACHE_REQUESTS
+
+logger = LoggerFactory().get_logger()
+
+EXACT = "exact"
+SEMANTIC = "semantic"
+
+# Scope of the requests without an agent
+NO_AGENT_SCOPE = ""
+# Generation shared by every scope, increased when files change
+ALL_SCOPES = "*"
+GENERATIONS_KEY = "response_cache:generations"
+INVALIDATED_SCOPES = "response_cache_invalidated_scopes"
+# Messages compared per request context for the semantic tier, the oldest are dropped
+MAX_SIMILAR_MESSAGES = 256
+
+AGENT_MODELS = (AgentDeploymentModel, AgentToolMetadata)
+FILE_MODELS = (File, FileChunk, FileContentSegment)
+
+
+@dataclass
+class ResponseCacheKey:
+    exact: str
+    # Hash of the request without its last user message, None without the semantic tier
+    context: Optional[str] = None
+    message: Optional[str] = None
+    # Embedding of the message, once it's needed
+    vector: Optional[np.ndarray] = None
+
+
+@dataclass(frozen=True)
+class _SimilarMessage:
+    vector: np.ndarray
+    exact: str
+
+
+class ResponseCache:
+    """
+    Process-local cache of the events streamed for chat requests.
+
+    Responses are looked up by a hash of the upstream request body, or with the semantic
+    tier, by the embedding of the last user message of an otherwise identical request.
+    Keys include the generations of their scope, so invalidating a scope, e.g. an agent,
+    makes its entries unreachable until they expire.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        max_temperature: float = 0.0,
+        semantic: bool = False,
+        similarity_threshold: float = 0.95,
+        embedder: Optional[BaseEmbedder] = None,
+    ):
+        self.max_temperature = max_temperature
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.embedder = embedder
+        self._responses = TTLCache(ttl_seconds, max_entries)
+        # Context hash to the messages answered in that context
+        self._messages = TTLCache(ttl_seconds, max_entries)
+        self._generations: dict[str, int] = {}
+        # Generations are shared between workers through Redis if it's configured
+        self._redis_url = Settings().redis.url
+        self._lock = threading.Lock()
+
+    def accepts(self, temperature: Optional[float]) -> bool:
+        """
+        Whether the responses of a request are deterministic enough to be replayed.
+
+        Args:
+            temperature (Optional[float]): Requested temperature.
+
+        Returns:
+            bool: Whether the responses can be cached.
+        """
+        return temperature is not None and temperature <= self.max_temperature
+
+    def get_key(
+        self, body: dict[str, Any], scope: str, message: Optional[str] = None
+    ) -> Optional[ResponseCacheKey]:
+        """
+        Gets the cache key of an upstream request.
+
+        Args:
+            body (dict[str, Any]): Upstream request body.
+            scope (str): Scope of the request, its agent ID.
+            message (Optional[str]): Last user message, enables the semantic tier.
+
+        Returns:
+            Optional[ResponseCacheKey]: Key, or None if the generations couldn't be read.
+        """
+        generations = self._get_generations(scope)
+        if generations is None:
+            return None
+
+        exact = _hash({"body": body, "scope": scope, "generations": generations})
+        if not (self.semantic and message):
+            return ResponseCacheKey(exact=exact)
+
+        context_body = _without_last_user_message(body)
+        if context_body is None:
+            return ResponseCacheKey(exact=exact)
+
+        context = _hash(
+            {"body": context_body, "scope": scope, "generations": generations}
+        )
+        return ResponseCacheKey(exact=exact, context=context, message=message)
+
+    def get(self, key: ResponseCacheKey) -> Optional[tuple[str, list[Any]]]:
+        """
+        Gets the events of a cached response.
+
+        Args:
+            key (ResponseCacheKey): Cache key.
+
+        Returns:
+            Optional[tuple[str, list[Any]]]: Tier of the hit and a copy of the events, or
+                None on a miss.
+        """
+        events = self._responses.get(key.exact)
+        if events is not None:
+            RESPONSE_CACHE_REQUESTS.inc(outcome=EXACT)
+            return EXACT, copy.deepcopy(events)
+
+        if key.context is not None:
+            similar = self._get_similar(key)
+            events = self._responses.get(similar) if similar else None
+            if events is not None:
+                RESPONSE_CACHE_REQUESTS.inc(outcome=SEMANTIC)
+                return SEMANTIC, copy.deepcopy(events)
+
+        RESPONSE_CACHE_REQUESTS.inc(outcome="miss")
+        return None
+
+    def put(self, key: ResponseCacheKey, events: list[Any]) -> None:
+        """
+        Caches the events of a response.
+
+        Args:
+            key (ResponseCacheKey): Cache key.
+            events (list[Any]): Streamed events, e.g. grouped by upstream event, not
+                changed afterwards.
+        """
+        self._responses.put(key.exact, events)
+
+        if key.context is None:
+            return
+
+        vector = self._embed(key)
+        if vector is None:
+            return
+
+        with self._lock:
+            messages = self._messages.get(key.context, [])
+            messages = [*messages, _SimilarMessage(vector, key.exact)]
+            self._messages.put(key.context, messages[-MAX_SIMILAR_MESSAGES:])
+
+    def invalidate(self, scope: str) -> None:
+        """
+        Drops the responses of a scope, or of every scope for ALL_SCOPES, in every worker
+        if Redis is configured.
+
+        Args:
+            scope (str): Scope, e.g. an agent ID.
+        """
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+        if not self._redis_url:
+            return
+
+        try:
+            get_client().hincrby(GENERATIONS_KEY, scope, 1)
+        except Exception as e:
+            logger.warning(
+                event="[Response Cache] Failed to publish the invalidation",
+                scope=scope,
+                error=str(e),
+            )
+
+    def _get_generations(self, scope: str) -> Optional[list[int]]:
+        with self._lock:
+            generations = [
+                self._generations.get(ALL_SCOPES, 0),
+                self._generations.get(scope, 0),
+            ]
+
+        if not self._redis_url:
+            return generations
+
+        try:
+            shared = get_client().hmget(GENERATIONS_KEY, [ALL_SCOPES, scope])
+        except Exception as e:
+            # Without them a response could be replayed after an invalidation
+            logger.warning(
+                event="[Response Cache] Failed to read the generations, bypassing the cache",
+                error=str(e),
+            )
+            return None
+
+        return [*generations, *(int(value or 0) for value in shared)]
+
+    def _get_similar(self, key: ResponseCacheKey) -> Optional[str]:
+        messages = self._messages.get(key.context)
+        if not messages:
+            return None
+
+        vector = self._embed(key)
+        if vector is None:
+            return None
+
+        similarities = np.stack([message.vector for message in messages]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        return messages[best].exact
+
+    def _embed(self, key: ResponseCacheKey) -> Optional[np.ndarray]:
+        if key.vector is not None:
+            return key.vector
+
+        try:
+            key.vector = (self.embedder or get_embedder()).embed([key.message])[0]
+            return key.vector
+        except Exception as e:
+            logger.warning(
+                event="[Response Cache] Failed to embed the message",
+                error=str(e),
+            )
+            return None
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Gets the response cache.
+
+    Returns:
+        Optional[ResponseCache]: The response cache, or None if it's disabled.
+    """
+    settings = Settings().response_cache
+    if not settings.enabled:
+        return None
+
+    return ResponseCache(
+        ttl_seconds=settings.ttl_seconds,
+        max_entries=settings.max_entries,
+        max_temperature=settings.max_temperature or 0.0,
+        semantic=settings.semantic,
+        similarity_threshold=settings.similarity_threshold,
+    )
+
+
+def invalidate_response_cache(scope: str) -> None:
+    cache = get_response_cache()
+    if cache:
+        cache.invalidate(scope)
+
+
+def set_response_ids(
+    events: list[dict[str, Any]],
+    generation_id: str,
+    conversation_id: Optional[str],
+    response_id: Optional[str],
+) -> None:
+    """
+    Replaces the IDs of the response a cached response was recorded for.
+
+    Args:
+        events (list[dict[str, Any]]): Cached events, changed in place.
+        generation_id (str): Generation ID of the replayed response.
+        conversation_id (Optional[str]): Conversation ID of the request.
+        response_id (Optional[str]): Response ID of the request.
+    """
+    ids = {
+        "generation_id": generation_id,
+        "conversation_id": conversation_id,
+        "response_id": response_id,
+    }
+    for cached_event in events:
+        if "generation_id" in cached_event:
+            cached_event["generation_id"] = generation_id
+
+        response = cached_event.get("response")
+        if isinstance(response, dict):
+            response.update({name: ids[name] for name in ids if name in response})
+
+
+def set_response_chat_history(
+    events: list[dict[str, Any]], chat_history: list[dict[str, Any]]
+) -> None:
+    """
+    Replaces the chat history of the request a cached response was recorded for.
+
+    The messages the response added to it, e.g. its tool calls, are kept.
+
+    Args:
+        events (list[dict[str, Any]]): Cached events, changed in place.
+        chat_history (list[dict[str, Any]]): Chat history of the request.
+    """
+    for cached_event in events:
+        recorded = [cached_event, cached_event.get("response")]
+        for value in recorded:
+            if isinstance(value, dict) and isinstance(value.get("chat_history"), list):
+                value["chat_history"] = [
+                    *chat_history,
+                    *value["chat_history"][len(chat_history) :],
+                ]
+
+
+def _hash(value: Any) -> str:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _without_last_user_message(body: dict[str, Any]) -> Optional[dict[str, Any]]:
+    # Only chat bodies keep the messages apart, completion prompts are templated
+    messages = body.get("messages")
+    if not messages:
+        return None
+
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].get("role") == "user":
+            message = {**messages[i], "content": None}
+            return {**body, "messages": [*messages[:i], message, *messages[i + 1 :]]}
+
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _track_response_cache_changes(session: Session, flush_context) -> None:
+    if get_response_cache() is None:
+        return
+
+    scopes = session.info.setdefault(INVALIDATED_SCOPES, set())
+    for instance in [*session.new, *session.dirty, *session.deleted]:
+        if isinstance(instance, FILE_MODELS):
+            scopes.add(ALL_SCOPES)
+        elif isinstance(instance, AGENT_MODELS):
+            scopes.add(instance.agent_id)
+        elif isinstance(instance, Agent) and instance not in session.new:
+            scopes.add(instance.id)
+
+    if not scopes:
+        session.info.pop(INVALIDATED_SCOPES)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_response_cache_changes(state: ORMExecuteState) -> None:
+    if not (state.is_delete or state.is_update):
+        return
+
+    if get_response_cache() is not None and any(
+        mapper.class_ in (*FILE_MODELS, *AGENT_MODELS, Agent)
+        for mapper in state.all_mappers
+    ):
+        state.session.info.setdefault(INVALIDATED_SCOPES, set()).add(ALL_SCOPES)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    scopes = session.info.pop(INVALIDATED_SCOPES, set())
+    if ALL_SCOPES in scopes:
+        scopes = {ALL_SCOPES}
+
+    for scope in scopes:
+        invalidate_response_cache(scope)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_response_cache_changes(session: Session) -> None:
+    session.info.pop(INVALIDATED_SCOPES, None)
@@ -0,0 +1,207 @@
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncGenerator
+from uuid import uuid4
+
+from fastapi import HTTPException
+from sse_starlette.sse import ServerSentEvent
+
+from backend.config.settings import Settings
+from backend.services.event_log import (
+    POLL_SECONDS,
+    EventLog,
+    EventLogExpiredError,
+    EventLogNotFoundError,
+    get_event_log,
+)
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+# SSE event IDs are "<stream ID>:<event ID>", so Last-Event-ID identifies the turn
+EVENT_ID_SEPARATOR = ":"
+# How often a turn checks whether any client is still reading it
+ABANDONED_CHECK_SECONDS = 1.0
+
+# Keeps running turns referenced, the event loop only keeps weak references to tasks
+_producers: set[asyncio.Task] = set()
+
+
+def format_event_id(stream_id: str, event_id: int) -> str:
+    return f"{stream_id}{EVENT_ID_SEPARATOR}{event_id}"
+
+
+def parse_event_id(last_event_id: str) -> tuple[str, int]:
+    """
+    Parses a Last-Event-ID header.
+
+    Args:
+        last_event_id (str): SSE event ID, "<stream ID>:<event ID>".
+
+    Returns:
+        tuple[str, int]: Stream ID and event ID.
+
+    Raises:
+        HTTPException: If the event ID is malformed.
+    """
+    stream_id, _, event_id = last_event_id.rpartition(EVENT_ID_SEPARATOR)
+    if not stream_id or not event_id.isdigit():
+        raise HTTPException(
+            status_code=400, detail=f"Invalid Last-Event-ID: {last_event_id}"
+        )
+    return stream_id, int(event_id)
+
+
+def stream_chat_events(
+    stream: AsyncGenerator[str, None], user_id: str
+) -> AsyncGenerator[Any, None]:
+    """
+    Makes a chat turn's SSE stream resumable with Last-Event-ID.
+
+    The turn runs in a background task that appends its events to the event log, and
+    the returned stream follows the log. If the client disconnects, the turn keeps
+    running for the resume grace period, so a reconnecting client can pick it up.
+    If no client reads it by then, it's cancelled.
+
+    Args:
+        stream (AsyncGenerator[str, None]): Events of the turn, as serialized JSON.
+        user_id (str): ID of the user the turn belongs to.
+
+    Returns:
+        AsyncGenerator[Any, None]: The SSE events, the stream as is if resuming is disabled.
+    """
+    event_log = get_event_log()
+    if event_log is None:
+        return stream
+
+    return _start_and_follow(event_log, stream, str(uuid4()), user_id)
+
+
+async def resume_chat_events(
+    last_event_id: str, user_id: str
+) -> AsyncGenerator[ServerSentEvent, None]:
+    """
+    Resumes a chat turn's SSE stream after the last event the client received.
+
+    Args:
+        last_event_id (str): Value of the Last-Event-ID header.
+        user_id (str): ID of the user resuming the turn.
+
+    Returns:
+        AsyncGenerator[ServerSentEvent, None]: The events after last_event_id, followed
+            by the live events if the turn is still running.
+
+    Raises:
+        HTTPException: If the turn doesn't exist, has expired or belongs to another user.
+    """
+    event_log = get_event_log()
+    if event_log is None:
+        raise HTTPException(status_code=404, detail="Resuming chat streams is disabled.")
+
+    stream_id, event_id = parse_event_id(last_event_id)
+    if await event_log.get_owner(stream_id) != user_id:
+        raise HTTPException(
+            status_code=404, detail=f"Chat stream {stream_id} not found or expired."
+        )
+
+    return follow_chat_events(event_log, stream_id, event_id)
+
+
+async def _start_and_follow(
+    event_log: EventLog,
+    stream: AsyncGenerator[str, None],
+    stream_id: str,
+    user_id: str,
+) -> AsyncGenerator[ServerSentEvent, None]:
+    await event_log.create(stream_id, user_id)
+    producer = asyncio.create_task(produce_chat_events(event_log, stream, stream_id))
+    _producers.add(producer)
+    producer.add_done_callback(_producers.discard)
+
+    async for event in follow_chat_events(event_log, stream_id):
+        yield event
+
+
+async def follow_chat_events(
+    event_log: EventLog, stream_id: str, after_id: int = 0
+) -> AsyncGenerator[ServerSentEvent, None]:
+    """
+    Follows a chat turn's event log as SSE events, until the turn ends.
+
+    Args:
+        event_log (EventLog): Event log the turn is appended to.
+        stream_id (str): ID of the turn's log.
+        after_id (int): ID of the last event the client received, 0 for all events.
+
+    Yields:
+        ServerSentEvent: The turn's events, with resumable event IDs.
+    """
+    try:
+        async for event_id, data in event_log.read(stream_id, after_id):
+            yield ServerSentEvent(data=data, id=format_event_id(stream_id, event_id))
+    except (EventLogNotFoundError, EventLogExpiredError) as e:
+        # The response has started, so the client can only be told in the stream
+        logger.warning(
+            event="[Chat Stream] Can't resume chat stream",
+            stream_id=stream_id,
+            error=type(e).__name__,
+        )
+        yield ServerSentEvent(event="error", data="Chat stream expired")
+
+
+async def produce_chat_events(
+    event_log: EventLog, stream: AsyncGenerator[str, None], stream_id: str
+) -> None:
+    """
+    Runs a chat turn to the end, appending its events to its event log.
+
+    The turn is cancelled if no client reads the log for the resume grace period.
+
+    Args:
+        event_log (EventLog): Event log to append to, the log must exist.
+        stream (AsyncGenerator[str, None]): Events of the turn, as serialized JSON.
+        stream_id (str): ID of the turn's log.
+    """
+    producer = asyncio.current_task()
+    watchdog = asyncio.create_task(_cancel_when_abandoned(event_log, stream_id, producer))
+
+    try:
+        async with aclosing(stream):
+            async for data in stream:
+                await event_log.append(stream_id, data)
+    except asyncio.CancelledError:
+        logger.info(
+            event="[Chat Stream] Stopped chat turn without connected clients",
+            stream_id=stream_id,
+        )
+    except Exception as e:
+        logger.error(
+            event="[Chat Stream] Error producing chat turn",
+            stream_id=stream_id,
+            error=str(e),
+        )
+    finally:
+        watchdog.cancel()
+        await event_log.close(stream_id)
+
+
+async def _cancel_when_abandoned(
+    event_log: EventLog, stream_id: str, producer: asyncio.Task
+) -> None:
+    grace_seconds = Settings().chat_stream.resume_grace_seconds
+    while True:
+        await asyncio.sleep(ABANDONED_CHECK_SECONDS)
+        try:
+            seconds_since_read = await event_log.get_seconds_since_read(stream_id)
+        except Exception as e:
+            logger.warning(
+                event="[Chat Stream] Error checking chat stream readers",
+                stream_id=stream_id,
+                error=str(e),
+            )
+            continue
+
+        # Readers waiting for the next event renew their lease every POLL_SECONDS
+        if seconds_since_read > grace_seconds + POLL_SECONDS:
+            producer.cancel()
+            return
@@ -0,0 +1,35 @@
+from typing import Any
+
+import anyio
+from sse_starlette.sse import EventSourceResponse
+from starlette.types import Send
+
+
+class CancellableEventSourceResponse(EventSourceResponse):
+    """
+    Server-sent event response that closes its event generator when the client disconnects.
+
+    EventSourceResponse cancels sending on disconnect, but a generator suspended at a
+    yield is only closed when it's garbage collected, so upstream streams and tool
+    calls it drives keep running until then. Closing it raises GeneratorExit at the
+    yield, so the generator can stop its upstream work and persist what it produced.
+    """
+
+    async def stream_response(self, send: Send) -> None:
+        try:
+            await super().stream_response(send)
+        finally:
+            if hasattr(self.body_iterator, "aclose"):
+                # The response task is being cancelled, shield the cleanup from it
+                with anyio.CancelScope(shield=True):
+                    await self.body_iterator.aclose()
+
+
+def create_chat_event_response(events: Any) -> CancellableEventSourceResponse:
+    return CancellableEventSourceResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Connection": "keep-alive"},
+        send_timeout=300,
+        ping=5,
+    )
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from typing import AsyncGenerator, Callable, Iterable, TypeVar
+
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+T = TypeVar("T")
+
+MAX_BUFFERED_EVENTS = 64
+# How often a producer blocked on a full buffer checks whether the consumer went away
+BACKPRESSURE_POLL_SECONDS = 0.1
+
+_EVENT = "event"
+_END = "end"
+_ERROR = "error"
+
+
+async def iterate_in_thread(
+    open_stream: Callable[[], Iterable[T]],
+    max_buffered_events: int = MAX_BUFFERED_EVENTS,
+) -> AsyncGenerator[T, None]:
+    """
+    Iterates a blocking stream in a producer thread, without blocking the event loop.
+
+    The producer hands events over through a bounded asyncio.Queue and stops reading
+    from upstream while max_buffered_events are waiting to be consumed. When the
+    consumer stops early, e.g. because the SSE client disconnected and the response
+    task was cancelled, the producer stops and the stream is closed, which releases
+    its upstream connection.
+
+    Args:
+        open_stream (Callable[[], Iterable[T]]): Opens the stream, called in the
+            producer thread so that the initial request doesn't block either.
+        max_buffered_events (int): Maximum number of events read ahead of the consumer.
+
+    Yields:
+        T: Stream events.
+
+    Raises:
+        Exception: Any exception raised while opening or reading the stream.
+    """
+    loop = asyncio.get_running_loop()
+    # One extra slot so the end of stream marker never waits for a free slot
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered_events + 1)
+    free_slots = threading.Semaphore(max_buffered_events)
+    cancelled = threading.Event()
+    streams = []
+
+    def send(kind: str, value=None) -> bool:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+        except RuntimeError:
+            # The event loop was closed
+            return False
+        return True
+
+    def produce() -> None:
+        try:
+            stream = open_stream()
+            streams.append(stream)
+            for event in stream:
+                while not free_slots.acquire(timeout=BACKPRESSURE_POLL_SECONDS):
+                    if cancelled.is_set():
+                        return
+                if cancelled.is_set() or not send(_EVENT, event):
+                    return
+            send(_END)
+        except Exception as e:
+            if not cancelled.is_set():
+                send(_ERROR, e)
+        finally:
+            _close_streams(streams)
+
+    producer = threading.Thread(target=produce, name="sync-stream", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == _END:
+                return
+            if kind == _ERROR:
+                raise value
+
+            free_slots.release()
+            yield value
+    finally:
+        cancelled.set()
+        # Unblocks a producer waiting on a read where the stream supports closing
+        # from another thread, otherwise the producer closes it after its next read
+        if producer.is_alive():
+            _close_streams(streams)
+
+
+def _close_streams(streams: list) -> None:
+    for stream in streams:
+        close = getattr(stream, "close", None)
+        if close is None:
+            continue
+
+        try:
+            close()
+        except ValueError:
+            # Generators can't be closed while the producer is running them
+            pass
+        except Exception as e:
+            logger.warning(event="[Sync Stream] Error closing stream", error=str(e))
@@ -1,3 +1,12 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from functools import lru_cache
+from typing import AsyncGenerator, Iterator
+
 from google.cloud.texttospeech import (
     AudioConfig,
     AudioEncoding,
@@ -8,14 +17,29 @@ from google.cloud.texttospeech import (
 from googleapiclient.discovery import build
 
 from backend.config import Settings
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+# Google Text-to-Speech rejects inputs over 5000 bytes, chunks stay well below that
+MAX_CHUNK_CHARACTERS = 1000
+MAX_CACHED_AUDIO_FILES = 1000
+SYNTHESIS_CACHE_DIR_NAME = "toolkit-synthesis"
+AUTO_VOICE = "auto"
+
+SENTENCE_BOUNDARY_REGEX = re.compile(r"(?<=[.!?。！？])\s+")
 
+# Discovery services send requests with one httplib2 connection, which isn't thread-safe
+_translate_clients = threading.local()
 
-def synthesize(text: str) -> bytes:
+
+def synthesize(text: str, language: str | None = None) -> bytes:
     """
     Synthesizes speech from the input text.
 
     Args:
         text (str): The input text to be synthesized into speech.
+        language (str): Optional language code, detected from the text if not given.
 
     Returns:
         bytes: The audio content generated from the input text in MP3 format.
@@ -23,11 +47,10 @@ def synthesize(text: str) -> bytes:
     Raises:
         ValueError: If the Google Cloud API key from the settings is not valid.
     """
-    client = TextToSpeechClient(client_options={
-        "api_key": _validate_google_cloud_api_key()
-    })
+    client = get_text_to_speech_client(_validate_google_cloud_api_key())
 
-    language = detect_language(text)
+    if not language:
+        language = detect_language(text)
 
     response = client.synthesize_speech(
         input=SynthesisInput(text=text),
@@ -38,6 +61,75 @@ def synthesize(text: str) -> bytes:
     return response.audio_content
 
 
+async def synthesize_message_stream(
+    message_id: str, text: str, voice: str | None = None
+) -> AsyncGenerator[bytes, None]:
+    """
+    Synthesizes speech for a message sentence chunk by sentence chunk, off the event loop.
+
+    MP3 frames can be concatenated, so every chunk can be played as soon as it is sent.
+    The complete audio is written to the synthesis cache once all chunks are synthesized,
+    and later calls for the same message, text and voice are served from the cache.
+
+    Args:
+        message_id (str): Message ID.
+        text (str): The message text to be synthesized into speech.
+        voice (str): Optional language code, detected from the text if not given.
+
+    Yields:
+        bytes: MP3 audio chunks, none for an empty text.
+    """
+    text_chunks = list(chunk_text(text))
+    if not text_chunks:
+        return
+
+    cache_key = get_synthesis_cache_key(message_id, text, voice)
+    cached_audio = await asyncio.to_thread(get_cached_synthesis, cache_key)
+    if cached_audio is not None:
+        yield cached_audio
+        return
+
+    language = voice or await asyncio.to_thread(detect_language, text)
+
+    audio_chunks = []
+    for text_chunk in text_chunks:
+        audio = await asyncio.to_thread(synthesize, text_chunk, language)
+        audio_chunks.append(audio)
+        yield audio
+
+    await asyncio.to_thread(put_cached_synthesis, cache_key, b"".join(audio_chunks))
+
+
+def chunk_text(text: str, max_characters: int = MAX_CHUNK_CHARACTERS) -> Iterator[str]:
+    """
+    Splits text into chunks of whole sentences of at most max_characters.
+
+    Sentences longer than max_characters are split on whitespace.
+
+    Args:
+        text (str): Text to split.
+        max_characters (int): Maximum chunk length.
+
+    Yields:
+        str: Text chunks.
+    """
+    current_chunk = []
+    current_length = 0
+
+    for sentence in SENTENCE_BOUNDARY_REGEX.split(text.strip()):
+        for part in _split_long_sentence(sentence, max_characters):
+            if current_chunk and current_length + len(part) + 1 > max_characters:
+                yield " ".join(current_chunk)
+                current_chunk = []
+                current_length = 0
+
+            current_chunk.append(part)
+            current_length += len(part) + 1
+
+    if current_chunk:
+        yield " ".join(current_chunk)
+
+
 def detect_language(text: str) -> str:
     """
     Detect the language of the given text.
@@ -51,13 +143,107 @@ def detect_language(text: str) -> str:
     Raises:
         ValueError: If the Google Cloud API key from the settings is not valid.
     """
-    client = build("translate", "v2", developerKey=_validate_google_cloud_api_key())
+    client = get_translate_client(_validate_google_cloud_api_key())
 
     response = client.detections().list(q=text).execute()
 
     return response["detections"][0][0]["language"]
 
 
+@lru_cache(maxsize=None)
+def get_text_to_speech_client(api_key: str) -> TextToSpeechClient:
+    # gRPC clients are thread-safe, so one is shared by all the synthesis threads
+    return TextToSpeechClient(client_options={"api_key": api_key})
+
+
+def get_translate_client(api_key: str):
+    # Building the service reads the discovery document, so it is done once per thread
+    clients = getattr(_translate_clients, "by_api_key", None)
+    if clients is None:
+        clients = _translate_clients.by_api_key = {}
+
+    if api_key not in clients:
+        clients[api_key] = build("translate", "v2", developerKey=api_key)
+
+    return clients[api_key]
+
+
+def get_synthesis_cache_key(message_id: str, text: str, voice: str | None = None) -> str:
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(
+        f"{message_id}:{text_hash}:{voice or AUTO_VOICE}".encode("utf-8")
+    ).hexdigest()
+
+
+def get_cached_synthesis(cache_key: str) -> bytes | None:
+    path = os.path.join(_get_synthesis_cache_dir(), f"{cache_key}.mp3")
+
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def put_cached_synthesis(cache_key: str, audio: bytes) -> None:
+    cache_dir = _get_synthesis_cache_dir()
+    path = os.path.join(cache_dir, f"{cache_key}.mp3")
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as f:
+            f.write(audio)
+        os.replace(f.name, path)
+        _evict_cached_synthesis(cache_dir)
+    except OSError as e:
+        logger.warning(event="[Synthesizer] Error writing synthesis cache", error=str(e))
+
+
+def _evict_cached_synthesis(cache_dir: str) -> None:
+    files = [
+        entry for entry in os.scandir(cache_dir) if entry.name.endswith(".mp3")
+    ]
+    if len(files) <= MAX_CACHED_AUDIO_FILES:
+        return
+
+    files.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in files[: len(files) - MAX_CACHED_AUDIO_FILES]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _get_synthesis_cache_dir() -> str:
+    google_cloud = Settings().google_cloud
+    if google_cloud and google_cloud.synthesis_cache_dir:
+        return google_cloud.synthesis_cache_dir
+
+    return os.path.join(tempfile.gettempdir(), SYNTHESIS_CACHE_DIR_NAME)
+
+
+def _split_long_sentence(sentence: str, max_characters: int) -> Iterator[str]:
+    if len(sentence) <= max_characters:
+        if sentence:
+            yield sentence
+        return
+
+    current_part = []
+    current_length = 0
+    for word in sentence.split():
+        if current_part and current_length + len(word) + 1 > max_characters:
+            yield " ".join(current_part)
+            current_part = []
+            current_length = 0
+
+        current_part.append(word)
+        current_length += len(word) + 1
+
+    if current_part:
+        yield " ".join(current_part)
+
+
 def _validate_google_cloud_api_key() -> str:
     """
     Validates the Google Cloud API key from the settings.
@@ -0,0 +1,357 @@
+import functools
+import inspect
+import json
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable
+from uuid import uuid4
+
+from backend.config.settings import Settings
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+_exporters: list["SpanExporter"] = []
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Timing of one stage of a request, nested under the span that was current when it started.
+
+    Use it as a context manager, the span ends when the block exits. Events mark points
+    in time within the span, e.g. the first token of an upstream stream.
+    """
+
+    def __init__(self, name: str, trace_id: str | None = None, **attributes: Any):
+        self.parent = _current_span.get()
+        self.name = name
+        self.span_id = uuid4().hex[:16]
+        self.trace_id = trace_id or (self.parent.trace_id if self.parent else uuid4().hex)
+        self.parent_id = self.parent.span_id if self.parent else None
+        self.attributes = attributes
+        self.events: list[tuple[str, float]] = []
+        self.start_time = 0.0
+        self.duration_seconds = 0.0
+        self.error: str | None = None
+        # Per exporter data, e.g. the exporter's own span object
+        self.exporter_state: dict[Any, Any] = {}
+        self._start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start()
+        # Set rather than reset with a token: async generators can resume in another context
+        _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if _current_span.get() is self:
+            _current_span.set(self.parent)
+        self.end(exc_type)
+
+    def start(self) -> "Span":
+        """Starts the span without making it the parent of spans started after it"""
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        _notify("on_start", self)
+        return self
+
+    def end(self, exc_type: type[BaseException] | None = None) -> None:
+        self.duration_seconds = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _notify("on_end", self)
+
+    def add_event(self, name: str) -> None:
+        self.events.append((name, time.perf_counter() - self._start))
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_seconds": self.duration_seconds,
+            "attributes": self.attributes,
+            "events": [
+                {"name": name, "offset_seconds": offset} for name, offset in self.events
+            ],
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled, so instrumented code costs a function call"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        pass
+
+    def start(self) -> "_NoopSpan":
+        return self
+
+    def end(self, exc_type: type[BaseException] | None = None) -> None:
+        pass
+
+    def add_event(self, name: str) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter:
+    """Base for span exporters, notified when spans start and end"""
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        """Exports the spans that are still buffered"""
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps ended spans in memory, for tests"""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def on_end(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def get_span_names(self) -> list[str]:
+        return [span.name for span in self.spans]
+
+
+class JSONSpanExporter(SpanExporter):
+    """
+    Appends ended spans to a file, one JSON object per line.
+
+    Spans are written in batches by a writer thread, so the event loop never waits on the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._spans: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+        self._writer = threading.Thread(
+            target=self._write, name="span-writer", daemon=True
+        )
+        self._writer.start()
+
+    def on_end(self, span: Span) -> None:
+        if self._writer.is_alive():
+            self._spans.put(span.to_dict())
+
+    def shutdown(self) -> None:
+        self._spans.put(None)
+        self._writer.join()
+
+    def _write(self) -> None:
+        try:
+            with open(self.path, "a") as f:
+                while True:
+                    batch = [self._spans.get()]
+                    while not self._spans.empty():
+                        batch.append(self._spans.get())
+
+                    for span in batch:
+                        if span is not None:
+                            f.write(json.dumps(span, default=str) + "\n")
+                    f.flush()
+
+                    if None in batch:
+                        return
+        except OSError as e:
+            logger.warning(event="[Tracing] Error writing spans", error=str(e))
+
+
+class OpenTelemetrySpanExporter(SpanExporter):
+    """
+    Mirrors spans to OpenTelemetry, using the globally configured tracer provider.
+
+    Requires the opentelemetry-api package.
+    """
+
+    def __init__(self, tracer_name: str = "cohere-toolkit"):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = trace.get_tracer(tracer_name)
+
+    def on_start(self, span: Span) -> None:
+        context = None
+        if span.parent is not None and self in span.parent.exporter_state:
+            context = self._trace.set_span_in_context(span.parent.exporter_state[self])
+
+        span.exporter_state[self] = self.tracer.start_span(
+            span.name,
+            context=context,
+            start_time=int(span.start_time * 1e9),
+        )
+
+    def on_end(self, span: Span) -> None:
+        otel_span = span.exporter_state.pop(self, None)
+        if otel_span is None:
+            return
+
+        start_ns = int(span.start_time * 1e9)
+        for key, value in span.attributes.items():
+            otel_span.set_attribute(key, value if _is_otel_value(value) else str(value))
+        for name, offset in span.events:
+            otel_span.add_event(name, timestamp=start_ns + int(offset * 1e9))
+        if span.error:
+            otel_span.set_attribute("error.type", span.error)
+        otel_span.end(end_time=start_ns + int(span.duration_seconds * 1e9))
+
+
+def span(name: str, trace_id: str | None = None, **attributes: Any) -> Span | _NoopSpan:
+    """
+    Starts timing a stage, as a context manager.
+
+    Args:
+        name (str): Stage name, e.g. "chat.rerank_and_chunk".
+        trace_id (str): Optional trace ID for root spans, e.g. the request's trace ID.
+            Nested spans use the trace ID of their parent.
+        **attributes (Any): Span attributes.
+
+    Returns:
+        Span | _NoopSpan: The span, or a no-op span if tracing is disabled.
+    """
+    if not _exporters:
+        return NOOP_SPAN
+
+    return Span(name, trace_id=trace_id, **attributes)
+
+
+def start_span(
+    name: str, trace_id: str | None = None, **attributes: Any
+) -> Span | _NoopSpan:
+    """
+    Starts timing a stage that spans yields of a generator, it must be ended with end().
+
+    Unlike span(), the span doesn't become the parent of spans started by the
+    consumer of the generator while it is running.
+
+    Args:
+        name (str): Stage name.
+        trace_id (str): Optional trace ID for root spans.
+        **attributes (Any): Span attributes.
+
+    Returns:
+        Span | _NoopSpan: The started span, or a no-op span if tracing is disabled.
+    """
+    if not _exporters:
+        return NOOP_SPAN
+
+    return Span(name, trace_id=trace_id, **attributes).start()
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator timing every call of a function as a span.
+
+    The span's trace ID is the request's if the function has a ctx argument.
+
+    Args:
+        name (str): Stage name.
+
+    Returns:
+        Callable[[Callable], Callable]: The decorator.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _exporters:
+                return function(*args, **kwargs)
+
+            ctx = signature.bind_partial(*args, **kwargs).arguments.get("ctx")
+            trace_id = ctx.get_trace_id() if ctx is not None else None
+            with span(name, trace_id=trace_id):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_tracing(exporters: list[SpanExporter]) -> None:
+    """
+    Replaces the span exporters, the previous ones are shut down.
+
+    Args:
+        exporters (list[SpanExporter]): Span exporters, tracing is disabled if empty.
+    """
+    previous_exporters = [
+        exporter for exporter in _exporters if exporter not in exporters
+    ]
+    _exporters[:] = exporters
+    for exporter in previous_exporters:
+        exporter.shutdown()
+
+
+def shutdown_tracing() -> None:
+    """Disables tracing, exporting the spans that are still buffered"""
+    configure_tracing([])
+
+
+def configure_tracing_from_settings() -> None:
+    """
+    Configures the span exporter from the tracing settings, tracing stays disabled
+    if no exporter is configured.
+    """
+    tracing = Settings().tracing
+    exporter = tracing.exporter if tracing else None
+
+    if exporter == "json" and tracing.json_path:
+        configure_tracing([JSONSpanExporter(tracing.json_path)])
+    elif exporter == "opentelemetry":
+        try:
+            configure_tracing([OpenTelemetrySpanExporter()])
+        except ImportError:
+            logger.warning(
+                event="[Tracing] opentelemetry-api is not installed, tracing is disabled"
+            )
+    elif exporter:
+        logger.warning(event=f"[Tracing] Unknown or incomplete exporter: {exporter}")
+
+
+def add_span_exporter(exporter: SpanExporter) -> None:
+    if exporter not in _exporters:
+        _exporters.append(exporter)
+
+
+def remove_span_exporter(exporter: SpanExporter) -> None:
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+def _notify(method: str, span: Span) -> None:
+    for exporter in _exporters:
+        try:
+            getattr(exporter, method)(span)
+        except Exception as e:
+            logger.warning(
+                event="[Tracing] Error exporting span", span=span.name, error=str(e)
+            )
+
+
+def _is_otel_value(value: Any) -> bool:
+    return isinstance(value, (str, bool, int, float))
@@ -1,4 +1,4 @@
-import io
+from typing import BinaryIO
 
 from fastapi import Request
 from pypdf import PdfReader
@@ -23,16 +23,16 @@ def get_header_value(headers: list, keys: list) -> str:
     return ""
 
 
-def read_pdf(file_contents: bytes) -> str:
+def read_pdf(file: BinaryIO) -> str:
     """Reads the text from a PDF file using PyPDF2
 
     Args:
-        file_contents (bytes): The file contents
+        file (BinaryIO): The file
 
     Returns:
         str: The text extracted from the PDF
     """
-    pdf_reader = PdfReader(io.BytesIO(file_contents))
+    pdf_reader = PdfReader(file)
     text = ""
 
     # Extract text from each page
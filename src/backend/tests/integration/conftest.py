@@ -18,6 +18,7 @@ from backend.main import app, create_app
 from backend.schemas.deployment import Deployment as DeploymentSchema
 from backend.schemas.organization import Organization
 from backend.schemas.user import User
+from backend.services.auth.token_cache import clear_token_caches
 from backend.tests.unit.factories import get_factory
 
 DATABASE_URL = os.environ["DATABASE_URL"]
@@ -28,6 +29,16 @@ def client():
     yield TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def reset_token_caches():
+    """
+    Clears the process-wide JWT and blacklist caches so tests don't share tokens
+    """
+    clear_token_caches()
+    yield
+    clear_token_caches()
+
+
 @pytest.fixture(scope="function")
 def engine() -> Generator[Any, None, None]:
     """
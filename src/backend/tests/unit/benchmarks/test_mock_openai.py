@@ -0,0 +1,59 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.benchmarks.load import percentile
+from backend.benchmarks.mock_openai import MockOpenAIConfig, create_mock_openai_app
+
+
+def get_streamed_text(response) -> str:
+    text = ""
+    for line in response.iter_lines():
+        if not line.startswith("data: ") or line == "data: [DONE]":
+            continue
+        text += json.loads(line[len("data: ") :])["choices"][0]["delta"].get(
+            "content", ""
+        )
+    return text
+
+
+def test_mock_openai_streams_tokens():
+    client = TestClient(
+        create_mock_openai_app(
+            MockOpenAIConfig(tokens_per_second=1000, response_tokens=3)
+        )
+    )
+
+    with client.stream(
+        "POST",
+        "/v1/chat/completions",
+        json={"stream": True, "messages": [{"role": "user", "content": "Hi"}]},
+    ) as response:
+        assert get_streamed_text(response) == "lorem lorem lorem "
+
+
+def test_mock_openai_emits_tool_call_before_tool_results():
+    client = TestClient(
+        create_mock_openai_app(MockOpenAIConfig(tokens_per_second=1000, tool_call_rate=1))
+    )
+    request = {"stream": True, "messages": [{"role": "user", "content": "Hi"}]}
+
+    with client.stream("POST", "/v1/chat/completions", json=request) as response:
+        tool_call = get_streamed_text(response)
+
+    request["messages"].append(
+        {"role": "user", "content": "Here's the tool response: 42"}
+    )
+    with client.stream("POST", "/v1/chat/completions", json=request) as response:
+        answer = get_streamed_text(response)
+
+    assert '"name": "toolkit_calculator"' in tool_call
+    assert answer.startswith("lorem")
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) is None
@@ -5,7 +5,7 @@ from unittest.mock import patch
 import pytest
 from fastapi import HTTPException
 
-from backend.chat.custom.tool_calls import async_call_tools
+from backend.chat.custom.tool_calls import StreamedToolCalls, async_call_tools
 from backend.config.tools import AVAILABLE_TOOLS, ToolName
 from backend.schemas.tool import ManagedTool
 from backend.services.context import Context
@@ -154,3 +154,92 @@ def test_async_call_tools_failure_and_success() -> None:
             "call": {"name": "toolkit_calculator", "parameters": {"expression": "6*7"}},
             "outputs": [{"result": 42}],
         } in results
+
+
+def test_streamed_tool_calls_run_before_results_are_awaited() -> None:
+    started = []
+
+    class MockCalculator(BaseTool):
+        NAME = "toolkit_calculator"
+
+        async def call(
+            self, parameters: dict, ctx: Any, **kwargs: Any
+        ) -> List[Dict[str, Any]]:
+            started.append(parameters["expression"])
+            await asyncio.sleep(0.01 * parameters["delay"])
+            return [{"result": parameters["expression"]}]
+
+    async def stream_tool_calls():
+        tool_calls = StreamedToolCalls(MockCohereDeployment(), Context())
+        tool_calls.start(
+            [
+                {"name": "toolkit_calculator", "parameters": {"expression": "a", "delay": 2}},
+                {"name": "toolkit_calculator", "parameters": {"expression": "b", "delay": 1}},
+            ]
+        )
+        # The rest of the model stream is read meanwhile
+        await asyncio.sleep(0)
+        assert started == ["a", "b"]
+        return await tool_calls.results()
+
+    MOCKED_TOOLS = {ToolName.Calculator: ManagedTool(implementation=MockCalculator)}
+    with patch.dict(AVAILABLE_TOOLS, MOCKED_TOOLS):
+        results = asyncio.run(stream_tool_calls())
+
+    assert [result["outputs"] for result in results] == [
+        [{"result": "a"}],
+        [{"result": "b"}],
+    ]
+
+
+def test_streamed_tool_calls_cancel() -> None:
+    finished = []
+
+    class MockCalculator(BaseTool):
+        NAME = "toolkit_calculator"
+
+        async def call(
+            self, parameters: dict, ctx: Any, **kwargs: Any
+        ) -> List[Dict[str, Any]]:
+            await asyncio.sleep(1)
+            finished.append(parameters)
+            return [{"result": 42}]
+
+    async def cancel_tool_calls():
+        tool_calls = StreamedToolCalls(MockCohereDeployment(), Context())
+        tool_calls.start([{"name": "toolkit_calculator", "parameters": {}}])
+        task = tool_calls.tasks[0]
+        await asyncio.sleep(0)
+        tool_calls.cancel()
+        await asyncio.sleep(0)
+        return task
+
+    MOCKED_TOOLS = {ToolName.Calculator: ManagedTool(implementation=MockCalculator)}
+    with patch.dict(AVAILABLE_TOOLS, MOCKED_TOOLS):
+        task = asyncio.run(cancel_tool_calls())
+
+    assert task.cancelled()
+    assert finished == []
+
+
+@patch("backend.chat.custom.tool_calls.TIMEOUT_SECONDS", 1)
+def test_streamed_tool_calls_timeout() -> None:
+    class MockCalculator(BaseTool):
+        NAME = "toolkit_calculator"
+
+        async def call(
+            self, parameters: dict, ctx: Any, **kwargs: Any
+        ) -> List[Dict[str, Any]]:
+            await asyncio.sleep(3)
+            return [{"result": 42}]
+
+    async def wait_for_tool_calls():
+        tool_calls = StreamedToolCalls(MockCohereDeployment(), Context())
+        tool_calls.start([{"name": "toolkit_calculator", "parameters": {}}])
+        return await tool_calls.results()
+
+    MOCKED_TOOLS = {ToolName.Calculator: ManagedTool(implementation=MockCalculator)}
+    with patch.dict(AVAILABLE_TOOLS, MOCKED_TOOLS):
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(wait_for_tool_calls())
+        assert excinfo.value.status_code == 500
@@ -1,5 +1,6 @@
 from unittest.mock import Mock
 
+from backend.benchmarks.import_time import measure_import
 from backend.config.deployments import (
     get_default_deployment,
 )
@@ -11,3 +12,10 @@ from backend.tests.unit.model_deployments.mock_deployments.mock_cohere_platform
 def test_get_default_deployment(mock_available_model_deployments: Mock) -> None:
     default_deployment = get_default_deployment()
     assert isinstance(default_deployment, MockCohereDeployment)
+
+
+def test_importing_main_does_no_network_io() -> None:
+    measurement = measure_import("backend.main")
+
+    assert measurement["error"] is None
+    assert measurement["network_attempts"] == []
@@ -16,6 +16,9 @@ from backend.main import app, create_app
 from backend.schemas.deployment import Deployment
 from backend.schemas.organization import Organization
 from backend.schemas.user import User
+from backend.services.auth.token_cache import clear_token_caches
+from backend.services.auth.tool_auth import clear_tool_auth_statuses
+from backend.services.catalog import get_catalog
 from backend.tests.unit.factories import get_factory
 
 DATABASE_URL = os.environ["DATABASE_URL"]
@@ -26,6 +29,36 @@ def client():
     yield TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def reset_token_caches():
+    """
+    Clears the process-wide JWT and blacklist caches so tests don't share tokens
+    """
+    clear_token_caches()
+    yield
+    clear_token_caches()
+
+
+@pytest.fixture(autouse=True)
+def reset_tool_auth_statuses():
+    """
+    Clears the process-wide cache of the users' tool auth statuses
+    """
+    clear_tool_auth_statuses()
+    yield
+    clear_tool_auth_statuses()
+
+
+@pytest.fixture(autouse=True)
+def reset_catalog():
+    """
+    Drops the deployment catalog, as the deployments of a test are rolled back after it
+    """
+    get_catalog().invalidate()
+    yield
+    get_catalog().invalidate()
+
+
 @pytest.fixture(scope="function")
 def engine() -> Generator[Any, None, None]:
     """
@@ -119,6 +119,77 @@ def test_update_conversation(session, user):
     assert conversation.description == new_conversation_data.description
 
 
+def test_search_conversations_ranks_title_matches_first(session, user):
+    message_match = get_factory("Conversation", session).create(
+        title="Weekend plans", user_id=user.id
+    )
+    _ = get_factory("Message", session).create(
+        conversation_id=message_match.id,
+        user_id=user.id,
+        text="Where can I see rainbows?",
+        position=0,
+        is_active=True,
+    )
+    conversation_crud.index_conversation_messages(
+        session, message_match.id, user.id, position=0
+    )
+    title_match = get_factory("Conversation", session).create(
+        title="The colors of the rainbow", user_id=user.id
+    )
+    _ = get_factory("Conversation", session).create(
+        title="Unrelated", user_id=user.id
+    )
+
+    conversations = conversation_crud.search_conversations(
+        session, user_id=user.id, query="rainbow"
+    )
+
+    assert [c.id for c in conversations] == [title_match.id, message_match.id]
+
+
+def test_search_conversations_with_pagination_and_agent_id(session, user):
+    agent = get_factory("Agent", session).create(user=user)
+    for i in range(3):
+        _ = get_factory("Conversation", session).create(
+            title=f"Rainbow {i}", user_id=user.id, agent_id=agent.id
+        )
+    _ = get_factory("Conversation", session).create(title="Rainbow", user_id=user.id)
+
+    conversations = conversation_crud.search_conversations(
+        session, user_id=user.id, query="rainbow", offset=1, limit=5, agent_id=agent.id
+    )
+
+    assert len(conversations) == 2
+    assert all(c.agent_id == agent.id for c in conversations)
+
+
+def test_index_conversation_messages_rebuilds_index(session, user):
+    conversation = get_factory("Conversation", session).create(
+        title="Hello", user_id=user.id
+    )
+    message = get_factory("Message", session).create(
+        conversation_id=conversation.id,
+        user_id=user.id,
+        text="Tell me about volcanoes",
+        position=0,
+        is_active=True,
+    )
+    conversation_crud.index_conversation_messages(
+        session, conversation.id, user.id, position=0
+    )
+    assert conversation_crud.search_conversations(
+        session, user_id=user.id, query="volcano"
+    )
+
+    message.is_active = False
+    session.commit()
+    conversation_crud.index_conversation_messages(session, conversation.id, user.id)
+
+    assert not conversation_crud.search_conversations(
+        session, user_id=user.id, query="volcano"
+    )
+
+
 def test_delete_conversation(session, user):
     conversation = get_factory("Conversation", session).create(user_id=user.id)
 
@@ -2,6 +2,10 @@ import pytest
 
 from backend.crud import file as file_crud
 from backend.database_models.file import File
+from backend.database_models.file_content import (
+    FILE_CONTENT_SEGMENT_SIZE,
+    FileContentSegment,
+)
 from backend.tests.unit.factories import get_factory
 
 
@@ -115,3 +119,45 @@ def test_delete_file(session, user):
 
     file_crud.delete_file(session, file.id, user.id)
     assert file_crud.get_file(session, file.id, user.id) is None
+
+
+def test_file_content_is_stored_in_compressed_segments(session, user):
+    content = "lorem ipsum " * FILE_CONTENT_SEGMENT_SIZE
+    file = file_crud.create_file(
+        session, File(file_name="test.txt", file_content=content, user_id=user.id)
+    )
+    session.expire_all()
+
+    segments = (
+        session.query(FileContentSegment)
+        .filter(FileContentSegment.file_id == file.id)
+        .all()
+    )
+    assert len(segments) == len(content) // FILE_CONTENT_SEGMENT_SIZE
+    assert sum(len(segment.data) for segment in segments) < len(content)
+
+    file = file_crud.get_file(session, file.id, user.id)
+    assert file.word_count == 2 * FILE_CONTENT_SEGMENT_SIZE
+    assert file.file_content == content
+
+
+def test_get_file_content_range(session, user):
+    content = "".join(str(i % 10) for i in range(3 * FILE_CONTENT_SEGMENT_SIZE))
+    file = get_factory("File", session).create(file_content=content, user_id=user.id)
+
+    start = FILE_CONTENT_SEGMENT_SIZE - 5
+    end = 2 * FILE_CONTENT_SEGMENT_SIZE + 5
+    assert file_crud.get_file_content_range(session, file.id, start, end) == (
+        content[start:end]
+    )
+    assert file_crud.get_file_content_range(session, file.id, 0, 10) == content[:10]
+    assert file_crud.get_file_content_range(
+        session, file.id, len(content) - 3, len(content) + 10
+    ) == content[-3:]
+
+
+def test_get_file_content_range_of_empty_file(session, user):
+    file = get_factory("File", session).create(user_id=user.id)
+
+    assert file.file_content == ""
+    assert file_crud.get_file_content_range(session, file.id, 0, 10) == ""
@@ -0,0 +1,381 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import openai
+import pytest
+from openai import OpenAI
+
+from backend.config.settings import OpenAIEndpointSettings
+from backend.model_deployments import endpoint_pool
+from backend.model_deployments.endpoint_pool import (
+    EWMA_LATENCY,
+    Endpoint,
+    EndpointPool,
+)
+from backend.model_deployments.open_ai import (
+    OPENAI_API_KEY_ENV_VAR,
+    OPENAI_URL_ENV_VAR,
+    OpenAIDeployment,
+)
+from backend.services.metrics import ENDPOINT_HEDGES
+
+
+class StubServer:
+    """OpenAI-compatible server answering chat completions with a fixed text."""
+
+    def __init__(self, text="Hello", status=200, delay=0.0):
+        self.text = text
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._send_json({"object": "list", "data": []})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests += 1
+                time.sleep(stub.delay)
+                if stub.status != 200:
+                    self._send_json({"error": {"message": "Unavailable"}}, stub.status)
+                elif body.get("stream"):
+                    self._send_stream()
+                else:
+                    self._send_json(stub.completion())
+
+            def _send_json(self, data, status=200):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for word in stub.text.split():
+                    chunk = stub.chunk(word)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def completion(self):
+        return {
+            "id": "completion",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "model",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.text},
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+
+    def chunk(self, text):
+        return {
+            "id": "completion",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "model",
+            "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+        }
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_servers():
+    servers = []
+
+    def create(**kwargs):
+        server = StubServer(**kwargs)
+        servers.append(server)
+        return server
+
+    yield create
+    for server in servers:
+        server.close()
+
+
+def get_closed_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def get_endpoint(url, weight=1.0):
+    return Endpoint(
+        url=url,
+        client=OpenAI(api_key="test", base_url=url, max_retries=0, timeout=5),
+        weight=weight,
+    )
+
+
+def send_chat(client):
+    return client.chat.completions.create(
+        model="model", messages=[{"role": "user", "content": "Hi"}]
+    )
+
+
+def open_chat_stream(client):
+    return client.chat.completions.create(
+        model="model", messages=[{"role": "user", "content": "Hi"}], stream=True
+    )
+
+
+def test_pick_prefers_least_outstanding_requests_relative_to_weight():
+    light = Endpoint(url="light", client=None, weight=1)
+    heavy = Endpoint(url="heavy", client=None, weight=3)
+    pool = EndpointPool([light, heavy])
+
+    heavy.outstanding = 3
+    assert pool.pick() is light
+
+    light.outstanding = 1
+    assert pool.pick() is heavy
+    assert pool.pick(exclude=[heavy]) is light
+    assert pool.pick(exclude=[light, heavy]) is None
+
+
+def test_pick_prefers_lower_ewma_latency():
+    slow = Endpoint(url="slow", client=None)
+    fast = Endpoint(url="fast", client=None)
+    pool = EndpointPool([slow, fast], strategy=EWMA_LATENCY)
+
+    pool.record_success(slow, 2.0)
+    pool.record_success(fast, 0.5)
+    assert pool.pick() is fast
+
+    pool.record_success(fast, 10.0)
+    assert fast.latency == pytest.approx(0.3 * 10.0 + 0.7 * 0.5)
+    assert pool.pick() is slow
+
+
+def test_circuit_breaker_ejects_failing_endpoint():
+    failing = Endpoint(url="failing", client=None)
+    healthy = Endpoint(url="healthy", client=None)
+    pool = EndpointPool([failing, healthy], failure_threshold=2, ejection_seconds=60)
+    healthy.outstanding = 10
+
+    pool.record_failure(failing)
+    assert pool.pick() is failing
+
+    pool.record_failure(failing)
+    assert pool.pick() is healthy
+    # Ejected endpoints are still used when there's no other one
+    assert pool.pick(exclude=[healthy]) is failing
+
+    pool.record_success(failing)
+    assert pool.pick() is failing
+
+
+@pytest.mark.asyncio
+async def test_request_fails_over_to_next_endpoint(stub_servers):
+    server = stub_servers(text="Hello there")
+    down = get_endpoint(get_closed_url(), weight=10)
+    up = get_endpoint(server.url)
+    pool = EndpointPool([down, up])
+
+    response = await pool.request(send_chat)
+
+    assert response.choices[0].message.content == "Hello there"
+    assert down.consecutive_failures == 1
+    assert up.consecutive_failures == 0
+    assert down.outstanding == up.outstanding == 0
+
+
+@pytest.mark.asyncio
+async def test_request_does_not_fail_over_client_errors(stub_servers):
+    invalid = stub_servers(status=400)
+    other = stub_servers()
+    pool = EndpointPool([get_endpoint(invalid.url, weight=10), get_endpoint(other.url)])
+
+    with pytest.raises(openai.BadRequestError):
+        await pool.request(send_chat)
+
+    assert other.requests == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_before_first_event(stub_servers):
+    failing = stub_servers(status=503)
+    server = stub_servers(text="Hello there")
+    pool = EndpointPool([get_endpoint(failing.url, weight=10), get_endpoint(server.url)])
+
+    events = [event async for event in pool.stream(open_chat_stream)]
+
+    assert [event.choices[0].delta.content for event in events] == ["Hello", "there"]
+    assert failing.requests == 1
+    assert pool.endpoints[1].latency is not None
+
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_slow_first_event(stub_servers):
+    slow = stub_servers(text="Slow", delay=1.0)
+    fast = stub_servers(text="Fast")
+    pool = EndpointPool(
+        [get_endpoint(slow.url, weight=10), get_endpoint(fast.url)],
+        first_event_timeout_seconds=0.2,
+    )
+
+    events = [event async for event in pool.stream(open_chat_stream)]
+
+    assert [event.choices[0].delta.content for event in events] == ["Fast"]
+    assert pool.endpoints[0].consecutive_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_raises_when_all_endpoints_fail():
+    pool = EndpointPool([get_endpoint(get_closed_url()), get_endpoint(get_closed_url())])
+
+    with pytest.raises(openai.APIConnectionError):
+        [event async for event in pool.stream(open_chat_stream)]
+
+    assert all(endpoint.outstanding == 0 for endpoint in pool.endpoints)
+
+
+@pytest.mark.asyncio
+async def test_health_checks_record_latency_and_failures(stub_servers):
+    server = stub_servers()
+    up = get_endpoint(server.url)
+    down = get_endpoint(get_closed_url())
+    pool = EndpointPool([up, down], failure_threshold=1)
+
+    await pool.check_health()
+
+    assert up.latency is not None
+    assert down.is_ejected(time.monotonic())
+
+
+@pytest.mark.asyncio
+async def test_deployment_uses_configured_endpoints(stub_servers, monkeypatch):
+    servers = [stub_servers(text="First"), stub_servers(text="Second")]
+    monkeypatch.setattr(
+        OpenAIDeployment,
+        "default_endpoints",
+        [OpenAIEndpointSettings(url=server.url) for server in servers],
+    )
+    monkeypatch.setattr(OpenAIDeployment, "default_use_legacy_api", False)
+    monkeypatch.setattr(OpenAIDeployment, "default_endpoint", "http://configured")
+    monkeypatch.setattr(OpenAIDeployment, "default_api_key", "key")
+    monkeypatch.setattr(endpoint_pool, "_pools", {})
+
+    deployment = OpenAIDeployment()
+
+    assert [endpoint.url for endpoint in deployment.pool.endpoints] == [
+        server.url for server in servers
+    ]
+    assert await deployment.complete("Hi", ctx=None, model="model") in ("First", "Second")
+
+
+def test_deployment_overrides_do_not_share_pools(monkeypatch):
+    monkeypatch.setattr(endpoint_pool, "_pools", {})
+    monkeypatch.setattr(OpenAIDeployment, "default_endpoint", "http://configured")
+    monkeypatch.setattr(OpenAIDeployment, "default_api_key", "key")
+
+    assert OpenAIDeployment().pool is OpenAIDeployment().pool
+
+    for override in (
+        {OPENAI_API_KEY_ENV_VAR: "request-key"},
+        {OPENAI_URL_ENV_VAR: "http://request"},
+    ):
+        ctx = SimpleNamespace(model_config=override)
+        assert OpenAIDeployment(ctx=ctx).pool is not OpenAIDeployment(ctx=ctx).pool
+
+    assert len(endpoint_pool._pools) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_stream_is_hedged_to_another_endpoint(stub_servers):
+    slow = stub_servers(text="Slow", delay=1.0)
+    fast = stub_servers(text="Fast")
+    pool = EndpointPool(
+        [get_endpoint(slow.url, weight=10), get_endpoint(fast.url)],
+        deployment="Test",
+        hedging=True,
+        hedge_initial_delay_seconds=0.1,
+        hedge_budget_ratio=1,
+    )
+    won = ENDPOINT_HEDGES.get(deployment="Test", outcome="won")
+
+    events = [event async for event in pool.stream(open_chat_stream)]
+
+    assert [event.choices[0].delta.content for event in events] == ["Fast"]
+    assert (slow.requests, fast.requests) == (1, 1)
+    assert ENDPOINT_HEDGES.get(deployment="Test", outcome="won") == won + 1
+    # The slower request is cancelled, not counted as a failure
+    assert pool.endpoints[0].consecutive_failures == 0
+    assert all(endpoint.outstanding == 0 for endpoint in pool.endpoints)
+    assert pool.hedge_rate() == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_stream_is_not_hedged(stub_servers):
+    first = stub_servers(text="First")
+    second = stub_servers(text="Second")
+    pool = EndpointPool(
+        [get_endpoint(first.url, weight=10), get_endpoint(second.url)],
+        hedging=True,
+        hedge_initial_delay_seconds=1,
+        hedge_budget_ratio=1,
+    )
+
+    events = [event async for event in pool.stream(open_chat_stream)]
+
+    assert [event.choices[0].delta.content for event in events] == ["First"]
+    assert second.requests == 0
+    assert pool.hedge_rate() == 0
+
+
+@pytest.mark.asyncio
+async def test_hedges_are_capped_by_budget(stub_servers):
+    slow = stub_servers(text="Slow", delay=0.3)
+    other = stub_servers(text="Other")
+    pool = EndpointPool(
+        [get_endpoint(slow.url, weight=10), get_endpoint(other.url)],
+        deployment="Test",
+        hedging=True,
+        hedge_initial_delay_seconds=0.05,
+        hedge_budget_ratio=0,
+    )
+    over_budget = ENDPOINT_HEDGES.get(deployment="Test", outcome="over_budget")
+
+    events = [event async for event in pool.stream(open_chat_stream)]
+
+    assert [event.choices[0].delta.content for event in events] == ["Slow"]
+    assert other.requests == 0
+    assert ENDPOINT_HEDGES.get(deployment="Test", outcome="over_budget") == over_budget + 1
+
+
+def test_hedge_delay_is_a_percentile_of_first_event_latencies():
+    pool = EndpointPool(
+        [Endpoint(url="first", client=None), Endpoint(url="second", client=None)],
+        hedging=True,
+        hedge_percentile=90,
+        hedge_initial_delay_seconds=2,
+    )
+    assert pool.hedge_delay() == 2
+
+    pool._first_event_latencies.extend(i / 100 for i in range(1, 101))
+
+    assert pool.hedge_delay() == pytest.approx(0.91)
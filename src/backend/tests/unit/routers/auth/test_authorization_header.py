@@ -6,6 +6,7 @@ from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from backend.schemas.context import Context
 from backend.services.auth.jwt import JWTService
 from backend.services.auth.request_validators import validate_authorization
 from backend.tests.unit.factories import get_factory
@@ -28,6 +29,16 @@ def test_validate_authorization_valid_token(
     assert response.status_code == 200
 
 
+def test_validate_authorization_reads_claims_from_context(session: Session):
+    token_claims = {"context": {"id": "test"}, "jti": "test_jti"}
+    ctx = Context().with_token_claims(token_claims)
+    request_mock = MagicMock(
+        headers={"Authorization": "Bearer not_decoded"}, scope={"context": ctx}
+    )
+
+    assert validate_authorization(request_mock, session) == token_claims
+
+
 def test_validate_authorization_no_authorization():
     request_mock = MagicMock(headers={})
 
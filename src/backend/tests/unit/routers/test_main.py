@@ -15,3 +15,12 @@ def test_health_ok(client: TestClient) -> None:
 
     assert response.status_code == 200
     assert response.json() == {"status": "OK"}
+
+
+def test_metrics_ok(client: TestClient) -> None:
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE toolkit_chat_streams_open gauge" in response.text
+    assert "toolkit_db_pool_size 5" in response.text
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.config.settings import AdmissionSettings
+from backend.schemas.context import Context
+from backend.services.admission import (
+    InMemoryAdmissionController,
+    admit_chat_stream_turn,
+    admit_chat_turn,
+)
+from backend.services.metrics import CHAT_ADMISSIONS
+
+
+def get_context(user_id="user", deployment_name="OpenAI"):
+    ctx = Context()
+    ctx.with_user_id(user_id)
+    ctx.with_deployment_name(deployment_name)
+    return ctx
+
+
+def get_controller(**settings):
+    return InMemoryAdmissionController(
+        AdmissionSettings(**{"max_wait_seconds": 0.2, **settings})
+    )
+
+
+@pytest.mark.asyncio
+async def test_admit_without_limits():
+    controller = get_controller()
+
+    ticket = await controller.admit(get_context())
+
+    assert ticket.slots == []
+
+
+@pytest.mark.asyncio
+async def test_admit_waits_for_in_flight_slot():
+    controller = get_controller(user_max_in_flight=1)
+    first = await controller.admit(get_context())
+
+    second = asyncio.ensure_future(controller.admit(get_context()))
+    await asyncio.sleep(0.05)
+    assert not second.done()
+    await first.release()
+
+    assert (await second).slots == ["user:user"]
+
+
+@pytest.mark.asyncio
+async def test_admit_limits_are_per_key():
+    controller = get_controller(user_max_in_flight=1)
+    await controller.admit(get_context("user"))
+
+    ticket = await controller.admit(get_context("other-user"))
+
+    assert ticket.slots == ["user:other-user"]
+
+
+@pytest.mark.asyncio
+async def test_admit_rejects_after_max_wait():
+    controller = get_controller(deployment_max_in_flight=1)
+    await controller.admit(get_context())
+    timed_out = CHAT_ADMISSIONS.get(status="timed_out")
+
+    with pytest.raises(HTTPException) as e:
+        await controller.admit(get_context("other-user"))
+
+    assert e.value.status_code == 429
+    assert e.value.headers == {"Retry-After": "1"}
+    assert CHAT_ADMISSIONS.get(status="timed_out") == timed_out + 1
+
+
+@pytest.mark.asyncio
+async def test_admit_rejects_right_away_when_queue_is_full():
+    controller = get_controller(
+        user_max_in_flight=1, max_queued=0, max_wait_seconds=30
+    )
+    await controller.admit(get_context())
+
+    with pytest.raises(HTTPException) as e:
+        await asyncio.wait_for(controller.admit(get_context()), 1)
+
+    assert e.value.status_code == 429
+    assert e.value.headers == {"Retry-After": "30"}
+
+
+@pytest.mark.asyncio
+async def test_admit_rate_limits_with_token_bucket():
+    controller = get_controller(user_requests_per_minute=60, burst_seconds=2)
+    await controller.admit(get_context())
+    await controller.admit(get_context())
+
+    with pytest.raises(HTTPException) as e:
+        await controller.admit(get_context())
+
+    assert e.value.status_code == 429
+    assert e.value.headers == {"Retry-After": "1"}
+
+
+@pytest.mark.asyncio
+async def test_rejected_turn_releases_acquired_slots():
+    controller = get_controller(user_max_in_flight=1, deployment_max_in_flight=1)
+    await controller.admit(get_context("user"))
+
+    with pytest.raises(HTTPException):
+        await controller.admit(get_context("other-user"))
+
+    # The other user's slot was released when the deployment's was unavailable
+    assert "user:other-user" not in controller._slots
+
+
+@pytest.mark.asyncio
+async def test_hold_releases_slots_when_stream_ends():
+    controller = get_controller(user_max_in_flight=1)
+    ticket = await controller.admit(get_context())
+
+    async def stream():
+        yield "a"
+        yield "b"
+
+    held = ticket.hold(stream())
+    assert ticket.is_held
+    assert await anext(held) == "a"
+    assert list(controller._slots["user:user"]) == [ticket.id]
+
+    await held.aclose()
+    assert controller._slots == {}
+
+
+@pytest.mark.asyncio
+async def test_admit_chat_turn_releases_unheld_tickets(monkeypatch):
+    controller = get_controller(user_max_in_flight=1)
+    monkeypatch.setattr(
+        "backend.services.admission.get_admission_controller", lambda: controller
+    )
+
+    dependency = admit_chat_turn(get_context())
+    ticket = await anext(dependency)
+    assert list(controller._slots["user:user"]) == [ticket.id]
+    await dependency.aclose()
+
+    assert controller._slots == {}
+
+
+@pytest.mark.asyncio
+async def test_admit_chat_stream_turn_skips_resumed_turns(monkeypatch):
+    controller = get_controller(user_max_in_flight=1)
+    monkeypatch.setattr(
+        "backend.services.admission.get_admission_controller", lambda: controller
+    )
+    await controller.admit(get_context())
+
+    dependency = admit_chat_stream_turn(get_context(), last_event_id="turn:3")
+    assert await anext(dependency) is None
+    await dependency.aclose()
+
+    dependency = admit_chat_stream_turn(get_context(), last_event_id=None)
+    with pytest.raises(HTTPException) as e:
+        await anext(dependency)
+    assert e.value.status_code == 429
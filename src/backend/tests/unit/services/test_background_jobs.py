@@ -0,0 +1,143 @@
+import pytest
+
+import backend.crud.background_job as background_job_crud
+import backend.services.background_jobs as background_jobs_module
+from backend.database_models.background_job import BackgroundJobStatus
+from backend.schemas.context import Context
+from backend.services import conversation as conversation_service
+from backend.services.background_jobs import (
+    HANDLERS,
+    run_next_background_job,
+    submit_background_job,
+)
+from backend.tests.unit.factories import get_factory
+
+
+@pytest.fixture
+def handler_calls():
+    calls = []
+
+    async def handler(session, payload, ctx):
+        calls.append((payload, ctx.get_user_id()))
+        if payload.get("fail"):
+            raise ValueError("Handler failed")
+
+    HANDLERS["test"] = handler
+    yield calls
+    HANDLERS.pop("test")
+
+
+@pytest.fixture
+def ctx(user):
+    ctx = Context()
+    ctx.with_user_id(user.id)
+    return ctx
+
+
+@pytest.mark.asyncio
+async def test_submit_background_job_queues_job_once(session, ctx, handler_calls):
+    job = await submit_background_job(session, "test", "test:1", {"id": 1}, ctx)
+    same_job = await submit_background_job(session, "test", "test:1", {"id": 1}, ctx)
+
+    assert same_job.id == job.id
+    assert job.status == BackgroundJobStatus.PENDING
+    assert job.context["user_id"] == ctx.get_user_id()
+    assert handler_calls == []
+
+
+@pytest.mark.asyncio
+async def test_submit_background_job_runs_inline_without_workers(
+    session, ctx, handler_calls, monkeypatch
+):
+    monkeypatch.setenv("BACKGROUND_JOBS_WORKERS", "0")
+
+    job = await submit_background_job(session, "test", "test:1", {"id": 1}, ctx)
+
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert handler_calls == [({"id": 1}, ctx.get_user_id())]
+
+
+@pytest.mark.asyncio
+async def test_run_next_background_job(session, ctx, handler_calls):
+    job = await submit_background_job(session, "test", "test:1", {"id": 1}, ctx)
+
+    assert await run_next_background_job(session)
+    assert not await run_next_background_job(session)
+
+    job = background_job_crud.get_background_job(session, job.id)
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert job.attempts == 1
+    assert handler_calls == [({"id": 1}, ctx.get_user_id())]
+
+
+@pytest.mark.asyncio
+async def test_failed_background_job_is_retried_until_max_attempts(
+    session, ctx, handler_calls, monkeypatch
+):
+    monkeypatch.setenv("BACKGROUND_JOBS_MAX_ATTEMPTS", "2")
+    job = await submit_background_job(session, "test", "test:1", {"fail": True}, ctx)
+
+    await run_next_background_job(session)
+
+    job = background_job_crud.get_background_job(session, job.id)
+    assert job.status == BackgroundJobStatus.PENDING
+    assert job.attempts == 1
+    assert job.error == "Handler failed"
+    # Retried after a backoff
+    assert not await run_next_background_job(session)
+
+    job.run_after = job.created_at
+    session.commit()
+    await run_next_background_job(session)
+
+    job = background_job_crud.get_background_job(session, job.id)
+    assert job.status == BackgroundJobStatus.FAILED
+    assert job.attempts == 2
+    assert len(handler_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_background_job_is_deferred(
+    session, ctx, handler_calls, monkeypatch
+):
+    async def take_deployment_token(job, settings):
+        return 5.0
+
+    monkeypatch.setattr(
+        background_jobs_module, "take_deployment_token", take_deployment_token
+    )
+    job = await submit_background_job(session, "test", "test:1", {"id": 1}, ctx)
+
+    assert await run_next_background_job(session)
+
+    job = background_job_crud.get_background_job(session, job.id)
+    assert job.status == BackgroundJobStatus.PENDING
+    assert job.attempts == 0
+    assert handler_calls == []
+
+
+@pytest.mark.asyncio
+async def test_conversation_title_job_updates_title(session, ctx, user, monkeypatch):
+    conversation = get_factory("Conversation", session).create(
+        title="New Conversation", user_id=user.id
+    )
+
+    async def generate_conversation_title(session, conversation, agent_id, ctx, model):
+        return "Generated Title", None
+
+    monkeypatch.setattr(
+        conversation_service,
+        "generate_conversation_title",
+        generate_conversation_title,
+    )
+
+    job = await conversation_service.submit_conversation_title(
+        session, conversation, None, ctx, "command-r"
+    )
+    await run_next_background_job(session)
+
+    assert background_job_crud.get_background_job(session, job.id).status == (
+        BackgroundJobStatus.SUCCEEDED
+    )
+    session.refresh(conversation)
+    assert conversation.title == "Generated Title"
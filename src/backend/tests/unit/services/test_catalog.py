@@ -0,0 +1,70 @@
+import backend.crud.agent as agent_crud
+import backend.crud.deployment as deployment_crud
+from backend.services import catalog as catalog_module
+from backend.services.catalog import get_catalog
+from backend.tests.unit.factories import get_factory
+
+
+def test_catalog_gets_deployments_by_name(session):
+    deployment = get_factory("Deployment", session).create(name="Catalog Deployment")
+
+    catalog_deployment = get_catalog().get_deployment_by_name(
+        session, "Catalog Deployment"
+    )
+
+    assert catalog_deployment.id == deployment.id
+    assert get_catalog().get_deployment_by_name(session, "Missing") is None
+
+
+def test_catalog_is_not_reloaded_without_writes(session, monkeypatch):
+    get_factory("Deployment", session).create(name="Catalog Deployment")
+    get_catalog().get_deployment_by_name(session, "Catalog Deployment")
+
+    def load(session):
+        raise AssertionError("Catalog reloaded")
+
+    monkeypatch.setattr(get_catalog(), "_load", load)
+
+    assert get_catalog().get_deployment_by_name(session, "Catalog Deployment")
+
+
+def test_catalog_is_invalidated_on_committed_writes(session):
+    deployment = get_factory("Deployment", session).create(name="Catalog Deployment")
+    assert get_catalog().get_deployment_by_name(session, "Catalog Deployment")
+
+    deployment_crud.delete_deployment(session, deployment.id)
+
+    assert get_catalog().get_deployment_by_name(session, "Catalog Deployment") is None
+
+
+def test_catalog_gets_agent_deployments(session, user):
+    agent = get_factory("Agent", session).create(user=user)
+    deployment = get_factory("Deployment", session).create()
+    model = get_factory("Model", session).create(deployment=deployment)
+    assert get_catalog().get_agent_deployments(session, agent.id) == []
+
+    agent_crud.assign_model_deployment_to_agent(
+        session, agent=agent, model_id=model.id, deployment_id=deployment.id
+    )
+
+    assert [
+        catalog_deployment.id
+        for catalog_deployment in get_catalog().get_agent_deployments(
+            session, agent.id
+        )
+    ] == [deployment.id]
+
+
+def test_catalog_invalidation_is_published_with_redis(monkeypatch):
+    published = []
+
+    class Client:
+        def publish(self, channel, message):
+            published.append(channel)
+
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379")
+    monkeypatch.setattr(catalog_module, "get_client", lambda: Client())
+
+    catalog_module.invalidate_catalog()
+
+    assert published == [catalog_module.INVALIDATION_CHANNEL]
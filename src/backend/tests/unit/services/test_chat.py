@@ -1,6 +1,9 @@
 
 import pytest
 
+from backend.chat.enums import StreamEvent
+from backend.crud import message as message_crud
+from backend.database_models.message import Message, MessageAgent
 from backend.schemas.chat import EventState
 from backend.schemas.context import Context
 from backend.services.chat import (
@@ -8,7 +11,9 @@ from backend.services.chat import (
     are_previous_actions_similar,
     check_death_loop,
     check_similarity,
+    generate_chat_stream,
 )
+from backend.tests.unit.factories import get_factory
 
 
 def test_are_previous_actions_similar():
@@ -161,3 +166,81 @@ def test_check_no_death_loop():
 
     assert new_event_state.distances_plans[-1] < max(DEATHLOOP_SIMILARITY_THRESHOLDS)
     assert new_event_state.distances_actions[-1] < max(DEATHLOOP_SIMILARITY_THRESHOLDS)
+
+
+@pytest.mark.asyncio
+async def test_generate_chat_stream_saves_interrupted_turn(session, user):
+    conversation = get_factory("Conversation", session).create(user_id=user.id)
+    response_message = Message(
+        id="response-message",
+        text="",
+        user_id=user.id,
+        conversation_id=conversation.id,
+        position=1,
+        agent=MessageAgent.CHATBOT,
+    )
+    upstream_closed = False
+
+    async def model_stream():
+        nonlocal upstream_closed
+        try:
+            yield {"event_type": StreamEvent.STREAM_START, "generation_id": "generation"}
+            for text in ["The deepest ", "trench ", "is"]:
+                yield {"event_type": StreamEvent.TEXT_GENERATION, "text": text}
+        finally:
+            upstream_closed = True
+
+    ctx = Context()
+    ctx.with_user_id(user.id)
+    ctx.with_conversation_id(conversation.id)
+    stream = generate_chat_stream(session, model_stream(), response_message, ctx=ctx)
+
+    # The client disconnects after the stream start and the first text event
+    await anext(stream)
+    await anext(stream)
+    await stream.aclose()
+
+    assert upstream_closed
+    message = message_crud.get_message(session, "response-message", user.id)
+    assert message.text == "The deepest "
+    assert message.is_interrupted
+
+
+@pytest.mark.asyncio
+async def test_generate_chat_stream_saves_completed_turn_on_disconnect(session, user):
+    conversation = get_factory("Conversation", session).create(user_id=user.id)
+    response_message = Message(
+        id="response-message",
+        text="",
+        user_id=user.id,
+        conversation_id=conversation.id,
+        position=1,
+        agent=MessageAgent.CHATBOT,
+    )
+
+    async def model_stream():
+        yield {"event_type": StreamEvent.STREAM_START, "generation_id": "generation"}
+        yield {"event_type": StreamEvent.TEXT_GENERATION, "text": "Challenger Deep"}
+        yield {
+            "event_type": StreamEvent.STREAM_END,
+            "finish_reason": "COMPLETE",
+            "response": {
+                "text": "Challenger Deep",
+                "finish_reason": "COMPLETE",
+                "chat_history": [],
+            },
+        }
+
+    ctx = Context()
+    ctx.with_user_id(user.id)
+    ctx.with_conversation_id(conversation.id)
+    stream = generate_chat_stream(session, model_stream(), response_message, ctx=ctx)
+
+    # The client disconnects after receiving the stream end, before the turn is saved
+    for _ in range(3):
+        await anext(stream)
+    await stream.aclose()
+
+    message = message_crud.get_message(session, "response-message", user.id)
+    assert message.text == "Challenger Deep"
+    assert not message.is_interrupted
@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import pytest
+
+import backend.chat.custom.utils as custom_utils
+from backend.chat.enums import StreamEvent
+from backend.model_deployments.base import BaseDeployment
+from backend.model_deployments.endpoint_pool import Endpoint, EndpointPool
+from backend.model_deployments.open_ai import OpenAIDeployment
+from backend.schemas.context import Context
+from backend.services.completion import complete_prompt
+from backend.services.conversation import TITLE_MAX_TOKENS, generate_conversation_title
+from backend.tests.unit.factories import get_factory
+
+
+class StreamDeployment(BaseDeployment):
+    rerank_enabled = False
+
+    def __init__(self):
+        self.chat_requests = []
+
+    async def invoke_chat(self, chat_request, **kwargs):
+        pass
+
+    async def invoke_chat_stream(self, chat_request, ctx, **kwargs):
+        self.chat_requests.append(chat_request)
+        yield {"event_type": StreamEvent.STREAM_START}
+        yield {"event_type": StreamEvent.TEXT_GENERATION, "text": " A "}
+        yield {"event_type": StreamEvent.TEXT_GENERATION, "text": "title "}
+        yield {"event_type": StreamEvent.STREAM_END}
+
+    async def invoke_rerank(self, query, documents, ctx, **kwargs):
+        pass
+
+
+class CompletionDeployment:
+    def __init__(self):
+        self.calls = []
+
+    async def complete(self, prompt, ctx, model=None, max_tokens=None):
+        self.calls.append((prompt, model, max_tokens))
+        return "Generated Title"
+
+
+@pytest.fixture
+def deployment(monkeypatch):
+    deployment = CompletionDeployment()
+    names = []
+
+    def get_deployment(name, ctx, **kwargs):
+        names.append(name)
+        return deployment
+
+    monkeypatch.setattr(custom_utils, "get_deployment", get_deployment)
+    deployment.names = names
+    return deployment
+
+
+@pytest.mark.asyncio
+async def test_complete_collects_chat_stream_text():
+    deployment = StreamDeployment()
+
+    text = await deployment.complete("Prompt", Context(), model="model", max_tokens=16)
+
+    assert text == "A title"
+    [chat_request] = deployment.chat_requests
+    assert chat_request.message == "Prompt"
+    assert chat_request.max_tokens == 16
+    assert chat_request.tools == []
+    assert chat_request.chat_history is None
+
+
+@pytest.mark.asyncio
+async def test_openai_complete_sends_a_single_message(monkeypatch):
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        message = SimpleNamespace(content=" Title\n")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(OpenAIDeployment, "default_endpoint", "http://configured")
+    monkeypatch.setattr(OpenAIDeployment, "default_api_key", "key")
+    deployment = OpenAIDeployment()
+    monkeypatch.setattr(deployment, "default_use_legacy_api", False)
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    deployment.pool = EndpointPool([Endpoint(url="stub", client=client)])
+
+    text = await deployment.complete("Prompt", Context(), model="model", max_tokens=16)
+
+    assert text == "Title"
+    assert requests == [
+        {
+            "model": "model",
+            "messages": [{"role": "user", "content": "Prompt"}],
+            "max_tokens": 16,
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_complete_prompt_uses_agent_deployment(session, user, deployment):
+    agent = get_factory("Agent", session).create(user=user)
+    agent_deployment = get_factory("Deployment", session).create(name="Agent Deployment")
+    model = get_factory("Model", session).create(deployment=agent_deployment)
+    get_factory("AgentDeploymentModel", session).create(
+        agent=agent, deployment=agent_deployment, model=model
+    )
+    ctx = Context()
+    ctx.with_deployment_name("Request Deployment")
+
+    await complete_prompt(session, "Prompt", ctx, agent_id=agent.id)
+    await complete_prompt(session, "Prompt", ctx)
+
+    assert deployment.names == ["Agent Deployment", "Request Deployment"]
+
+
+@pytest.mark.asyncio
+async def test_generate_conversation_title_completes_prompt(session, user, deployment):
+    conversation = get_factory("Conversation", session).create(user_id=user.id)
+    get_factory("Message", session).create(
+        conversation_id=conversation.id, user_id=user.id, text="Hello there"
+    )
+    session.refresh(conversation)
+    ctx = Context()
+    ctx.with_user_id(user.id)
+
+    title, error = await generate_conversation_title(
+        session, conversation, None, ctx, "model"
+    )
+
+    assert (title, error) == ("Generated Title", None)
+    [(prompt, model, max_tokens)] = deployment.calls
+    assert "Hello there" in prompt
+    assert (model, max_tokens) == ("model", TITLE_MAX_TOKENS)
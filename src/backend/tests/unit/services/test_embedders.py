@@ -0,0 +1,29 @@
+import numpy as np
+
+from backend.services.embedders import HashingEmbedder
+
+
+def test_hashing_embeddings_are_deterministic_unit_vectors():
+    embedder = HashingEmbedder(dimensions=64)
+
+    vectors = embedder.embed(["The quick brown fox", "The quick brown fox", ""])
+
+    assert vectors.shape == (3, 64)
+    assert vectors.dtype == np.float32
+    assert np.array_equal(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()
+
+
+def test_hashing_embeddings_of_similar_texts_are_closer():
+    embedder = HashingEmbedder()
+
+    query, similar, unrelated = embedder.embed(
+        [
+            "quarterly revenue growth",
+            "Revenue growth was strong this quarter, quarterly results show.",
+            "The cat sat on the mat near the window.",
+        ]
+    )
+
+    assert query @ similar > query @ unrelated
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from backend.services.event_log import (
+    EventLogExpiredError,
+    EventLogNotFoundError,
+    InMemoryEventLog,
+)
+
+
+async def collect(stream):
+    return [event async for event in stream]
+
+
+@pytest.mark.asyncio
+async def test_read_replays_after_offset():
+    log = InMemoryEventLog(max_events=10, retention_seconds=60)
+    await log.create("turn", "user")
+    for data in ["a", "b", "c"]:
+        await log.append("turn", data)
+    await log.close("turn")
+
+    assert await collect(log.read("turn")) == [(1, "a"), (2, "b"), (3, "c")]
+    assert await collect(log.read("turn", after_id=2)) == [(3, "c")]
+    assert await collect(log.read("turn", after_id=3)) == []
+
+
+@pytest.mark.asyncio
+async def test_read_follows_live_events_until_closed():
+    log = InMemoryEventLog(max_events=10, retention_seconds=60)
+    await log.create("turn", "user")
+    await log.append("turn", "a")
+
+    reader = asyncio.create_task(collect(log.read("turn")))
+    await asyncio.sleep(0.01)
+    await log.append("turn", "b")
+    await log.close("turn")
+
+    assert await asyncio.wait_for(reader, 1) == [(1, "a"), (2, "b")]
+
+
+@pytest.mark.asyncio
+async def test_read_raises_when_offset_was_evicted():
+    log = InMemoryEventLog(max_events=2, retention_seconds=60)
+    await log.create("turn", "user")
+    for data in ["a", "b", "c"]:
+        await log.append("turn", data)
+
+    with pytest.raises(EventLogExpiredError):
+        await collect(log.read("turn", after_id=0))
+    await log.close("turn")
+    assert await collect(log.read("turn", after_id=1)) == [(2, "b"), (3, "c")]
+
+
+@pytest.mark.asyncio
+async def test_closed_logs_expire_after_retention():
+    log = InMemoryEventLog(max_events=10, retention_seconds=0)
+    await log.create("turn", "user")
+    assert await log.get_owner("turn") == "user"
+
+    await log.close("turn")
+    await log.create("other-turn", "user")
+
+    assert await log.get_owner("turn") is None
+    with pytest.raises(EventLogNotFoundError):
+        await collect(log.read("turn"))
+
+
+@pytest.mark.asyncio
+async def test_reading_renews_lease():
+    log = InMemoryEventLog(max_events=10, retention_seconds=60)
+    await log.create("turn", "user")
+    await asyncio.sleep(0.05)
+    assert await log.get_seconds_since_read("turn") >= 0.05
+
+    await log.append("turn", "a")
+    await anext(log.read("turn"))
+
+    assert await log.get_seconds_since_read("turn") < 0.05
@@ -0,0 +1,135 @@
+import datetime
+import io
+
+import openpyxl
+import pytest
+from docx import Document
+from fastapi import FastAPI, HTTPException
+from fastapi import UploadFile as FastAPIUploadFile
+from fastapi.testclient import TestClient
+
+from backend.services.file import (
+    MAX_FILE_SIZE,
+    get_file_content,
+    read_excel,
+    rows_to_csv,
+    validate_file_sizes,
+)
+from backend.services.upload_limit import UploadSizeLimitMiddleware
+
+
+def get_upload(filename, data, size=None):
+    return FastAPIUploadFile(
+        io.BytesIO(data), filename=filename, size=len(data) if size is None else size
+    )
+
+
+def test_excel_is_read_as_csv():
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["name", "quantity", "price", "date"])
+    workbook.active.append(["apple", 3, 2.5, datetime.date(2024, 1, 2)])
+    workbook.active.append(["pear, green", None, 4, None])
+    data = io.BytesIO()
+    workbook.save(data)
+    data.seek(0)
+
+    assert read_excel(data) == (
+        "name,quantity,price,date\n"
+        "apple,3,2.5,2024-01-02\n"
+        '"pear, green",,4,\n'
+    )
+
+
+def test_rows_are_converted_lazily():
+    def rows():
+        yield ["a", "b"]
+        yield [1, None]
+
+    assert rows_to_csv(rows()) == "a,b\n1,\n"
+
+
+@pytest.mark.asyncio
+async def test_text_upload_is_read_from_its_file():
+    upload = get_upload("notes.md", "# Notes\nCafé".encode("utf-8"))
+
+    assert await get_file_content(upload) == "# Notes\nCafé"
+    # The upload stays open for the rest of the request
+    assert not upload.file.closed
+
+
+@pytest.mark.asyncio
+async def test_docx_upload_is_read():
+    document = Document()
+    document.add_paragraph("First")
+    document.add_paragraph("Second")
+    data = io.BytesIO()
+    document.save(data)
+
+    upload = get_upload("doc.docx", data.getvalue())
+
+    assert await get_file_content(upload) == "First\nSecond\n"
+
+
+@pytest.mark.asyncio
+async def test_unsupported_upload_is_rejected():
+    with pytest.raises(ValueError):
+        await get_file_content(get_upload("image.png", b"data"))
+
+
+def test_oversized_files_are_rejected_before_reading():
+    upload = get_upload("big.txt", b"data", size=MAX_FILE_SIZE + 1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        validate_file_sizes([upload])
+
+    assert exc_info.value.status_code == 413
+    assert upload.file.tell() == 0
+
+
+def get_limited_client(max_size):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: FastAPIUploadFile):
+        return {"size": len(await file.read())}
+
+    return TestClient(UploadSizeLimitMiddleware(app, max_size=max_size))
+
+
+def test_upload_within_limit_is_accepted():
+    client = get_limited_client(max_size=1_000)
+
+    response = client.post("/upload", files={"file": ("a.txt", b"x" * 100)})
+
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+
+def test_upload_over_limit_is_rejected_by_content_length():
+    client = get_limited_client(max_size=1_000)
+
+    response = client.post("/upload", files={"file": ("a.txt", b"x" * 2_000)})
+
+    assert response.status_code == 413
+
+
+def test_streamed_upload_over_limit_is_rejected():
+    client = get_limited_client(max_size=1_000)
+    body = (
+        b"--boundary\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="a.txt"\r\n\r\n'
+        + b"x" * 2_000
+        + b"\r\n--boundary--\r\n"
+    )
+
+    def chunks():
+        for i in range(0, len(body), 500):
+            yield body[i : i + 500]
+
+    response = client.post(
+        "/upload",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=boundary"},
+    )
+
+    assert response.status_code == 413
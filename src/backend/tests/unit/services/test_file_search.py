@@ -0,0 +1,97 @@
+import pytest
+
+import backend.crud.file_chunk as file_chunk_crud
+from backend.services import file_search
+from backend.services.embedders import HashingEmbedder
+from backend.services.file_search import (
+    chunk_with_offsets,
+    index_files,
+    index_files_async,
+    search_files,
+)
+from backend.tests.unit.factories import get_factory
+
+TOPICS = ["apples", "rockets", "violins", "glaciers"]
+
+
+@pytest.fixture(autouse=True)
+def embedder(monkeypatch):
+    embedder = HashingEmbedder()
+    monkeypatch.setattr(file_search, "get_embedder", lambda: embedder)
+    return embedder
+
+
+def get_content():
+    # One chunk per topic, each ending past the soft cut off
+    return " ".join(
+        " ".join([topic] * (file_search.SOFT_WORD_CUT_OFF + 1)) + "." for topic in TOPICS
+    )
+
+
+def test_chunk_offsets_match_content():
+    content = get_content()
+
+    chunks = chunk_with_offsets(content)
+
+    assert len(chunks) == len(TOPICS)
+    for chunk, topic in zip(chunks, TOPICS):
+        assert content[chunk.start_offset : chunk.end_offset] == chunk.text
+        assert chunk.text.startswith(topic)
+
+
+def test_chunks_are_cut_at_hard_limit():
+    content = " ".join(["word"] * (file_search.HARD_WORD_CUT_OFF + 1))
+
+    chunks = chunk_with_offsets(content)
+
+    assert [len(chunk.text.split()) for chunk in chunks] == [
+        file_search.HARD_WORD_CUT_OFF,
+        1,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_returns_most_similar_chunks(session, user):
+    file = get_factory("File", session).create(
+        user_id=user.id, file_content=get_content()
+    )
+    await index_files_async(session, [file])
+
+    results = search_files(session, [file], "tell me about rockets", top_k=2)
+
+    assert len(results) == 2
+    assert results[0][0].text.startswith("rockets")
+    assert results[0][0].file_id == file.id
+    assert results[0][1] > results[1][1]
+
+
+def test_unindexed_files_are_indexed_on_search(session, user, embedder):
+    file = get_factory("File", session).create(
+        user_id=user.id, file_content=get_content()
+    )
+    assert not file_chunk_crud.get_indexed_file_ids(session, [file.id], embedder.name)
+
+    results = search_files(session, [file], "glaciers", top_k=1)
+
+    assert results[0][0].text.startswith("glaciers")
+    assert file_chunk_crud.get_indexed_file_ids(session, [file.id], embedder.name) == {
+        file.id
+    }
+
+
+def test_files_are_reindexed_when_embedder_changes(session, user, monkeypatch):
+    file = get_factory("File", session).create(
+        user_id=user.id, file_content=get_content()
+    )
+    index_files(session, [file])
+
+    embedder = HashingEmbedder(dimensions=128)
+    monkeypatch.setattr(file_search, "get_embedder", lambda: embedder)
+
+    results = search_files(session, [file], "violins", top_k=1)
+
+    assert results[0][0].text.startswith("violins")
+    assert results[0][0].embedder == embedder.name
+    assert len(file_chunk_crud.get_file_chunk_embeddings(session, [file.id])) == len(
+        TOPICS
+    )
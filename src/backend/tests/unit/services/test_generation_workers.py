@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from backend.config.settings import Settings
+from backend.database_models.message import Message, MessageAgent
+from backend.schemas.agent import Agent, AgentToolMetadata
+from backend.schemas.chat import ChatMessage, ChatRole
+from backend.schemas.cohere_chat import CohereChatRequest
+from backend.schemas.context import Context
+from backend.schemas.user import User
+from backend.services import generation_workers
+from backend.services.generation_workers import (
+    GenerationJob,
+    LocalGenerationWorkers,
+    _serve,
+    get_generation_workers,
+)
+from backend.tests.unit.factories import get_factory
+
+
+@pytest.fixture(autouse=True)
+def clear_generation_workers():
+    get_generation_workers.cache_clear()
+    yield
+    get_generation_workers.cache_clear()
+
+
+def test_generation_job_round_trip(session, user):
+    agent = get_factory("Agent", session).create(user=user)
+    ctx = Context()
+    ctx.with_trace_id("trace")
+    ctx.with_user_id(user.id)
+    ctx.with_user(user=User.model_validate(user))
+    ctx.with_agent(Agent.model_validate(agent))
+    metadata = get_factory("AgentToolMetadata", session).create(
+        user_id=user.id, agent_id=agent.id, tool_name="wikipedia"
+    )
+    ctx.with_agent_tool_metadata([AgentToolMetadata.model_validate(metadata)])
+    ctx.with_deployment_config({"api_key": "key"})
+    ctx.with_conversation_id("conversation")
+    chat_request = CohereChatRequest(
+        message="Hello",
+        chat_history=[ChatMessage(role=ChatRole.USER, message="Hi")],
+    )
+    response_message = Message(
+        id="message",
+        user_id=user.id,
+        conversation_id="conversation",
+        text="",
+        position=2,
+        agent=MessageAgent.CHATBOT,
+    )
+
+    job = GenerationJob.create(
+        chat_request,
+        response_message,
+        True,
+        ctx,
+        should_store=False,
+        next_message_position=2,
+    )
+    job = GenerationJob.model_validate_json(job.model_dump_json())
+
+    assert job.chat_request == chat_request
+    assert job.managed_tools
+    assert not job.should_store
+    assert job.get_user_id() == user.id
+    loaded = job.get_context()
+    assert loaded.get_trace_id() == "trace"
+    assert loaded.user.id == user.id
+    assert loaded.agent.id == agent.id
+    assert loaded.get_agent_tool_metadata()[0].id == metadata.id
+    assert loaded.deployment_config == {"api_key": "key"}
+    assert loaded.get_conversation_id() == "conversation"
+    message = job.get_response_message()
+    assert (message.id, message.position, message.agent) == (
+        "message",
+        2,
+        MessageAgent.CHATBOT,
+    )
+
+
+@pytest.mark.asyncio
+async def test_local_generation_workers_relay_events(monkeypatch):
+    workers = LocalGenerationWorkers(processes=2, max_turns=1)
+    monkeypatch.setattr(workers, "start", lambda: None)
+    workers._loop = asyncio.get_running_loop()
+    job = GenerationJob.create(
+        CohereChatRequest(message="Hello"),
+        Message(id="message", text="", position=0, agent=MessageAgent.CHATBOT),
+        False,
+        Context(),
+    )
+
+    stream = workers._run(job)
+    first = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    workers._deliver(job.stream_id, "a")
+    workers._deliver(job.stream_id, None)
+
+    assert await first == "a"
+    assert [data async for data in stream] == []
+    assert job.stream_id not in workers._turns
+    assert workers._controls[0].empty()
+
+
+@pytest.mark.asyncio
+async def test_local_generation_workers_cancel_closed_streams(monkeypatch):
+    workers = LocalGenerationWorkers(processes=2, max_turns=1)
+    monkeypatch.setattr(workers, "start", lambda: None)
+    workers._loop = asyncio.get_running_loop()
+    job = GenerationJob.create(
+        CohereChatRequest(message="Hello"),
+        Message(id="message", text="", position=0, agent=MessageAgent.CHATBOT),
+        False,
+        Context(),
+    )
+
+    stream = workers._run(job)
+    first = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    workers._deliver(job.stream_id, "a")
+    assert await first == "a"
+    await stream.aclose()
+
+    # Every worker is told, as only the one running the turn knows it
+    assert [control.get(timeout=5) for control in workers._controls] == [
+        job.stream_id,
+        job.stream_id,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_serve_limits_concurrent_turns():
+    jobs = [
+        GenerationJob.create(
+            CohereChatRequest(message="Hello"),
+            Message(id=str(i), text="", position=0, agent=MessageAgent.CHATBOT),
+            False,
+            Context(),
+        ).model_dump_json()
+        for i in range(5)
+    ] + [None]
+    running = 0
+    max_running = 0
+    finished = []
+
+    async def get_job():
+        return jobs.pop(0)
+
+    async def run_job(job):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        finished.append(job.stream_id)
+
+    await _serve(get_job, run_job, {}, max_turns=2)
+
+    assert max_running == 2
+    assert len(finished) == 5
+
+
+def test_get_generation_workers_defaults_to_inline():
+    assert Settings().chat_stream.generation_workers == "inline"
+    assert get_generation_workers() is None
+
+
+def test_get_generation_workers_redis_needs_redis_event_log(monkeypatch):
+    monkeypatch.setenv("CHAT_STREAM_GENERATION_WORKERS", "redis")
+    monkeypatch.setattr(generation_workers, "get_event_log", lambda: None)
+
+    assert get_generation_workers() is None
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from backend.model_deployments.base import BaseDeployment
+from backend.services.metrics import (
+    CHAT_STREAMS,
+    CHAT_STREAMS_OPEN,
+    DEPLOYMENT_REQUEST_DURATION,
+    DEPLOYMENT_REQUESTS,
+    DEPLOYMENT_TIME_TO_FIRST_EVENT,
+    REGISTRY,
+    MetricsRegistry,
+    track_chat_stream,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+class FakeDeployment(BaseDeployment):
+    rerank_enabled = False
+
+    async def invoke_chat(self, chat_request, **kwargs):
+        raise ConnectionError("Upstream unavailable")
+
+    async def invoke_chat_stream(self, chat_request, ctx, **kwargs):
+        for text in ["Hello", " world"]:
+            yield {"text": text}
+
+    async def invoke_rerank(self, query, documents, ctx, **kwargs):
+        return []
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["status"])
+    open_streams = registry.gauge("streams_open", "Open streams")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(status="ok")
+    requests.inc(2, status='say "hi"')
+    open_streams.inc()
+    latency.observe(0.5)
+    latency.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{status="ok"} 1.0',
+        'requests_total{status="say \\"hi\\""} 2.0',
+        "# HELP streams_open Open streams",
+        "# TYPE streams_open gauge",
+        "streams_open 1.0",
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 0',
+        'latency_seconds_bucket{le="1.0"} 1',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        "latency_seconds_sum 5.5",
+        "latency_seconds_count 2",
+    ]
+
+
+def test_metric_rejects_unknown_labels():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["status"])
+
+    with pytest.raises(ValueError):
+        requests.inc(deployment="Cohere")
+
+
+def test_gauge_function_is_read_on_render():
+    registry = MetricsRegistry()
+    pool = registry.gauge("pool_checked_out", "Checked out connections")
+    checked_out = 3
+    pool.set_function(lambda: checked_out)
+
+    assert "pool_checked_out 3" in registry.render()
+    checked_out = 4
+    assert "pool_checked_out 4" in registry.render()
+
+
+@pytest.mark.asyncio
+async def test_deployment_stream_is_instrumented():
+    events = [event async for event in FakeDeployment().invoke_chat_stream(None, None)]
+
+    assert len(events) == 2
+    labels = {"deployment": "FakeDeployment", "operation": "chat_stream"}
+    assert DEPLOYMENT_REQUESTS.get(status="success", **labels) == 1
+    assert DEPLOYMENT_REQUEST_DURATION.get_count(**labels) == 1
+    assert DEPLOYMENT_TIME_TO_FIRST_EVENT.get_count(deployment="FakeDeployment") == 1
+
+
+@pytest.mark.asyncio
+async def test_deployment_stream_closed_early_is_cancelled():
+    stream = FakeDeployment().invoke_chat_stream(None, None)
+    await anext(stream)
+    await stream.aclose()
+
+    assert (
+        DEPLOYMENT_REQUESTS.get(
+            deployment="FakeDeployment", operation="chat_stream", status="cancelled"
+        )
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_deployment_requests_are_instrumented():
+    await FakeDeployment().invoke_rerank("query", [], None)
+    with pytest.raises(ConnectionError):
+        await FakeDeployment().invoke_chat(None)
+
+    assert (
+        DEPLOYMENT_REQUESTS.get(
+            deployment="FakeDeployment", operation="rerank", status="success"
+        )
+        == 1
+    )
+    assert (
+        DEPLOYMENT_REQUESTS.get(
+            deployment="FakeDeployment", operation="chat", status="error"
+        )
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_track_chat_stream_counts_open_and_cancelled_streams():
+    started = asyncio.Event()
+
+    async def stream():
+        with track_chat_stream():
+            started.set()
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(stream())
+    await started.wait()
+    assert CHAT_STREAMS_OPEN.get() == 1
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert CHAT_STREAMS_OPEN.get() == 0
+    assert CHAT_STREAMS.get(status="cancelled") == 1
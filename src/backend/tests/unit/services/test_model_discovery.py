@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from backend.model_deployments.base import BaseDeployment
+from backend.schemas.deployment import Deployment
+from backend.services import model_discovery
+from backend.services.model_discovery import (
+    get_initial_models,
+    load_last_known_models,
+    refresh_deployment_models,
+    refresh_stale_deployment_models,
+)
+
+
+class RemoteDeployment(BaseDeployment):
+    lists_models_remotely = True
+    models = ["discovered-model"]
+    calls = 0
+
+    @classmethod
+    def list_models(cls):
+        cls.calls += 1
+        return cls.models
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+
+class ConstantDeployment(BaseDeployment):
+    @staticmethod
+    def list_models():
+        return ["constant-model"]
+
+
+@pytest.fixture(autouse=True)
+def model_discovery_cache(monkeypatch, tmp_path):
+    # The deployments section of configuration.yaml would override an env variable
+    cache_path = str(tmp_path / "models.json")
+    monkeypatch.setattr(model_discovery, "_get_cache_path", lambda: cache_path)
+    RemoteDeployment.calls = 0
+    model_discovery.clear_model_discovery_state()
+    yield
+    model_discovery.clear_model_discovery_state()
+
+
+def get_deployment(deployment_class, models=None):
+    return Deployment(
+        id=deployment_class.__name__,
+        name=deployment_class.__name__,
+        deployment_class=deployment_class,
+        models=models or [],
+        is_available=True,
+        env_vars=[],
+    )
+
+
+def test_get_initial_models_does_not_list_remote_models():
+    assert get_initial_models("remote", RemoteDeployment) == []
+    assert get_initial_models("constant", ConstantDeployment) == ["constant-model"]
+    assert RemoteDeployment.calls == 0
+
+
+def test_refresh_deployment_models_persists_models():
+    deployment = get_deployment(RemoteDeployment)
+
+    assert refresh_deployment_models(deployment) == ["discovered-model"]
+    assert deployment.models == ["discovered-model"]
+    assert load_last_known_models() == {"RemoteDeployment": ["discovered-model"]}
+    assert get_initial_models("RemoteDeployment", RemoteDeployment) == [
+        "discovered-model"
+    ]
+
+
+def test_refresh_deployment_models_keeps_last_known_models_on_timeout():
+    release = threading.Event()
+
+    class SlowDeployment(RemoteDeployment):
+        @classmethod
+        def list_models(cls):
+            release.wait(5)
+            return ["late-model"]
+
+    deployment = get_deployment(SlowDeployment, models=["last-known-model"])
+
+    try:
+        models = refresh_deployment_models(deployment, timeout_seconds=0.01)
+    finally:
+        release.set()
+
+    assert models == ["last-known-model"]
+    assert load_last_known_models() == {}
+
+
+def test_refresh_deployment_models_keeps_last_known_models_on_error():
+    class FailingDeployment(RemoteDeployment):
+        @classmethod
+        def list_models(cls):
+            raise ConnectionError("Provider unavailable")
+
+    deployment = get_deployment(FailingDeployment, models=["last-known-model"])
+
+    assert refresh_deployment_models(deployment) == ["last-known-model"]
+
+
+def test_refresh_stale_deployment_models_respects_ttl():
+    remote = get_deployment(RemoteDeployment)
+    constant = get_deployment(ConstantDeployment, models=["constant-model"])
+
+    refresh_stale_deployment_models([remote, constant], ttl_seconds=60)
+    refresh_stale_deployment_models([remote, constant], ttl_seconds=60)
+
+    assert RemoteDeployment.calls == 1
+    assert remote.models == ["discovered-model"]
+    assert constant.models == ["constant-model"]
+
+    refresh_stale_deployment_models([remote], ttl_seconds=0)
+
+    assert RemoteDeployment.calls == 2
@@ -0,0 +1,233 @@
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletionChunk
+
+import backend.model_deployments.open_ai as open_ai_module
+import backend.services.response_cache as response_cache_module
+from backend.chat.enums import StreamEvent
+from backend.model_deployments.endpoint_pool import Endpoint, EndpointPool
+from backend.model_deployments.open_ai import OpenAIDeployment
+from backend.schemas.cohere_chat import CohereChatRequest
+from backend.schemas.context import Context
+from backend.services.embedders import HashingEmbedder
+from backend.services.metrics import RESPONSE_CACHE_REQUESTS
+from backend.services.response_cache import ResponseCache
+from backend.tests.unit.factories import get_factory
+
+
+def get_body(message, preamble="Be brief."):
+    return {
+        "model": "model",
+        "messages": [
+            {"role": "system", "content": preamble},
+            {"role": "user", "content": message},
+        ],
+    }
+
+
+def get_chunk(text, finish_reason=None):
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "completion",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "model",
+            "choices": [
+                {"index": 0, "delta": {"content": text}, "finish_reason": finish_reason}
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(
+        ttl_seconds=60,
+        max_entries=16,
+        semantic=True,
+        similarity_threshold=0.8,
+        embedder=HashingEmbedder(),
+    )
+    monkeypatch.setattr(response_cache_module, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(open_ai_module, "get_response_cache", lambda: cache)
+    return cache
+
+
+def get_deployment(monkeypatch, texts):
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return [*(get_chunk(text) for text in texts), get_chunk("", "stop")]
+
+    monkeypatch.setattr(OpenAIDeployment, "default_endpoint", "http://configured")
+    monkeypatch.setattr(OpenAIDeployment, "default_api_key", "key")
+    deployment = OpenAIDeployment()
+    deployment.default_use_legacy_api = False
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    deployment.pool = EndpointPool([Endpoint(url="stub", client=client)])
+    deployment.requests = requests
+    return deployment
+
+
+@pytest.fixture
+def deployment(monkeypatch):
+    return get_deployment(monkeypatch, ["Hello", " there"])
+
+
+async def stream_chat(
+    deployment, temperature=0.0, conversation_id="conversation", chat_request=None
+):
+    chat_request = chat_request or CohereChatRequest(
+        message="Hi", temperature=temperature, conversation_id=conversation_id
+    )
+    ctx = Context()
+    ctx.with_agent_id("agent")
+    return [event async for event in deployment.invoke_chat_stream(chat_request, ctx)]
+
+
+def get_stream_end(events):
+    [stream_end] = [
+        event for event in events if event["event_type"] == StreamEvent.STREAM_END
+    ]
+    return stream_end
+
+
+def test_exact_and_semantic_hits(cache):
+    message = "How do I reset my password?"
+    key = cache.get_key(get_body(message), "agent", message)
+    assert cache.get(key) is None
+
+    cache.put(key, [{"event_type": StreamEvent.TEXT_GENERATION, "text": "Answer"}])
+    exact = RESPONSE_CACHE_REQUESTS.get(outcome="exact")
+    semantic = RESPONSE_CACHE_REQUESTS.get(outcome="semantic")
+
+    tier, events = cache.get(cache.get_key(get_body(message), "agent", message))
+    assert (tier, events[0]["text"]) == ("exact", "Answer")
+
+    similar_message = "how do I reset my password"
+    tier, events = cache.get(
+        cache.get_key(get_body(similar_message), "agent", similar_message)
+    )
+    assert (tier, events[0]["text"]) == ("semantic", "Answer")
+
+    assert RESPONSE_CACHE_REQUESTS.get(outcome="exact") == exact + 1
+    assert RESPONSE_CACHE_REQUESTS.get(outcome="semantic") == semantic + 1
+
+
+def test_semantic_tier_requires_same_scope_and_context(cache):
+    message = "How do I reset my password?"
+    cache.put(cache.get_key(get_body(message), "agent", message), [{"text": "Answer"}])
+
+    other_message = "Which plans do you offer?"
+    other_key = cache.get_key(get_body(other_message), "agent", other_message)
+    assert cache.get(other_key) is None
+    assert cache.get(cache.get_key(get_body(message), "other-agent", message)) is None
+    other_context_key = cache.get_key(get_body(message, "Be long."), "agent", message)
+    assert cache.get(other_context_key) is None
+
+
+def test_cached_events_are_copies(cache):
+    key = cache.get_key(get_body("Hi"), "agent")
+    cache.put(key, [{"response": {"chat_history": []}}])
+
+    _, events = cache.get(key)
+    events[0]["response"]["chat_history"].append("changed")
+
+    assert cache.get(key)[1] == [{"response": {"chat_history": []}}]
+
+
+@pytest.mark.asyncio
+async def test_deployment_replays_cached_stream(cache, deployment):
+    events = await stream_chat(deployment, conversation_id="first")
+    replayed = await stream_chat(deployment, conversation_id="second")
+
+    assert len(deployment.requests) == 1
+    assert [event["event_type"] for event in replayed] == [
+        event["event_type"] for event in events
+    ]
+    text = [
+        event["text"]
+        for event in replayed
+        if event["event_type"] == StreamEvent.TEXT_GENERATION
+    ]
+    assert "".join(text) == "Hello there"
+    [stream_end] = [
+        event for event in replayed if event["event_type"] == StreamEvent.STREAM_END
+    ]
+    assert stream_end["response"]["conversation_id"] == "second"
+    assert stream_end["response"]["generation_id"] != (
+        events[-1]["response"]["generation_id"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit_keeps_the_request_chat_history(cache, deployment):
+    messages = ["How do I reset my password?", "how do I reset my password"]
+    streams = [
+        await stream_chat(
+            deployment,
+            chat_request=CohereChatRequest(message=message, temperature=0.0),
+        )
+        for message in messages
+    ]
+
+    assert len(deployment.requests) == 1
+    for message, events in zip(messages, streams):
+        chat_history = get_stream_end(events)["response"]["chat_history"]
+        assert [entry["message"] for entry in chat_history] == [message]
+
+
+@pytest.mark.asyncio
+async def test_replayed_tool_calls_are_added_to_chat_history(cache, monkeypatch):
+    deployment = get_deployment(
+        monkeypatch, ['{"name": "search", "parameters": {"query": "x"}}']
+    )
+    chat_requests = [CohereChatRequest(message="Hi", temperature=0.0) for _ in range(2)]
+    streams = [
+        await stream_chat(deployment, chat_request=chat_request)
+        for chat_request in chat_requests
+    ]
+
+    assert len(deployment.requests) == 1
+    assert [event["event_type"] for event in streams[1]] == [
+        event["event_type"] for event in streams[0]
+    ]
+    assert StreamEvent.TOOL_CALLS_GENERATION in [
+        event["event_type"] for event in streams[1]
+    ]
+    live, replayed = [chat_request.chat_history for chat_request in chat_requests]
+    assert replayed == live
+    assert replayed[-1].tool_calls == [{"search": {"query": "x"}}]
+
+
+@pytest.mark.asyncio
+async def test_deployment_does_not_cache_nondeterministic_requests(cache, deployment):
+    await stream_chat(deployment, temperature=None)
+    await stream_chat(deployment, temperature=0.7)
+
+    assert len(deployment.requests) == 2
+
+
+def test_agent_and_file_changes_invalidate_responses(session, user, cache):
+    agent = get_factory("Agent", session).create(user=user)
+    other_agent = get_factory("Agent", session).create(user=user)
+    session.commit()
+    key = cache.get_key(get_body("Hi"), agent.id)
+    other_key = cache.get_key(get_body("Hi"), other_agent.id)
+    cache.put(key, [{"text": "Answer"}])
+    cache.put(other_key, [{"text": "Answer"}])
+
+    agent.preamble = "Be long."
+    session.commit()
+
+    assert cache.get(cache.get_key(get_body("Hi"), agent.id)) is None
+    assert cache.get(cache.get_key(get_body("Hi"), other_agent.id)) is not None
+
+    get_factory("File", session).create(user_id=user.id)
+    session.commit()
+
+    assert cache.get(cache.get_key(get_body("Hi"), other_agent.id)) is None
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.services import resumable_stream
+from backend.services.event_log import InMemoryEventLog
+from backend.services.resumable_stream import (
+    parse_event_id,
+    resume_chat_events,
+    stream_chat_events,
+)
+
+
+@pytest.fixture(autouse=True)
+def event_log(monkeypatch):
+    event_log = InMemoryEventLog(max_events=100, retention_seconds=60)
+    monkeypatch.setattr(resumable_stream, "get_event_log", lambda: event_log)
+    monkeypatch.setattr(resumable_stream, "ABANDONED_CHECK_SECONDS", 0.01)
+    return event_log
+
+
+class FakeTurn:
+    def __init__(self, events, delay=0.0):
+        self.events = events
+        self.delay = delay
+        self.cancelled = False
+
+    async def stream(self):
+        try:
+            for event in self.events:
+                await asyncio.sleep(self.delay)
+                yield event
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_parse_event_id():
+    assert parse_event_id("3f1c-2d7a:12") == ("3f1c-2d7a", 12)
+
+    with pytest.raises(HTTPException) as e:
+        parse_event_id("12")
+    assert e.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_events_sets_event_ids():
+    turn = FakeTurn(["a", "b"])
+
+    events = [event async for event in stream_chat_events(turn.stream(), "user")]
+
+    assert [event.data for event in events] == ["a", "b"]
+    stream_id, event_id = parse_event_id(events[1].id)
+    assert event_id == 2
+    assert events[0].id == f"{stream_id}:1"
+
+
+@pytest.mark.asyncio
+async def test_reconnect_resumes_after_last_event_id(monkeypatch):
+    monkeypatch.setenv("CHAT_STREAM_RESUME_GRACE_SECONDS", "10")
+    turn = FakeTurn(["a", "b", "c", "d"], delay=0.02)
+
+    # The connection drops after the first event
+    stream = stream_chat_events(turn.stream(), "user")
+    first = await anext(stream)
+    await stream.aclose()
+
+    resumed = await resume_chat_events(first.id, "user")
+    events = [event async for event in resumed]
+
+    assert [event.data for event in events] == ["b", "c", "d"]
+    assert not turn.cancelled
+
+
+@pytest.mark.asyncio
+async def test_resume_rejects_other_users():
+    turn = FakeTurn(["a"])
+    events = [event async for event in stream_chat_events(turn.stream(), "user")]
+
+    with pytest.raises(HTTPException) as e:
+        await resume_chat_events(events[0].id, "other-user")
+    assert e.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_waiting_reader_keeps_turn_running(monkeypatch):
+    monkeypatch.setenv("CHAT_STREAM_RESUME_GRACE_SECONDS", "0")
+    turn = FakeTurn(["a", "b", "c"], delay=0.05)
+
+    events = [event async for event in stream_chat_events(turn.stream(), "user")]
+
+    assert [event.data for event in events] == ["a", "b", "c"]
+    assert not turn.cancelled
+
+
+@pytest.mark.asyncio
+async def test_abandoned_turn_is_cancelled(monkeypatch, event_log):
+    monkeypatch.setenv("CHAT_STREAM_RESUME_GRACE_SECONDS", "0")
+    connected = True
+
+    async def get_seconds_since_read(stream_id):
+        return 0.0 if connected else 60.0
+
+    monkeypatch.setattr(event_log, "get_seconds_since_read", get_seconds_since_read)
+    turn = FakeTurn(["a"] * 100, delay=0.02)
+
+    stream = stream_chat_events(turn.stream(), "user")
+    await anext(stream)
+    await asyncio.sleep(0.05)
+    assert not turn.cancelled
+
+    await stream.aclose()
+    connected = False
+    await asyncio.sleep(0.2)
+
+    assert turn.cancelled
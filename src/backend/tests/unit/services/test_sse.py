@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+from sse_starlette.sse import AppStatus
+
+from backend.services.sse import CancellableEventSourceResponse
+
+
+@pytest.mark.asyncio
+async def test_event_generator_is_closed_when_client_disconnects():
+    # The exit event is bound to the event loop of the first response that used it
+    AppStatus.should_exit_event = None
+    closed = asyncio.Event()
+    sent = []
+
+    async def events():
+        try:
+            for index in range(100):
+                yield f"event {index}"
+        finally:
+            closed.set()
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # A slow client, the generator is suspended at a yield when it disconnects
+        await asyncio.sleep(0.01)
+        sent.append(message)
+
+    response = CancellableEventSourceResponse(events(), ping=60)
+    await asyncio.wait_for(response({"type": "http"}, receive, send), timeout=5)
+
+    assert closed.is_set()
+    body = [message for message in sent if message["type"] == "http.response.body"]
+    assert 0 < len(body) < 100
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.services.sync_stream import iterate_in_thread
+
+
+class FakeUpstream:
+    """Blocking stream that records how far it was read and whether it was closed"""
+
+    def __init__(self, events, delay=0.0):
+        self.events = events
+        self.delay = delay
+        self.read = 0
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        for event in self.events:
+            time.sleep(self.delay)
+            self.read += 1
+            yield event
+
+    def close(self):
+        self.closed.set()
+
+
+async def collect(stream):
+    return [event async for event in stream]
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_yields_all_events():
+    upstream = FakeUpstream(list(range(10)))
+
+    events = await collect(iterate_in_thread(lambda: upstream))
+
+    assert events == list(range(10))
+    assert upstream.closed.wait(1)
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_does_not_block_event_loop():
+    upstream = FakeUpstream([1, 2], delay=0.1)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    events = await collect(iterate_in_thread(lambda: upstream))
+    ticker.cancel()
+
+    assert events == [1, 2]
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_applies_backpressure():
+    upstream = FakeUpstream(list(range(100)))
+    stream = iterate_in_thread(lambda: upstream, max_buffered_events=5)
+
+    assert await anext(stream) == 0
+    await asyncio.sleep(0.1)
+
+    # The consumed event, the buffered events and the one waiting for a free slot
+    assert upstream.read <= 7
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_closes_upstream_when_cancelled():
+    upstream = FakeUpstream(list(range(100)), delay=0.01)
+
+    async def consume():
+        async for _ in iterate_in_thread(lambda: upstream):
+            pass
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    consumer.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await consumer
+
+    assert upstream.closed.wait(1)
+    read = upstream.read
+    await asyncio.sleep(0.1)
+    assert upstream.read <= read + 1
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_raises_upstream_errors():
+    def open_stream():
+        yield 1
+        raise ConnectionError("Upstream closed the connection")
+
+    stream = iterate_in_thread(open_stream)
+
+    assert await anext(stream) == 1
+    with pytest.raises(ConnectionError):
+        await anext(stream)
@@ -0,0 +1,108 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend.services import synthesizer
+from backend.services.synthesizer import chunk_text, synthesize_message_stream
+
+
+class FakeTextToSpeechClient:
+    """Local stand-in for the Google Text-to-Speech client"""
+
+    def __init__(self):
+        self.inputs = []
+
+    def synthesize_speech(self, input, voice, audio_config):
+        self.inputs.append(input.text)
+        return MagicMock(audio_content=f"<{voice.language_code}:{input.text}>".encode())
+
+
+@pytest.fixture
+def fake_client(monkeypatch, tmp_path):
+    monkeypatch.setenv("GOOGLE_CLOUD_API_KEY", "test")
+    monkeypatch.setenv("SYNTHESIS_CACHE_DIR", str(tmp_path))
+
+    client = FakeTextToSpeechClient()
+    with patch(
+        "backend.services.synthesizer.get_text_to_speech_client", return_value=client
+    ), patch("backend.services.synthesizer.detect_language", return_value="en"):
+        yield client
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_chunk_text_keeps_sentences_together():
+    text = "First sentence. Second sentence! Third one?"
+
+    assert list(chunk_text(text, max_characters=35)) == [
+        "First sentence. Second sentence!",
+        "Third one?",
+    ]
+
+
+def test_chunk_text_splits_long_sentences():
+    text = "word " * 10
+
+    chunks = list(chunk_text(text, max_characters=12))
+
+    assert chunks == ["word word", "word word", "word word", "word word", "word word"]
+
+
+@pytest.mark.asyncio
+async def test_synthesize_message_stream_yields_chunks(fake_client):
+    first_sentence = "Hello " * 100 + "world."
+    second_sentence = "Bye " * 100 + "now."
+
+    chunks = await collect(
+        synthesize_message_stream("message-id", f"{first_sentence} {second_sentence}")
+    )
+
+    assert chunks == [
+        f"<en:{first_sentence}>".encode(),
+        f"<en:{second_sentence}>".encode(),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_synthesize_message_stream_uses_cache(fake_client):
+    first = await collect(synthesize_message_stream("message-id", "Hello world."))
+    second = await collect(synthesize_message_stream("message-id", "Hello world."))
+
+    assert b"".join(first) == b"".join(second)
+    assert fake_client.inputs == ["Hello world."]
+
+
+@pytest.mark.asyncio
+async def test_synthesize_message_stream_cache_depends_on_text(fake_client):
+    await collect(synthesize_message_stream("message-id", "Hello world."))
+    await collect(synthesize_message_stream("message-id", "Edited message."))
+
+    assert fake_client.inputs == ["Hello world.", "Edited message."]
+
+
+@pytest.mark.asyncio
+async def test_synthesize_message_stream_skips_empty_text(fake_client, tmp_path):
+    assert await collect(synthesize_message_stream("message-id", "  ")) == []
+
+    assert fake_client.inputs == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_translate_client_is_built_per_thread(monkeypatch):
+    monkeypatch.setattr(synthesizer, "build", lambda *args, **kwargs: object())
+
+    client = synthesizer.get_translate_client("key")
+    other_thread_client = []
+    thread = threading.Thread(
+        target=lambda: other_thread_client.append(
+            synthesizer.get_translate_client("key")
+        )
+    )
+    thread.start()
+    thread.join()
+
+    assert synthesizer.get_translate_client("key") is client
+    assert other_thread_client[0] is not client
@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend.services.auth.jwt import JWTService
+from backend.services.auth.token_cache import (
+    blacklist_token,
+    decode_jwt_cached,
+    is_token_blacklisted,
+)
+from backend.services.cache import TTLCache
+from backend.tests.unit.factories import get_factory
+
+
+@pytest.fixture(autouse=True)
+def mock_auth_secret_key_env(monkeypatch):
+    monkeypatch.setenv("AUTH_SECRET_KEY", "test")
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl_seconds=60)
+    cache.put("key", "value")
+    cache.put("expired", "value", ttl_seconds=-1)
+
+    assert cache.get("key") == "value"
+    assert cache.get("expired") is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl_seconds=60, max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_decode_jwt_cached_verifies_token_once():
+    token = JWTService().create_and_encode_jwt({"id": "test"})
+
+    with patch.object(
+        JWTService, "decode_jwt", wraps=JWTService().decode_jwt
+    ) as mock_decode:
+        first = decode_jwt_cached(token)
+        second = decode_jwt_cached(token)
+
+    assert first == second
+    assert first["context"] == {"id": "test"}
+    mock_decode.assert_called_once()
+
+
+def test_decode_jwt_cached_does_not_cache_invalid_token():
+    with patch.object(JWTService, "decode_jwt", return_value=None) as mock_decode:
+        assert decode_jwt_cached("invalid_token") is None
+        assert decode_jwt_cached("invalid_token") is None
+
+    assert mock_decode.call_count == 2
+
+
+def test_is_token_blacklisted_caches_blacklisted_status(session: Session):
+    _ = get_factory("Blacklist", session).create(token_id="blacklisted_jti")
+
+    assert is_token_blacklisted(session, "blacklisted_jti")
+    assert not is_token_blacklisted(session, "valid_jti")
+
+    with patch(
+        "backend.crud.blacklist.get_blacklist", return_value=None
+    ) as mock_get_blacklist:
+        assert is_token_blacklisted(session, "blacklisted_jti")
+        assert not is_token_blacklisted(session, "valid_jti")
+
+    # Without Redis, a logout on another worker must be seen right away
+    mock_get_blacklist.assert_called_once_with(session, "valid_jti")
+
+
+def test_blacklist_token_invalidates_cached_status(session: Session):
+    token = JWTService().create_and_encode_jwt({"id": "test"})
+    decoded = decode_jwt_cached(token)
+
+    assert not is_token_blacklisted(session, decoded["jti"])
+
+    blacklist_token(session, decoded)
+
+    assert is_token_blacklisted(session, decoded["jti"])
@@ -0,0 +1,93 @@
+import threading
+
+from backend.schemas.tool import ManagedTool
+from backend.services.auth.tool_auth import get_tools_with_auth, invalidate_tool_auth
+
+
+def get_tool(name, auth_implementation):
+    return ManagedTool(
+        name=name,
+        display_name=name,
+        implementation=None,
+        is_available=True,
+        auth_implementation=auth_implementation,
+    )
+
+
+def get_auth_implementation(calls, is_auth_required=True, wait=None):
+    class MockToolAuth:
+        def is_auth_required(self, session, user_id):
+            calls.append(user_id)
+            if wait:
+                wait()
+            return is_auth_required
+
+        def get_auth_url(self, user_id):
+            return f"https://auth/{user_id}"
+
+        def get_token(self, session, user_id):
+            return None if is_auth_required else "token"
+
+    return MockToolAuth
+
+
+def test_tools_with_auth_are_copies(session):
+    calls = []
+    tool = get_tool("tool", get_auth_implementation(calls))
+
+    [user_tool] = get_tools_with_auth(session, [tool], "user")
+    [other_user_tool] = get_tools_with_auth(session, [tool], "other-user")
+
+    assert user_tool.is_auth_required
+    assert user_tool.auth_url == "https://auth/user"
+    assert other_user_tool.auth_url == "https://auth/other-user"
+    assert not tool.is_auth_required
+    assert tool.auth_url == ""
+
+
+def test_tool_auth_statuses_are_cached_until_invalidated(session):
+    calls = []
+    tool = get_tool("tool", get_auth_implementation(calls, is_auth_required=False))
+
+    get_tools_with_auth(session, [tool], "user")
+    [user_tool] = get_tools_with_auth(session, [tool], "user")
+    assert user_tool.token == "token"
+    assert calls == ["user"]
+
+    invalidate_tool_auth("tool", "user")
+    get_tools_with_auth(session, [tool], "user")
+    assert calls == ["user", "user"]
+
+
+def test_tool_auth_statuses_are_computed_concurrently(session):
+    calls = []
+    barrier = threading.Barrier(2, timeout=5)
+    tools = [
+        get_tool(name, get_auth_implementation(calls, wait=barrier.wait))
+        for name in ("first", "second")
+    ]
+
+    # Each check waits for the other, so this only returns if they run at the same time
+    user_tools = get_tools_with_auth(session, tools, "user")
+
+    assert [tool.name for tool in user_tools] == ["first", "second"]
+    assert all(tool.is_auth_required for tool in user_tools)
+
+
+def test_tool_auth_errors_are_not_cached(session):
+    class FailingToolAuth:
+        def is_auth_required(self, session, user_id):
+            raise ValueError("Auth failed")
+
+    tool = get_tool("tool", FailingToolAuth)
+
+    [user_tool] = get_tools_with_auth(session, [tool], "user")
+
+    assert not user_tool.is_available
+    assert user_tool.error_message == "Error while calling Tool Auth implementation Auth failed"
+    assert tool.is_available
+
+    calls = []
+    tool.auth_implementation = get_auth_implementation(calls)
+    get_tools_with_auth(session, [tool], "user")
+    assert calls == ["user"]
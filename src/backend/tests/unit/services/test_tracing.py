@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.schemas.context import Context
+from backend.services.tracing import (
+    NOOP_SPAN,
+    InMemorySpanExporter,
+    JSONSpanExporter,
+    configure_tracing,
+    span,
+    start_span,
+    traced,
+)
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    configure_tracing([exporter])
+    yield exporter
+    configure_tracing([])
+
+
+def test_span_is_noop_when_tracing_is_disabled():
+    configure_tracing([])
+
+    with span("chat.process_chat") as s:
+        s.add_event("first_token")
+
+    assert s is NOOP_SPAN
+
+
+def test_span_records_duration_attributes_and_events(exporter):
+    with span("openai.upstream", model="gpt") as s:
+        s.add_event("first_token")
+        s.set_attribute("tokens", 3)
+
+    (recorded,) = exporter.spans
+    assert recorded.name == "openai.upstream"
+    assert recorded.attributes == {"model": "gpt", "tokens": 3}
+    assert recorded.events[0][0] == "first_token"
+    assert recorded.duration_seconds >= recorded.events[0][1]
+    assert recorded.error is None
+
+
+def test_nested_spans_share_trace(exporter):
+    with span("chat.stream", trace_id="trace") as parent:
+        with span("chat.rerank_and_chunk"):
+            pass
+    with span("chat.process_chat"):
+        pass
+
+    child, root, other = exporter.spans
+    assert child.parent_id == parent.span_id
+    assert child.trace_id == root.trace_id == "trace"
+    assert other.parent_id is None
+    assert other.trace_id != "trace"
+
+
+def test_span_records_errors(exporter):
+    with pytest.raises(ValueError):
+        with span("chat.call_tool"):
+            raise ValueError("Tool failed")
+
+    assert exporter.spans[0].error == "ValueError"
+
+
+def test_start_span_does_not_become_parent(exporter):
+    upstream = start_span("openai.upstream")
+    with span("chat.persist_turn"):
+        pass
+    upstream.end()
+
+    persist, recorded_upstream = exporter.spans
+    assert persist.parent_id is None
+    assert recorded_upstream.name == "openai.upstream"
+
+
+def test_traced_uses_the_context_trace_id(exporter):
+    @traced("chat.persist_turn")
+    def persist(session, ctx):
+        return "persisted"
+
+    ctx = Context()
+    ctx.with_trace_id("trace")
+
+    assert persist(None, ctx=ctx) == "persisted"
+    (recorded,) = exporter.spans
+    assert (recorded.name, recorded.trace_id) == ("chat.persist_turn", "trace")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_are_parented_to_spawning_span(exporter):
+    async def call_tool(name):
+        with span("chat.call_tool", tool=name):
+            await asyncio.sleep(0.01)
+
+    with span("chat.stream") as parent:
+        await asyncio.gather(call_tool("a"), call_tool("b"))
+
+    tool_spans = [s for s in exporter.spans if s.name == "chat.call_tool"]
+    assert len(tool_spans) == 2
+    assert all(s.parent_id == parent.span_id for s in tool_spans)
+
+
+def test_json_span_exporter_writes_json_lines(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    configure_tracing([JSONSpanExporter(str(path))])
+    try:
+        with span("chat.process_chat"):
+            with span("chat.build_file_manifest", files=2):
+                pass
+    finally:
+        configure_tracing([])
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == [
+        "chat.build_file_manifest",
+        "chat.process_chat",
+    ]
+    assert lines[0]["attributes"] == {"files": 2}
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
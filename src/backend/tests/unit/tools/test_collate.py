@@ -1,9 +1,12 @@
+import asyncio
 import os
+from unittest.mock import patch
 
 import pytest
 
 from backend.chat import collate
 from backend.model_deployments import CohereDeployment
+from backend.schemas.context import Context
 
 is_cohere_env_set = (
     os.environ.get("COHERE_API_KEY") is not None
@@ -110,3 +113,92 @@ def test_chunk_empty_content() -> None:
     content = ""
     expected_output = []
     collate.chunk(content, False, 4, 10) == expected_output
+
+
+class FakeRerankDeployment:
+    rerank_enabled = True
+    rerank_model = "fake-rerank"
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def invoke_rerank(self, query, documents, ctx):
+        self.calls.append((query, [document["text"] for document in documents]))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        return {
+            "results": [
+                {
+                    "index": i,
+                    "relevance_score": 1.0 if query in document["text"] else 0.0,
+                }
+                for i, document in enumerate(documents)
+            ]
+        }
+
+
+@pytest.fixture(autouse=True)
+def clear_collate_caches():
+    collate.chunk_cache.clear()
+    collate.rerank_score_cache.clear()
+
+
+def get_tool_results(*queries):
+    return [
+        {
+            "call": {"parameters": {"query": query}, "name": "retriever"},
+            "outputs": [{"text": "about mountains"}, {"text": "about rivers"}],
+        }
+        for query in queries
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rerank_and_chunk_reranks_queries_concurrently() -> None:
+    model = FakeRerankDeployment()
+
+    results = await collate.rerank_and_chunk(
+        get_tool_results("rivers", "mountains"), model, Context()
+    )
+
+    assert model.max_in_flight == 2
+    assert [result["outputs"] for result in results] == [
+        [{"text": "about rivers"}],
+        [{"text": "about mountains"}],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rerank_and_chunk_reuses_cached_scores() -> None:
+    model = FakeRerankDeployment()
+    first = await collate.rerank_and_chunk(get_tool_results("rivers"), model, Context())
+
+    tool_results = get_tool_results("rivers")
+    tool_results[0]["outputs"].append({"text": "more about rivers"})
+    second = await collate.rerank_and_chunk(tool_results, model, Context())
+
+    assert first[0]["outputs"] == [{"text": "about rivers"}]
+    assert second[0]["outputs"] == [
+        {"text": "about rivers"},
+        {"text": "more about rivers"},
+    ]
+    assert model.calls == [
+        ("rivers", ["about mountains", "about rivers"]),
+        ("rivers", ["more about rivers"]),
+    ]
+
+
+def test_chunk_is_memoized() -> None:
+    content = "This is a test. We are testing the chunk function."
+
+    with patch.object(collate, "_chunk_words", wraps=collate._chunk_words) as mock:
+        first = collate.chunk(content, False, 4, 10)
+        second = collate.chunk(content, False, 4, 10)
+
+    assert first == second == [content]
+    mock.assert_called_once()
@@ -0,0 +1,87 @@
+import pytest
+
+from backend.chat import collate
+from backend.services.metrics import FILE_PREFETCH_READS
+from backend.tests.unit.factories import get_factory
+from backend.tools.files import FilePrefetch, ReadFileTool
+
+
+@pytest.mark.asyncio
+async def test_read_file_served_from_prefetch(session, user):
+    file = get_factory("File", session).create(
+        user_id=user.id, file_name="notes.txt", file_content="Some notes"
+    )
+    file_prefetch = FilePrefetch([file], user.id)
+    hits = FILE_PREFETCH_READS.get(status="hit")
+
+    # Without a session, only the prefetched file can be returned
+    result = await ReadFileTool().call(
+        {"file_id": file.id}, user_id=user.id, file_prefetch=file_prefetch
+    )
+
+    assert result == [{"text": "Some notes", "title": "notes.txt", "url": "notes.txt"}]
+    assert FILE_PREFETCH_READS.get(status="hit") == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_read_files_served_from_prefetch(session, user):
+    files = [
+        get_factory("File", session).create(
+            user_id=user.id, file_name=f"{i}.txt", file_content=f"Content {i}"
+        )
+        for i in range(2)
+    ]
+    file_prefetch = FilePrefetch(files, user.id)
+
+    result = await ReadFileTool().call(
+        {"file_ids": [files[1].id, files[0].id]},
+        user_id=user.id,
+        file_prefetch=file_prefetch,
+    )
+
+    assert result[0]["text"] == (
+        "FILE START 1.txt\nContent 1\nFILE END 1.txt\n\n"
+        "FILE START 0.txt\nContent 0\nFILE END 0.txt\n\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_file_falls_back_to_db_on_prefetch_miss(session, user):
+    prefetched = get_factory("File", session).create(user_id=user.id)
+    file = get_factory("File", session).create(
+        user_id=user.id, file_name="other.txt", file_content="Other"
+    )
+    file_prefetch = FilePrefetch([prefetched], user.id)
+    misses = FILE_PREFETCH_READS.get(status="miss")
+
+    result = await ReadFileTool().call(
+        {"file_id": file.id},
+        session=session,
+        user_id=user.id,
+        file_prefetch=file_prefetch,
+    )
+
+    assert result == [{"text": "Other", "title": "other.txt", "url": "other.txt"}]
+    assert FILE_PREFETCH_READS.get(status="miss") == misses + 1
+
+
+def test_prefetch_skips_files_of_other_users(session, user):
+    file = get_factory("File", session).create(user_id=user.id)
+    other_file = get_factory("File", session).create()
+
+    file_prefetch = FilePrefetch([file, other_file], user.id)
+
+    assert list(file_prefetch.files) == [file.id]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_chunks_files(session, user):
+    content = "A prefetched sentence. " * 200
+    file = get_factory("File", session).create(user_id=user.id, file_content=content)
+    collate.chunk_cache.clear()
+
+    file_prefetch = FilePrefetch([file], user.id)
+    file_prefetch.start()
+    await file_prefetch.task
+
+    assert len(collate.chunk_cache) == 1
@@ -1,14 +1,70 @@
+import asyncio
 from enum import StrEnum
 from typing import Any, Dict, List
 
 import backend.crud.file as file_crud
+from backend.chat.collate import chunk
+from backend.services.file_search import search_files
+from backend.services.logger.utils import LoggerFactory
+from backend.services.metrics import FILE_PREFETCH_READS
 from backend.tools.base import BaseTool
 from backend.database_models import File
 
+logger = LoggerFactory().get_logger()
+
 
 class FileToolsArtifactTypes(StrEnum):
     local_file = "file"
 
+
+class FilePrefetch:
+    """
+    Files of a conversation's manifest kept for the read_document call the model is
+    expected to make, so it's served without another DB round trip.
+
+    Only lookups by file ID are served, names can also match files outside the manifest.
+    """
+
+    def __init__(self, files: List[File], user_id: str):
+        # Copied, as the manifest's session can't be used while the model is called
+        self.files = {
+            file.id: File(
+                id=file.id, file_name=file.file_name, file_content=file.file_content
+            )
+            for file in files
+            if file.user_id == user_id
+        }
+        self.task = None
+
+    def start(self) -> None:
+        """
+        Chunks the files in a thread while the model is called, so searches over them
+        are reranked from the chunk cache.
+        """
+        self.task = asyncio.create_task(asyncio.to_thread(self._chunk_files))
+
+    def cancel(self) -> None:
+        if self.task:
+            self.task.cancel()
+
+    def _chunk_files(self) -> None:
+        for file in self.files.values():
+            chunk(file.file_content)
+
+    def get_file(self, file_id: str) -> File | None:
+        file = self.files.get(file_id)
+        FILE_PREFETCH_READS.inc(status="hit" if file else "miss")
+        return file
+
+    def get_files(self, file_ids: List[str]) -> List[File] | None:
+        if not all(file_id in self.files for file_id in file_ids):
+            FILE_PREFETCH_READS.inc(status="miss")
+            return None
+
+        FILE_PREFETCH_READS.inc(status="hit")
+        return [self.files[file_id] for file_id in dict.fromkeys(file_ids)]
+
+
 class ReadFileTool(BaseTool):
     """
     Tool to read a file from the file system.
@@ -34,6 +90,14 @@ class ReadFileTool(BaseTool):
         print("Called_file_ids: ", _file_ids)
         session = kwargs.get("session")
         user_id = kwargs.get("user_id")
+        file_prefetch = kwargs.get("file_prefetch")
+
+        def get_file(identifier):
+            retrieved_file = file_prefetch and file_prefetch.get_file(identifier)
+            return retrieved_file or file_crud.get_file_by_name_or_id(
+                session, identifier, user_id
+            )
+
         if not file and not _file_id and not _file_name and not _file_ids:
             return []
         elif file:
@@ -43,13 +107,15 @@ class ReadFileTool(BaseTool):
                 _, file_id = file
             elif isinstance(file, list):
                 _, file_id = file
-            retrieved_file = file_crud.get_file_by_name_or_id(session, file_id, user_id)    
+            retrieved_file = get_file(file_id)
         elif _file_name and not _file_id:
             retrieved_file = file_crud.get_file_by_name_or_id(session, _file_name, user_id)
         elif _file_id:
-            retrieved_file = file_crud.get_file_by_name_or_id(session, _file_id, user_id)
+            retrieved_file = get_file(_file_id)
         elif _file_ids:
-            retrieved_files = file_crud.get_files_by_identifiers(session, _file_ids, user_id)
+            retrieved_files = (
+                file_prefetch and file_prefetch.get_files(_file_ids)
+            ) or file_crud.get_files_by_identifiers(session, _file_ids, user_id)
             print("retrieved_files_ont: ", retrieved_files)
             # Initialize a variable to hold the combined content
             combined_file_name = "Compination of Files "
@@ -144,6 +210,27 @@ class SearchFileTool(BaseTool):
         if not retrieved_files:
             return []
 
+        try:
+            file_chunks = search_files(
+                session, retrieved_files, query, self.MAX_NUM_CHUNKS
+            )
+        except Exception as e:
+            logger.warning(
+                event="[File Search] Failed to search file chunks", error=str(e)
+            )
+            file_chunks = []
+
+        if file_chunks:
+            file_names = {file.id: file.file_name for file in retrieved_files}
+            return [
+                {
+                    "text": file_chunk.text,
+                    "title": file_names[file_chunk.file_id],
+                    "url": file_names[file_chunk.file_id],
+                }
+                for file_chunk, _ in file_chunks
+            ]
+
         results = []
         for file in retrieved_files:
             results.append(